@@ -0,0 +1,77 @@
+"""Size and speed benchmark for hexflow session codecs.
+
+Encodes and decodes the data of a completed fishing licence session with
+each codec and prints the stored size and per-session timings.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_codecs.py [--iterations N]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from hexflow.state import SQLiteBackend
+
+SESSION_DATA = {
+    "name-and-address": {
+        "full_name": "Alice Example",
+        "address_line1": "1 High Street",
+        "address_line2": "",
+        "city": "Exampleton",
+        "postcode": "EX1 2MP",
+        "date_of_birth": "1980-05-17",
+        "email": "alice@example.com",
+    },
+    "license-type": {
+        "license_type": "trout",
+        "duration": "12-months",
+        "concession": False,
+        "rods": 2,
+        "start_date": "2025-04-01",
+    },
+    "payment": {
+        "card_holder": "Alice Example",
+        "amount": 35.8,
+        "reference": "FL-2025-000123",
+        "receipt_requested": True,
+        "addons": ["postal-card", "email-receipt"],
+    },
+}
+
+
+def bench_codec(backend, codec_name, iterations):
+    """Time encode and decode of SESSION_DATA with one codec."""
+    codec = backend.codecs[codec_name]
+    encoded = codec.encode(SESSION_DATA)
+    size = len(encoded.encode("utf-8") if isinstance(encoded, str) else encoded)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.encode(SESSION_DATA)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.decode(encoded)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    print(f"{codec_name:<14} {size:>6} bytes {encode_us:9.1f} us encode {decode_us:9.1f} us decode")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--compress-threshold", type=int, default=256)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(str(Path(tmp) / "sessions.db"),
+                                compress_threshold=options.compress_threshold)
+        for codec_name in backend.codecs:
+            bench_codec(backend, codec_name, options.iterations)
+
+
+if __name__ == "__main__":
+    main()
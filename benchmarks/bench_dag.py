@@ -0,0 +1,81 @@
+"""DAG loading benchmark: YAML loaders versus the compiled DAG cache.
+
+Generates a large linear workflow, then times loading it with PyYAML's
+pure-Python SafeLoader (the previous behaviour), with libyaml's CSafeLoader
+when available, and from the compiled JSON copy on disk, as a fresh
+process would.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_dag.py [--apps N] [--repeat N]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from hexflow.runner import dag_parser
+from hexflow.runner.dag_parser import DAGParser
+
+
+def generate_dag(apps):
+    """Build the YAML of a linear workflow with one data mapping per hop."""
+    lines = ['name: "generated-flow"', 'description: "Generated benchmark workflow"', 'apps:']
+    for index in range(apps):
+        lines += [f'  - name: "step-{index}"', f'    port: {8001 + index}']
+        if index == 0:
+            lines.append('    entry_point: true')
+    lines.append('flow:')
+    for index in range(apps - 1):
+        lines += [f'  - from: "step-{index}"', f'    to: "step-{index + 1}"', '    trigger: "completion"']
+    lines.append('data_mapping:')
+    for index in range(apps - 1):
+        lines += [f'  - from: "step-{index}"', f'    to: "step-{index + 1}"',
+                  '    fields: ["full_name", "email", "address_line_1", "postcode"]']
+    lines += ['config:', '  timeout: 300', '  retry_attempts: 3']
+    return '\n'.join(lines) + '\n'
+
+
+def best_of(repeat, load):
+    """Return the fastest of several timed loads, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dag_file = Path(tmp) / "generated-flow.dag"
+        dag_file.write_text(generate_dag(options.apps))
+        raw = dag_file.read_bytes()
+
+        pure = best_of(options.repeat, lambda: yaml.load(raw, Loader=yaml.SafeLoader))
+        print(f"SafeLoader         {pure:8.1f} ms")
+        if hasattr(yaml, 'CSafeLoader'):
+            libyaml = best_of(options.repeat, lambda: yaml.load(raw, Loader=yaml.CSafeLoader))
+            print(f"CSafeLoader        {libyaml:8.1f} ms")
+
+        DAGParser.parse_file(str(dag_file))
+
+        def load_cached():
+            # As a new process: nothing in memory, the compiled copy on disk
+            dag_parser._compiled.clear()
+            DAGParser.parse_file(str(dag_file))
+
+        cached = best_of(options.repeat, load_cached)
+        print(f"compiled cache     {cached:8.1f} ms (parse_file, {options.apps} apps, "
+              f"{len(raw) / 1024:.0f} KiB of YAML)")
+
+
+if __name__ == "__main__":
+    main()
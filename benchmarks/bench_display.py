@@ -0,0 +1,129 @@
+"""Rendering benchmark for the onboarding welcome-confirmation DisplayApp page.
+
+Posts a complete onboarding record (as the router hands it over) to the
+example's welcome-confirmation app through Flask's test client, and also
+times the page's view function alone inside a request context: rendering
+every time, serving the rendered page from the response cache, and
+answering a revalidation with 304. Prints pages per second and
+microseconds per page.
+
+Then measures time to first byte of a summary page with a growing number
+of data-bound sections, rendered in memory and streamed
+(``stream_responses``).
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_display.py [--requests N] [--sections N ...]
+"""
+
+import argparse
+import importlib.util
+import time
+from pathlib import Path
+
+from hexflow.skeletons.display.app import DisplayApp
+
+APP_FILE = Path(__file__).resolve().parent.parent / "examples" / "onboarding" / "welcome-confirmation" / "app.py"
+
+# One onboarding record, as posted by the router to the last step
+RECORD = {
+    'full_name': 'Alice Example', 'email': 'alice@example.com', 'phone': '07700 900123',
+    'date_of_birth': '1990-04-01', 'address_line_1': '1 High Street', 'address_line_2': 'Flat 2',
+    'city': 'Leeds', 'postcode': 'LS1 1AA', 'emergency_contact_name': 'Bob Example',
+    'emergency_contact_phone': '07700 900456', 'emergency_contact_relationship': 'Partner',
+    'department': 'Engineering', 'job_title': 'Developer', 'employment_type': 'full_time',
+    'start_date': '2025-09-01', 'manager_name': 'Carol Manager', 'office_location': 'Leeds',
+    'salary_band': 'B2', 'security_clearance': 'none', 'laptop_type': 'linux', 'monitor_setup': 'dual',
+    'mobile_phone': 'yes', 'software_access': 'IDE, chat, ticketing', 'development_tools': 'yes',
+    'vpn_access': 'yes', 'cloud_accounts': 'yes', 'special_requirements': 'Standing desk',
+    'national_insurance': 'QQ123456C', 'bank_name': 'Example Bank', 'account_holder_name': 'Alice Example',
+    'sort_code': '12-34-56', 'account_number': '12345678', 'tax_code': '1257L', 'pension_scheme': 'yes',
+    'health_insurance': 'yes', 'life_insurance': 'no', 'beneficiary_name': 'Bob Example',
+    'beneficiary_relationship': 'Partner', 'holiday_entitlement': '25', 'work_from_home': 'hybrid',
+    'dietary_requirements': 'None'
+}
+
+
+def load_app():
+    """Instantiate the example's WelcomeConfirmationApp."""
+    spec = importlib.util.spec_from_file_location("welcome_confirmation", APP_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.WelcomeConfirmationApp()
+
+
+class Summary(DisplayApp):
+    """Summary page with one section of every field per step."""
+
+    cache_static = True
+    steps = 10
+
+    def setup_display(self, workflow_data=None):
+        workflow_data = workflow_data or {}
+        items = [{'label': key.replace('_', ' ').title(), 'value': value} for key, value in workflow_data.items()]
+        return {
+            'title': 'Check your answers',
+            'sections': [{'title': f'Step {step}', 'items': items} for step in range(self.steps)],
+            'show_workflow_data': True,
+            'completion_message': 'Thank you!'
+        }
+
+
+def first_byte(app, form, requests):
+    """Return the mean seconds until a page's first chunk is ready."""
+    view = app.app.view_functions['display_handler']
+    with app.app.test_request_context('/', method='POST', data=form):
+        start = time.perf_counter()
+        for _ in range(requests):
+            next(iter(view().response))
+        return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--sections", type=int, nargs="+", default=[10, 100, 1000])
+    options = parser.parse_args()
+
+    app = load_app()
+    form = dict(RECORD, workflow_token='WF-BENCH')
+    client = app.app.test_client()
+    assert 'Alice Example' in client.post('/', data=form).get_data(as_text=True)
+
+    start = time.perf_counter()
+    for _ in range(options.requests):
+        client.post('/', data=form)
+    elapsed = time.perf_counter() - start
+    print(f"POST /             {options.requests / elapsed:10.0f} pages/s "
+          f"({elapsed / options.requests * 1e6:.0f} us/page, Flask test client)")
+
+    etag = client.post('/', data=form).headers['ETag']
+    view = app.app.view_functions['display_handler']
+    for label, max_entries, request in (
+            ("view, rendered", 0, dict(method='POST', data=form)),
+            ("view, cached", 256, dict(method='POST', data=form)),
+            ("view, 304", 256, dict(method='GET', query_string=form, headers={'If-None-Match': etag}))):
+        app.response_cache.max_entries = max_entries
+        app.response_cache.clear()
+        with app.app.test_request_context('/', **request):
+            start = time.perf_counter()
+            for _ in range(options.requests):
+                view()
+            elapsed = time.perf_counter() - start
+        print(f"{label:18} {options.requests / elapsed:10.0f} pages/s "
+              f"({elapsed / options.requests * 1e6:.0f} us/page)")
+
+    print()
+    print("time to first byte  sections   in memory    streamed")
+    for steps in options.sections:
+        summary = Summary("summary")
+        summary.steps = steps
+        summary.response_cache.max_entries = 0
+        requests = max(10, options.requests // steps)
+        in_memory = first_byte(summary, form, requests)
+        summary.stream_responses = True
+        streamed = first_byte(summary, form, requests)
+        print(f"                   {steps:9d} {in_memory * 1e3:9.2f}ms {streamed * 1e3:9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
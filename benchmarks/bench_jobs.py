@@ -0,0 +1,91 @@
+"""Throughput benchmark for the durable SQLite processor job queue.
+
+Creates sessions waiting on a processor step, enqueues one job per session,
+then drains the queue with worker threads that claim jobs in batches and
+complete each batch (session update and job settlement) in one transaction.
+Prints enqueue, batched enqueue and claim+complete rates in jobs per second.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_jobs.py [--jobs N] [--batch-size N] [--workers N]
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from hexflow.state import SQLiteBackend, SQLiteJobQueue
+
+
+def mark_checked(workflow_session):
+    """Session update applied by each completed job."""
+    workflow_session.set_step_data("check", {"eligible": "yes"})
+    workflow_session.current_step = "confirm"
+    workflow_session.set_status("in_progress")
+
+
+def drain(queue, batch_size, completed):
+    """Claim and complete batches until the queue is empty."""
+    worker_id = queue.new_worker_id()
+    while True:
+        jobs = queue.claim("check", worker_id, batch_size)
+        if not jobs:
+            return
+        queue.complete_many([(job, mark_checked, None) for job in jobs])
+        completed.append(len(jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=2)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(str(Path(tmp) / "sessions.db"))
+        queue = SQLiteJobQueue(backend)
+
+        sessions = []
+        for _ in range(options.jobs):
+            session = backend.new_session("bench-flow")
+            session.current_step = "check"
+            session.status = "processing"
+            session.set_step_data("details", {"full_name": "Alice Example", "age": "30"})
+            sessions.append(session)
+        backend.insert_sessions(sessions)
+
+        single = min(1000, options.jobs)
+        start = time.perf_counter()
+        for session in sessions[:single]:
+            queue.enqueue(session.workflow_token, "check", {"age": "30"})
+        enqueue_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for offset in range(single, options.jobs, options.batch_size):
+            queue.enqueue_many([(session.workflow_token, ("check", {"age": "30"}, 0, None))
+                                for session in sessions[offset:offset + options.batch_size]])
+        enqueue_many_seconds = time.perf_counter() - start
+
+        completed = []
+        threads = [threading.Thread(target=drain, args=(queue, options.batch_size, completed))
+                   for _ in range(options.workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        drain_seconds = time.perf_counter() - start
+
+        assert sum(completed) == options.jobs, queue.counts()
+        print(f"enqueue            {single / enqueue_seconds:10.0f} jobs/s (one transaction per job)")
+        if options.jobs > single:
+            print(f"enqueue_many       {(options.jobs - single) / enqueue_many_seconds:10.0f} jobs/s "
+                  f"(batches of {options.batch_size})")
+        print(f"claim + complete   {options.jobs / drain_seconds:10.0f} jobs/s "
+              f"({options.workers} workers, batches of {options.batch_size})")
+
+
+if __name__ == "__main__":
+    main()
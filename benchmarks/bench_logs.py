@@ -0,0 +1,91 @@
+"""Caller-side cost of logging from request threads.
+
+Several threads each emit the same per-request event, first with print()
+(what the router and apps used to do), then with log_event through
+configure_logging's queue to a background writer, then with the event
+below the configured level. Each is run against a file and against a
+simulated console that takes 20us per write. Prints events per second and
+microseconds per event seen by the calling threads, and how long the
+background writer took to catch up.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_logs.py [--events N] [--threads N]
+"""
+
+import argparse
+import contextlib
+import logging
+import tempfile
+import threading
+import time
+
+from hexflow.logs import configure_logging, get_logger, log_event, stop_logging
+
+TOKEN = 'ABCD-EFGH-JKMN-PQRS'
+
+
+class Console:
+    """Stream that, like a terminal, serialises writes and takes a while for each."""
+
+    def __init__(self, seconds_per_write=20e-6):
+        self.seconds_per_write = seconds_per_write
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            deadline = time.perf_counter() + self.seconds_per_write
+            while time.perf_counter() < deadline:
+                pass
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def timed(emit, events, threads):
+    """Run emit events times on each thread; return seconds per event."""
+    workers = [threading.Thread(target=lambda: [emit() for _ in range(events)]) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (events * threads)
+
+
+def report(label, seconds, threads, extra=""):
+    """Print one benchmark line."""
+    print(f"{label:20} {1 / seconds:10.0f} events/s ({seconds * 1e6:.2f} us/event, {threads} threads{extra})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    options = parser.parse_args()
+    logger = get_logger('router')
+
+    with tempfile.TemporaryFile('w') as log_file:
+        for sink, out in (("file", log_file), ("console", Console())):
+            with contextlib.redirect_stdout(out):
+                seconds = timed(lambda: print(f"Started workflow: {TOKEN}", flush=True),
+                                options.events, options.threads)
+            report(f"print, {sink}", seconds, options.threads)
+
+            configure_logging(stream=out)
+            seconds = timed(lambda: log_event(logger, logging.INFO, 'workflow_started', workflow_token=TOKEN),
+                            options.events, options.threads)
+            drain_start = time.perf_counter()
+            stop_logging()
+            report(f"log_event, {sink}", seconds, options.threads,
+                   f", writer done {(time.perf_counter() - drain_start) * 1e3:.0f}ms later")
+
+        configure_logging(stream=log_file)
+        seconds = timed(lambda: log_event(logger, logging.DEBUG, 'workflow_started', workflow_token=TOKEN),
+                        options.events, options.threads)
+        stop_logging()
+        report("log_event, skipped", seconds, options.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Memory and throughput benchmark for the WorkflowSession model.
+
+Measures the memory held per session after a four-step workflow and the
+rate of the session operations the router and backends perform on every
+hop: storing step data, serialising, deserialising and flattening. Each
+is measured for the current model and for BaselineSession, a copy of the
+dataclass model it replaced, side by side.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_session.py [--sessions N]
+"""
+
+import argparse
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from hexflow.state import WorkflowSession
+
+STEPS = ["name-and-address", "license-type", "payment", "confirmation"]
+
+STEP_DATA = {
+    "full_name": "Alice Example",
+    "address_line1": "1 High Street",
+    "city": "Exampleton",
+    "postcode": "EX1 2MP",
+    "license_type": "trout",
+    "start_date": "2025-04-01",
+}
+
+
+@dataclass
+class BaselineSession:
+    """The dataclass WorkflowSession the slotted model replaced, for comparison."""
+
+    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    workflow_name: str = ""
+    workflow_token: str = field(default_factory=lambda: f"WF-{str(uuid.uuid4())[:8].upper()}")
+    current_step: Optional[str] = None
+    status: str = "in_progress"
+    data: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+
+    def __post_init__(self):
+        if not self.metadata:
+            self.metadata = {"completed_steps": [], "total_steps": None, "progress_percentage": 0}
+
+    def set_step_data(self, step_name, step_data):
+        self.data[step_name] = step_data
+        self.updated_at = datetime.now()
+        completed_steps = self.metadata.get("completed_steps", [])
+        if step_name not in completed_steps:
+            completed_steps.append(step_name)
+            self.metadata["completed_steps"] = completed_steps
+        total_steps = self.metadata.get("total_steps")
+        if total_steps:
+            self.metadata["progress_percentage"] = min(100, (len(completed_steps) / total_steps) * 100)
+
+    def get_all_data(self):
+        all_data = {}
+        for step_name, step_data in self.data.items():
+            for key, value in step_data.items():
+                all_data[f"{step_name}_{key}"] = value
+                all_data[key] = value
+        return all_data
+
+    def to_dict(self):
+        session_dict = asdict(self)
+        session_dict["created_at"] = self.created_at.isoformat()
+        session_dict["updated_at"] = self.updated_at.isoformat()
+        return session_dict
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data.get("created_at"), str):
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        if isinstance(data.get("updated_at"), str):
+            data["updated_at"] = datetime.fromisoformat(data["updated_at"])
+        return cls(**data)
+
+
+MODELS = [("baseline", BaselineSession), ("slotted", WorkflowSession)]
+
+
+def filled_session(model=WorkflowSession):
+    """Build a session with data for every step."""
+    session = model(workflow_name="bench-flow")
+    for step in STEPS:
+        session.set_step_data(step, dict(STEP_DATA))
+    return session
+
+
+def bench_memory(model, sessions):
+    """Return the memory held per filled session, in bytes."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [filled_session(model) for _ in range(sessions)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(held)
+
+
+def bench_op(operation, iterations):
+    """Time an operation and return operations per second."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return iterations / (time.perf_counter() - start)
+
+
+def operations(model):
+    """The hop operations to time for a session model, by name."""
+    session = filled_session(model)
+    stored = session.to_dict()
+    return {
+        "create+4 steps": lambda: filled_session(model),
+        "set_step_data": lambda: session.set_step_data("payment", STEP_DATA),
+        "to_dict": session.to_dict,
+        "from_dict": lambda: model.from_dict(dict(stored)),
+        "get_all_data": session.get_all_data,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    options = parser.parse_args()
+    iterations = options.sessions
+
+    print(f"{'':<20} " + " ".join(f"{name:>12}" for name, _ in MODELS))
+    memory = [bench_memory(model, iterations) for _, model in MODELS]
+    print(f"{'bytes/session':<20} " + " ".join(f"{value:12.0f}" for value in memory))
+
+    timed = [operations(model) for _, model in MODELS]
+    for name in timed[0]:
+        rates = [bench_op(ops[name], iterations) for ops in timed]
+        print(f"{name + ' ops/s':<20} " + " ".join(f"{rate:12.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Hop throughput benchmark for hexflow state backends.
+
+A hop is what Router.next_app does against the backend: load the session
+by token, store the submitted step data, move current_step on and save.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_state.py [--sessions N] [--threads N]
+"""
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from hexflow.state import SQLiteBackend, LogStructuredBackend, ShardedSQLiteBackend
+
+STEPS = ["name-and-address", "license-type", "payment", "confirmation"]
+
+STEP_DATA = {
+    "full_name": "Alice Example",
+    "address_line1": "1 High Street",
+    "city": "Exampleton",
+    "postcode": "EX1 2MP",
+    "license_type": "trout",
+    "start_date": "2025-04-01",
+}
+
+
+def run_workflow(backend, workflow_token):
+    """Run every hop of one workflow."""
+    for index, step in enumerate(STEPS):
+        session = backend.get_session_by_token(workflow_token)
+        session.set_step_data(step, dict(STEP_DATA))
+        if index + 1 < len(STEPS):
+            session.current_step = STEPS[index + 1]
+        else:
+            session.set_status("completed")
+        backend.save_session(session)
+
+
+def bench_backend(name, backend, sessions, threads):
+    """Time all hops for a number of workflows and print hops per second."""
+    tokens = [backend.create_session("bench-flow").workflow_token for _ in range(sessions)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda token: run_workflow(backend, token), tokens))
+    elapsed = time.perf_counter() - start
+
+    hops = sessions * len(STEPS)
+    print(f"{name:<24} {hops:>7} hops {elapsed:8.3f}s {hops / elapsed:10.0f} hops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        bench_backend("SQLiteBackend", SQLiteBackend(str(tmp_path / "sessions.db")),
+                      options.sessions, options.threads)
+
+        sharded_backend = ShardedSQLiteBackend(str(tmp_path / "shards"), shards=8)
+        bench_backend("ShardedSQLiteBackend(8)", sharded_backend, options.sessions, options.threads)
+        sharded_backend.close()
+
+        log_backend = LogStructuredBackend(str(tmp_path / "sessions.log"))
+        bench_backend("LogStructuredBackend", log_backend, options.sessions, options.threads)
+        log_backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 
 import sys
 import os
+import logging
 from flask import request, render_template_string, render_template
 from typing import Dict, List, Any, Optional
 
@@ -9,6 +10,7 @@ from typing import Dict, List, Any, Optional
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from hexflow.skeletons.casa.app import CasaApp
+from hexflow.logs import log_event
 
 
 class GDSCasaApp(CasaApp):
@@ -65,7 +67,6 @@ class GDSCasaApp(CasaApp):
         """Helper method to serve asset files with proper MIME types."""
         from flask import send_from_directory, make_response
         
-        print(f"DEBUG: Serving asset {filename}")
         try:
             response = make_response(send_from_directory(assets_dir, filename))
             
@@ -87,10 +88,11 @@ class GDSCasaApp(CasaApp):
             elif filename.endswith('.ico'):
                 response.headers['Content-Type'] = 'image/x-icon'
             
-            print(f"DEBUG: Content-Type set to: {response.headers.get('Content-Type')}")
+            log_event(self.logger, logging.DEBUG, 'asset_served', filename=filename,
+                      content_type=response.headers.get('Content-Type'))
             return response
         except Exception as e:
-            print(f"ERROR serving {filename}: {e}")
+            log_event(self.logger, logging.ERROR, 'asset_failed', filename=filename, error=str(e))
             raise
         
     def render_form(self, errors: Dict[str, str] = None) -> str:
@@ -100,7 +102,7 @@ class GDSCasaApp(CasaApp):
         
         # Log validation errors if any
         if errors:
-            print(f"Form validation errors: {list(errors.keys())}")
+            log_event(self.logger, logging.DEBUG, 'validation_errors', fields=sorted(errors))
 
                 # Build form fields HTML
         fields_html = []
@@ -205,7 +207,6 @@ class GDSCasaApp(CasaApp):
         
         # Try to use Jinja2 template, fall back to inline template if not found
         try:
-            print(f"DEBUG: Attempting to render gds_form.html with service_name: {self.service_name}")
             return render_template('gds_form.html',
                                 title=form_config.get('title', 'Government Service'),
                                 fields_html=fields_html,
@@ -215,7 +216,7 @@ class GDSCasaApp(CasaApp):
                                 service_name=self.service_name,
                                 govuk_css=govuk_css)
         except Exception as e:
-            print(f"Jinja2 template not found, using inline template fallback: {e}")
+            log_event(self.logger, logging.WARNING, 'template_fallback', template='gds_form.html', error=str(e))
             # Fallback to inline template for backward compatibility
             return render_template_string(template, 
                                         title=form_config.get('title', 'Government Service'),
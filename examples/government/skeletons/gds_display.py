@@ -2,6 +2,7 @@
 
 import sys
 import os
+import logging
 from flask import request, render_template_string, render_template
 from markupsafe import Markup
 from typing import Dict, List, Any, Optional
@@ -10,6 +11,8 @@ from typing import Dict, List, Any, Optional
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from hexflow.skeletons.display.app import DisplayApp
+from hexflow.skeletons.http_base.streaming import LazyHTML
+from hexflow.logs import log_event
 
 
 class GDSDisplayApp(DisplayApp):
@@ -89,7 +92,7 @@ class GDSDisplayApp(DisplayApp):
             
             return response
         except Exception as e:
-            print(f"ERROR serving {filename}: {e}")
+            log_event(self.logger, logging.ERROR, 'asset_failed', filename=filename, error=str(e))
             raise
     
     def setup_routes(self):
@@ -107,29 +110,52 @@ class GDSDisplayApp(DisplayApp):
                 workflow_data = dict(request.args)
             
             workflow_token = workflow_data.pop('workflow_token', '')
-            print(f"DEBUG: Workflow data received: {workflow_data}")
+            log_event(self.logger, logging.DEBUG, 'workflow_data_received', fields=sorted(workflow_data))
             
-            # Call setup_display with workflow data
-            self.display_config = self.setup_display(workflow_data)
+            def render():
+                # Call setup_display with workflow data
+                self.display_config = self.setup_display(workflow_data)
+                
+                # Use our custom GDS render method
+                return self.render_display(workflow_data, stream=self.stream_responses)
             
-            # Use our custom GDS render method
-            return self.render_display(workflow_data)
+            # Repeat views of the same session get a 304 or the cached page;
+            # the token is part of the key as setup_display may generate
+            # per-session values such as reference numbers
+            return self.cached_response(dict(workflow_data, workflow_token=workflow_token), render)
+        
+    def render_display(self, workflow_data=None, stream: bool = False):
+        """Render the display HTML using GDS Design System styling.
         
-    def render_display(self, workflow_data=None) -> str:
-        """Render the display HTML using GDS Design System styling."""
+        With stream, the page is streamed and its sections and workflow data
+        are only rendered once the page's head has been sent.
+        """
         display_config = self.display_config
         workflow_data = workflow_data or {}
         
         # Build sections HTML
-        sections_html = []
-        for section in display_config.get('sections', []):
-            section_html = self.render_gds_section(section)
-            sections_html.append(section_html)
+        sections_html = (self.render_gds_section(section) for section in display_config.get('sections', []))
         
         # Get workflow data if requested
-        workflow_data_html = ''
-        if display_config.get('show_workflow_data', False):
-            workflow_data_html = self.render_workflow_data(workflow_data)
+        workflow_data_html = LazyHTML(lambda: self.render_workflow_data(workflow_data)
+                                      if display_config.get('show_workflow_data', False) else '')
+        
+        if stream:
+            try:
+                return self.stream_template('gds_display.html', {
+                    'title': display_config.get('title', 'Application Complete'),
+                    'sections_html': sections_html,
+                    'workflow_data_html': workflow_data_html,
+                    'completion_message': display_config.get('completion_message',
+                                                             'Your application has been submitted.'),
+                    'service_name': self.service_name
+                })
+            except Exception as e:
+                log_event(self.logger, logging.WARNING, 'template_fallback', template='gds_display.html',
+                          error=str(e), streamed=False)
+        
+        sections_html = list(sections_html)
+        workflow_data_html = str(workflow_data_html)
         
         # GDS-compliant template with 2025 rebrand
         template = '''
@@ -216,18 +242,6 @@ class GDSDisplayApp(DisplayApp):
         </html>
         '''
         
-        # Load GOV.UK Frontend CSS
-        css_path = os.path.join(os.path.dirname(__file__), 'assets', 'govuk-frontend.min.css')
-        try:
-            with open(css_path, 'r', encoding='utf-8') as f:
-                govuk_css = f.read()
-        except FileNotFoundError:
-            print(f"CSS file not found at {css_path}")
-            govuk_css = ""  # Fallback to no CSS
-        except Exception as e:
-            print(f"Error loading CSS: {e}")
-            govuk_css = ""
-        
         # Try to use Jinja2 template, fall back to inline template if not found
         try:
             return render_template('gds_display.html',
@@ -235,11 +249,22 @@ class GDSDisplayApp(DisplayApp):
                                 sections_html=sections_html,
                                 workflow_data_html=workflow_data_html,
                                 completion_message=display_config.get('completion_message', 'Your application has been submitted.'),
-                                service_name=self.service_name,
-                                govuk_css=govuk_css)
+                                service_name=self.service_name)
         except Exception as e:
-            print(f"Template error: {e}, falling back to inline template")
-            print(f"CSS length: {len(govuk_css)} characters")
+            log_event(self.logger, logging.WARNING, 'template_fallback', template='gds_display.html', error=str(e))
+            
+            # Load GOV.UK Frontend CSS, only inlined by the fallback template
+            css_path = os.path.join(os.path.dirname(__file__), 'assets', 'govuk-frontend.min.css')
+            try:
+                with open(css_path, 'r', encoding='utf-8') as f:
+                    govuk_css = f.read()
+            except FileNotFoundError:
+                log_event(self.logger, logging.WARNING, 'stylesheet_missing', path=css_path)
+                govuk_css = ""  # Fallback to no CSS
+            except Exception as e:
+                log_event(self.logger, logging.WARNING, 'stylesheet_failed', path=css_path, error=str(e))
+                govuk_css = ""
+            
             # Fallback to inline template
             return render_template_string(template,
                                         title=display_config.get('title', 'Application Complete'),
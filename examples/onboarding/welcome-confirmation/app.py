@@ -3,7 +3,6 @@
 
 import sys
 import os
-from flask import request
 
 # Add the parent directory to the path so we can import hexflow
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
@@ -14,10 +13,13 @@ from hexflow.skeletons.display import DisplayApp
 class WelcomeConfirmationApp(DisplayApp):
     """Welcome confirmation page for completed employee onboarding."""
     
+    # The page depends only on the workflow data
+    cache_static = True
+    
     def __init__(self, name="welcome-confirmation", host='localhost', port=8005):
         super().__init__(name=name, host=host, port=port)
     
-    def setup_display(self):
+    def setup_display(self, workflow_data=None):
         """Configure the welcome confirmation display."""
         return {
             'title': 'Welcome to the Team! 🎉',
@@ -35,15 +37,10 @@ class WelcomeConfirmationApp(DisplayApp):
             'completion_message': 'Welcome to the company! Your IT equipment will be prepared and ready for your start date. You will receive a welcome email with additional information and next steps within 24 hours.'
         }
     
-    def render_workflow_data(self) -> str:
+    def render_workflow_data(self, workflow_data) -> str:
         """Render all onboarding data from the four forms."""
-        workflow_token = request.args.get('workflow_token', '')
-        if not workflow_token:
-            return '<div class="workflow-data"><div class="empty-data">No onboarding data available</div></div>'
-        
-        # Get all workflow parameters passed to this app
-        workflow_params = dict(request.args)
-        workflow_params.pop('workflow_token', None)  # Remove token from display
+        # Workflow data passed to this app, without the workflow token
+        workflow_params = dict(workflow_data or {})
         
         if not workflow_params:
             return '<div class="workflow-data"><div class="empty-data">No onboarding details to display</div></div>'
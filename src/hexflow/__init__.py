@@ -1,7 +1,18 @@
 """Hexflow - AI-aware modular application framework."""
 
+import importlib
+
 __version__ = "0.1.0"
 
-from . import launcher, runner, skeletons, state
+__all__ = ["launcher", "logs", "runner", "skeletons", "state"]
+
+
+def __getattr__(name):
+    """Import subpackages and modules on first use, so the CLI starts without loading Flask."""
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-__all__ = ["launcher", "runner", "skeletons", "state"]
\ No newline at end of file
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -5,7 +5,30 @@ directory and launch them as background services. In future versions, it will
 coordinate with the runner to manage application lifecycles based on DAGs.
 """
 
-from .app_launcher import AppLauncher
-from .cli import main
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ["AppLauncher", "main"]
\ No newline at end of file
+# Exported names and the modules defining them, imported on first use
+_EXPORTS = {
+    "AppLauncher": ".app_launcher",
+    "main": ".cli",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .app_launcher import AppLauncher
+    from .cli import main
+
+
+def __getattr__(name):
+    """Import an exported name's module on first use."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
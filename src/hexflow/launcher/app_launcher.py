@@ -3,11 +3,18 @@
 import os
 import sys
 import importlib.util
+import logging
 import threading
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, TYPE_CHECKING
 from pathlib import Path
-from ..runner import Router
+
+from ..logs import configure_from_settings, get_logger, log_event, logging_configured
+
+if TYPE_CHECKING:
+    from ..runner import Router
+
+logger = get_logger('launcher')
 
 
 class AppLauncher:
@@ -17,7 +24,7 @@ class AppLauncher:
         self.apps_directory = Path(apps_directory)
         self.running_apps: Dict[str, Any] = {}
         self.app_threads: Dict[str, threading.Thread] = {}
-        self.router: Router = None
+        self.router: 'Router' = None
         self.router_thread: threading.Thread = None
         
     def has_dag_file(self) -> bool:
@@ -29,7 +36,7 @@ class AppLauncher:
     def discover_apps(self) -> List[str]:
         """Discover all application directories."""
         if not self.apps_directory.exists():
-            print(f"Directory {self.apps_directory} does not exist")
+            log_event(logger, logging.ERROR, 'directory_missing', directory=str(self.apps_directory))
             return []
         
         apps = []
@@ -88,7 +95,7 @@ class AppLauncher:
         # Find the app class (look for classes that inherit from HTTPBaseApp hierarchy)
         # We want the most specific class - the one defined in this module, not imported ones
         app_class = None
-        excluded_base_classes = ['HTTPBaseApp', 'CasaApp', 'DisplayApp']
+        excluded_base_classes = ['HTTPBaseApp', 'CasaApp', 'DisplayApp', 'ProcessorApp']
         candidates = []
         
         for name in dir(module):
@@ -96,7 +103,7 @@ class AppLauncher:
             if (isinstance(obj, type) and 
                 name not in excluded_base_classes and  # Exclude base classes
                 hasattr(obj, '__bases__') and
-                any(base_name in str(base) for base_name in ['HTTPBaseApp', 'CasaApp', 'DisplayApp'] for base in obj.__mro__)):
+                any(base_name in str(base) for base_name in ['HTTPBaseApp', 'CasaApp', 'DisplayApp', 'ProcessorApp'] for base in obj.__mro__)):
                 # Check if this class is defined in this module (not imported)
                 if obj.__module__ == module.__name__:
                     candidates.append(obj)
@@ -135,14 +142,16 @@ class AppLauncher:
             
             # Store the app instance
             self.running_apps[app_name] = app_instance
+            if self.router:
+                # Lets the router's JSON API validate with the app's form rules
+                self.router.register_app(app_instance)
             
             # Start the app in a background thread
             def run_app():
-                print(f"Starting {app_name} on port {port}")
                 try:
                     app_instance.run(debug=False)
                 except Exception as e:
-                    print(f"Error running {app_name}: {e}")
+                    log_event(logger, logging.ERROR, 'app_failed', app=app_name, error=str(e), exc_info=e)
             
             thread = threading.Thread(target=run_app, daemon=True)
             thread.start()
@@ -151,22 +160,23 @@ class AppLauncher:
             # Give the app a moment to start
             time.sleep(0.5)
             
-            print(f"Launched {app_name} at http://localhost:{port}")
+            log_event(logger, logging.INFO, 'app_launched', app=app_name, url=f"http://localhost:{port}")
             
         except Exception as e:
-            print(f"Failed to launch {app_name}: {e}")
+            log_event(logger, logging.ERROR, 'app_launch_failed', app=app_name, error=str(e), exc_info=e)
     
     def launch_router(self):
         """Launch the router service."""
+        # Flask and the router are only loaded when a workflow is served
+        from ..runner import Router
         try:
             self.router = Router(dag_directory=str(self.apps_directory), port=8000)
             
             def run_router():
-                print("Starting router on port 8000")
                 try:
                     self.router.run(debug=False)
                 except Exception as e:
-                    print(f"Error running router: {e}")
+                    log_event(logger, logging.ERROR, 'router_failed', error=str(e), exc_info=e)
             
             self.router_thread = threading.Thread(target=run_router, daemon=True)
             self.router_thread.start()
@@ -174,18 +184,21 @@ class AppLauncher:
             # Give the router a moment to start
             time.sleep(0.5)
             
-            print("Launched router at http://localhost:8000")
-            print("Start workflow at: http://localhost:8000/start")
+            log_event(logger, logging.INFO, 'router_launched', url="http://localhost:8000",
+                      entry_point="http://localhost:8000/start")
             
         except Exception as e:
-            print(f"Failed to launch router: {e}")
+            log_event(logger, logging.ERROR, 'router_launch_failed', error=str(e), exc_info=e)
     
     def launch_all_apps(self):
-        """Discover and launch all applications."""
+        """Discover and launch all applications, logging as the workflow's settings.py configures."""
+        if not logging_configured():
+            configure_from_settings(str(self.apps_directory))
+        
         # Check for .dag file requirement
         if not self.has_dag_file():
-            print(f"Error: No .dag file found in {self.apps_directory}")
-            print("A .dag file is required to launch applications")
+            log_event(logger, logging.ERROR, 'dag_not_found', directory=str(self.apps_directory),
+                      hint="a .dag file is required to launch applications")
             return []
         
         # Launch the router first
@@ -198,7 +211,7 @@ class AppLauncher:
                 port_mapping[app.name] = app.port
             
         apps = self.discover_apps()
-        print(f"Discovered apps: {apps}")
+        log_event(logger, logging.INFO, 'apps_discovered', apps=apps)
         
         for app_name in apps:
             # Use port from DAG if available, otherwise auto-assign
@@ -207,7 +220,7 @@ class AppLauncher:
             port = port_mapping.get(dag_app_name)
             self.launch_app(app_name, port=port)
         
-        print(f"Launched {len(apps)} applications")
+        log_event(logger, logging.INFO, 'apps_launched', count=len(apps))
         return list(self.running_apps.keys())
     
     def stop_all_apps(self):
@@ -215,9 +228,9 @@ class AppLauncher:
         # Stop router first
         if self.router:
             try:
-                print("Stopped router")
+                log_event(logger, logging.INFO, 'router_stopped')
             except Exception as e:
-                print(f"Error stopping router: {e}")
+                log_event(logger, logging.ERROR, 'router_stop_failed', error=str(e))
             self.router = None
             self.router_thread = None
         
@@ -227,9 +240,9 @@ class AppLauncher:
                 # If the app has a stop method, call it
                 if hasattr(app_instance, 'stop'):
                     app_instance.stop()
-                print(f"Stopped {app_name}")
+                log_event(logger, logging.INFO, 'app_stopped', app=app_name)
             except Exception as e:
-                print(f"Error stopping {app_name}: {e}")
+                log_event(logger, logging.ERROR, 'app_stop_failed', app=app_name, error=str(e))
         
         self.running_apps.clear()
         self.app_threads.clear()
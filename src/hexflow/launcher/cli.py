@@ -2,8 +2,9 @@
 
 import sys
 import os
+import argparse
+from contextlib import redirect_stdout
 from pathlib import Path
-from .app_launcher import AppLauncher
 
 
 def show_help():
@@ -14,12 +15,20 @@ Hexflow - AI-aware modular application framework
 USAGE:
     hexflow start [DIRECTORY]
     hexflow init [DIRECTORY]
+    hexflow export [DIRECTORY] [--format ndjson|csv] [--output FILE] [--watermark FILE]
+    hexflow stats [DIRECTORY] [--reconcile]
+    hexflow reshard SOURCE TARGET_DIRECTORY --shards N
+    hexflow ingest DIRECTORY RECORDS [--report FILE] [--batch-size N] [--workers N]
     hexflow --help
     hexflow -h
 
 COMMANDS:
     start        Launch a workflow from the specified directory
     init         Initialize a new workflow directory with starter files
+    export       Export completed workflow sessions as NDJSON or CSV
+    stats        Show session statistics, optionally reconciling the counters
+    reshard      Copy a session database into N ShardedSQLiteBackend shards
+    ingest       Bulk-load NDJSON records of complete workflows as sessions
     
 ARGUMENTS:
     DIRECTORY    Path to workflow directory (default: current directory)
@@ -27,6 +36,17 @@ ARGUMENTS:
 OPTIONS:
     -h, --help   Show this help message and exit
 
+EXPORT OPTIONS:
+    --format     Output format: ndjson (default) or csv
+    --output     Output file (default: standard output)
+    --watermark  File recording the last exported session; only sessions
+                 completed after it are exported and it is updated afterwards
+
+INGEST OPTIONS:
+    --report     File receiving one NDJSON result per record
+    --batch-size Records validated per task and written per transaction
+    --workers    Threads validating records
+
 DESCRIPTION:
     Hexflow launches orchestrated workflows from a directory containing:
     - A .dag file defining the workflow structure
@@ -44,6 +64,10 @@ EXAMPLES:
     hexflow start                # Launch workflow in current directory
     hexflow start examples/fishing  # Launch fishing license example workflow
     hexflow start ~/my-workflow  # Launch workflow in specific directory
+    hexflow export examples/fishing --format csv --output licences.csv
+    hexflow stats examples/fishing --reconcile
+    hexflow reshard workflow_sessions.db sessions --shards 8
+    hexflow ingest examples/fishing paper-forms.ndjson --report ingest-report.ndjson
 
 For more information, see: https://github.com/bmcollier/hexflow
 """
@@ -109,6 +133,200 @@ A simple workflow that collects a user's name and displays a greeting.
     print("3. Run 'hexflow start' to launch the completed workflow")
 
 
+def load_workflow_apps(directory_path: Path, dag, purpose: str) -> dict:
+    """Load an instance of each app in a DAG without starting it.
+    
+    Apps are loaded the same way the launcher loads them. Apps that fail to
+    load are skipped.
+    """
+    from .app_launcher import AppLauncher
+    launcher = AppLauncher(str(directory_path))
+    app_dirs = {app_dir.split('/')[-1]: app_dir for app_dir in launcher.discover_apps()}
+    
+    apps = {}
+    for app in dag.apps:
+        if app.name not in app_dirs:
+            continue
+        try:
+            app_class = launcher.load_app_class(app_dirs[app.name])
+            apps[app.name] = app_class(name=app.name, host='localhost', port=app.port)
+        except Exception as e:
+            print(f"Could not load {app.name} for {purpose}: {e}")
+    
+    return apps
+
+
+def collect_form_fields(directory_path: Path, dag) -> dict:
+    """Collect form field names for each app in a DAG.
+    
+    Apps that fail to load or have no form configuration are skipped.
+    """
+    form_fields = {}
+    for name, instance in load_workflow_apps(directory_path, dag, 'export columns').items():
+        form_config = getattr(instance, 'form_config', None) or {}
+        fields = [field['name'] for field in form_config.get('fields', []) if 'name' in field]
+        if fields:
+            form_fields[name] = fields
+    
+    return form_fields
+
+
+def export_workflow(args: list):
+    """Export completed sessions of the workflow in a directory."""
+    from ..runner.dag_parser import DAGParser
+    from ..state import load_state_backend
+    from ..state.export import (SessionExporter, EXPORT_FORMATS, dag_columns,
+                                read_watermark, write_watermark)
+    
+    parser = argparse.ArgumentParser(prog='hexflow export')
+    parser.add_argument('directory', nargs='?', default=os.getcwd())
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+    parser.add_argument('--output')
+    parser.add_argument('--watermark')
+    options = parser.parse_args(args)
+    
+    directory_path = Path(options.directory)
+    if not directory_path.is_dir():
+        print(f"Error: {options.directory} is not a directory", file=sys.stderr)
+        sys.exit(1)
+    
+    # Loading settings and apps prints progress; keep it off the export stream
+    with redirect_stdout(sys.stderr):
+        dag_file = DAGParser.find_dag_file(str(directory_path))
+        if not dag_file:
+            print(f"Error: No .dag file found in {directory_path}")
+            sys.exit(1)
+        dag = DAGParser.parse_file(dag_file)
+        backend = load_state_backend(str(directory_path))
+        columns = dag_columns(dag, collect_form_fields(directory_path, dag))
+    
+    after = read_watermark(options.watermark) if options.watermark else None
+    exporter = SessionExporter(backend, workflow_name=dag.name, columns=columns)
+    
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8', newline='') as out:
+            count, watermark = exporter.export(out, options.format, after)
+    else:
+        count, watermark = exporter.export(sys.stdout, options.format, after)
+    
+    if options.watermark and watermark:
+        write_watermark(options.watermark, watermark)
+    
+    print(f"Exported {count} completed sessions", file=sys.stderr)
+
+
+def show_stats(args: list):
+    """Print session statistics for the workflow in a directory."""
+    import json
+    from ..state import load_state_backend
+    
+    parser = argparse.ArgumentParser(prog='hexflow stats')
+    parser.add_argument('directory', nargs='?', default=os.getcwd())
+    parser.add_argument('--reconcile', action='store_true',
+                        help='Recompute counters from scratch and report drift')
+    options = parser.parse_args(args)
+    
+    if not Path(options.directory).is_dir():
+        print(f"Error: {options.directory} is not a directory")
+        sys.exit(1)
+    
+    backend = load_state_backend(options.directory)
+    
+    if options.reconcile:
+        if not hasattr(backend, 'reconcile_stats'):
+            print(f"Error: {type(backend).__name__} does not support reconciliation")
+            sys.exit(1)
+        result = backend.reconcile_stats()
+        if result['drift']:
+            print("Counter drift corrected:")
+            for key, values in sorted(result['drift'].items()):
+                print(f"  {key}: counter={values['counter']} actual={values['actual']}")
+        else:
+            print("No counter drift found")
+        stats = result['stats']
+    else:
+        stats = backend.get_stats()
+    
+    print(json.dumps(stats, indent=2))
+
+
+def reshard_sessions(args: list):
+    """Copy a session database into a new set of shards."""
+    from ..state import reshard
+    
+    parser = argparse.ArgumentParser(prog='hexflow reshard')
+    parser.add_argument('source', help='workflow_sessions.db file or existing shard directory')
+    parser.add_argument('target', help='Directory for the new shards')
+    parser.add_argument('--shards', type=int, required=True)
+    options = parser.parse_args(args)
+    
+    if not Path(options.source).exists():
+        print(f"Error: {options.source} does not exist")
+        sys.exit(1)
+    
+    try:
+        copied = reshard(options.source, options.target, options.shards)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    print(f"Copied {copied} sessions into {options.shards} shards in {options.target}")
+    print("Configure settings.py with:")
+    print("    STATE_BACKEND_CLASS = ShardedSQLiteBackend")
+    print(f"    STATE_BACKEND_CONFIG = {{'db_dir': '{options.target}', 'shards': {options.shards}}}")
+
+
+def ingest_records(args: list):
+    """Bulk-load NDJSON workflow records into the workflow in a directory."""
+    import time
+    from ..runner.dag_parser import DAGParser
+    from ..runner.ingest import BulkIngester
+    from ..state import load_state_backend
+    
+    parser = argparse.ArgumentParser(prog='hexflow ingest')
+    parser.add_argument('directory', help='Workflow directory')
+    parser.add_argument('records', help='NDJSON file of records, or - for standard input')
+    parser.add_argument('--report', help='Write one NDJSON result per record to this file')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    options = parser.parse_args(args)
+    
+    directory_path = Path(options.directory)
+    if not directory_path.is_dir():
+        print(f"Error: {options.directory} is not a directory")
+        sys.exit(1)
+    
+    dag_file = DAGParser.find_dag_file(str(directory_path))
+    if not dag_file:
+        print(f"Error: No .dag file found in {directory_path}")
+        sys.exit(1)
+    dag = DAGParser.parse_file(dag_file)
+    backend = load_state_backend(str(directory_path))
+    apps = load_workflow_apps(directory_path, dag, 'validation')
+    
+    ingester = BulkIngester(dag, backend, apps, batch_size=options.batch_size, workers=options.workers)
+    records = sys.stdin if options.records == '-' else open(options.records, 'r', encoding='utf-8')
+    report = open(options.report, 'w', encoding='utf-8') if options.report else None
+    started = time.perf_counter()
+    try:
+        result = ingester.ingest(records, report)
+    finally:
+        if records is not sys.stdin:
+            records.close()
+        if report:
+            report.close()
+    elapsed = time.perf_counter() - started
+    
+    print(f"Ingested {result.ingested} records, {result.failed} failed, "
+          f"in {elapsed:.1f}s ({(result.ingested + result.failed) / max(elapsed, 1e-9) * 60:.0f} records/min)")
+    for error in result.errors[:10]:
+        print(f"  line {error['line']}: {error['errors']}")
+    if result.failed > 10:
+        print(f"  ... {result.failed - 10} more" + (f"; see {options.report}" if options.report else ""))
+    if result.failed:
+        sys.exit(1)
+
+
 def main():
     """Main CLI entry point for launching applications."""
     # Check for help flag or no arguments
@@ -133,6 +351,26 @@ def main():
         init_workflow(directory_path)
         sys.exit(0)
     
+    # Check for export command
+    elif command == 'export':
+        export_workflow(sys.argv[2:])
+        sys.exit(0)
+    
+    # Check for stats command
+    elif command == 'stats':
+        show_stats(sys.argv[2:])
+        sys.exit(0)
+    
+    # Check for reshard command
+    elif command == 'reshard':
+        reshard_sessions(sys.argv[2:])
+        sys.exit(0)
+    
+    # Check for ingest command
+    elif command == 'ingest':
+        ingest_records(sys.argv[2:])
+        sys.exit(0)
+    
     # Check for start command
     elif command == 'start':
         if len(sys.argv) > 2:
@@ -148,7 +386,7 @@ def main():
     
     else:
         print(f"Error: Unknown command '{command}'")
-        print("Available commands: start, init")
+        print("Available commands: start, init, export, stats, reshard, ingest")
         print("Run 'hexflow --help' for usage information.")
         sys.exit(1)
     
@@ -164,6 +402,7 @@ def main():
     
     print(f"Launching applications from: {directory_path.absolute()}")
     
+    from .app_launcher import AppLauncher
     launcher = AppLauncher(str(directory_path))
     
     try:
@@ -0,0 +1,306 @@
+"""Structured logging for the router, launcher, job workers and apps.
+
+Hexflow logs events: a short event name with key/value fields, e.g.
+
+    log_event(logger, logging.INFO, 'workflow_started', workflow_token=token)
+
+which configure_logging writes as a logfmt line
+
+    time=2025-01-12T10:00:00 level=info logger=hexflow.router event=workflow_started workflow_token=...
+
+or as a JSON object per line. Records go through a queue to a background
+thread that formats and writes them, so request threads never wait on the
+console. Events skipped by the level are not formatted at all, and
+high-volume events can be sampled.
+
+Every component has its own logger (get_logger): ``hexflow.router``,
+``hexflow.launcher``, ``hexflow.jobs``, ``hexflow.state`` and
+``hexflow.app.<app-name>`` for each app, so levels can be set per app.
+``hexflow start`` configures logging from the workflow's settings.py:
+
+    LOG_LEVEL = 'INFO'                          # default level
+    LOG_LEVELS = {'router': 'WARNING', 'eligibility-form': 'DEBUG'}
+    LOG_FORMAT = 'logfmt'                       # or 'json'
+    LOG_SAMPLING = {'workflow_started': 100}    # log 1 in 100 of an event
+
+Until logging is configured, Python's defaults apply: warnings and errors
+are written to stderr, as the event name followed by its fields in logfmt,
+and nothing else is. The same message reaches any handlers an embedding
+application has set up itself.
+"""
+
+import atexit
+import copy
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, TextIO
+
+ROOT_LOGGER = 'hexflow'
+
+# Components with their own logger; any other name is an app
+COMPONENTS = ('router', 'launcher', 'jobs', 'state')
+
+# Record attributes holding an event's name and fields
+EVENT_ATTRIBUTE = 'event_name'
+FIELDS_ATTRIBUTE = 'event_fields'
+
+_sample_rates: Dict[str, int] = {}
+_sample_counters: Dict[str, Any] = {}
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_levelled_loggers = []
+_atexit_registered = False
+
+
+def get_logger(component: str) -> logging.Logger:
+    """Return the logger of a hexflow component ('router', 'launcher', 'jobs', 'state') or app."""
+    if component in COMPONENTS:
+        return logging.getLogger(f'{ROOT_LOGGER}.{component}')
+    return logging.getLogger(f'{ROOT_LOGGER}.app.{component}')
+
+
+def log_event(logger: logging.Logger, level: int, event: str, sample: int = 1, exc_info: Any = None,
+              **fields: Any) -> None:
+    """Log a structured event.
+
+    Nothing is formatted if the logger is not enabled for the level.
+
+    Args:
+        logger: Logger from get_logger
+        level: Logging level, e.g. logging.INFO
+        event: Event name, e.g. 'workflow_started'
+        sample: Log only one in this many occurrences of the event; LOG_SAMPLING
+            in settings.py overrides it. Sampled records carry ``sample_rate``
+        exc_info: Exception to log with its traceback, or True for the current one
+        **fields: Key/value pairs describing the event
+    """
+    if not logger.isEnabledFor(level):
+        return
+    sample = _sample_rates.get(event, sample)
+    if sample > 1:
+        counter = _sample_counters.get(event)
+        if counter is None:
+            counter = _sample_counters.setdefault(event, itertools.count())
+        if next(counter) % sample:
+            return
+        fields['sample_rate'] = sample
+    if exc_info is True:
+        exc_info = sys.exc_info()
+    elif isinstance(exc_info, BaseException):
+        exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+    message = event
+    if _listener is None:
+        # Other handlers only print the message, so it carries the fields
+        message = ' '.join([event] + [f'{key}={_logfmt_value(value)}' for key, value in fields.items()])
+    # Built directly, as Logger.log would spend longer finding the caller
+    # than the rest of the record takes
+    record = logger.makeRecord(logger.name, level, '', 0, message, (), exc_info or None,
+                               extra={EVENT_ATTRIBUTE: event, FIELDS_ATTRIBUTE: fields})
+    logger.handle(record)
+
+
+def _record_fields(record: logging.LogRecord, formatter: logging.Formatter) -> Dict[str, Any]:
+    """Return the time, level, logger, event and event fields of a record."""
+    fields = {
+        'time': formatter.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+        'level': record.levelname.lower(),
+        'logger': record.name,
+        'event': getattr(record, EVENT_ATTRIBUTE, None) or record.getMessage(),
+    }
+    fields.update(getattr(record, FIELDS_ATTRIBUTE, None) or {})
+    return fields
+
+
+def _logfmt_value(value: Any) -> str:
+    """Render a logfmt value: lists comma-separated, quoted if it has spaces, quotes or equals signs."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        text = ','.join(str(item) for item in value)
+    else:
+        text = value if isinstance(value, str) else json.dumps(value, default=str)
+    if text and not any(char in text for char in ' "=\n\t'):
+        return text
+    return json.dumps(text)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Formats records as logfmt lines, with any traceback on the lines after."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = ' '.join(f'{key}={_logfmt_value(value)}' for key, value in _record_fields(record, self).items())
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line = f'{line}\n{record.exc_text}'
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, with any traceback under 'exception'."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = _record_fields(record, self)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields['exception'] = record.exc_text
+        return json.dumps(fields, default=str)
+
+
+FORMATTERS = {'logfmt': KeyValueFormatter, 'json': JSONFormatter}
+
+# Most records the background writer joins into one write
+WRITE_BATCH = 256
+
+
+class _EventQueueHandler(QueueHandler):
+    """Queues records with their fields intact, for the background writer to format."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks are rendered here, while their frames are still current
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _BatchingStreamHandler(logging.StreamHandler):
+    """Stream handler for the background writer: one write for all the records queued so far."""
+
+    def __init__(self, stream: TextIO, log_queue: 'queue.SimpleQueue'):
+        super().__init__(stream)
+        self.log_queue = log_queue
+        self.lines = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+        if len(self.lines) >= WRITE_BATCH or self.log_queue.empty():
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.lines:
+                lines, self.lines = self.lines, []
+                self.stream.write('\n'.join(lines) + '\n')
+            super().flush()
+
+
+def configure_logging(level: Any = 'INFO', levels: Optional[Dict[str, Any]] = None, fmt: str = 'logfmt',
+                      sampling: Optional[Dict[str, int]] = None, stream: Optional[TextIO] = None) -> None:
+    """Write hexflow's log records from a background thread.
+
+    Records are put on an unbounded queue by the logging thread and written
+    by a QueueListener, which joins the records waiting in the queue into
+    one write. Calling this again replaces the configuration; the
+    writer is stopped, after draining the queue, at interpreter exit or by
+    stop_logging.
+
+    Args:
+        level: Default level for hexflow's loggers
+        levels: Levels by component or app name, e.g. {'router': 'WARNING'}
+        fmt: 'logfmt' or 'json'
+        sampling: One-in-N sampling rates by event name
+        stream: Stream to write to; defaults to stderr
+
+    Raises:
+        ValueError: If fmt is not a known format
+    """
+    global _listener, _queue_handler, _atexit_registered
+    if fmt not in FORMATTERS:
+        raise ValueError(f"Unknown log format {fmt!r}; use one of {', '.join(FORMATTERS)}")
+    stop_logging()
+
+    log_queue = queue.SimpleQueue()
+    handler = _BatchingStreamHandler(stream or sys.stderr, log_queue)
+    handler.setFormatter(FORMATTERS[fmt]())
+    _queue_handler = _EventQueueHandler(log_queue)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.addHandler(_queue_handler)
+    root.setLevel(_level(level))
+    root.propagate = False
+    for component, component_level in (levels or {}).items():
+        logger = get_logger(component)
+        logger.setLevel(_level(component_level))
+        _levelled_loggers.append(logger)
+
+    _sample_rates.update(sampling or {})
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    if not _atexit_registered:
+        atexit.register(stop_logging)
+        _atexit_registered = True
+
+
+def configure_from_settings(directory: str) -> None:
+    """Configure logging from LOG_LEVEL, LOG_LEVELS, LOG_FORMAT and LOG_SAMPLING in settings.py.
+
+    A workflow without settings.py, or whose settings.py cannot be loaded,
+    logs at INFO in logfmt.
+
+    Args:
+        directory: Workflow directory containing settings.py
+    """
+    settings = None
+    settings_path = os.path.join(directory, 'settings.py')
+    if os.path.exists(settings_path):
+        try:
+            spec = importlib.util.spec_from_file_location('_hexflow_log_settings', settings_path)
+            settings = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(settings)
+        except Exception as e:
+            configure_logging()
+            log_event(logging.getLogger(ROOT_LOGGER), logging.WARNING, 'settings_load_failed',
+                      path=settings_path, error=str(e))
+            return
+    configure_logging(level=getattr(settings, 'LOG_LEVEL', 'INFO'),
+                      levels=getattr(settings, 'LOG_LEVELS', None),
+                      fmt=getattr(settings, 'LOG_FORMAT', 'logfmt'),
+                      sampling=getattr(settings, 'LOG_SAMPLING', None))
+
+
+def logging_configured() -> bool:
+    """Check whether configure_logging has set up the background writer."""
+    return _listener is not None
+
+
+def stop_logging() -> None:
+    """Write the queued records, stop the background writer and restore the defaults."""
+    global _listener, _queue_handler
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+    root = logging.getLogger(ROOT_LOGGER)
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+        _queue_handler = None
+        root.setLevel(logging.NOTSET)
+        root.propagate = True
+    while _levelled_loggers:
+        _levelled_loggers.pop().setLevel(logging.NOTSET)
+    _sample_rates.clear()
+    _sample_counters.clear()
+
+
+def _level(level: Any) -> int:
+    """Convert a level name such as 'info' to its number."""
+    if isinstance(level, str):
+        number = logging.getLevelName(level.upper())
+        if not isinstance(number, int):
+            raise ValueError(f"Unknown log level {level!r}")
+        return number
+    return level
@@ -3,10 +3,40 @@
 This module contains functionality to run complete workflows by executing
 each micro-app in the correct order and managing data flow between them.
 Acts as a controller, directing each app where to pass its output.
+
+Exports are imported on first use: ``hexflow.runner.dag_parser`` can be
+used without loading the router and Flask.
 """
 
-from .router import Router
-from .dag_parser import DAGParser, DAGDefinition
+import importlib
+from typing import TYPE_CHECKING
+
+# Exported names and the modules defining them, imported on first use
+_EXPORTS = {
+    "Router": ".router",
+    "DAGParser": ".dag_parser",
+    "DAGDefinition": ".dag_parser",
+    "WorkflowDataReader": ".handoff",
+    "JobWorker": ".jobs",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .router import Router
+    from .dag_parser import DAGParser, DAGDefinition
+    from .handoff import WorkflowDataReader
+    from .jobs import JobWorker
+
+
+def __getattr__(name):
+    """Import an exported name's module on first use."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
 
-__all__ = ["Router", "DAGParser", "DAGDefinition"]
 
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
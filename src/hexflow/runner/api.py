@@ -0,0 +1,236 @@
+"""JSON API on the router for headless, machine-driven workflows.
+
+The HTML endpoints hand the browser from app to app with auto-submitting
+pages. The JSON API drives the same sessions without a browser:
+
+    POST /api/workflows                        start a workflow
+    POST /api/workflows/<token>/steps/<app>    submit a step's data
+    GET  /api/workflows/<token>                read a workflow's state
+    POST /api/ingest                           bulk-load NDJSON records
+
+Each response describes the step the workflow is now at: its form schema
+and the inputs the DAG maps into it, so a client can complete a workflow in
+one request per step. Apps registered with Router.register_app validate
+submissions in-process with their own form rules. A workflow past its
+deadline (see hexflow.runner.deadlines) is ``timed_out``; submitting a step
+to it returns 408.
+"""
+
+from typing import Any, Dict, Tuple
+
+from flask import request
+
+from .deadlines import TIMED_OUT, session_deadline, set_step_deadline, set_workflow_deadline
+from .flow import PENDING_BRANCHES
+from .handoff import mapped_inputs
+from ..state import DeadlineExceededError, SessionConflictError, WorkflowSession
+from ..state.tokens import InvalidTokenError
+
+# Header carrying an idempotency key for step submissions
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+ApiResponse = Tuple[Dict[str, Any], int]
+
+
+def form_value(value: Any) -> Any:
+    """Convert a JSON value to the string form an HTML form would submit."""
+    if isinstance(value, list):
+        return [form_value(item) for item in value]
+    if isinstance(value, bool):
+        return 'true' if value else ''
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+
+def validate_step(app: Any, form_data: Dict[str, Any]) -> Dict[str, str]:
+    """Validate a step's data with an app's own form rules.
+
+    Args:
+        app: App instance, or None if the app is not running in this process
+        form_data: Field values converted with form_value
+
+    Returns:
+        Field names mapped to error messages; empty if valid or if the app
+        has no validate_form
+    """
+    validate_form = getattr(app, 'validate_form', None)
+    if not validate_form:
+        return {}
+    # Form rules expect strings; multi-value fields are checked joined
+    return validate_form({key: ','.join(value) if isinstance(value, list) else value
+                          for key, value in form_data.items()})
+
+
+class WorkflowAPI:
+    """JSON endpoints for a Router, registered under /api."""
+
+    def __init__(self, router):
+        """Initialize the API.
+
+        Args:
+            router: Router whose DAG, state backend and apps are used
+        """
+        self.router = router
+
+    def register(self, app) -> None:
+        """Add the API routes to a Flask app."""
+        app.add_url_rule('/api/workflows', 'api_start_workflow',
+                         self.start_workflow, methods=['POST'])
+        app.add_url_rule('/api/workflows/<workflow_token>', 'api_get_workflow',
+                         self.get_workflow, methods=['GET'])
+        app.add_url_rule('/api/workflows/<workflow_token>/steps/<app_name>', 'api_submit_step',
+                         self.submit_step, methods=['POST'])
+        app.add_url_rule('/api/ingest', 'api_ingest', self.ingest, methods=['POST'])
+
+    def start_workflow(self) -> ApiResponse:
+        """Create a session at the entry point and describe its first step."""
+        dag = self.router.dag
+        if not dag:
+            return {'error': 'No DAG loaded'}, 400
+        entry_app = dag.get_entry_point()
+        if not entry_app:
+            return {'error': 'No entry point defined in DAG'}, 400
+
+        state_backend = self.router.state_backend
+        workflow_session = state_backend.create_session(workflow_name=dag.name)
+        workflow_session.current_step = entry_app.name
+        set_workflow_deadline(dag, workflow_session)
+        set_step_deadline(dag, workflow_session, entry_app.name)
+        if not state_backend.save_session(workflow_session):
+            return {'error': 'Failed to start workflow: the session could not be saved'}, 503
+        return self.describe(workflow_session), 201
+
+    def get_workflow(self, workflow_token: str) -> ApiResponse:
+        """Describe a workflow's state and current step."""
+        if not self.router.dag:
+            return {'error': 'No DAG loaded'}, 400
+        try:
+            workflow_token = self.router.state_backend.token_allocator.normalize(workflow_token)
+        except InvalidTokenError as e:
+            return {'error': str(e)}, 400
+
+        workflow_session = self.router.state_backend.get_session_by_token(workflow_token)
+        if not workflow_session:
+            return {'error': f'Workflow session not found: {workflow_token}'}, 404
+        workflow_session = self.router.expire_session(workflow_session)
+        if workflow_session.status == 'processing':
+            if self.router.job_queue:
+                # Re-enqueue a job lost between the hop and its enqueue
+                self.router.dispatch_job(workflow_session)
+            return self.describe(workflow_session), 202
+        return self.describe(workflow_session), 200
+
+    def submit_step(self, workflow_token: str, app_name: str) -> ApiResponse:
+        """Validate and save a step's data, then describe the next step.
+
+        The body is a JSON object of field values. Values are stored as form
+        strings (lists stay lists of strings), as an HTML submission would
+        store them. Only the workflow's current step can be submitted; an
+        ``Idempotency-Key`` header makes retries of a submission safe.
+        """
+        dag = self.router.dag
+        if not dag:
+            return {'error': 'No DAG loaded'}, 400
+        if not dag.get_app_by_name(app_name):
+            return {'error': f'App {app_name} not found'}, 404
+        try:
+            workflow_token = self.router.state_backend.token_allocator.normalize(workflow_token)
+        except InvalidTokenError as e:
+            return {'error': str(e)}, 400
+
+        body = request.get_json(silent=True)
+        if body is None:
+            body = {}
+        if not isinstance(body, dict):
+            return {'error': 'Request body must be a JSON object of field values'}, 400
+        form_data = {key: form_value(value) for key, value in body.items()}
+
+        def submit():
+            return self._submit(workflow_token, app_name, form_data)
+
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return submit()
+        return self.router.idempotency_cache.run(('api', workflow_token, app_name, idempotency_key), submit)
+
+    def ingest(self) -> ApiResponse:
+        """Bulk-load an NDJSON body of complete records (see BulkIngester)."""
+        if not self.router.dag:
+            return {'error': 'No DAG loaded'}, 400
+
+        from .ingest import BulkIngester
+        ingester = BulkIngester(self.router.dag, self.router.state_backend, self.router.apps)
+        result = ingester.ingest(request.stream)
+        return {'ingested': result.ingested, 'failed': result.failed, 'errors': result.errors}, 200
+
+    def describe(self, workflow_session: WorkflowSession) -> Dict[str, Any]:
+        """Build the JSON description of a workflow and its current step."""
+        metadata = workflow_session.metadata
+        description = {
+            'workflow_token': workflow_session.workflow_token,
+            'workflow_name': workflow_session.workflow_name,
+            'status': workflow_session.status,
+            'current_step': workflow_session.current_step,
+            'completed_steps': list(metadata.get('completed_steps') or []),
+            'progress_percentage': metadata.get('progress_percentage', 0),
+            'version': workflow_session.version,
+            'step': None
+        }
+        if 'processing_error' in metadata:
+            description['processing_error'] = metadata['processing_error']
+        deadline = session_deadline(workflow_session)
+        if deadline is not None:
+            description['deadline'] = deadline
+        if workflow_session.status == TIMED_OUT:
+            description['timed_out_step'] = metadata.get('timed_out_step')
+        if workflow_session.status == 'processing' and PENDING_BRANCHES in metadata:
+            description['pending_branches'] = list(metadata[PENDING_BRANCHES])
+        if workflow_session.status in ('in_progress', 'processing') and workflow_session.current_step:
+            description['step'] = self.describe_step(workflow_session, workflow_session.current_step)
+        return description
+
+    def describe_step(self, workflow_session: WorkflowSession, app_name: str) -> Dict[str, Any]:
+        """Describe a step: its form schema and the inputs mapped into it."""
+        app = self.router.apps.get(app_name)
+        form_schema = getattr(app, 'form_schema', None)
+        return {
+            'app': app_name,
+            'form': form_schema() if form_schema else None,
+            'inputs': mapped_inputs(self.router.dag, workflow_session, app_name)
+        }
+
+    def _submit(self, workflow_token: str, app_name: str, form_data: Dict[str, Any]) -> ApiResponse:
+        """Validate a step submission and move the session on."""
+        errors = validate_step(self.router.apps.get(app_name), form_data)
+        if errors:
+            return {'error': 'Validation failed', 'errors': errors}, 422
+
+        hop = self.router._hop_update(app_name, form_data)
+
+        def update(workflow_session: WorkflowSession) -> None:
+            if workflow_session.status == TIMED_OUT:
+                raise DeadlineExceededError(f"Workflow timed out at step {workflow_session.current_step}")
+            if workflow_session.status != 'in_progress' or workflow_session.current_step != app_name:
+                raise SessionConflictError(
+                    f"Workflow is {workflow_session.status} at step {workflow_session.current_step}, "
+                    f"not waiting for {app_name}")
+            hop(workflow_session)
+
+        try:
+            workflow_session = self.router.state_backend.update_session(workflow_token, update)
+        except DeadlineExceededError as e:
+            return {'error': str(e)}, 408
+        except SessionConflictError as e:
+            return {'error': str(e)}, 409
+        except RuntimeError as e:
+            return {'error': str(e)}, 503
+        if not workflow_session:
+            return {'error': f'Workflow session not found: {workflow_token}'}, 404
+        if workflow_session.status == TIMED_OUT:
+            return self.describe(workflow_session), 408
+        if workflow_session.status == 'processing':
+            # Poll GET /api/workflows/<token> until the processor has finished
+            self.router.dispatch_job(workflow_session)
+            return self.describe(workflow_session), 202
+        return self.describe(workflow_session), 200
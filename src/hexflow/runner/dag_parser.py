@@ -1,10 +1,31 @@
-"""DAG file parser for workflow definitions."""
+"""DAG file parser for workflow definitions.
 
-import yaml
+Parsed DAG files are cached. Each file is read as YAML at most once per
+content: the loaded definition is kept in memory and written as JSON to
+``__pycache__/<name>.<hash>.dag.json`` next to the file, so later launches,
+and every worker process of a multi-process deployment, skip YAML parsing.
+The cache is keyed by a hash of the file's content; editing the file makes
+the cached copy unused, and it is replaced on the next parse.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
+# Directory next to a DAG file holding its compiled copies
+DAG_CACHE_DIR = '__pycache__'
+
+# Bump when the cached format changes
+DAG_CACHE_VERSION = 1
+
+# Compiled DAGs (JSON text) by content hash, for this process
+_compiled: Dict[str, str] = {}
+_COMPILED_LIMIT = 128
+
 
 @dataclass
 class App:
@@ -12,6 +33,10 @@ class App:
     name: str
     port: int
     entry_point: bool = False
+    type: str = "web"  # web, or processor for background processing steps
+    priority: int = 0  # processor jobs with higher priorities are claimed first
+    timeout: Optional[float] = None  # seconds allowed for each visit to this step
+    retry_attempts: Optional[int] = None  # overrides config.retry_attempts for this app
 
 
 @dataclass
@@ -47,6 +72,23 @@ class DAGDefinition:
                 return app
         return None
     
+    @property
+    def parallel_execution(self) -> bool:
+        """Whether apps with several outgoing flow steps run them as parallel branches."""
+        return bool((self.config or {}).get('parallel_execution', False))
+    
+    @property
+    def timeout(self) -> Optional[float]:
+        """Seconds a workflow may take from start to finish, if limited."""
+        return (self.config or {}).get('timeout')
+    
+    def get_retry_attempts(self, app_name: str) -> int:
+        """Get how often a failed processor job for an app is retried."""
+        app = self.get_app_by_name(app_name)
+        if app and app.retry_attempts is not None:
+            return app.retry_attempts
+        return (self.config or {}).get('retry_attempts', 0)
+    
     def get_next_app(self, current_app: str) -> Optional[str]:
         """Get the next app in the flow from the current app."""
         for step in self.flow:
@@ -56,25 +98,163 @@ class DAGDefinition:
                 return step.to_app
         return None
     
+    def get_next_apps(self, current_app: str) -> List[str]:
+        """Get every app the flow leads to from the current app, in file order."""
+        return [step.to_app for step in self.flow if step.from_app == current_app]
+    
+    def get_branches(self, current_app: str) -> List[str]:
+        """Get the apps that run after the current app.
+        
+        With parallel_execution every successor runs as a branch; otherwise
+        only the first one runs, as get_next_app.
+        """
+        next_apps = self.get_next_apps(current_app)
+        return next_apps if self.parallel_execution else next_apps[:1]
+    
+    def get_join(self, current_app: str) -> Optional[str]:
+        """Get the first app every branch from the current app leads to."""
+        chains = []
+        for branch in self.get_next_apps(current_app):
+            chain = []
+            app_name = branch
+            while app_name and app_name not in chain:
+                chain.append(app_name)
+                app_name = self.get_next_app(app_name)
+            chains.append(chain)
+        
+        for app_name in chains[0] if chains else []:
+            if all(app_name in chain for chain in chains[1:]):
+                return app_name
+        return None
+    
+    def validate_branches(self) -> None:
+        """Check that parallel branches can run concurrently and join.
+        
+        Raises:
+            ValueError: If a fan-out's branches never join, contain a web
+                app, or fan out again before joining
+        """
+        if not self.parallel_execution:
+            return
+        for app in self.apps:
+            branches = self.get_next_apps(app.name)
+            if len(branches) < 2:
+                continue
+            join = self.get_join(app.name)
+            if join is None:
+                raise ValueError(f"Parallel branches from {app.name} never join")
+            for app_name in branches:
+                while app_name != join:
+                    if not self.is_processor(app_name):
+                        raise ValueError(f"Parallel branch app {app_name} must be a processor: "
+                                         f"a user can only be at one web app at a time")
+                    if len(self.get_next_apps(app_name)) > 1:
+                        raise ValueError(f"Parallel branch app {app_name} cannot fan out again "
+                                         f"before joining at {join}")
+                    app_name = self.get_next_app(app_name)
+    
+    def is_processor(self, app_name: str) -> bool:
+        """Check whether an app is a background processor."""
+        app = self.get_app_by_name(app_name)
+        return bool(app and app.type == "processor")
+    
     def get_app_port(self, app_name: str) -> Optional[int]:
         """Get the port for a given app."""
         app = self.get_app_by_name(app_name)
         return app.port if app else None
 
 
+def _parse_yaml(raw: bytes) -> Any:
+    """Parse YAML with libyaml's CSafeLoader when available."""
+    # Imported here so that loading a cached DAG never imports yaml
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(raw, Loader=loader)
+
+
+def _cache_path(path: Path, key: str) -> Path:
+    """Return where the compiled copy of a DAG file with this content hash lives."""
+    return path.parent / DAG_CACHE_DIR / f"{path.stem}.{key[:32]}.dag.json"
+
+
+def _write_cache(path: Path, key: str, text: str) -> None:
+    """Save a compiled DAG next to its file, replacing copies of older contents.
+    
+    The file is written under a temporary name and renamed, so processes
+    starting together never read a partial copy. Failures, e.g. in a
+    read-only directory, only mean the next parse reads the YAML again.
+    """
+    cache_file = _cache_path(path, key)
+    try:
+        cache_file.parent.mkdir(exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=cache_file.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_name, cache_file)
+        for stale in cache_file.parent.glob(f"{path.stem}.*.dag.json"):
+            if stale != cache_file:
+                stale.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def load_dag_data(dag_file_path: str, cache: bool = True) -> Any:
+    """Load the data in a DAG file, from the cache if its content was seen before.
+    
+    Args:
+        dag_file_path: Path of the .dag file
+        cache: Use and update the in-memory and on-disk caches
+        
+    Returns:
+        The YAML document, as a fresh object the caller may change
+        
+    Raises:
+        FileNotFoundError: If the file does not exist
+        yaml.YAMLError: If the file is not valid YAML
+    """
+    path = Path(dag_file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"DAG file not found: {dag_file_path}")
+    raw = path.read_bytes()
+    if not cache:
+        return _parse_yaml(raw)
+    
+    key = hashlib.sha256(raw + f"\0v{DAG_CACHE_VERSION}".encode()).hexdigest()
+    text = _compiled.get(key)
+    if text is None:
+        try:
+            text = _cache_path(path, key).read_text(encoding='utf-8')
+            json.loads(text)
+        except (OSError, ValueError):
+            # A missing or corrupt cache file is rebuilt from the YAML
+            data = _parse_yaml(raw)
+            # YAML can hold more than JSON (dates, non-string keys); such
+            # files are not cached rather than cached differently
+            try:
+                text = json.dumps(data)
+            except (TypeError, ValueError):
+                return data
+            if json.loads(text) != data:
+                return data
+            _write_cache(path, key, text)
+        if len(_compiled) >= _COMPILED_LIMIT:
+            _compiled.clear()
+        _compiled[key] = text
+    return json.loads(text)
+
+
 class DAGParser:
     """Parser for DAG YAML files."""
     
     @staticmethod
-    def parse_file(dag_file_path: str) -> DAGDefinition:
-        """Parse a DAG file and return a DAGDefinition."""
-        path = Path(dag_file_path)
+    def parse_file(dag_file_path: str, cache: bool = True) -> DAGDefinition:
+        """Parse a DAG file and return a DAGDefinition.
         
-        if not path.exists():
-            raise FileNotFoundError(f"DAG file not found: {dag_file_path}")
-        
-        with open(path, 'r') as f:
-            data = yaml.safe_load(f)
+        Args:
+            dag_file_path: Path of the .dag file
+            cache: Reuse the compiled copy of the file's content, if any
+        """
+        data = load_dag_data(dag_file_path, cache)
         
         # Parse apps
         apps = []
@@ -82,7 +262,11 @@ class DAGParser:
             apps.append(App(
                 name=app_data['name'],
                 port=app_data['port'],
-                entry_point=app_data.get('entry_point', False)
+                entry_point=app_data.get('entry_point', False),
+                type=app_data.get('type', 'web'),
+                priority=app_data.get('priority', 0),
+                timeout=app_data.get('timeout'),
+                retry_attempts=app_data.get('retry_attempts')
             ))
         
         # Parse flow
@@ -95,7 +279,7 @@ class DAGParser:
                 condition=flow_data.get('condition')
             ))
         
-        return DAGDefinition(
+        dag = DAGDefinition(
             name=data['name'],
             description=data['description'],
             apps=apps,
@@ -103,6 +287,8 @@ class DAGParser:
             data_mapping=data.get('data_mapping', []),
             config=data.get('config', {})
         )
+        dag.validate_branches()
+        return dag
     
     @staticmethod
     def find_dag_file(directory: str) -> Optional[str]:
@@ -121,10 +307,10 @@ class DAGParser:
         # Multiple DAG files - try to find a valid one
         for dag_file in dag_files:
             try:
-                # Try to parse each file to see if it's valid
-                with open(dag_file, 'r') as f:
-                    data = yaml.safe_load(f)
-                    
+                # Try to parse each file to see if it's valid; the
+                # chosen file's parse_file then reuses the cached copy
+                data = load_dag_data(str(dag_file))
+                
                 # Check if it has required fields
                 if (data and 
                     isinstance(data, dict) and 
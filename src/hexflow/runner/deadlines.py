@@ -0,0 +1,125 @@
+"""Workflow and step deadlines from the DAG's timeout settings.
+
+``config.timeout`` gives each workflow a deadline, that many seconds after
+it starts; an app's own ``timeout`` bounds each visit to that step and
+each job run by a processor app. Deadlines are Unix timestamps kept in the
+session metadata and carried with every hop: the router posts the
+deadline to apps in the ``workflow_deadline`` form field, sends it with
+processor jobs and bounds its own calls and retries by what remains.
+
+A session past its deadline moves to the ``timed_out`` status instead of
+advancing. Timed-out sessions are counted per status like any other, so
+they show up in the router's /stats.
+"""
+
+import time
+from typing import Any, Optional
+
+from .dag_parser import DAGDefinition
+from ..state import WorkflowSession
+
+TIMED_OUT = 'timed_out'
+
+# Form field and job field carrying a deadline to apps
+DEADLINE_FIELD = 'workflow_deadline'
+
+# Job error reported when a job outlives its deadline, by processor apps
+# and by the router for jobs claimed too late
+DEADLINE_EXCEEDED = 'deadline exceeded'
+
+# Session metadata keys
+WORKFLOW_DEADLINE = 'deadline'
+STEP_DEADLINE = 'step_deadline'
+
+
+def set_workflow_deadline(dag: DAGDefinition, workflow_session: WorkflowSession,
+                          now: Optional[float] = None) -> None:
+    """Set a new session's workflow deadline from config.timeout, if any."""
+    if dag.timeout:
+        workflow_session.add_metadata(WORKFLOW_DEADLINE, (now or time.time()) + float(dag.timeout))
+
+
+def set_step_deadline(dag: DAGDefinition, workflow_session: WorkflowSession, app_name: Optional[str],
+                      now: Optional[float] = None) -> None:
+    """Set the deadline of the step a session enters from the app's timeout, if any."""
+    app = dag.get_app_by_name(app_name) if app_name else None
+    if app and app.timeout:
+        workflow_session.add_metadata(STEP_DEADLINE, (now or time.time()) + float(app.timeout))
+    elif STEP_DEADLINE in workflow_session.metadata:
+        workflow_session.metadata.pop(STEP_DEADLINE)
+        workflow_session.touch()
+
+
+def session_deadline(workflow_session: WorkflowSession) -> Optional[float]:
+    """Return the earliest of a session's workflow and step deadlines."""
+    deadlines = [workflow_session.metadata.get(key) for key in (WORKFLOW_DEADLINE, STEP_DEADLINE)]
+    deadlines = [deadline for deadline in deadlines if deadline is not None]
+    return min(deadlines) if deadlines else None
+
+
+def job_deadline(dag: DAGDefinition, workflow_session: WorkflowSession, app_name: str,
+                 now: Optional[float] = None) -> Optional[float]:
+    """Return the deadline of a processor job: the app's timeout within the session's deadlines."""
+    deadlines = [session_deadline(workflow_session)]
+    app = dag.get_app_by_name(app_name)
+    if app and app.timeout:
+        deadlines.append((now or time.time()) + float(app.timeout))
+    deadlines = [deadline for deadline in deadlines if deadline is not None]
+    return min(deadlines) if deadlines else None
+
+
+def is_expired(deadline: Optional[float], now: Optional[float] = None) -> bool:
+    """Check whether a deadline has passed."""
+    return deadline is not None and (now or time.time()) >= deadline
+
+
+def session_expired(workflow_session: WorkflowSession, now: Optional[float] = None) -> bool:
+    """Check whether a session has timed out or passed one of its deadlines."""
+    return workflow_session.status == TIMED_OUT or is_expired(session_deadline(workflow_session), now)
+
+
+def time_out(workflow_session: WorkflowSession) -> None:
+    """Move a session to the timed_out status, recording the step it timed out at."""
+    if workflow_session.status != TIMED_OUT:
+        workflow_session.add_metadata('timed_out_step', workflow_session.current_step)
+        workflow_session.set_status(TIMED_OUT)
+
+
+def bounded_timeout(default: float, deadline: Optional[float], now: Optional[float] = None) -> float:
+    """Return a call timeout no longer than the time left before a deadline."""
+    if deadline is None:
+        return default
+    return max(0.001, min(default, deadline - (now or time.time())))
+
+
+def parse_deadline(value: Any) -> Optional[float]:
+    """Read a deadline sent by an app or client; anything unparseable means none."""
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(dag: DAGDefinition, app_name: str, attempt: int, deadline: Optional[float] = None,
+                now: Optional[float] = None) -> Optional[float]:
+    """Return the backoff before retrying a failed processor job.
+
+    The delay doubles with each attempt, starting at ``config.retry_backoff``
+    seconds (default 1).
+
+    Args:
+        dag: Workflow definition with retry_attempts
+        app_name: Processor app whose job failed
+        attempt: Number of times the job has run, including the failed run
+        deadline: Job or session deadline; no retry is scheduled past it
+        now: Current Unix time
+
+    Returns:
+        Seconds to wait, or None if the job should fail instead
+    """
+    if attempt > dag.get_retry_attempts(app_name):
+        return None
+    delay = float((dag.config or {}).get('retry_backoff', 1)) * 2 ** (attempt - 1)
+    if is_expired(deadline, (now or time.time()) + delay):
+        return None
+    return delay
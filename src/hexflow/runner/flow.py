@@ -0,0 +1,90 @@
+"""Moving sessions along a DAG's flow, including parallel branches.
+
+With ``parallel_execution: true`` in the DAG config, an app with several
+outgoing flow steps fans out: every branch runs concurrently and the
+branches join at the first app they all lead to. Branches are processor
+apps, since a user can only be at one web app at a time. While branches
+run, the session is ``processing`` with ``current_step`` set to the join
+app and the unfinished branch apps listed in its ``pending_branches``
+metadata. Each branch stores its own step data, and every completion is a
+compare-and-swap update of the session, so concurrent branches never lose
+each other's results. When the last branch finishes the session moves on
+to the join app.
+"""
+
+from typing import List
+
+from .dag_parser import DAGDefinition
+from .deadlines import set_step_deadline
+from ..state import WorkflowSession
+
+# Metadata key listing the branch apps a fanned-out session waits for
+PENDING_BRANCHES = 'pending_branches'
+
+
+def waiting_for(workflow_session: WorkflowSession) -> List[str]:
+    """Return the processor apps a processing session is waiting for."""
+    if workflow_session.status != 'processing':
+        return []
+    pending = workflow_session.metadata.get(PENDING_BRANCHES)
+    if pending is not None:
+        return list(pending)
+    return [workflow_session.current_step] if workflow_session.current_step else []
+
+
+def advance(dag: DAGDefinition, workflow_session: WorkflowSession, from_app: str) -> None:
+    """Move a session on from an app that finished, fanning out if the DAG branches.
+
+    Args:
+        dag: Workflow definition
+        workflow_session: Session to move on
+        from_app: App the session is leaving
+    """
+    branches = dag.get_branches(from_app)
+    if len(branches) > 1:
+        join = dag.get_join(from_app)
+        workflow_session.current_step = join
+        workflow_session.add_metadata(PENDING_BRANCHES, [branch for branch in branches if branch != join])
+        workflow_session.set_status('processing')
+        # Each branch job is bounded by its own app's timeout instead
+        set_step_deadline(dag, workflow_session, None)
+    elif branches:
+        enter(dag, workflow_session, branches[0])
+    else:
+        workflow_session.set_status('completed')
+
+
+def enter(dag: DAGDefinition, workflow_session: WorkflowSession, app_name: str) -> None:
+    """Put a session at an app; processor apps park it in the processing status."""
+    workflow_session.current_step = app_name
+    set_step_deadline(dag, workflow_session, app_name)
+    workflow_session.set_status('processing' if dag.is_processor(app_name) else 'in_progress')
+
+
+def finish_processor(dag: DAGDefinition, workflow_session: WorkflowSession, app_name: str) -> None:
+    """Move a session on after one of the processors it waits for finished.
+
+    A finished branch hands over to the next app on its branch, if the
+    branch has more steps; the session only advances to the join app once
+    no branch is pending.
+
+    Args:
+        dag: Workflow definition
+        workflow_session: Session waiting for app_name
+        app_name: Processor app that finished
+    """
+    pending = workflow_session.metadata.get(PENDING_BRANCHES)
+    if pending is None:
+        advance(dag, workflow_session, app_name)
+        return
+
+    pending = [branch for branch in pending if branch != app_name]
+    next_app_name = dag.get_next_app(app_name)
+    if next_app_name and next_app_name != workflow_session.current_step:
+        pending.append(next_app_name)
+
+    if pending:
+        workflow_session.add_metadata(PENDING_BRANCHES, pending)
+    else:
+        workflow_session.metadata.pop(PENDING_BRANCHES, None)
+        enter(dag, workflow_session, workflow_session.current_step)
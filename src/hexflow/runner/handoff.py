@@ -0,0 +1,102 @@
+"""Data handoff between apps, projected through the DAG's data_mapping."""
+
+from typing import Any, Dict, Mapping, Optional
+
+from .dag_parser import DAGParser, DAGDefinition
+from ..state import StateBackend, WorkflowSession, load_state_backend
+
+# Handoff modes, set with ``data_handoff`` in the DAG config
+HANDOFF_INLINE = 'inline'
+HANDOFF_REFERENCE = 'reference'
+
+# Form field telling an app its inputs were passed by reference
+HANDOFF_FIELD = 'data_handoff'
+
+
+def project_mapping(workflow_session: WorkflowSession, mapping: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Select the data one data_mapping entry passes to its target app.
+
+    Args:
+        workflow_session: Session holding the step data
+        mapping: data_mapping entry with from, to and fields
+
+    Returns:
+        Mapped fields present in the session. ``fields: "*"`` passes the
+        session's flattened view of all step data
+    """
+    fields = mapping.get('fields', [])
+    if fields == "*" or (isinstance(fields, list) and len(fields) == 1 and fields[0] == "*"):
+        return workflow_session.get_all_data()
+
+    from_app_data = workflow_session.get_step_data(mapping.get('from')) or {}
+    return {field: from_app_data[field] for field in fields if field in from_app_data}
+
+
+def mapped_inputs(dag: DAGDefinition, workflow_session: WorkflowSession, app_name: str) -> Dict[str, Any]:
+    """Collect everything the DAG maps into an app, from any source step.
+
+    This is the access-control projection for apps reading their inputs by
+    reference: an app only sees fields some data_mapping entry passes to it.
+
+    Args:
+        dag: Workflow definition
+        workflow_session: Session holding the step data
+        app_name: App reading its inputs
+
+    Returns:
+        Dictionary of mapped fields; later mappings win on shared names
+    """
+    inputs: Dict[str, Any] = {}
+    for mapping in dag.data_mapping or []:
+        if mapping.get('to') == app_name:
+            inputs.update(project_mapping(workflow_session, mapping))
+    return inputs
+
+
+class WorkflowDataReader:
+    """Reads an app's mapped inputs straight from the state backend.
+
+    The router serves the same projection at ``/data/<app>``; apps that can
+    reach the state backend themselves can use a reader instead and skip
+    the extra HTTP request.
+    """
+
+    def __init__(self, dag: DAGDefinition, state_backend: StateBackend):
+        """Initialize the reader.
+
+        Args:
+            dag: Workflow definition whose data_mapping is enforced
+            state_backend: Backend holding the sessions
+        """
+        self.dag = dag
+        self.state_backend = state_backend
+
+    @classmethod
+    def from_directory(cls, dag_directory: str) -> 'WorkflowDataReader':
+        """Build a reader from a workflow directory, as the router would.
+
+        Args:
+            dag_directory: Directory containing the .dag file and settings.py
+
+        Raises:
+            FileNotFoundError: If the directory has no .dag file
+        """
+        dag_file = DAGParser.find_dag_file(dag_directory)
+        if not dag_file:
+            raise FileNotFoundError(f"No DAG file found in {dag_directory}")
+        return cls(DAGParser.parse_file(dag_file), load_state_backend(dag_directory))
+
+    def read(self, workflow_token: str, app_name: str) -> Optional[Dict[str, Any]]:
+        """Return the inputs mapped into an app for a session.
+
+        Args:
+            workflow_token: Workflow token of the session
+            app_name: App reading its inputs
+
+        Returns:
+            Mapped fields, or None if the session does not exist
+        """
+        workflow_session = self.state_backend.get_session_by_token(workflow_token)
+        if workflow_session is None:
+            return None
+        return mapped_inputs(self.dag, workflow_session, app_name)
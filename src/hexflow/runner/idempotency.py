@@ -0,0 +1,102 @@
+"""Short-lived cache of router responses keyed by idempotency key."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# Form field carrying the idempotency key issued by the app that rendered the form
+IDEMPOTENCY_FIELD = 'idempotency_key'
+
+
+class IdempotencyCache:
+    """Replays the response of a request when it is submitted again.
+
+    Apps put a fresh idempotency key in every form they render, so a double
+    submit, a back-button resubmit or a retried POST arrives with a key the
+    router has already seen. The first request with a key runs; later ones
+    get its response without running the handler again. A repeat that
+    arrives while the first is still running waits for it, and gets a 409
+    asking it to retry if the first is still running after ``wait_timeout``.
+
+    Only successful (2xx) responses are kept, so a request that failed can
+    be retried with the same key. Entries expire after ``ttl`` seconds and
+    the oldest are evicted beyond ``max_entries``.
+    """
+
+    # Response to a repeat whose original request outlasted the wait
+    IN_PROGRESS_RESPONSE = ({'error': 'Request in progress; retry shortly'}, 409, {'Retry-After': '1'})
+
+    def __init__(self, ttl: float = 300, max_entries: int = 10000, wait_timeout: float = 30):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds a response is replayed for
+            max_entries: Maximum number of cached responses
+            wait_timeout: Seconds a repeat waits for the original request
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._responses: 'OrderedDict[Hashable, tuple[float, Any]]' = OrderedDict()
+        self._in_flight = {}
+
+    def run(self, key: Hashable, handler: Callable[[], Any]) -> Any:
+        """Return the cached response for a key, or run the handler and cache it.
+
+        Args:
+            key: Idempotency key, scoped by the caller (e.g. with the token)
+            handler: Produces the response when the key has not been seen
+
+        Returns:
+            The handler's response, the replayed response for a repeat, or
+            IN_PROGRESS_RESPONSE if the original is still running
+        """
+        while True:
+            with self._lock:
+                cached = self._get(key)
+                if cached is not None:
+                    return cached
+                running = self._in_flight.get(key)
+                if running is None:
+                    running = self._in_flight[key] = threading.Event()
+                    break
+            # Another request with this key is running; replay its response
+            if not running.wait(self.wait_timeout):
+                return self.IN_PROGRESS_RESPONSE
+
+        try:
+            response = handler()
+            if self._is_success(response):
+                with self._lock:
+                    self._responses[key] = (time.monotonic() + self.ttl, response)
+                    self._responses.move_to_end(key)
+                    while len(self._responses) > self.max_entries:
+                        self._responses.popitem(last=False)
+            return response
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            running.set()
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        """Return an unexpired response. Caller must hold the lock."""
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        expires, response = entry
+        if expires < time.monotonic():
+            del self._responses[key]
+            return None
+        return response
+
+    @staticmethod
+    def _is_success(response: Any) -> bool:
+        """Check whether a Flask view return value has a 2xx status."""
+        status = 200
+        if isinstance(response, tuple) and len(response) > 1 and isinstance(response[1], int):
+            status = response[1]
+        elif hasattr(response, 'status_code'):
+            status = response.status_code
+        return 200 <= status < 300
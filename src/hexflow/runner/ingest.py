@@ -0,0 +1,206 @@
+"""Bulk ingestion of complete workflow records, e.g. migrated paper applications."""
+
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from .api import form_value, validate_step
+from .dag_parser import DAGDefinition
+from ..state import StateBackend, WorkflowSession
+from ..state.tokens import InvalidTokenError
+
+INGEST_STATUSES = ('completed', 'in_progress')
+
+# (line number, session or None, errors, whether the record chose its token)
+Prepared = Tuple[int, Optional[WorkflowSession], Dict[str, Any], bool]
+
+
+@dataclass
+class IngestResult:
+    """Outcome of a bulk ingestion."""
+    ingested: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def flow_order(dag: DAGDefinition) -> List[str]:
+    """Return the apps of a workflow in flow order, starting at the entry point."""
+    order: List[str] = []
+    entry = dag.get_entry_point()
+    app_name = entry.name if entry else None
+    while app_name and app_name not in order:
+        order.append(app_name)
+        app_name = dag.get_next_app(app_name)
+    order.extend(app.name for app in dag.apps if app.name not in order)
+    return order
+
+
+class BulkIngester:
+    """Validates NDJSON workflow records and writes them as sessions in batches.
+
+    Each line is one record::
+
+        {"steps": {"app-one": {"full_name": "Alice"}, "app-two": {...}},
+         "status": "completed", "workflow_token": "optional"}
+
+    Step data is validated with the form rules of the apps passed in (the
+    same rules the app applies to a browser submission) on a thread pool,
+    one batch per task, while the previous batch is written with
+    StateBackend.insert_sessions. Records that fail validation or whose
+    workflow token is taken are skipped and reported; the rest are saved.
+
+    ``status`` defaults to completed. An in_progress record is placed at
+    the first step in flow order it has no data for.
+    """
+
+    def __init__(self, dag: DAGDefinition, state_backend: StateBackend,
+                 apps: Optional[Dict[str, Any]] = None, batch_size: int = 1000, workers: int = 4):
+        """Initialize the ingester.
+
+        Args:
+            dag: Workflow the records belong to
+            state_backend: Backend the sessions are written to
+            apps: App instances by name used for validation; steps of apps
+                not given are stored without validation
+            batch_size: Records validated per task and written per transaction
+            workers: Threads validating batches
+        """
+        self.dag = dag
+        self.state_backend = state_backend
+        self.apps = apps or {}
+        self.batch_size = batch_size
+        self.workers = workers
+        self.order = flow_order(dag)
+
+    def ingest(self, lines: Iterable[Union[str, bytes]], report: Optional[TextIO] = None) -> IngestResult:
+        """Ingest NDJSON records.
+
+        Args:
+            lines: NDJSON lines; blank lines are skipped
+            report: Optional stream receiving one NDJSON result per record,
+                with its line number and either its workflow token or errors
+
+        Returns:
+            Counts of ingested and failed records, and the errors of failed ones
+        """
+        result = IngestResult()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hexflow-ingest') as pool:
+            pending = deque()
+            for batch in self._batches(lines):
+                pending.append(pool.submit(self._prepare, batch))
+                # Keep a bounded number of batches validating ahead of the writer
+                if len(pending) > self.workers:
+                    self._write(pending.popleft().result(), result, report)
+            while pending:
+                self._write(pending.popleft().result(), result, report)
+        return result
+
+    def build_session(self, record: Any) -> Tuple[Optional[WorkflowSession], Dict[str, Any]]:
+        """Validate a record and build its unsaved session.
+
+        Returns:
+            The session and an empty dict, or None and the record's errors
+        """
+        if not isinstance(record, dict) or not isinstance(record.get('steps'), dict):
+            return None, {'record': 'Record must be a JSON object with a "steps" object'}
+
+        errors: Dict[str, Any] = {}
+        steps: Dict[str, Dict[str, Any]] = {}
+        for app_name, step_data in record['steps'].items():
+            if app_name not in self.order:
+                errors[app_name] = f'{app_name} is not an app in workflow {self.dag.name}'
+            elif not isinstance(step_data, dict):
+                errors[app_name] = 'Step data must be a JSON object'
+            else:
+                steps[app_name] = {key: form_value(value) for key, value in step_data.items()}
+                step_errors = validate_step(self.apps.get(app_name), steps[app_name])
+                if step_errors:
+                    errors[app_name] = step_errors
+
+        status = record.get('status', 'completed')
+        if status not in INGEST_STATUSES:
+            errors['status'] = f'Status must be one of {", ".join(INGEST_STATUSES)}'
+
+        workflow_token = record.get('workflow_token')
+        if workflow_token is not None:
+            try:
+                workflow_token = self.state_backend.token_allocator.normalize(str(workflow_token))
+            except InvalidTokenError as e:
+                errors['workflow_token'] = str(e)
+
+        if errors:
+            return None, errors
+
+        session = self.state_backend.new_session(self.dag.name, workflow_token)
+        for app_name in self.order:
+            if app_name in steps:
+                session.set_step_data(app_name, steps[app_name])
+
+        if status == 'completed':
+            session.current_step = self.order[-1] if self.order else None
+            session.set_status('completed')
+        else:
+            session.current_step = next((app_name for app_name in self.order if app_name not in steps),
+                                        self.order[-1] if self.order else None)
+        return session, {}
+
+    def _batches(self, lines: Iterable[Union[str, bytes]]) -> Iterator[List[Tuple[int, Union[str, bytes]]]]:
+        """Group non-blank lines into numbered batches."""
+        batch = []
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            batch.append((line_number, line))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _prepare(self, batch: List[Tuple[int, Union[str, bytes]]]) -> List[Prepared]:
+        """Parse and validate a batch of lines."""
+        prepared = []
+        for line_number, line in batch:
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                prepared.append((line_number, None, {'record': f'Invalid JSON: {e}'}, False))
+                continue
+            session, errors = self.build_session(record)
+            explicit_token = isinstance(record, dict) and record.get('workflow_token') is not None
+            prepared.append((line_number, session, errors, explicit_token))
+        return prepared
+
+    def _write(self, prepared: List[Prepared], result: IngestResult, report: Optional[TextIO]) -> None:
+        """Insert a validated batch and record each record's outcome."""
+        valid = [entry for entry in prepared if entry[1] is not None]
+        inserted = dict(zip((entry[0] for entry in valid),
+                            self.state_backend.insert_sessions([entry[1] for entry in valid])))
+
+        for line_number, session, errors, explicit_token in prepared:
+            if session is not None and not inserted[line_number]:
+                if explicit_token or not self._insert_with_fresh_token(session):
+                    errors = {'workflow_token': f'Workflow token {session.workflow_token} is already in use'}
+
+            if errors:
+                outcome = {'line': line_number, 'status': 'failed', 'errors': errors}
+                result.failed += 1
+                result.errors.append(outcome)
+            else:
+                outcome = {'line': line_number, 'status': 'ingested',
+                           'workflow_token': session.workflow_token}
+                result.ingested += 1
+            if report is not None:
+                report.write(json.dumps(outcome) + '\n')
+
+    def _insert_with_fresh_token(self, session: WorkflowSession) -> bool:
+        """Retry an insert whose generated token collided, as create_session does."""
+        for _ in range(self.state_backend.CREATE_ATTEMPTS - 1):
+            fresh = self.state_backend.new_session(session.workflow_name)
+            session.session_id = fresh.session_id
+            session.workflow_token = fresh.workflow_token
+            if self.state_backend.insert_session(session):
+                return True
+        return False
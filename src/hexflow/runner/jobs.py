@@ -0,0 +1,287 @@
+"""Processor jobs: the session change a job's outcome makes, and a worker
+feeding processor apps from a durable SQLiteJobQueue."""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .dag_parser import DAGParser, DAGDefinition
+from .deadlines import (DEADLINE_EXCEEDED, is_expired, job_deadline, retry_delay, session_deadline,
+                        session_expired, time_out)
+from .flow import finish_processor, waiting_for
+from .handoff import mapped_inputs
+from ..logs import get_logger, log_event
+from ..state import (Job, SessionConflictError, SQLiteBackend, SQLiteJobQueue, StateBackend,
+                     WorkflowSession, load_state_backend)
+from ..state.job_queue import JobSpec
+
+
+# Session metadata counting the retries of each processor's failed jobs
+PROCESSING_RETRIES = 'processing_retries'
+
+logger = get_logger('jobs')
+
+
+class JobOutcome:
+    """Session update recording a processor job's outcome.
+
+    The result is stored as the processor's step data and the session
+    advances to the next app, which may itself be a processor, or, for a
+    parallel branch, to the join app once every branch has finished. A
+    failed job leaves the session in the ``failed`` status with the error
+    in its ``processing_error`` metadata, unless ``retry`` is set and the
+    app has retries left (``retry_attempts``), in which case the session
+    keeps waiting and ``retry_delay`` is set to the backoff before the job
+    should run again. A job that ran past its deadline, or that finished
+    after the session's deadline, times the session out instead.
+
+    Instances are callables for StateBackend.update_session and
+    SQLiteJobQueue.complete_many; calling one raises SessionConflictError
+    if the session is not waiting for the processor.
+    """
+
+    def __init__(self, dag: DAGDefinition, app_name: str, data: Optional[Dict[str, Any]],
+                 error: Optional[str] = None, retry: bool = False):
+        """Initialize the outcome.
+
+        Args:
+            dag: Workflow definition
+            app_name: Processor app that ran the job
+            data: Step data returned by the job, if it succeeded
+            error: Error message, if it failed
+            retry: Count failures against the app's retry_attempts in the
+                session; the job queue counts them on the job instead
+        """
+        self.dag = dag
+        self.app_name = app_name
+        self.data = data
+        self.error = error
+        self.retry = retry
+        self.retry_delay: Optional[float] = None
+
+    def __call__(self, workflow_session: WorkflowSession) -> None:
+        app_name = self.app_name
+        if app_name not in waiting_for(workflow_session):
+            raise SessionConflictError(
+                f"Workflow {workflow_session.workflow_token} is not waiting for {app_name}")
+        self.retry_delay = None
+        if self.error == DEADLINE_EXCEEDED or session_expired(workflow_session):
+            time_out(workflow_session)
+            return
+
+        retries = dict(workflow_session.metadata.get(PROCESSING_RETRIES) or {})
+        if self.error is not None:
+            if self.retry:
+                attempt = retries.get(app_name, 0) + 1
+                self.retry_delay = retry_delay(self.dag, app_name, attempt, session_deadline(workflow_session))
+                if self.retry_delay is not None:
+                    retries[app_name] = attempt
+                    workflow_session.add_metadata(PROCESSING_RETRIES, retries)
+                    return
+            workflow_session.add_metadata('processing_error', f"{app_name}: {self.error}")
+            workflow_session.set_status('failed')
+            return
+
+        if app_name in retries:
+            del retries[app_name]
+            workflow_session.add_metadata(PROCESSING_RETRIES, retries)
+        workflow_session.set_step_data(app_name, self.data or {})
+        finish_processor(self.dag, workflow_session, app_name)
+
+
+def next_jobs(dag: DAGDefinition, workflow_session: WorkflowSession) -> List[JobSpec]:
+    """Return the jobs a session in the processing status is waiting for."""
+    jobs = []
+    for app_name in waiting_for(workflow_session):
+        app = dag.get_app_by_name(app_name)
+        jobs.append((app_name, mapped_inputs(dag, workflow_session, app_name), app.priority if app else 0,
+                     job_deadline(dag, workflow_session, app_name)))
+    return jobs
+
+
+def job_queue_for(dag: DAGDefinition, state_backend: StateBackend) -> SQLiteJobQueue:
+    """Build the job queue for a workflow from its DAG config.
+
+    Raises:
+        ValueError: If the state backend is not a SQLiteBackend
+    """
+    if not isinstance(state_backend, SQLiteBackend):
+        raise ValueError(f"The job queue needs a SQLiteBackend, not {type(state_backend).__name__}")
+    config = dag.config or {}
+    return SQLiteJobQueue(state_backend, lease_seconds=config.get('job_lease_seconds', 30))
+
+
+class JobWorker:
+    """Claims jobs from a SQLiteJobQueue and runs them on processor apps.
+
+    A background thread claims jobs in batches for each app, up to twice
+    the app's max_workers in flight, and submits them with the app's
+    submit_job. Leases on running jobs are extended every third of the
+    lease. Finished jobs are completed in batches: each job is settled, its
+    outcome saved to the session and any follow-up processor job enqueued
+    in one transaction. A failed job with retries left (the app's
+    ``retry_attempts``) goes back on the queue after an exponential
+    backoff, and a job claimed after its deadline times the session out
+    without running.
+
+    Any number of workers, in any number of processes, can share a queue.
+    A worker that dies leaves its jobs leased; they run again on another
+    worker once their leases expire, so process() should be safe to repeat.
+    """
+
+    def __init__(self, dag: DAGDefinition, job_queue: SQLiteJobQueue, apps: Optional[Dict[str, Any]] = None,
+                 batch_size: int = 32, poll_interval: float = 0.5):
+        """Initialize the worker.
+
+        Args:
+            dag: Workflow definition, used to advance sessions
+            job_queue: Queue to claim jobs from
+            apps: Processor app instances by name; more can be added with add_app
+            batch_size: Maximum jobs claimed per app per poll
+            poll_interval: Seconds to wait when no jobs were claimed or finished
+        """
+        self.dag = dag
+        self.job_queue = job_queue
+        self.apps: Dict[str, Any] = dict(apps or {})
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.worker_id = job_queue.new_worker_id()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running: Dict[int, Job] = {}
+        self._finished: List[Tuple[Job, Optional[Dict[str, Any]], Optional[str]]] = []
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_directory(cls, dag_directory: str, apps: Dict[str, Any], **kwargs) -> 'JobWorker':
+        """Build a worker for a workflow directory, e.g. in a separate process.
+
+        The directory's state backend must be a SQLiteBackend.
+
+        Raises:
+            FileNotFoundError: If the directory has no .dag file
+            ValueError: If the state backend is not a SQLiteBackend
+        """
+        dag_file = DAGParser.find_dag_file(dag_directory)
+        if not dag_file:
+            raise FileNotFoundError(f"No DAG file found in {dag_directory}")
+        dag = DAGParser.parse_file(dag_file)
+        return cls(dag, job_queue_for(dag, load_state_backend(dag_directory)), apps, **kwargs)
+
+    def add_app(self, app: Any) -> None:
+        """Run jobs for a processor app, keyed by its name."""
+        with self._lock:
+            self.apps[app.name] = app
+        self._wake.set()
+
+    def start(self) -> None:
+        """Start claiming jobs on a background thread."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f'hexflow-jobs-{self.worker_id[:8]}',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming jobs and complete the jobs that have finished.
+
+        Jobs still running keep their leases until those expire.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        thread.join(timeout)
+        self.flush()
+
+    def poll(self) -> int:
+        """Claim and submit one batch of jobs per app.
+
+        Returns:
+            Number of jobs claimed
+        """
+        with self._lock:
+            apps = list(self.apps.items())
+        claimed = 0
+        for app_name, app in apps:
+            with self._lock:
+                in_flight = sum(1 for job in self._running.values() if job.app_name == app_name)
+            capacity = min(self.batch_size, 2 * getattr(app, 'max_workers', 1) - in_flight)
+            if capacity <= 0:
+                continue
+            for job in self.job_queue.claim(app_name, self.worker_id, capacity):
+                with self._lock:
+                    self._running[job.job_id] = job
+                if is_expired(job.deadline):
+                    self._on_finished(job)(job.workflow_token, None, DEADLINE_EXCEEDED)
+                else:
+                    app.submit_job(job.workflow_token, job.payload, self._on_finished(job), deadline=job.deadline)
+                claimed += 1
+        return claimed
+
+    def flush(self) -> int:
+        """Complete the jobs that have finished since the last flush.
+
+        Returns:
+            Number of jobs completed
+        """
+        with self._lock:
+            finished, self._finished = self._finished, []
+        if not finished:
+            return 0
+        outcomes, retries = [], []
+        for job, data, error in finished:
+            delay = None
+            if error is not None and error != DEADLINE_EXCEEDED:
+                delay = retry_delay(self.dag, job.app_name, job.attempts, job.deadline)
+            if delay is None:
+                outcomes.append((job, JobOutcome(self.dag, job.app_name, data, error), error))
+            else:
+                retries.append((job, delay))
+        try:
+            self.job_queue.complete_many(
+                outcomes, follow_up=lambda workflow_session: next_jobs(self.dag, workflow_session))
+            for job, delay in retries:
+                self.job_queue.release(job, delay)
+        except Exception:
+            # Keep the outcomes for the next flush
+            with self._lock:
+                self._finished[:0] = finished
+            raise
+        with self._lock:
+            for job, _, _ in finished:
+                self._running.pop(job.job_id, None)
+        return len(finished)
+
+    def _on_finished(self, job: Job):
+        """Build the submit_job callback recording a job's outcome."""
+        def on_complete(workflow_token: str, data: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+            with self._lock:
+                self._finished.append((job, data, error))
+            self._wake.set()
+        return on_complete
+
+    def _run(self) -> None:
+        """Claim, complete and heartbeat until stopped."""
+        heartbeat_interval = self.job_queue.lease_seconds / 3
+        last_heartbeat = time.monotonic()
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                worked = self.flush() + self.poll()
+                if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                    with self._lock:
+                        running = list(self._running)
+                    self.job_queue.heartbeat(running, self.worker_id)
+                    last_heartbeat = time.monotonic()
+            except Exception as e:
+                log_event(logger, logging.ERROR, 'job_worker_error', worker_id=self.worker_id, error=str(e),
+                          exc_info=e)
+                worked = 0
+            if not worked:
+                self._wake.wait(self.poll_interval)
+
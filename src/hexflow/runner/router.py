@@ -1,12 +1,28 @@
 """Router service that coordinates application workflows based on DAG files."""
 
+import json
+import logging
 import os
-import sys
+import threading
 from urllib.parse import urlencode
+from urllib.request import Request, urlopen
 from flask import Flask, request, redirect, jsonify, session
 from .dag_parser import DAGParser, DAGDefinition
-from ..state import StateBackend, SQLiteBackend, WorkflowSession
-from typing import Optional, Dict, Any
+from ..state import (StateBackend, WorkflowSession, SessionConflictError, DeadlineExceededError,
+                     load_state_backend)
+from ..state.tokens import InvalidTokenError
+from .api import WorkflowAPI
+from .idempotency import IDEMPOTENCY_FIELD, IdempotencyCache
+from .handoff import HANDOFF_FIELD, HANDOFF_INLINE, HANDOFF_REFERENCE, mapped_inputs, project_mapping
+from .flow import advance, waiting_for
+from .jobs import JobOutcome, JobWorker, job_queue_for, next_jobs
+from ..logs import configure_from_settings, get_logger, log_event, logging_configured
+from .deadlines import (DEADLINE_EXCEEDED, DEADLINE_FIELD, TIMED_OUT, bounded_timeout, is_expired, job_deadline,
+                        parse_deadline, session_deadline, session_expired, set_step_deadline,
+                        set_workflow_deadline, time_out)
+from typing import Optional, Dict, Any, Callable, List, Mapping
+
+logger = get_logger('router')
 
 
 class Router:
@@ -19,6 +35,9 @@ class Router:
         self.dag: Optional[DAGDefinition] = None
         self.app = Flask(name)
         self.app.secret_key = 'modular-builder-router-key'  # For session management
+        self.idempotency_cache = IdempotencyCache()
+        # App instances running in this process, by name (see register_app)
+        self.apps: Dict[str, Any] = {}
         
         # Initialize state backend
         if state_backend is None:
@@ -27,6 +46,9 @@ class Router:
             self.state_backend = state_backend
         
         self.load_dag()
+        # Durable queue for processor jobs, if the DAG config enables it
+        self.job_queue = self._load_job_queue()
+        self.job_worker: Optional[JobWorker] = None
         self.setup_routes()
     
     def load_dag(self):
@@ -35,13 +57,13 @@ class Router:
         if dag_file:
             try:
                 self.dag = DAGParser.parse_file(dag_file)
-                print(f"Loaded DAG: {self.dag.name} from {dag_file}")
+                log_event(logger, logging.INFO, 'dag_loaded', workflow=self.dag.name, path=dag_file)
             except Exception as e:
-                print(f"Error loading DAG file {dag_file}: {e}")
-                print("Please check that the DAG file has valid YAML format and required fields (name, apps)")
+                log_event(logger, logging.ERROR, 'dag_load_failed', path=dag_file, error=str(e),
+                          hint="check that the DAG file is valid YAML with the required fields (name, apps)")
                 self.dag = None
         else:
-            print(f"No valid DAG file found in {self.dag_directory}")
+            log_event(logger, logging.WARNING, 'dag_not_found', directory=self.dag_directory)
             self.dag = None
     
     def setup_routes(self):
@@ -57,6 +79,11 @@ class Router:
         def status():
             return 'OK', 200
         
+        @self.app.route('/stats')
+        def stats():
+            """Return session statistics from the state backend."""
+            return jsonify(self.state_backend.get_stats())
+        
         @self.app.route('/start')
         def start_workflow():
             """Start the workflow at the entry point."""
@@ -76,11 +103,15 @@ class Router:
             session['workflow_token'] = workflow_session.workflow_token
             session['workflow_started'] = True
             
-            # Set current step and save
+            # Set current step and deadlines, and save
             workflow_session.current_step = entry_app.name
-            self.state_backend.save_session(workflow_session)
+            set_workflow_deadline(self.dag, workflow_session)
+            set_step_deadline(self.dag, workflow_session, entry_app.name)
+            if not self.state_backend.save_session(workflow_session):
+                return 'Failed to start workflow: the session could not be saved', 503
             
-            print(f"Started workflow: {workflow_session.workflow_token}")
+            log_event(logger, logging.INFO, 'workflow_started', workflow=self.dag.name,
+                      workflow_token=workflow_session.workflow_token)
             
             # POST to the entry point app with workflow token
             return f'''
@@ -90,6 +121,7 @@ class Router:
                     <p>Starting workflow...</p>
                     <form id="startForm" method="post" action="http://localhost:{entry_app.port}">
                         <input type="hidden" name="workflow_token" value="{workflow_session.workflow_token}">
+                        {self._deadline_field(workflow_session)}
                     </form>
                     <script>
                         document.getElementById('startForm').submit();
@@ -112,63 +144,97 @@ class Router:
             if not workflow_token:
                 return 'Missing workflow_token', 400
             
-            # Get workflow session
-            workflow_session = self.state_backend.get_session_by_token(workflow_token)
-            if not workflow_session:
-                return f'Workflow session not found: {workflow_token}', 404
+            # Tokens may have been typed by hand; fix case and catch typos
+            try:
+                workflow_token = self.state_backend.token_allocator.normalize(workflow_token)
+            except InvalidTokenError as e:
+                return str(e), 400
             
-            # Save any form data from current app
             form_data = dict(request.form) if request.method == 'POST' else {}
-            if form_data:
-                workflow_session.set_step_data(current_app_name, form_data)
+            idempotency_key = form_data.pop(IDEMPOTENCY_FIELD, None) or request.args.get(IDEMPOTENCY_FIELD)
+            deadline = parse_deadline(form_data.pop(DEADLINE_FIELD, None))
             
-            # Get the next app in the flow
-            next_app_name = self.dag.get_next_app(current_app_name)
-            if not next_app_name:
-                # End of workflow
-                workflow_session.set_status('completed')
-                self.state_backend.save_session(workflow_session)
-                return f'Workflow completed! Token: {workflow_token}', 200
+            def transition():
+                return self._transition(current_app_name, workflow_token, form_data, deadline)
             
-            # Get the port for the next app
-            next_port = self.dag.get_app_port(next_app_name)
-            if not next_port:
-                return f'App {next_app_name} not found', 400
+            if not idempotency_key:
+                return transition()
+            # Repeat submissions of the same rendered form replay the first response
+            return self.idempotency_cache.run((workflow_token, current_app_name, idempotency_key), transition)
+        
+        @self.app.route('/data/<app_name>')
+        def app_data(app_name):
+            """Return the workflow data the DAG maps into an app."""
+            if not self.dag:
+                return jsonify({'error': 'No DAG loaded'}), 400
+            if not self.dag.get_app_by_name(app_name):
+                return jsonify({'error': f'App {app_name} not found'}), 404
             
-            # Update workflow session
-            workflow_session.current_step = next_app_name
-            self.state_backend.save_session(workflow_session)
+            workflow_token = request.args.get('workflow_token') or request.headers.get('X-Workflow-Token')
+            if not workflow_token:
+                return jsonify({'error': 'Missing workflow_token'}), 400
+            try:
+                workflow_token = self.state_backend.token_allocator.normalize(workflow_token)
+            except InvalidTokenError as e:
+                return jsonify({'error': str(e)}), 400
             
-            # Prepare data to pass to next app based on data_mapping
-            next_app_data = self._get_data_for_app(workflow_session, current_app_name, next_app_name)
+            workflow_session = self.state_backend.get_session_by_token(workflow_token)
+            if not workflow_session:
+                return jsonify({'error': f'Workflow session not found: {workflow_token}'}), 404
             
-            # Create form fields for all data
-            form_fields = []
-            form_fields.append(f'<input type="hidden" name="workflow_token" value="{workflow_token}">')
+            # data_mapping is the access control: only fields mapped into the app
+            return jsonify(mapped_inputs(self.dag, workflow_session, app_name))
+        
+        WorkflowAPI(self).register(self.app)
+        
+        @self.app.route('/wait')
+        def wait():
+            """Wait for a processing session, then hand it on to its next app."""
+            if not self.dag:
+                return 'No DAG loaded', 400
+            workflow_token = request.args.get('workflow_token') or session.get('workflow_token')
+            if not workflow_token:
+                return 'Missing workflow_token', 400
+            try:
+                workflow_token = self.state_backend.token_allocator.normalize(workflow_token)
+            except InvalidTokenError as e:
+                return str(e), 400
             
-            for key, value in next_app_data.items():
-                # Handle list values (like from checkboxes)
-                if isinstance(value, list):
-                    for item in value:
-                        form_fields.append(f'<input type="hidden" name="{key}" value="{item}">')
-                else:
-                    form_fields.append(f'<input type="hidden" name="{key}" value="{value}">')
+            workflow_session = self.state_backend.get_session_by_token(workflow_token)
+            if not workflow_session:
+                return f'Workflow session not found: {workflow_token}', 404
+            workflow_session = self.expire_session(workflow_session)
+            if workflow_session.status == TIMED_OUT:
+                return self._timed_out_response(workflow_session)
+            if workflow_session.status == 'processing':
+                if self.job_queue:
+                    # Re-enqueue a job lost between the hop and its enqueue
+                    self.dispatch_job(workflow_session)
+                return self._processing_page(workflow_token)
+            if workflow_session.status == 'failed':
+                return f"Processing failed: {workflow_session.metadata.get('processing_error')}", 500
+            if workflow_session.status == 'completed':
+                return f'Workflow completed! Token: {workflow_token}', 200
             
-            # POST to the next app with workflow token and data
-            return f'''
-            <html>
-                <head><title>Continuing Workflow</title></head>
-                <body>
-                    <p>Continuing to next step...</p>
-                    <form id="nextForm" method="post" action="http://localhost:{next_port}">
-                        {''.join(form_fields)}
-                    </form>
-                    <script>
-                        document.getElementById('nextForm').submit();
-                    </script>
-                </body>
-            </html>
-            '''
+            completed_steps = workflow_session.metadata.get('completed_steps') or []
+            next_app_name = workflow_session.current_step
+            return self._handoff_page(workflow_session, completed_steps[-1] if completed_steps else None,
+                                      next_app_name, self.dag.get_app_port(next_app_name))
+        
+        @self.app.route('/jobs/<app_name>/complete', methods=['POST'])
+        def job_complete(app_name):
+            """Receive the outcome of a processor job submitted over HTTP."""
+            if not self.dag or not self.dag.is_processor(app_name):
+                return jsonify({'error': f'Processor {app_name} not found'}), 404
+            result = request.get_json(silent=True) or {}
+            if not result.get('workflow_token'):
+                return jsonify({'error': 'Missing workflow_token'}), 400
+            
+            workflow_session = self.complete_job(app_name, result['workflow_token'],
+                                                 result.get('data'), result.get('error'))
+            if not workflow_session:
+                return jsonify({'error': f"Workflow {result['workflow_token']} is not waiting for {app_name}"}), 409
+            return jsonify({'status': workflow_session.status, 'current_step': workflow_session.current_step})
         
         @self.app.route('/dag')
         def get_dag():
@@ -179,13 +245,340 @@ class Router:
             return {
                 'name': self.dag.name,
                 'description': self.dag.description,
-                'apps': [{'name': app.name, 'port': app.port, 'entry_point': app.entry_point} 
+                'apps': [{'name': app.name, 'port': app.port, 'entry_point': app.entry_point, 'type': app.type} 
                         for app in self.dag.apps],
                 'flow': [{'from': step.from_app, 'to': step.to_app, 'trigger': step.trigger} 
                         for step in self.dag.flow]
             }
     
-    def _get_data_for_app(self, workflow_session: WorkflowSession, from_app: str, to_app: str) -> Dict[str, Any]:
+    def register_app(self, app: Any) -> None:
+        """Register an app instance running in the same process.
+        
+        The JSON API uses registered apps to validate step submissions with
+        the app's own form rules and to describe its form. Apps not
+        registered are still reachable over HTTP.
+        
+        Args:
+            app: App instance, e.g. a CasaApp subclass; keyed by its name
+        """
+        self.apps[app.name] = app
+        if self.job_queue and hasattr(app, 'submit_job'):
+            if self.job_worker is None:
+                self.job_worker = JobWorker(self.dag, self.job_queue)
+                self.job_worker.start()
+            self.job_worker.add_app(app)
+    
+    def stop(self) -> None:
+        """Stop the job worker, if processor jobs run from the job queue."""
+        if self.job_worker is not None:
+            self.job_worker.stop()
+            self.job_worker = None
+    
+    def _transition(self, current_app_name: str, workflow_token: str,
+                    form_data: Dict[str, Any], deadline: Optional[float] = None) -> Any:
+        """Save a hop's form data, move the session on and render the handoff page.
+        
+        A hop arriving after the session's deadline times the session out
+        instead of moving it on.
+        
+        Args:
+            current_app_name: App the hop comes from
+            workflow_token: Normalised workflow token
+            form_data: Data submitted from the current app
+            deadline: Deadline the app passed on in its workflow_deadline
+                field; conflicting saves are not retried past it
+            
+        Returns:
+            Flask response
+        """
+        # Get the next app in the flow
+        next_app_name = self.dag.get_next_app(current_app_name)
+        next_port = None
+        if next_app_name:
+            # Get the port for the next app
+            next_port = self.dag.get_app_port(next_app_name)
+            if not next_port:
+                if not self.state_backend.get_session_by_token(workflow_token):
+                    return f'Workflow session not found: {workflow_token}', 404
+                return f'App {next_app_name} not found', 400
+        
+        # Save form data and move the session on. Concurrent hops on the
+        # same session (double submits, several tabs) are retried on a
+        # freshly loaded copy rather than overwriting each other.
+        try:
+            workflow_session = self.state_backend.update_session(
+                workflow_token, self._hop_update(current_app_name, form_data), deadline=deadline)
+        except DeadlineExceededError as e:
+            return str(e), 408
+        except SessionConflictError as e:
+            return str(e), 409
+        except RuntimeError as e:
+            # The backend failed to save; the hop can be submitted again
+            log_event(logger, logging.ERROR, 'hop_save_failed', app=current_app_name,
+                      workflow_token=workflow_token, error=str(e))
+            return str(e), 503
+        if not workflow_session:
+            return f'Workflow session not found: {workflow_token}', 404
+        if workflow_session.status == TIMED_OUT:
+            return self._timed_out_response(workflow_session)
+        
+        if not next_app_name:
+            # End of workflow
+            return f'Workflow completed! Token: {workflow_token}', 200
+        
+        if workflow_session.status == 'processing':
+            # The next app is a background processor; the browser waits on /wait
+            self.dispatch_job(workflow_session)
+            return self._processing_page(workflow_token)
+        
+        return self._handoff_page(workflow_session, current_app_name, next_app_name, next_port)
+    
+    def _handoff_page(self, workflow_session: WorkflowSession, from_app: Optional[str],
+                      next_app_name: str, next_port: int) -> str:
+        """Render the page that POSTs the browser on to the next app.
+        
+        Args:
+            workflow_session: Session being handed on
+            from_app: App the session is coming from, for data_mapping
+            next_app_name: App to hand the session to
+            next_port: Port of that app
+            
+        Returns:
+            Auto-submitting HTML page
+        """
+        workflow_token = workflow_session.workflow_token
+        
+        # Create form fields for all data
+        form_fields = []
+        form_fields.append(f'<input type="hidden" name="workflow_token" value="{workflow_token}">')
+        form_fields.append(self._deadline_field(workflow_session))
+        
+        if self._data_handoff() == HANDOFF_REFERENCE:
+            # Only the token travels; the next app reads its inputs from /data
+            form_fields.append(f'<input type="hidden" name="{HANDOFF_FIELD}" value="{HANDOFF_REFERENCE}">')
+            next_app_data = {}
+        else:
+            # Prepare data to pass to next app based on data_mapping
+            next_app_data = self._get_data_for_app(workflow_session, from_app, next_app_name)
+        
+        for key, value in next_app_data.items():
+            # Handle list values (like from checkboxes)
+            if isinstance(value, list):
+                for item in value:
+                    form_fields.append(f'<input type="hidden" name="{key}" value="{item}">')
+            else:
+                form_fields.append(f'<input type="hidden" name="{key}" value="{value}">')
+        
+        # POST to the next app with workflow token and data
+        return f'''
+        <html>
+            <head><title>Continuing Workflow</title></head>
+            <body>
+                <p>Continuing to next step...</p>
+                <form id="nextForm" method="post" action="http://localhost:{next_port}">
+                    {''.join(form_fields)}
+                </form>
+                <script>
+                    document.getElementById('nextForm').submit();
+                </script>
+            </body>
+        </html>
+        '''
+    
+    def _hop_update(self, current_app_name: str,
+                    form_data: Dict[str, Any]) -> Callable[[WorkflowSession], None]:
+        """Build the session update applied by a hop, for StateBackend.update_session.
+        
+        The update may run more than once if other hops on the same session
+        win the race to save. Their changes are kept, except that different
+        data submitted concurrently for the same step is a conflict. A
+        session past its deadline is timed out instead.
+        
+        Args:
+            current_app_name: App the hop comes from
+            form_data: Data submitted from that app
+            
+        Returns:
+            Function applying the hop to a loaded session
+        """
+        first_seen = []
+        
+        def update(workflow_session: WorkflowSession) -> None:
+            if session_expired(workflow_session):
+                time_out(workflow_session)
+                return
+            
+            if form_data:
+                stored = workflow_session.get_step_data(current_app_name)
+                if not first_seen:
+                    first_seen.append(stored)
+                elif stored != first_seen[0] and stored != form_data:
+                    raise SessionConflictError(
+                        f"Step {current_app_name} was submitted concurrently with different data")
+                workflow_session.set_step_data(current_app_name, form_data)
+            
+            # Processor apps and parallel branches park the session until their jobs complete
+            advance(self.dag, workflow_session, current_app_name)
+        
+        return update
+    
+    def dispatch_job(self, workflow_session: WorkflowSession, app_names: Optional[List[str]] = None) -> None:
+        """Submit a processing session's jobs to its processor apps.
+        
+        A session waits for one processor, or for every pending branch of a
+        parallel fan-out (see hexflow.runner.flow).
+        
+        With ``job_queue: true`` in the DAG config the jobs are added to the
+        durable job queue, once per step however often this is called, and
+        a JobWorker runs them. Otherwise processors registered in this process
+        get the job directly and others are sent it over HTTP and report
+        back to /jobs/<app>/complete; a job that cannot be submitted fails
+        the session.
+        
+        Args:
+            workflow_session: Session in the processing status
+            app_names: Processors to submit jobs to. Defaults to every app
+                the session is waiting for
+        """
+        if self.job_queue:
+            self.job_queue.enqueue_many([(workflow_session.workflow_token, job)
+                                         for job in next_jobs(self.dag, workflow_session)
+                                         if app_names is None or job[0] in app_names])
+            return
+        
+        for app_name in waiting_for(workflow_session) if app_names is None else app_names:
+            self._submit_job(workflow_session, app_name)
+    
+    def _submit_job(self, workflow_session: WorkflowSession, app_name: str) -> None:
+        """Submit one processor's job in process or over HTTP, with its deadline."""
+        workflow_token = workflow_session.workflow_token
+        deadline = job_deadline(self.dag, workflow_session, app_name)
+        if is_expired(deadline):
+            self.complete_job(app_name, workflow_token, None, DEADLINE_EXCEEDED)
+            return
+        session_data = mapped_inputs(self.dag, workflow_session, app_name)
+        
+        def on_complete(token: str, data: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+            self.complete_job(app_name, token, data, error)
+        
+        app = self.apps.get(app_name)
+        if app is not None and hasattr(app, 'submit_job'):
+            app.submit_job(workflow_token, session_data, on_complete, deadline=deadline)
+            return
+        
+        body = json.dumps({
+            'workflow_token': workflow_token,
+            'session_data': session_data,
+            'deadline': deadline,
+            'callback_url': f"http://{self.host}:{self.port}/jobs/{app_name}/complete"
+        }).encode('utf-8')
+        job = Request(f"http://localhost:{self.dag.get_app_port(app_name)}/jobs", data=body,
+                      method='POST', headers={'Content-Type': 'application/json'})
+        try:
+            with urlopen(job, timeout=bounded_timeout(10, deadline)):
+                pass
+        except Exception as e:
+            self.complete_job(app_name, workflow_token, None, f"Could not submit job: {e}")
+    
+    def complete_job(self, app_name: str, workflow_token: str, data: Optional[Dict[str, Any]],
+                     error: Optional[str] = None) -> Optional[WorkflowSession]:
+        """Record a processor job's outcome and move the session on.
+        
+        See JobOutcome for how the session moves on. Jobs for the
+        processors the completion started (the next app, or the join of a
+        parallel fan-out) are dispatched; other branches are already running.
+        A failed job with retries left runs again after its backoff.
+        
+        Args:
+            app_name: Processor app that ran the job
+            workflow_token: Token of the session
+            data: Step data returned by the job, if it succeeded
+            error: Error message, if it failed
+            
+        Returns:
+            Updated session, or None if it does not exist or is not
+            waiting for this processor
+        """
+        update = JobOutcome(self.dag, app_name, data, error, retry=True)
+        # Every other processor, e.g. a parallel branch finishing at the same
+        # time, can win the race to save at most once
+        processors = sum(1 for app in self.dag.apps if app.type == 'processor')
+        max_attempts = self.state_backend.UPDATE_ATTEMPTS + processors
+        
+        try:
+            workflow_session = self.state_backend.update_session(workflow_token, update, max_attempts)
+        except SessionConflictError as e:
+            log_event(logger, logging.WARNING, 'job_result_ignored', app=app_name, workflow_token=workflow_token,
+                      error=str(e))
+            return None
+        
+        if workflow_session and update.retry_delay is not None:
+            log_event(logger, logging.INFO, 'job_retry_scheduled', app=app_name, workflow_token=workflow_token,
+                      delay=update.retry_delay, error=error)
+            retry = threading.Timer(update.retry_delay, self._retry_job, (app_name, workflow_token))
+            retry.daemon = True
+            retry.start()
+        elif workflow_session:
+            started = [name for name in waiting_for(workflow_session) if name in self.dag.get_next_apps(app_name)]
+            if started:
+                self.dispatch_job(workflow_session, started)
+        return workflow_session
+    
+    def _retry_job(self, app_name: str, workflow_token: str) -> None:
+        """Submit a failed job again if its session still waits for it."""
+        workflow_session = self.state_backend.get_session_by_token(workflow_token)
+        if workflow_session and app_name in waiting_for(workflow_session):
+            self._submit_job(workflow_session, app_name)
+    
+    def expire_session(self, workflow_session: WorkflowSession) -> WorkflowSession:
+        """Time out a session left waiting past its deadline, e.g. by a user who went away.
+        
+        Args:
+            workflow_session: Loaded session
+            
+        Returns:
+            The session, timed out and saved if it was overdue
+        """
+        if workflow_session.status not in ('processing', 'in_progress') or not session_expired(workflow_session):
+            return workflow_session
+        
+        def update(overdue: WorkflowSession) -> None:
+            if overdue.status in ('processing', 'in_progress') and session_expired(overdue):
+                time_out(overdue)
+        
+        try:
+            return self.state_backend.update_session(workflow_session.workflow_token, update) or workflow_session
+        except SessionConflictError:
+            return workflow_session
+    
+    def _timed_out_response(self, workflow_session: WorkflowSession):
+        """Response for a hop or wait on a session that timed out."""
+        step = workflow_session.metadata.get('timed_out_step') or workflow_session.current_step
+        return f'Workflow timed out at step {step}. Token: {workflow_session.workflow_token}', 408
+    
+    def _deadline_field(self, workflow_session: WorkflowSession) -> str:
+        """Hidden form field passing a session's deadline on to an app, if it has one."""
+        deadline = session_deadline(workflow_session)
+        if deadline is None:
+            return ''
+        return f'<input type="hidden" name="{DEADLINE_FIELD}" value="{deadline!r}">'
+    
+    def _processing_page(self, workflow_token: str) -> str:
+        """Render the page a browser waits on while a processor runs."""
+        wait_url = f"/wait?{urlencode({'workflow_token': workflow_token})}"
+        return f'''
+        <html>
+            <head>
+                <title>Processing</title>
+                <meta http-equiv="refresh" content="1;url={wait_url}">
+            </head>
+            <body>
+                <p>Processing, please wait...</p>
+            </body>
+        </html>
+        '''
+    
+    def _get_data_for_app(self, workflow_session: WorkflowSession, from_app: str, to_app: str) -> Mapping[str, Any]:
         """Get data to pass from one app to another based on data_mapping in DAG.
         
         Args:
@@ -202,21 +595,7 @@ class Router:
         # Find data mapping for this transition
         for mapping in self.dag.data_mapping:
             if mapping.get('from') == from_app and mapping.get('to') == to_app:
-                fields = mapping.get('fields', [])
-                
-                # Special case: "*" means pass ALL workflow data
-                if fields == "*" or (isinstance(fields, list) and len(fields) == 1 and fields[0] == "*"):
-                    return self._get_all_workflow_data_flattened(workflow_session)
-                
-                from_app_data = workflow_session.get_step_data(from_app) or {}
-                
-                # Extract only specified fields
-                filtered_data = {}
-                for field in fields:
-                    if field in from_app_data:
-                        filtered_data[field] = from_app_data[field]
-                
-                return filtered_data
+                return project_mapping(workflow_session, mapping)
         
         return {}
     
@@ -231,67 +610,44 @@ class Router:
         """
         return workflow_session.data
     
-    def _get_all_workflow_data_flattened(self, workflow_session: WorkflowSession) -> Dict[str, Any]:
+    def _get_all_workflow_data_flattened(self, workflow_session: WorkflowSession) -> Mapping[str, Any]:
         """Get all workflow data flattened into a single dictionary for URL parameters.
         
         Args:
             workflow_session: Current workflow session
             
         Returns:
-            Dictionary with all workflow data flattened (no step organization)
+            Read-only mapping with all workflow data flattened (no step
+            organization), maintained by the session (see
+            WorkflowSession.get_all_data for the conflict rules)
         """
-        flattened_data = {}
-        all_data = workflow_session.data
-        
-        # Flatten all step data into a single dictionary
-        for step_name, step_data in all_data.items():
-            if isinstance(step_data, dict):
-                for key, value in step_data.items():
-                    # Avoid overwriting keys by prefixing with step name if there's a conflict
-                    if key in flattened_data and flattened_data[key] != value:
-                        flattened_data[f"{step_name}_{key}"] = value
-                    else:
-                        flattened_data[key] = value
-        
-        return flattened_data
+        return workflow_session.get_all_data()
+    
+    def _data_handoff(self) -> str:
+        """Return how mapped data reaches the next app: inline or reference."""
+        return (self.dag.config or {}).get('data_handoff', HANDOFF_INLINE)
+    
+    def _load_job_queue(self):
+        """Build the durable job queue if the DAG config sets ``job_queue: true``."""
+        if not self.dag or not (self.dag.config or {}).get('job_queue'):
+            return None
+        try:
+            return job_queue_for(self.dag, self.state_backend)
+        except ValueError as e:
+            log_event(logger, logging.WARNING, 'job_queue_disabled', error=str(e))
+            return None
     
     def _load_state_backend(self) -> StateBackend:
         """Load state backend from workflow settings or use default."""
-        settings_path = os.path.join(self.dag_directory, 'settings.py')
-        
-        if os.path.exists(settings_path):
-            try:
-                # Add directory to path temporarily
-                if self.dag_directory not in sys.path:
-                    sys.path.insert(0, self.dag_directory)
-                    
-                import settings
-                
-                # Get backend class and config from settings
-                backend_class = getattr(settings, 'STATE_BACKEND_CLASS', SQLiteBackend)
-                backend_config = getattr(settings, 'STATE_BACKEND_CONFIG', {})
-                
-                print(f"Loading state backend from settings: {backend_class.__name__}")
-                return backend_class(**backend_config)
-                
-            except Exception as e:
-                print(f"Error loading settings.py: {e}")
-                print("Falling back to default SQLite backend")
-            finally:
-                # Clean up path
-                if self.dag_directory in sys.path:
-                    sys.path.remove(self.dag_directory)
-        
-        # Default fallback
-        db_path = os.path.join(self.dag_directory, 'workflow_sessions.db')
-        return SQLiteBackend(db_path)
+        return load_state_backend(self.dag_directory)
     
     def run(self, debug: bool = False):
-        """Start the router service."""
-        print(f"Starting router on http://{self.host}:{self.port}")
-        if self.dag:
-            print(f"Managing workflow: {self.dag.name}")
-            print(f"Entry point: http://{self.host}:{self.port}/start")
+        """Start the router service, logging as settings.py configures unless logging is set up."""
+        if not logging_configured():
+            configure_from_settings(self.dag_directory)
+        log_event(logger, logging.INFO, 'router_starting', url=f"http://{self.host}:{self.port}",
+                  workflow=self.dag.name if self.dag else None,
+                  entry_point=f"http://{self.host}:{self.port}/start" if self.dag else None)
         
         self.app.run(host=self.host, port=self.port, debug=debug)
     
@@ -3,8 +3,20 @@
 This module provides base classes and templates that can be extended
 to create new micro-apps following standardized patterns. Currently
 includes templates for http_base, casa, display, and processor applications.
+Each template is imported when first used.
 """
 
-from . import http_base, casa, display
+import importlib
 
-__all__ = ["http_base", "casa", "display"]
\ No newline at end of file
+__all__ = ["http_base", "casa", "display", "processor"]
+
+
+def __getattr__(name):
+    """Import a template subpackage on first use."""
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
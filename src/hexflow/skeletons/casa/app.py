@@ -1,8 +1,11 @@
 """Casa application skeleton for form-based applications."""
 
 from flask import request, render_template_string, render_template
-from ..http_base.app import HTTPBaseApp
+from ..http_base.app import HTTPBaseApp, HANDOFF_FIELD, HANDOFF_REFERENCE
+from ...logs import log_event
+from ...runner.idempotency import IDEMPOTENCY_FIELD
 from typing import Dict, List, Any, Optional
+import logging
 import os
 
 
@@ -10,10 +13,8 @@ class CasaApp(HTTPBaseApp):
     """Form-based application that extends HTTPBaseApp."""
     
     def __init__(self, name: str = "casa-app", host: str = 'localhost', port: int = 8000):
-        print(f"INIT DEBUG: CasaApp.__init__ called for {name}")
         try:
             super().__init__(name, host, port)
-            self.name = name  # Store name for template usage
             
             # Set up template folder for Jinja2
             template_dir = os.path.join(os.path.dirname(__file__), 'templates')
@@ -21,7 +22,7 @@ class CasaApp(HTTPBaseApp):
                 self.app.template_folder = template_dir
                 
             self.form_config = self.setup_form()
-            print(f"INIT DEBUG: CasaApp setup complete for {name}")
+            log_event(self.logger, logging.DEBUG, 'form_ready', fields=len(self.form_config.get('fields', [])))
         except TypeError as e:
             if "unexpected keyword argument" in str(e):
                 raise TypeError(f"CasaApp constructor requires 'name', 'host', and 'port' parameters. "
@@ -41,9 +42,22 @@ class CasaApp(HTTPBaseApp):
             'submit_text': 'Submit'
         }
     
+    def form_schema(self) -> Dict[str, Any]:
+        """Describe the form for machine clients of the router's JSON API.
+        
+        Returns:
+            Dict with the form's title, fields, validation rules and submit text
+        """
+        form_config = self.form_config
+        return {
+            'title': form_config.get('title', 'Form'),
+            'fields': [dict(field) for field in form_config.get('fields', [])],
+            'validation': dict(form_config.get('validation', {})),
+            'submit_text': form_config.get('submit_text', 'Submit')
+        }
+    
     def setup_routes(self):
         """Setup form routes with GET and POST handling."""
-        print(f"ROUTE DEBUG: CasaApp.setup_routes called")
         
         @self.app.route('/', methods=['GET', 'POST'])
         def form_handler():
@@ -75,9 +89,8 @@ class CasaApp(HTTPBaseApp):
         form_config = self.form_config
         errors = errors or {}
         
-        # Debug logging
         if errors:
-            print(f"BASE DEBUG: Showing validation errors: {list(errors.keys())}")
+            log_event(self.logger, logging.DEBUG, 'validation_errors', fields=sorted(errors))
 
         # Build form fields HTML
         fields_html = []
@@ -87,6 +100,11 @@ class CasaApp(HTTPBaseApp):
         
         workflow_token = request.form.get('workflow_token', '') or request.args.get('workflow_token', '')
         
+        # A form re-rendered with validation errors is still the same submission
+        idempotency_key = (errors and request.form.get(IDEMPOTENCY_FIELD)) or self.new_idempotency_key()
+        deadline = self.workflow_deadline()
+        workflow_deadline = repr(deadline) if deadline is not None else ''
+        
         # Try to use Jinja2 template, fall back to inline template if not found
         try:
             return render_template('form.html',
@@ -94,9 +112,12 @@ class CasaApp(HTTPBaseApp):
                                 fields_html=fields_html,
                                 submit_text=form_config.get('submit_text', 'Submit'),
                                 app_name=self.name,
-                                workflow_token=workflow_token)
+                                workflow_token=workflow_token,
+                                idempotency_field=IDEMPOTENCY_FIELD,
+                                idempotency_key=idempotency_key,
+                                workflow_deadline=workflow_deadline)
         except Exception as e:
-            print(f"Template error: {e}, falling back to inline template for backward compatibility")
+            log_event(self.logger, logging.WARNING, 'template_fallback', template='form.html', error=str(e))
             # Fallback to inline template for backward compatibility
             template = '''
             <!DOCTYPE html>
@@ -118,6 +139,8 @@ class CasaApp(HTTPBaseApp):
                 <form action="http://localhost:8000/next" method="post">
                     <input type="hidden" name="from" value="{{ app_name }}">
                     <input type="hidden" name="workflow_token" value="{{ workflow_token }}">
+                    <input type="hidden" name="{{ idempotency_field }}" value="{{ idempotency_key }}">
+                    <input type="hidden" name="workflow_deadline" value="{{ workflow_deadline }}">
                     {{ fields_html|safe }}
                     <div class="form-group">
                         <button type="submit" name="action" value="submit">{{ submit_text }}</button>
@@ -132,7 +155,10 @@ class CasaApp(HTTPBaseApp):
                                         fields_html=''.join(fields_html),
                                         submit_text=form_config.get('submit_text', 'Submit'),
                                         app_name=self.name,
-                                        workflow_token=workflow_token)
+                                        workflow_token=workflow_token,
+                                        idempotency_field=IDEMPOTENCY_FIELD,
+                                        idempotency_key=idempotency_key,
+                                        workflow_deadline=workflow_deadline)
     
     def render_field(self, field: Dict[str, Any], error: str = '') -> str:
         """Render a single form field."""
@@ -142,6 +168,9 @@ class CasaApp(HTTPBaseApp):
         field_required = field.get('required', False)
         field_options = field.get('options', [])
         field_value = request.form.get(field_name, '') or request.args.get(field_name, '')
+        if not field_value and request.form.get(HANDOFF_FIELD) == HANDOFF_REFERENCE:
+            # Inputs passed by reference are fetched once, when first needed
+            field_value = self.get_workflow_inputs().get(field_name, '')
         
         required_attr = 'required' if field_required else ''
         error_html = f'<div class="error">{error}</div>' if error else ''
@@ -1,23 +1,82 @@
 """Display application skeleton for read-only confirmation pages."""
 
-from flask import request, render_template_string, render_template, has_request_context
+from jinja2 import TemplateError
 from ..http_base.app import HTTPBaseApp
-from typing import Dict, List, Any, Optional
+from ..http_base.streaming import LazyHTML
+from ...logs import log_event
+from typing import Dict, Iterable, List, Any, Optional
+import copy
+import logging
 import os
 
+# Page template used when no display.html template is found
+DISPLAY_TEMPLATE = '''
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{{ title }}</title>
+    <style>
+        body { font-family: Arial, sans-serif; max-width: 700px; margin: 50px auto; padding: 20px; }
+        .header { text-align: center; margin-bottom: 30px; }
+        .section { background: #f8f9fa; padding: 20px; margin-bottom: 20px; border-radius: 8px; border-left: 4px solid #007cba; }
+        .section h3 { margin-top: 0; color: #007cba; }
+        .data-item { margin-bottom: 10px; }
+        .data-label { font-weight: bold; color: #333; }
+        .data-value { color: #666; margin-left: 10px; }
+        .completion-message { background: #d4edda; color: #155724; padding: 15px; border-radius: 8px; text-align: center; margin-top: 30px; border: 1px solid #c3e6cb; }
+        .workflow-data { background: #fff; border: 1px solid #ddd; padding: 20px; border-radius: 8px; }
+        .workflow-step { margin-bottom: 15px; }
+        .step-title { font-weight: bold; color: #007cba; margin-bottom: 8px; }
+        .empty-data { color: #999; font-style: italic; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>{{ title }}</h1>
+    </div>
+    
+    {% for section_html in sections_html %}{{ section_html|safe }}{% endfor %}
+    {{ workflow_data_html|safe }}
+    
+    <div class="completion-message">
+        {{ completion_message }}
+    </div>
+</body>
+</html>
+'''
+
+# Stands in for the workflow data when the static page is pre-rendered
+WORKFLOW_DATA_MARKER = '<!--hexflow:workflow-data-->'
+
 
 class DisplayApp(HTTPBaseApp):
-    """Display-only application that shows information without collecting input."""
+    """Display-only application that shows information without collecting input.
+    
+    With ``cache_static = True``, sections and pages that do not depend on
+    workflow data are rendered once and reused, and pages are served with
+    HTTPBaseApp.cached_response, keyed by the workflow data. Only set it if
+    setup_display, render_section, render_workflow_data and the template
+    read nothing else that changes between requests, such as the request
+    itself, the time or random values.
+    
+    With ``stream_responses = True`` pages are streamed: the head goes out
+    before any section or workflow data is rendered.
+    """
+    
+    cache_static = False
     
     def __init__(self, name: str = "display-app", host: str = 'localhost', port: int = 8000):
         try:
             super().__init__(name, host, port)
-            self.name = name  # Store name for template usage
             
             # Set up template folder for Jinja2
             template_dir = os.path.join(os.path.dirname(__file__), 'templates')
             if os.path.exists(template_dir):
                 self.app.template_folder = template_dir
+            
+            # Compiled page template and pre-rendered static parts
+            self._template = None
+            self._static = None
                 
             # Don't call setup_display() here - it may need request context
         except TypeError as e:
@@ -32,13 +91,7 @@ class DisplayApp(HTTPBaseApp):
         Returns:
             Dict containing workflow data if request context is available, empty dict otherwise.
         """
-        if not has_request_context():
-            return {}
-        
-        # Get all workflow data passed from router  
-        workflow_params = dict(request.form) if request.method == 'POST' else dict(request.args)
-        workflow_params.pop('workflow_token', None)  # Remove token from data
-        return workflow_params
+        return self.get_workflow_inputs()
     
     def setup_display(self, workflow_data: Dict[str, Any] = None) -> Dict[str, Any]:
         """Override this method to define display configuration.
@@ -63,74 +116,118 @@ class DisplayApp(HTTPBaseApp):
         
         @self.app.route('/', methods=['GET', 'POST'])
         def display_handler():
-            # Get workflow data directly in route handler (like HTTPBaseApp pattern)
-            workflow_data = dict(request.form) if request.method == 'POST' else dict(request.args)
-            workflow_token = workflow_data.pop('workflow_token', '')
-            
-            # Call setup_display with direct access to workflow data
-            display_config = self.setup_display(workflow_data)
-            
-            # Build sections HTML
-            sections_html = []
-            for section in display_config.get('sections', []):
-                section_html = self.render_section(section)
-                sections_html.append(section_html)
-            
-            # Get workflow data if requested
-            workflow_data_html = ''
-            if display_config.get('show_workflow_data', False):
-                workflow_data_html = self.render_workflow_data(workflow_data)
-            
-            template = '''
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>{{ title }}</title>
-                <style>
-                    body { font-family: Arial, sans-serif; max-width: 700px; margin: 50px auto; padding: 20px; }
-                    .header { text-align: center; margin-bottom: 30px; }
-                    .section { background: #f8f9fa; padding: 20px; margin-bottom: 20px; border-radius: 8px; border-left: 4px solid #007cba; }
-                    .section h3 { margin-top: 0; color: #007cba; }
-                    .data-item { margin-bottom: 10px; }
-                    .data-label { font-weight: bold; color: #333; }
-                    .data-value { color: #666; margin-left: 10px; }
-                    .completion-message { background: #d4edda; color: #155724; padding: 15px; border-radius: 8px; text-align: center; margin-top: 30px; border: 1px solid #c3e6cb; }
-                    .workflow-data { background: #fff; border: 1px solid #ddd; padding: 20px; border-radius: 8px; }
-                    .workflow-step { margin-bottom: 15px; }
-                    .step-title { font-weight: bold; color: #007cba; margin-bottom: 8px; }
-                    .empty-data { color: #999; font-style: italic; }
-                </style>
-            </head>
-            <body>
-                <div class="header">
-                    <h1>{{ title }}</h1>
-                </div>
-                
-                {{ sections_html|safe }}
-                {{ workflow_data_html|safe }}
-                
-                <div class="completion-message">
-                    {{ completion_message }}
-                </div>
-            </body>
-            </html>
-            '''
+            workflow_data = self.get_workflow_inputs()
+            stream = self.stream_responses
+            if not self.cache_static:
+                return self.render_page(workflow_data, stream)
+            return self.cached_response(workflow_data, lambda: self.render_page(workflow_data, stream))
+    
+    def render_page(self, workflow_data: Dict[str, Any], stream: bool = False) -> Any:
+        """Render the display page for the workflow data of the current request.
+        
+        The page template is compiled once per app. Sections that are the
+        same as with no workflow data are pre-rendered once, and when the
+        whole configuration is, so is the page around the workflow data;
+        then only render_workflow_data runs per request.
+        
+        Args:
+            workflow_data: Dictionary containing data passed from previous workflow steps
+            stream: Stream the page with HTTPBaseApp.stream_template, rendering
+                sections and workflow data as the page is sent
             
-            # Try to use Jinja2 template, fall back to inline template if not found
+        Returns:
+            HTML page, or a streaming response
+        """
+        display_config = self.setup_display(workflow_data)
+        
+        # Get workflow data if requested
+        workflow_data_html = LazyHTML(lambda: self.render_workflow_data(workflow_data)
+                                      if display_config.get('show_workflow_data', False) else '')
+        
+        static = self._static_display()
+        if static and static['page'] and display_config == static['config']:
+            head, tail = static['page']
+            if stream:
+                return self.stream_response(str(part) for part in (head, workflow_data_html, tail))
+            return head + str(workflow_data_html) + tail
+        
+        sections_html = self._sections_html(display_config, static['sections'] if static else [])
+        if stream:
+            return self.stream_template(self._page_template(),
+                                        self._template_context(display_config, sections_html, workflow_data_html))
+        return self._render_template(display_config, list(sections_html), str(workflow_data_html))
+    
+    def _sections_html(self, display_config: Dict[str, Any], static_sections: List[Any]) -> Iterable[str]:
+        """Render the configured sections in turn, reusing the pre-rendered static sections."""
+        for section in display_config.get('sections', []):
+            section_html = next((html for static_section, html in static_sections if static_section == section),
+                                None)
+            yield section_html if section_html is not None else self.render_section(section)
+    
+    def _template_context(self, display_config: Dict[str, Any], sections_html: Iterable[str],
+                          workflow_data_html: Any) -> Dict[str, Any]:
+        """Build the page template's variables."""
+        return {
+            'title': display_config.get('title', 'Confirmation'),
+            'sections_html': sections_html,
+            'workflow_data_html': workflow_data_html,
+            'completion_message': display_config.get('completion_message', 'Thank you!')
+        }
+    
+    def _render_template(self, display_config: Dict[str, Any], sections_html: List[str],
+                         workflow_data_html: str) -> str:
+        """Render the compiled page template."""
+        context = self._template_context(display_config, sections_html, workflow_data_html)
+        self.app.update_template_context(context)
+        return self._page_template().render(context)
+    
+    def _page_template(self):
+        """Compile display.html, or the inline template if it is missing, once per app.
+        
+        With template auto-reloading on (Flask debug mode) the template is
+        looked up on every request, so edits show without a restart.
+        """
+        jinja_env = self.app.jinja_env
+        if self._template is None or jinja_env.auto_reload:
             try:
-                return render_template('display.html',
-                                    title=display_config.get('title', 'Confirmation'),
-                                    sections_html=sections_html,
-                                    workflow_data_html=workflow_data_html,
-                                    completion_message=display_config.get('completion_message', 'Thank you!'))
-            except Exception as e:
-                print(f"Template error: {e}, falling back to inline template")
-                # Fallback to inline template
-                return render_template_string(template,
-                                            title=display_config.get('title', 'Confirmation'),
-                                            sections_html=''.join(sections_html),
-                                            workflow_data_html=workflow_data_html,
-                                            completion_message=display_config.get('completion_message', 'Thank you!'))
+                self._template = jinja_env.get_template('display.html')
+            except TemplateError as e:
+                log_event(self.logger, logging.WARNING, 'template_fallback', template='display.html', error=str(e))
+                self._template = jinja_env.from_string(DISPLAY_TEMPLATE)
+        return self._template
+    
+    def _static_display(self) -> Optional[Dict[str, Any]]:
+        """Pre-render the parts of the display that do not depend on workflow data.
+        
+        setup_display is called once with no workflow data. Its sections are
+        rendered, and the page is rendered around a marker where the workflow
+        data goes and split there. A request whose configuration equals this
+        one reuses them.
+        
+        Returns:
+            Dict with the 'config', its rendered 'sections' as (section, html)
+            pairs and the 'page' as a (head, tail) pair or None; None if
+            caching is off or setup_display needs workflow data
+        """
+        if not self.cache_static or self.app.jinja_env.auto_reload:
+            return None
+        if self._static is None:
+            try:
+                display_config = self.setup_display({})
+                sections = [(section, self.render_section(section))
+                            for section in display_config.get('sections', [])]
+            except Exception:
+                self._static = {}
+                return None
+            page = None
+            if display_config.get('show_workflow_data', False):
+                html = self._render_template(display_config, [html for _, html in sections], WORKFLOW_DATA_MARKER)
+                if html.count(WORKFLOW_DATA_MARKER) == 1:
+                    page = tuple(html.split(WORKFLOW_DATA_MARKER))
+            else:
+                page = (self._render_template(display_config, [html for _, html in sections], ''), '')
+            self._static = {'config': copy.deepcopy(display_config), 'sections': sections, 'page': page}
+        return self._static or None
     
     def render_section(self, section: Dict[str, Any]) -> str:
         """Render a display section."""
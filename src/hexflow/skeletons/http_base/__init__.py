@@ -1,5 +1,7 @@
 """HTTP Base skeleton for creating web applications."""
 
 from .app import HTTPBaseApp
+from .cache import ResponseCache
+from .streaming import LazyHTML, flush_chunks
 
-__all__ = ["HTTPBaseApp"]
\ No newline at end of file
+__all__ = ["HTTPBaseApp", "LazyHTML", "ResponseCache", "flush_chunks"]
\ No newline at end of file
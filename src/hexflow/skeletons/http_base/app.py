@@ -1,15 +1,58 @@
 """Base HTTP application skeleton using Flask."""
 
-from flask import Flask
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import quote, urlencode
+from urllib.request import urlopen
+
+from flask import Flask, Response, g, has_request_context, request, stream_with_context
+
+from .cache import ResponseCache
+from .streaming import flush_chunks
+from ...logs import configure_logging, get_logger, log_event, logging_configured
+from ...runner.deadlines import DEADLINE_FIELD
+from ...runner.handoff import HANDOFF_FIELD, HANDOFF_REFERENCE
+
+# Key for page ETags when the Flask app has no secret_key; ETags then only
+# match within this process
+_ETAG_KEY = secrets.token_bytes(32)
 
 
 class HTTPBaseApp:
     """Base HTTP application that can be subclassed."""
     
+    # Router serving /data for apps whose inputs are passed by reference
+    router_url = 'http://localhost:8000'
+    
+    # Rendered pages kept by cached_response
+    response_cache_size = 256
+    
+    # Change when the markup of a page served by cached_response changes, so
+    # browsers holding the old page's ETag download the new one
+    page_version = ''
+    
+    # Stream pages from stream_template instead of rendering them in memory
+    stream_responses = False
+    
+    # Characters buffered between writes of a streamed page, after its head
+    stream_buffer_size = 8192
+    
     def __init__(self, name: str = "http-base", host: str = 'localhost', port: int = 8000):
+        self.name = name
         self.host = host
         self.port = port
         self.app = Flask(name)
+        # Level set per app with LOG_LEVELS in settings.py
+        self.logger = get_logger(name)
+        # Optional hexflow.runner.handoff.WorkflowDataReader; when set, inputs
+        # passed by reference are read from the state backend, not the router
+        self.data_reader = None
+        self.response_cache = ResponseCache(self.response_cache_size)
         self.setup_routes()
     
     def setup_routes(self):
@@ -18,8 +61,178 @@ class HTTPBaseApp:
         def index():
             return 'Modular-Builder: Running', 200
     
+    def new_idempotency_key(self) -> str:
+        """Issue an idempotency key for a form that posts to the router.
+        
+        Render it as a hidden ``idempotency_key`` field. The router replays
+        its first response to repeat submissions carrying the same key
+        instead of advancing the workflow again.
+        """
+        return secrets.token_urlsafe(16)
+    
+    def workflow_deadline(self) -> Optional[float]:
+        """Get the deadline the router passed with the current request.
+        
+        Render it back as a hidden ``workflow_deadline`` field so the
+        router can refuse a hop that arrives too late without loading the
+        session. Outside a request, or for a workflow without a timeout,
+        there is none.
+        
+        Returns:
+            Unix timestamp, or None
+        """
+        if not has_request_context():
+            return None
+        params = request.form if request.method == 'POST' else request.args
+        try:
+            return float(params[DEADLINE_FIELD]) if params.get(DEADLINE_FIELD) else None
+        except ValueError:
+            return None
+    
+    def page_etag(self, page_data: Any) -> str:
+        """Return the ETag of a page rendered only from page_data.
+        
+        The ETag is a keyed hash (with the Flask app's secret_key, if set)
+        of the app, its page_version and the data, so it does not disclose
+        the data it was computed from.
+        
+        Args:
+            page_data: JSON-serialisable data the page is rendered from
+        """
+        payload = json.dumps([type(self).__module__, type(self).__qualname__, self.name, self.page_version,
+                              page_data], sort_keys=True, default=str).encode('utf-8')
+        secret_key = self.app.secret_key
+        key = secret_key.encode('utf-8') if isinstance(secret_key, str) else secret_key or _ETAG_KEY
+        return hmac.new(key, payload, hashlib.sha256).hexdigest()[:32]
+    
+    def cached_response(self, page_data: Any, render: Callable[[], Any]) -> Any:
+        """Serve a page that is fully determined by page_data, with an ETag.
+        
+        A GET or HEAD whose ``If-None-Match`` holds the page's ETag gets a
+        304 without rendering. Otherwise the body comes from a bounded LRU
+        of rendered pages (``response_cache_size``), so refreshing a page,
+        which browsers do with a repeat POST, does not render it again.
+        Responses say ``Cache-Control: private, no-cache``: browsers keep
+        the page but check it with the ETag before showing it again.
+        
+        Only use this for pages that depend on nothing but page_data, e.g.
+        the workflow data of a confirmation page; include the workflow
+        token if the page shows it.
+        
+        Args:
+            page_data: JSON-serialisable data the page is rendered from
+            render: Renders the page; a str is cached, a response (such as
+                a streamed page) gets the ETag but is not cached, and
+                anything else (e.g. a (body, status) tuple) is returned as is
+                
+        Returns:
+            Flask response
+        """
+        etag = self.page_etag(page_data)
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+        if request.method in ('GET', 'HEAD') and request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        
+        body = self.response_cache.get(etag)
+        if body is None:
+            body = render()
+            if isinstance(body, Response):
+                body.headers.update(headers)
+                return body
+            if not isinstance(body, str):
+                return body
+            self.response_cache.put(etag, body)
+        return Response(body, headers=headers, mimetype='text/html')
+    
+    def stream_template(self, template: Any, context: Dict[str, Any]) -> Response:
+        """Stream a page as its template renders.
+        
+        The page's ``<head>`` is sent as soon as it is rendered and the rest
+        in chunks of about ``stream_buffer_size`` characters, so the time to
+        the first byte does not grow with the page. Pass fragments that are
+        expensive to build as generators or LazyHTML so they are only built
+        once the markup before them is on its way. The status has been sent
+        by the time they run: an error in them cuts the page short.
+        
+        Args:
+            template: Jinja template name or compiled template
+            context: Template variables
+            
+        Returns:
+            Streaming Flask response
+        """
+        if isinstance(template, str):
+            template = self.app.jinja_env.get_template(template)
+        self.app.update_template_context(context)
+        return self.stream_response(template.generate(context))
+    
+    def stream_response(self, chunks: Iterable[str]) -> Response:
+        """Stream page chunks, keeping the request context while they are generated.
+        
+        Args:
+            chunks: Page fragments, sent as described in stream_template
+            
+        Returns:
+            Streaming Flask response
+        """
+        chunks = flush_chunks(chunks, self.stream_buffer_size)
+        return Response(stream_with_context(chunks), mimetype='text/html')
+    
+    def get_workflow_inputs(self) -> Dict[str, Any]:
+        """Get the workflow data passed to this app in the current request.
+        
+        With inline handoff these are the fields the router posted. With
+        ``data_handoff: reference`` only the workflow token is posted; the
+        inputs are fetched on first call and reused for the rest of the
+        request.
+        
+        Returns:
+            Dict of mapped inputs, empty outside a request context
+        """
+        if not has_request_context():
+            return {}
+        
+        params = request.form if request.method == 'POST' else request.args
+        if params.get(HANDOFF_FIELD) != HANDOFF_REFERENCE:
+            inputs = params.to_dict()
+            inputs.pop('workflow_token', None)
+            inputs.pop(DEADLINE_FIELD, None)
+            return inputs
+        
+        if 'workflow_inputs' not in g:
+            g.workflow_inputs = self.fetch_workflow_inputs(params.get('workflow_token', ''))
+        return g.workflow_inputs
+    
+    def fetch_workflow_inputs(self, workflow_token: str) -> Dict[str, Any]:
+        """Read the inputs the DAG maps into this app for a session.
+        
+        Uses ``data_reader`` when set, otherwise the router's ``/data``
+        endpoint. Either way only fields mapped into this app by the DAG's
+        data_mapping are returned.
+        
+        Args:
+            workflow_token: Workflow token of the session
+            
+        Returns:
+            Dict of mapped inputs, empty if the session does not exist
+        """
+        if self.data_reader is not None:
+            return self.data_reader.read(workflow_token, self.name) or {}
+        
+        url = f"{self.router_url}/data/{quote(self.name)}?{urlencode({'workflow_token': workflow_token})}"
+        # Don't wait on the router beyond the workflow's deadline
+        timeout = 10.0
+        deadline = self.workflow_deadline()
+        if deadline is not None:
+            timeout = max(0.001, min(timeout, deadline - time.time()))
+        with urlopen(url, timeout=timeout) as response:
+            return json.load(response)
+    
     def run(self, debug: bool = False):
         """Start the Flask server."""
+        if not logging_configured():
+            configure_logging()
+        log_event(self.logger, logging.INFO, 'app_starting', url=f'http://{self.host}:{self.port}')
         self.app.run(host=self.host, port=self.port, debug=debug)
     
     def get_app(self):
@@ -0,0 +1,56 @@
+"""Bounded LRU of rendered pages keyed by their ETag."""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class ResponseCache:
+    """Keeps the most recently served page bodies, keyed by ETag.
+
+    A page's ETag is a hash of everything the page is rendered from (see
+    HTTPBaseApp.cached_response), so a body cached under an ETag is the
+    body a fresh render would produce. The least recently used bodies are
+    evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached bodies; 0 disables caching
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._bodies: 'OrderedDict[str, str]' = OrderedDict()
+
+    def get(self, etag: str) -> Optional[str]:
+        """Return the body cached under an ETag, marking it recently used."""
+        with self._lock:
+            body = self._bodies.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._bodies.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: str) -> None:
+        """Cache a body, evicting the least recently used beyond max_entries."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._bodies[etag] = body
+            self._bodies.move_to_end(etag)
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached body, e.g. after the page's markup changed."""
+        with self._lock:
+            self._bodies.clear()
+
+    def __len__(self) -> int:
+        return len(self._bodies)
@@ -0,0 +1,63 @@
+"""Chunking of streamed pages: the head is sent early, the rest in buffers."""
+
+from typing import Callable, Iterable, Iterator
+
+# Chunks are flushed as soon as the page's head is complete
+HEAD_END = '</head>'
+
+
+def flush_chunks(chunks: Iterable[str], buffer_size: int = 8192) -> Iterator[str]:
+    """Regroup the many small chunks of a rendered template for sending.
+
+    Everything up to and including ``</head>`` is yielded as soon as it is
+    rendered, so browsers can fetch stylesheets while the rest of the page
+    is rendered. After that, chunks are buffered up to buffer_size
+    characters so each write to the client carries a useful amount of
+    markup.
+
+    Args:
+        chunks: Rendered page fragments, e.g. from Template.generate
+        buffer_size: Characters to buffer between flushes after the head
+    """
+    buffer = []
+    buffered = 0
+    head_sent = False
+    # The end of the markup seen so far, so a split </head> is still found
+    tail = ''
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        flush = buffered >= buffer_size
+        if not head_sent:
+            # join rather than +, which would escape text added to Markup
+            seen = ''.join((tail, chunk))
+            tail = seen[1 - len(HEAD_END):]
+            if HEAD_END in seen:
+                head_sent = flush = True
+        if flush:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+class LazyHTML:
+    """Markup rendered when a template first outputs it.
+
+    Passing one to a streamed template instead of a string defers the work
+    until the markup before it has been sent.
+    """
+
+    __slots__ = ('_render', '_html')
+
+    def __init__(self, render: Callable[[], str]):
+        self._render = render
+        self._html = None
+
+    def __html__(self) -> str:
+        if self._html is None:
+            self._html = self._render()
+        return self._html
+
+    __str__ = __html__
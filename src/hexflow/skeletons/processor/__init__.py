@@ -0,0 +1,5 @@
+"""Processor skeleton for background processing steps."""
+
+from .app import ProcessorApp
+
+__all__ = ["ProcessorApp"]
@@ -0,0 +1,184 @@
+"""Processor application skeleton for slow, non-interactive workflow steps."""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.request import Request, urlopen
+from flask import request, jsonify
+from ..http_base.app import HTTPBaseApp
+from ...logs import log_event
+from ...runner.deadlines import DEADLINE_EXCEEDED
+from typing import Dict, Any, Callable, Optional
+
+
+# Called with (workflow_token, result data, error message) when a job ends
+JobCallback = Callable[[str, Optional[Dict[str, Any]], Optional[str]], None]
+
+
+def _run_process(app_class: type, session_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Run ProcessorApp.process in a worker process.
+    
+    The app instance (and its Flask app) cannot be sent to another process,
+    so the job runs on an uninitialised instance of the same class.
+    """
+    return app_class.process(app_class.__new__(app_class), session_data)
+
+
+class ProcessorApp(HTTPBaseApp):
+    """Application running a slow workflow step in the background.
+    
+    Override process() to do the work, e.g. an eligibility check or
+    document generation. The router parks the session in the
+    ``processing`` status, submits a job with the data the DAG maps into
+    this app, and moves the session on when the job completes; the user's
+    browser waits on the router meanwhile, so no web worker is held.
+    
+    Jobs run on a thread pool by default. Set ``pool = 'process'`` for
+    CPU-bound work; process() then runs in a worker process on a fresh,
+    uninitialised instance, so it may only use class attributes, and the
+    class must be importable by worker processes.
+    
+    A job submitted with a deadline (the workflow's and this step's
+    ``timeout`` in the DAG) is reported as failed with ``deadline exceeded``
+    once the deadline passes, even if process() is still running.
+    """
+    
+    # 'thread' or 'process'
+    pool = 'thread'
+    max_workers = 4
+    
+    def __init__(self, name: str = "processor-app", host: str = 'localhost', port: int = 8000):
+        try:
+            super().__init__(name, host, port)
+        except TypeError as e:
+            if "unexpected keyword argument" in str(e):
+                raise TypeError(f"ProcessorApp constructor requires 'name', 'host', and 'port' parameters. "
+                              f"Use: super().__init__(name='app-name', host='localhost', port=8001)") from e
+            raise
+        
+        if self.pool not in ('thread', 'process'):
+            raise ValueError(f"ProcessorApp.pool must be 'thread' or 'process', not {self.pool!r}")
+        self._executor = None
+        self._executor_lock = threading.Lock()
+    
+    def process(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Override this method to do the step's work.
+        
+        Args:
+            session_data: Data the DAG's data_mapping passes to this app
+            
+        Returns:
+            Step data to store for this app; it is available to later steps
+            through data_mapping like form data
+            
+        Raises:
+            Exception: Any exception fails the job; its message is recorded
+                on the session
+        """
+        return {}
+    
+    def setup_routes(self):
+        """Setup the job submission route."""
+        @self.app.route('/', methods=['GET'])
+        def index():
+            return f'Modular-Builder: Processor {self.name} running', 200
+        
+        @self.app.route('/jobs', methods=['POST'])
+        def submit():
+            job = request.get_json(silent=True) or {}
+            workflow_token = job.get('workflow_token')
+            callback_url = job.get('callback_url')
+            if not workflow_token or not callback_url:
+                return jsonify({'error': 'workflow_token and callback_url are required'}), 400
+            
+            try:
+                deadline = float(job['deadline']) if job.get('deadline') is not None else None
+            except (TypeError, ValueError):
+                return jsonify({'error': 'deadline must be a Unix timestamp'}), 400
+            
+            self.submit_job(workflow_token, job.get('session_data') or {},
+                            lambda token, data, error: self.post_result(callback_url, token, data, error),
+                            deadline=deadline)
+            return jsonify({'workflow_token': workflow_token, 'status': 'accepted'}), 202
+    
+    def submit_job(self, workflow_token: str, session_data: Dict[str, Any],
+                   on_complete: JobCallback, deadline: Optional[float] = None) -> Future:
+        """Run process() on the pool and report the outcome.
+        
+        Args:
+            workflow_token: Token of the session the job belongs to
+            session_data: Input passed to process()
+            on_complete: Called with the token and either the result or an
+                error message once the job ends; it is called only once
+            deadline: Unix time after which the job is reported as failed
+                with ``deadline exceeded``; process() is not interrupted
+            
+        Returns:
+            Future of the job
+        """
+        executor = self._get_executor()
+        if isinstance(executor, ProcessPoolExecutor):
+            future = executor.submit(_run_process, type(self), session_data)
+        else:
+            future = executor.submit(self.process, session_data)
+        
+        reported = threading.Lock()
+        timer = None
+        
+        def report(data: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+            if reported.acquire(blocking=False):
+                on_complete(workflow_token, data, error)
+        
+        def done(finished: Future) -> None:
+            if timer is not None:
+                timer.cancel()
+            error = finished.exception()
+            if error is not None:
+                report(None, str(error) or type(error).__name__)
+            else:
+                report(finished.result() or {}, None)
+        
+        if deadline is not None:
+            timer = threading.Timer(max(0.0, deadline - time.time()), report, (None, DEADLINE_EXCEEDED))
+            timer.daemon = True
+            timer.start()
+        future.add_done_callback(done)
+        return future
+    
+    def post_result(self, callback_url: str, workflow_token: str,
+                    data: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        """Send a job's outcome to the router's completion callback."""
+        body = json.dumps({'workflow_token': workflow_token, 'data': data, 'error': error}).encode('utf-8')
+        callback = Request(callback_url, data=body, method='POST',
+                           headers={'Content-Type': 'application/json'})
+        try:
+            with urlopen(callback, timeout=10):
+                pass
+        except Exception as e:
+            log_event(self.logger, logging.ERROR, 'job_callback_failed', workflow_token=workflow_token,
+                      callback_url=callback_url, error=str(e))
+    
+    def stop(self) -> None:
+        """Shut down the worker pool, waiting for running jobs."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+    
+    def _get_executor(self):
+        """Create the worker pool on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                if self.pool == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix=f'hexflow-{self.name}')
+            return self._executor
+
+
+if __name__ == "__main__":
+    app = ProcessorApp()
+    app.run()
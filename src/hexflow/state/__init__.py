@@ -1,7 +1,52 @@
-"""State management for workflow sessions."""
+"""State management for workflow sessions.
 
-from .backend import StateBackend
-from .sqlite_backend import SQLiteBackend
-from .session import WorkflowSession
+Exports are imported on first use, so loading one backend does not load
+the others (the async backend pulls in asyncio, for example).
+"""
 
-__all__ = ["StateBackend", "SQLiteBackend", "WorkflowSession"]
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING
+
+# Exported names and the modules defining them, imported on first use
+_EXPORTS = {
+    "StateBackend": ".backend",
+    "SessionConflictError": ".backend",
+    "DeadlineExceededError": ".backend",
+    "session_cursor": ".backend",
+    "SQLiteBackend": ".sqlite_backend",
+    "LogStructuredBackend": ".log_backend",
+    "SQLiteJobQueue": ".job_queue",
+    "Job": ".job_queue",
+    "ShardedSQLiteBackend": ".sharded_backend",
+    "reshard": ".sharded_backend",
+    "AsyncStateBackend": ".async_backend",
+    "SyncBackendAdapter": ".async_backend",
+    "AsyncSQLiteBackend": ".async_backend",
+    "WorkflowSession": ".session",
+    "load_state_backend": ".loader",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .backend import StateBackend, SessionConflictError, DeadlineExceededError, session_cursor
+    from .sqlite_backend import SQLiteBackend
+    from .log_backend import LogStructuredBackend
+    from .job_queue import SQLiteJobQueue, Job
+    from .sharded_backend import ShardedSQLiteBackend, reshard
+    from .async_backend import AsyncStateBackend, SyncBackendAdapter, AsyncSQLiteBackend
+    from .session import WorkflowSession
+    from .loader import load_state_backend
+
+
+def __getattr__(name):
+    """Import an exported name's module on first use."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,437 @@
+"""Asyncio-native state backend interface and implementations."""
+
+import asyncio
+import itertools
+import logging
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, AsyncIterator, Callable
+
+from .backend import StateBackend, SessionCursor, SessionConflictError
+from .session import WorkflowSession
+from .sqlite_backend import SQLiteBackend
+from .tokens import TokenAllocator, DEFAULT_ALLOCATOR
+from ..logs import get_logger, log_event
+
+logger = get_logger('state')
+
+
+class AsyncStateBackend(ABC):
+    """Abstract base class for asyncio state backends.
+
+    Mirrors StateBackend with coroutine methods, plus batched get_many and
+    save_many. Use SyncBackendAdapter to run an existing StateBackend
+    behind this interface.
+    """
+
+    # Mints session IDs and workflow tokens for create_session
+    token_allocator: TokenAllocator = DEFAULT_ALLOCATOR
+
+    @abstractmethod
+    async def create_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
+        """Create a new workflow session."""
+        pass
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[WorkflowSession]:
+        """Get a session by its session ID."""
+        pass
+
+    @abstractmethod
+    async def get_session_by_token(self, workflow_token: str) -> Optional[WorkflowSession]:
+        """Get a session by its workflow token."""
+        pass
+
+    @abstractmethod
+    async def save_session(self, session: WorkflowSession) -> bool:
+        """Save/update a session."""
+        pass
+
+    @abstractmethod
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a session."""
+        pass
+
+    @abstractmethod
+    async def list_sessions(self, workflow_name: str = None, status: str = None) -> List[WorkflowSession]:
+        """List sessions with optional filters."""
+        pass
+
+    @abstractmethod
+    def iter_sessions(self, workflow_name: str = None, status: str = None,
+                      include_data: bool = True, page_size: int = 500,
+                      after: Optional[SessionCursor] = None,
+                      ascending: bool = False) -> AsyncIterator[WorkflowSession]:
+        """Iterate over sessions with keyset pagination (async generator)."""
+        pass
+
+    @abstractmethod
+    async def count_sessions(self, workflow_name: str = None, status: str = None) -> int:
+        """Count sessions with optional filters."""
+        pass
+
+    @abstractmethod
+    async def cleanup_expired_sessions(self, max_age_days: int = 30) -> int:
+        """Clean up old sessions."""
+        pass
+
+    @abstractmethod
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get session statistics."""
+        pass
+
+    async def get_many(self, session_ids: List[str]) -> Dict[str, WorkflowSession]:
+        """Get several sessions by ID.
+
+        Args:
+            session_ids: Session IDs to fetch
+
+        Returns:
+            Dictionary of session ID to session for the IDs that were found
+        """
+        sessions = await asyncio.gather(*(self.get_session(session_id) for session_id in session_ids))
+        return {session.session_id: session for session in sessions if session}
+
+    async def save_many(self, sessions: List[WorkflowSession]) -> bool:
+        """Save several sessions.
+
+        Args:
+            sessions: Sessions to save
+
+        Returns:
+            True if every session was saved
+        """
+        results = await asyncio.gather(*(self.save_session(session) for session in sessions))
+        return all(results)
+
+    async def close(self) -> None:
+        """Release resources held by the backend."""
+        pass
+
+
+class SyncBackendAdapter(AsyncStateBackend):
+    """Runs a synchronous StateBackend on a bounded thread pool."""
+
+    def __init__(self, backend: StateBackend, max_workers: int = 8):
+        """Initialize the adapter.
+
+        Args:
+            backend: Synchronous backend to wrap
+            max_workers: Maximum number of storage calls running at once
+        """
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='hexflow-state')
+
+    async def _run(self, function: Callable, *args) -> Any:
+        """Run a blocking call on the adapter's executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def create_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
+        return await self._run(self.backend.create_session, workflow_name, workflow_token)
+
+    async def get_session(self, session_id: str) -> Optional[WorkflowSession]:
+        return await self._run(self.backend.get_session, session_id)
+
+    async def get_session_by_token(self, workflow_token: str) -> Optional[WorkflowSession]:
+        return await self._run(self.backend.get_session_by_token, workflow_token)
+
+    async def save_session(self, session: WorkflowSession) -> bool:
+        return await self._run(self.backend.save_session, session)
+
+    async def delete_session(self, session_id: str) -> bool:
+        return await self._run(self.backend.delete_session, session_id)
+
+    async def list_sessions(self, workflow_name: str = None, status: str = None) -> List[WorkflowSession]:
+        return await self._run(self.backend.list_sessions, workflow_name, status)
+
+    async def iter_sessions(self, workflow_name: str = None, status: str = None,
+                            include_data: bool = True, page_size: int = 500,
+                            after: Optional[SessionCursor] = None,
+                            ascending: bool = False) -> AsyncIterator[WorkflowSession]:
+        sessions = self.backend.iter_sessions(workflow_name, status, include_data,
+                                              page_size, after, ascending)
+        while True:
+            page = await self._run(lambda: list(itertools.islice(sessions, page_size)))
+            for session in page:
+                yield session
+            if len(page) < page_size:
+                return
+
+    async def count_sessions(self, workflow_name: str = None, status: str = None) -> int:
+        return await self._run(self.backend.count_sessions, workflow_name, status)
+
+    async def cleanup_expired_sessions(self, max_age_days: int = 30) -> int:
+        return await self._run(self.backend.cleanup_expired_sessions, max_age_days)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return await self._run(self.backend.get_stats)
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class AsyncSQLiteBackend(AsyncStateBackend):
+    """Asyncio SQLite backend with a single dedicated writer thread.
+
+    All writes are queued to one writer thread that owns the only write
+    connection. It takes whatever is queued, runs each operation inside its
+    own savepoint and commits the batch as one transaction, so writers never
+    contend for SQLite's lock. Sessions are encoded on the writer thread too,
+    before the transaction, as binary codecs may insert new terms. Reads run on a pool of threads, each with a
+    persistent connection, and proceed alongside writes using WAL mode.
+
+    Uses the same schema as SQLiteBackend, so both can share a database.
+    """
+
+    def __init__(self, db_path: str = None, read_workers: int = 4, max_batch: int = 256,
+                 codec: str = 'json'):
+        """Initialize async SQLite backend.
+
+        Args:
+            db_path: Path to SQLite database file. Defaults to 'workflow_sessions.db'
+            read_workers: Number of reader threads
+            max_batch: Maximum number of write operations committed together
+            codec: Codec used to write data and metadata (see SQLiteBackend)
+        """
+        # Creates the schema, indexes and stats triggers, and holds the codecs
+        self._schema = SQLiteBackend(db_path, codec=codec)
+        self.db_path = self._schema.db_path
+        self.max_batch = max_batch
+
+        self._local = threading.local()
+        self._readers = ThreadPoolExecutor(max_workers=read_workers,
+                                           thread_name_prefix='hexflow-sqlite-read')
+
+        self._writes: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True,
+                                        name='hexflow-sqlite-write')
+        self._writer_ready = threading.Event()
+        self._writer.start()
+        self._writer_ready.wait()
+
+    async def create_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
+        """Create a session, retrying with a fresh token on collisions."""
+        attempts = 1 if workflow_token else StateBackend.CREATE_ATTEMPTS
+        for _ in range(attempts):
+            session = WorkflowSession(
+                session_id=self.token_allocator.new_session_id(),
+                workflow_name=workflow_name,
+                workflow_token=workflow_token or self.token_allocator.new_token()
+            )
+            session.updated_at = datetime.now()
+            try:
+                await self._write(lambda conn, params: conn.execute(SQLiteBackend.INSERT_SQL, params), session)
+                session.version += 1
+                return session
+            except sqlite3.IntegrityError:
+                continue
+
+        if workflow_token:
+            raise RuntimeError(f"Failed to create session: workflow token {workflow_token} is in use")
+        raise RuntimeError(f"Failed to create session: no unused workflow token after {attempts} attempts")
+
+    async def get_session(self, session_id: str) -> Optional[WorkflowSession]:
+        rows = await self._read("SELECT * FROM workflow_sessions WHERE session_id = ?", (session_id,))
+        return self._schema._row_to_session(rows[0]) if rows else None
+
+    async def get_session_by_token(self, workflow_token: str) -> Optional[WorkflowSession]:
+        rows = await self._read("SELECT * FROM workflow_sessions WHERE workflow_token = ?", (workflow_token,))
+        return self._schema._row_to_session(rows[0]) if rows else None
+
+    async def get_many(self, session_ids: List[str]) -> Dict[str, WorkflowSession]:
+        """Get several sessions by ID with one query per 500 IDs."""
+        found = {}
+        for start in range(0, len(session_ids), 500):
+            chunk = session_ids[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            rows = await self._read(
+                f"SELECT * FROM workflow_sessions WHERE session_id IN ({placeholders})", tuple(chunk))
+            for row in rows:
+                found[row['session_id']] = self._schema._row_to_session(row)
+        return found
+
+    async def save_session(self, session: WorkflowSession) -> bool:
+        # Encoded on the writer thread from the session, so a rejected save
+        # puts the previous timestamp back
+        previous, session.updated_at = session.updated_at, datetime.now()
+        try:
+            saved = await self._write(
+                lambda conn, params: conn.execute(SQLiteBackend.UPSERT_SQL, params).rowcount > 0, session)
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'session_save_failed', error=str(e))
+            saved = False
+        if saved:
+            session.version += 1
+        else:
+            session.updated_at = previous
+        return saved
+
+    async def save_many(self, sessions: List[WorkflowSession]) -> bool:
+        """Save several sessions atomically in one write operation.
+
+        Nothing is saved if any session was changed by another writer.
+        """
+        now = datetime.now()
+        for session in sessions:
+            session.updated_at = now
+
+        def save_all(conn: sqlite3.Connection, *params: tuple) -> None:
+            if conn.executemany(SQLiteBackend.UPSERT_SQL, params).rowcount != len(params):
+                # Rolls back this operation's savepoint
+                raise SessionConflictError("A session was changed by another writer")
+
+        try:
+            await self._write(save_all, *sessions)
+            for session in sessions:
+                session.version += 1
+            return True
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'sessions_save_failed', error=str(e))
+            return False
+
+    async def delete_session(self, session_id: str) -> bool:
+        try:
+            return await self._write(lambda conn: conn.execute(
+                "DELETE FROM workflow_sessions WHERE session_id = ?", (session_id,)).rowcount > 0)
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'session_delete_failed', error=str(e))
+            return False
+
+    async def list_sessions(self, workflow_name: str = None, status: str = None) -> List[WorkflowSession]:
+        return [session async for session in self.iter_sessions(workflow_name, status)]
+
+    async def iter_sessions(self, workflow_name: str = None, status: str = None,
+                            include_data: bool = True, page_size: int = 500,
+                            after: Optional[SessionCursor] = None,
+                            ascending: bool = False) -> AsyncIterator[WorkflowSession]:
+        while True:
+            query, params = self._schema._page_query(workflow_name, status, include_data,
+                                                     page_size, after, ascending)
+            rows = await self._read(query, tuple(params))
+            for row in rows:
+                yield self._schema._row_to_session(row)
+
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]['updated_at'], rows[-1]['session_id'])
+
+    async def count_sessions(self, workflow_name: str = None, status: str = None) -> int:
+        query, params = self._schema._count_query(workflow_name, status)
+        rows = await self._read(query, tuple(params))
+        return rows[0][0]
+
+    async def cleanup_expired_sessions(self, max_age_days: int = 30) -> int:
+        cutoff_date = datetime.now() - timedelta(days=max_age_days)
+        try:
+            return await self._write(lambda conn: conn.execute(
+                "DELETE FROM workflow_sessions WHERE created_at < ?", (cutoff_date.isoformat(),)).rowcount)
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'session_cleanup_failed', error=str(e))
+            return 0
+
+    async def get_stats(self) -> Dict[str, Any]:
+        rows = await self._read("SELECT dimension, key, count FROM workflow_stats", ())
+        counters = {(row['dimension'], row['key']): row['count'] for row in rows}
+        return {
+            'total_sessions': counters.get(('total', ''), 0),
+            'status_counts': {key: count for (dimension, key), count in counters.items()
+                              if dimension == 'status' and count > 0},
+            'workflow_counts': {key: count for (dimension, key), count in counters.items()
+                                if dimension == 'workflow' and count > 0},
+            'database_path': str(self.db_path)
+        }
+
+    async def close(self) -> None:
+        """Stop the writer after queued writes finish and shut down readers."""
+        self._writes.put(None)
+        await asyncio.get_running_loop().run_in_executor(None, self._writer.join)
+        self._readers.shutdown(wait=True)
+
+    async def _read(self, query: str, params: tuple) -> List[sqlite3.Row]:
+        """Run a read query on a reader thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._read_blocking, query, params)
+
+    def _read_blocking(self, query: str, params: tuple) -> List[sqlite3.Row]:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn.execute(query, params).fetchall()
+
+    async def _write(self, operation: Callable[..., Any], *sessions: WorkflowSession) -> Any:
+        """Queue a write operation for the writer thread and await its result.
+
+        Args:
+            operation: Called with the write connection and the row parameters
+                of each session, encoded on the writer thread
+            *sessions: Sessions the operation writes
+        """
+        future: Future = Future()
+        self._writes.put((operation, sessions, future))
+        return await asyncio.wrap_future(future)
+
+    def _writer_loop(self) -> None:
+        """Apply queued writes in batches, one transaction per batch."""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        self._writer_ready.set()
+        stopping = False
+
+        while not stopping:
+            item = self._writes.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+            if item is None:
+                stopping = True
+            if not batch:
+                continue
+
+            # Encoded outside the transaction: binary codecs add new terms on
+            # their own connection, which would wait for this one's lock
+            results = []
+            encoded = []
+            for operation, sessions, future in batch:
+                try:
+                    encoded.append((operation, [self._schema._session_params(session) for session in sessions],
+                                    future))
+                except Exception as e:
+                    results.append((future, None, e))
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for operation, params, future in encoded:
+                    conn.execute("SAVEPOINT write_op")
+                    try:
+                        results.append((future, operation(conn, *params), None))
+                        conn.execute("RELEASE write_op")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_op")
+                        conn.execute("RELEASE write_op")
+                        results.append((future, None, e))
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                results = [(future, None, e) for _, _, future in batch]
+
+            for future, result, error in results:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        conn.close()
@@ -1,13 +1,52 @@
 """Abstract base class for state backends."""
 
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Iterator, Tuple
 from .session import WorkflowSession
+from .tokens import TokenAllocator, DEFAULT_ALLOCATOR
+
+
+# Keyset pagination cursor: (updated_at ISO string, session_id)
+SessionCursor = Tuple[str, str]
+
+
+def session_cursor(session: WorkflowSession) -> SessionCursor:
+    """Return the keyset pagination cursor for a session.
+    
+    Args:
+        session: WorkflowSession to take the cursor from
+        
+    Returns:
+        (updated_at, session_id) tuple usable as the ``after`` argument
+        of StateBackend.iter_sessions
+    """
+    return (session.updated_at.isoformat(), session.session_id)
+
+
+class SessionConflictError(RuntimeError):
+    """Raised when a session keeps changing underneath an update."""
+    pass
+
+
+class DeadlineExceededError(SessionConflictError):
+    """Raised when an update's time budget runs out before it could be saved."""
+    pass
 
 
 class StateBackend(ABC):
     """Abstract base class for pluggable state backends."""
     
+    # Mints session IDs and workflow tokens for create_session. Set an
+    # instance attribute (or TOKEN_ALLOCATOR in settings.py) to customise
+    token_allocator: TokenAllocator = DEFAULT_ALLOCATOR
+    
+    # Fresh tokens tried by create_session before giving up on collisions
+    CREATE_ATTEMPTS = 5
+    
+    # Reload-and-reapply attempts by update_session on version conflicts
+    UPDATE_ATTEMPTS = 3
+    
     @abstractmethod
     def create_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
         """Create a new workflow session.
@@ -49,14 +88,127 @@ class StateBackend(ABC):
     def save_session(self, session: WorkflowSession) -> bool:
         """Save/update a session.
         
+        Saving is a compare-and-swap on session.version: the save only
+        applies if the stored session still has the version this one was
+        loaded with, and increments it on success.
+        
         Args:
             session: WorkflowSession to save
             
         Returns:
-            True if successful, False otherwise
+            True if successful, False if the stored session was changed by
+            another writer or the save failed
         """
         pass
     
+    def update_session(self, workflow_token: str, update: Callable[[WorkflowSession], None],
+                       max_attempts: int = None, deadline: Optional[float] = None) -> Optional[WorkflowSession]:
+        """Load, change and save a session, retrying on version conflicts.
+        
+        On a conflict the session is reloaded and ``update`` applied again,
+        so changes to different parts of the session by concurrent writers
+        are merged. ``update`` must therefore be safe to re-run, and should
+        raise SessionConflictError itself if the reloaded session has
+        changed in a way it cannot merge.
+        
+        Args:
+            workflow_token: Workflow token of the session
+            update: Function applying the change to a loaded session
+            max_attempts: Attempts before giving up. Defaults to UPDATE_ATTEMPTS
+            deadline: Optional Unix time after which a lost race is not retried
+            
+        Returns:
+            The saved WorkflowSession, or None if no session has the token
+            
+        Raises:
+            SessionConflictError: If every attempt lost a race
+            DeadlineExceededError: If a race was lost after the deadline
+            RuntimeError: If the save failed for another reason
+        """
+        attempts = max_attempts or self.UPDATE_ATTEMPTS
+        for attempt in range(attempts):
+            if attempt and deadline is not None and time.time() >= deadline:
+                raise DeadlineExceededError(
+                    f"Workflow session {workflow_token} could not be saved before its deadline")
+            session = self.get_session_by_token(workflow_token)
+            if session is None:
+                return None
+            
+            update(session)
+            if self.save_session(session):
+                return session
+            
+            current = self.get_session(session.session_id)
+            if current is not None and current.version == session.version:
+                raise RuntimeError(f"Failed to save session {workflow_token}")
+        
+        raise SessionConflictError(
+            f"Workflow session {workflow_token} is being changed concurrently; "
+            f"gave up after {attempts} attempts")
+    
+    def insert_session(self, session: WorkflowSession) -> bool:
+        """Save a new session unless its ID or token is already in use.
+        
+        The default implementation checks for an existing session before
+        saving, which is not atomic. Backends should override this with an
+        atomic insert.
+        
+        Args:
+            session: New WorkflowSession to save
+            
+        Returns:
+            True if saved, False if the session ID or token is taken
+        """
+        if self.get_session(session.session_id) or self.get_session_by_token(session.workflow_token):
+            return False
+        return self.save_session(session)
+    
+    def insert_sessions(self, sessions: List[WorkflowSession]) -> List[bool]:
+        """Insert a batch of new sessions.
+        
+        The default implementation inserts them one at a time. Backends
+        should override this to write the batch in one transaction.
+        
+        Args:
+            sessions: New WorkflowSession objects to save
+            
+        Returns:
+            One flag per session: True if saved, False if its ID or token is taken
+        """
+        return [self.insert_session(session) for session in sessions]
+    
+    def new_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
+        """Build an unsaved session with a freshly allocated ID and token.
+        
+        Args:
+            workflow_name: Name of the workflow
+            workflow_token: Optional custom workflow token
+            
+        Returns:
+            New WorkflowSession instance
+        """
+        return WorkflowSession(
+            session_id=self.token_allocator.new_session_id(),
+            workflow_name=workflow_name,
+            workflow_token=workflow_token or self.token_allocator.new_token()
+        )
+    
+    def _create_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
+        """Create a session, retrying with a fresh token on collisions.
+        
+        Shared implementation of create_session for backends that provide
+        insert_session. A custom token is tried once.
+        """
+        attempts = 1 if workflow_token else self.CREATE_ATTEMPTS
+        for _ in range(attempts):
+            session = self.new_session(workflow_name, workflow_token)
+            if self.insert_session(session):
+                return session
+        
+        if workflow_token:
+            raise RuntimeError(f"Failed to create session: workflow token {workflow_token} is in use")
+        raise RuntimeError(f"Failed to create session: no unused workflow token after {attempts} attempts")
+    
     @abstractmethod
     def delete_session(self, session_id: str) -> bool:
         """Delete a session.
@@ -82,6 +234,70 @@ class StateBackend(ABC):
         """
         pass
     
+    def iter_sessions(self, workflow_name: str = None, status: str = None,
+                      include_data: bool = True, page_size: int = 500,
+                      after: Optional[SessionCursor] = None,
+                      ascending: bool = False) -> Iterator[WorkflowSession]:
+        """Iterate over sessions using keyset pagination on (updated_at, session_id).
+        
+        The default implementation falls back to list_sessions so that
+        existing backends keep working. Backends should override this to
+        fetch one page at a time.
+        
+        Args:
+            workflow_name: Optional filter by workflow name
+            status: Optional filter by status
+            include_data: If False, data and metadata are not decoded
+            page_size: Number of rows fetched per page
+            after: Optional cursor; only sessions strictly after it are returned
+            ascending: Oldest first if True, newest first (default) otherwise
+            
+        Yields:
+            Matching WorkflowSession objects
+        """
+        sessions = sorted(self.list_sessions(workflow_name, status),
+                          key=session_cursor, reverse=not ascending)
+        for session in sessions:
+            cursor = session_cursor(session)
+            if after is not None and (cursor <= after if ascending else cursor >= after):
+                continue
+            if not include_data:
+                session = WorkflowSession.from_dict(dict(session.to_dict(), data={}, metadata={}))
+            yield session
+    
+    def count_sessions(self, workflow_name: str = None, status: str = None) -> int:
+        """Count sessions with optional filters.
+        
+        Args:
+            workflow_name: Optional filter by workflow name
+            status: Optional filter by status
+            
+        Returns:
+            Number of matching sessions
+        """
+        return sum(1 for _ in self.iter_sessions(workflow_name, status, include_data=False))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get session statistics.
+        
+        The default implementation counts sessions by iterating without
+        decoding data. Backends should override this with something cheaper.
+        
+        Returns:
+            Dictionary with total_sessions, status_counts and workflow_counts
+        """
+        status_counts: Dict[str, int] = {}
+        workflow_counts: Dict[str, int] = {}
+        for session in self.iter_sessions(include_data=False):
+            status_counts[session.status] = status_counts.get(session.status, 0) + 1
+            workflow_counts[session.workflow_name] = workflow_counts.get(session.workflow_name, 0) + 1
+        
+        return {
+            'total_sessions': sum(status_counts.values()),
+            'status_counts': status_counts,
+            'workflow_counts': workflow_counts
+        }
+    
     @abstractmethod
     def cleanup_expired_sessions(self, max_age_days: int = 30) -> int:
         """Clean up old sessions.
@@ -0,0 +1,293 @@
+"""Codecs for persisting workflow session data.
+
+A codec turns a session's ``data`` or ``metadata`` structure into the value
+stored in the database and back. Rows record the name of the codec that
+wrote them, so one database can hold rows in several formats while it is
+being migrated.
+
+Available codecs:
+
+- ``json``: JSON text, the original format
+- ``binary``: compact tagged binary encoding with dictionary-encoded keys
+- ``json+zlib`` / ``binary+zlib``: either of the above, zlib-compressed
+  when the encoded value exceeds a size threshold
+"""
+
+import json
+import struct
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Callable, Union
+
+Encoded = Union[str, bytes]
+
+
+class TermDictionary:
+    """Maps repeated strings, such as step and field names, to small integers.
+
+    Terms are persisted by the backend through the load and add callables,
+    so IDs stay valid for every row in the same database. Terms are only
+    ever added, never renumbered.
+    """
+
+    def __init__(self, load: Callable[[], Dict[str, int]],
+                 add: Callable[[List[str]], Dict[str, int]]):
+        """Initialize the dictionary.
+
+        Args:
+            load: Returns every persisted term with its ID
+            add: Persists new terms and returns the IDs of the given terms
+        """
+        self._load = load
+        self._add = add
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._terms: Dict[int, str] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        """Reload all terms, picking up ones added by other processes."""
+        with self._lock:
+            self._ids = dict(self._load())
+            self._terms = {term_id: term for term, term_id in self._ids.items()}
+
+    def ids_for(self, terms: List[str]) -> Dict[str, int]:
+        """Return IDs for terms, persisting any that are new."""
+        with self._lock:
+            missing = [term for term in terms if term not in self._ids]
+            if missing:
+                added = self._add(missing)
+                self._ids.update(added)
+                self._terms.update({term_id: term for term, term_id in added.items()})
+            return {term: self._ids[term] for term in terms}
+
+    def term(self, term_id: int) -> str:
+        """Return the term for an ID."""
+        if term_id not in self._terms:
+            self.reload()
+        return self._terms[term_id]
+
+
+class SessionCodec(ABC):
+    """Abstract base class for session payload codecs."""
+
+    name = ''
+
+    @abstractmethod
+    def encode(self, value: Any) -> Encoded:
+        """Encode a data or metadata structure for storage."""
+        pass
+
+    @abstractmethod
+    def decode(self, stored: Encoded) -> Any:
+        """Decode a stored value back into a data or metadata structure."""
+        pass
+
+
+class JSONCodec(SessionCodec):
+    """JSON text codec, compatible with rows written before codecs existed."""
+
+    name = 'json'
+
+    def encode(self, value: Any) -> Encoded:
+        return json.dumps(value)
+
+    def decode(self, stored: Encoded) -> Any:
+        return json.loads(stored)
+
+
+class BinaryCodec(SessionCodec):
+    """Compact binary codec for JSON-compatible structures.
+
+    Each value is a one-byte type tag followed by its payload. Integers and
+    lengths are varints (integers zigzag encoded), and dictionary keys are
+    written as term IDs from the database's TermDictionary instead of
+    repeating step and field names in every row.
+    """
+
+    name = 'binary'
+
+    VERSION = 1
+    NONE, FALSE, TRUE, INT, FLOAT, STR, LIST, DICT = range(8)
+
+    def __init__(self, dictionary: TermDictionary):
+        """Initialize the codec.
+
+        Args:
+            dictionary: Term dictionary shared by all rows in the database
+        """
+        self.dictionary = dictionary
+
+    def encode(self, value: Any) -> Encoded:
+        keys: List[str] = []
+        self._collect_keys(value, keys)
+        ids = self.dictionary.ids_for(list(dict.fromkeys(keys)))
+
+        out = bytearray([self.VERSION])
+        self._write(value, out, ids)
+        return bytes(out)
+
+    def decode(self, stored: Encoded) -> Any:
+        if stored[0] != self.VERSION:
+            raise ValueError(f"Unsupported binary session encoding version {stored[0]}")
+        value, _ = self._read(stored, 1)
+        return value
+
+    def _collect_keys(self, value: Any, keys: List[str]) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if not isinstance(key, str):
+                    raise TypeError(f"Dictionary keys must be strings, not {type(key).__name__}")
+                keys.append(key)
+                self._collect_keys(item, keys)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self._collect_keys(item, keys)
+
+    def _write(self, value: Any, out: bytearray, ids: Dict[str, int]) -> None:
+        if value is None:
+            out.append(self.NONE)
+        elif value is True:
+            out.append(self.TRUE)
+        elif value is False:
+            out.append(self.FALSE)
+        elif isinstance(value, int):
+            out.append(self.INT)
+            self._write_varint(self._zigzag(value), out)
+        elif isinstance(value, float):
+            out.append(self.FLOAT)
+            out += struct.pack('<d', value)
+        elif isinstance(value, str):
+            encoded = value.encode('utf-8')
+            out.append(self.STR)
+            self._write_varint(len(encoded), out)
+            out += encoded
+        elif isinstance(value, (list, tuple)):
+            out.append(self.LIST)
+            self._write_varint(len(value), out)
+            for item in value:
+                self._write(item, out, ids)
+        elif isinstance(value, dict):
+            out.append(self.DICT)
+            self._write_varint(len(value), out)
+            for key, item in value.items():
+                self._write_varint(ids[key], out)
+                self._write(item, out, ids)
+        else:
+            raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+    def _read(self, data: bytes, pos: int):
+        tag = data[pos]
+        pos += 1
+        if tag == self.NONE:
+            return None, pos
+        if tag == self.TRUE:
+            return True, pos
+        if tag == self.FALSE:
+            return False, pos
+        if tag == self.INT:
+            raw, pos = self._read_varint(data, pos)
+            return (raw >> 1) ^ -(raw & 1), pos
+        if tag == self.FLOAT:
+            return struct.unpack_from('<d', data, pos)[0], pos + 8
+        if tag == self.STR:
+            length, pos = self._read_varint(data, pos)
+            return data[pos:pos + length].decode('utf-8'), pos + length
+        if tag == self.LIST:
+            length, pos = self._read_varint(data, pos)
+            items = []
+            for _ in range(length):
+                item, pos = self._read(data, pos)
+                items.append(item)
+            return items, pos
+        if tag == self.DICT:
+            length, pos = self._read_varint(data, pos)
+            result = {}
+            for _ in range(length):
+                term_id, pos = self._read_varint(data, pos)
+                item, pos = self._read(data, pos)
+                result[self.dictionary.term(term_id)] = item
+            return result, pos
+        raise ValueError(f"Unknown binary session encoding tag {tag}")
+
+    @staticmethod
+    def _zigzag(value: int) -> int:
+        return value * 2 if value >= 0 else -value * 2 - 1
+
+    @staticmethod
+    def _write_varint(value: int, out: bytearray) -> None:
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    @staticmethod
+    def _read_varint(data: bytes, pos: int):
+        result = 0
+        shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result, pos
+            shift += 7
+
+
+class CompressedCodec(SessionCodec):
+    """Wraps another codec, zlib-compressing values above a size threshold.
+
+    The stored value starts with a flag byte: 0 for uncompressed, 1 for
+    zlib-compressed.
+    """
+
+    def __init__(self, inner: SessionCodec, threshold: int = 512, level: int = 6):
+        """Initialize the codec.
+
+        Args:
+            inner: Codec producing the uncompressed encoding
+            threshold: Encoded size in bytes above which values are compressed
+            level: zlib compression level
+        """
+        self.inner = inner
+        self.threshold = threshold
+        self.level = level
+        self.name = f"{inner.name}+zlib"
+
+    def encode(self, value: Any) -> Encoded:
+        encoded = self.inner.encode(value)
+        if isinstance(encoded, str):
+            encoded = encoded.encode('utf-8')
+        if len(encoded) > self.threshold:
+            return b'\x01' + zlib.compress(encoded, self.level)
+        return b'\x00' + encoded
+
+    def decode(self, stored: Encoded) -> Any:
+        payload = stored[1:]
+        if stored[0] == 1:
+            payload = zlib.decompress(payload)
+        if isinstance(self.inner, JSONCodec):
+            payload = payload.decode('utf-8')
+        return self.inner.decode(payload)
+
+
+def build_codecs(dictionary: TermDictionary, compress_threshold: int = 512) -> Dict[str, SessionCodec]:
+    """Build every available codec, keyed by the name stored on each row.
+
+    Args:
+        dictionary: Term dictionary of the database the codecs are used with
+        compress_threshold: Size threshold for the zlib variants
+
+    Returns:
+        Dictionary of codec name to codec
+    """
+    json_codec = JSONCodec()
+    binary_codec = BinaryCodec(dictionary)
+    codecs = [
+        json_codec,
+        binary_codec,
+        CompressedCodec(json_codec, compress_threshold),
+        CompressedCodec(binary_codec, compress_threshold),
+    ]
+    return {codec.name: codec for codec in codecs}
@@ -0,0 +1,211 @@
+"""Streaming export of completed workflow sessions."""
+
+import csv
+import json
+import os
+from typing import Dict, List, Optional, Any, Iterator, Tuple, TextIO
+
+from .backend import StateBackend, SessionCursor, session_cursor
+from .session import WorkflowSession
+
+
+# Session attributes written ahead of the flattened step data
+SESSION_COLUMNS = ['session_id', 'workflow_token', 'workflow_name', 'status',
+                   'created_at', 'updated_at']
+
+# Routing fields posted to the router alongside step data
+ROUTING_FIELDS = {'from', 'workflow_token', 'action'}
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+
+def dag_columns(dag, form_fields: Dict[str, List[str]] = None) -> List[str]:
+    """Derive flattened data columns from a DAG.
+
+    Columns follow the order of the DAG's apps. For each app the fields
+    declared by its form are used; apps without known form fields fall back
+    to the fields listed for them in the DAG's data_mapping.
+
+    Args:
+        dag: DAGDefinition of the workflow
+        form_fields: Optional mapping of app name to its form field names
+
+    Returns:
+        List of column names in the form "<app>_<field>"
+    """
+    form_fields = form_fields or {}
+    columns = []
+
+    for app in dag.apps:
+        fields = list(form_fields.get(app.name, []))
+        if not fields:
+            for mapping in dag.data_mapping:
+                mapped = mapping.get('fields', [])
+                if mapping.get('from') == app.name and isinstance(mapped, list):
+                    fields.extend(f for f in mapped if f != '*' and f not in fields)
+
+        for field_name in fields:
+            column = f"{app.name}_{field_name}"
+            if column not in columns:
+                columns.append(column)
+
+    return columns
+
+
+def read_watermark(path: str) -> Optional[SessionCursor]:
+    """Read an export watermark file.
+
+    Args:
+        path: Path to the watermark file
+
+    Returns:
+        Cursor of the last exported session, or None if no file exists
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return (data['updated_at'], data['session_id'])
+
+
+def write_watermark(path: str, cursor: SessionCursor) -> None:
+    """Atomically write an export watermark file.
+
+    Args:
+        path: Path to the watermark file
+        cursor: Cursor of the last exported session
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'updated_at': cursor[0], 'session_id': cursor[1]}, f)
+    os.replace(tmp_path, path)
+
+
+class SessionExporter:
+    """Streams completed sessions from a state backend as NDJSON or CSV.
+
+    Sessions are read oldest first through StateBackend.iter_sessions, one
+    page at a time, so memory use does not grow with the number of rows.
+    Each export returns a watermark that can be passed back as ``after`` to
+    only read sessions completed since the previous run.
+    """
+
+    def __init__(self, backend: StateBackend, workflow_name: str = None,
+                 columns: List[str] = None, page_size: int = 500):
+        """Initialize the exporter.
+
+        Args:
+            backend: State backend to read sessions from
+            workflow_name: Optional filter by workflow name
+            columns: Flattened data columns for CSV output (see dag_columns)
+            page_size: Number of sessions fetched per page
+        """
+        self.backend = backend
+        self.workflow_name = workflow_name
+        self.columns = columns or []
+        self.page_size = page_size
+
+    def iter_completed(self, after: Optional[SessionCursor] = None) -> Iterator[WorkflowSession]:
+        """Iterate over completed sessions, oldest first.
+
+        Args:
+            after: Optional watermark from a previous export
+
+        Yields:
+            Completed WorkflowSession objects
+        """
+        return self.backend.iter_sessions(
+            workflow_name=self.workflow_name,
+            status='completed',
+            page_size=self.page_size,
+            after=after,
+            ascending=True
+        )
+
+    def export(self, out: TextIO, fmt: str = 'ndjson',
+               after: Optional[SessionCursor] = None) -> Tuple[int, Optional[SessionCursor]]:
+        """Export completed sessions to a text stream.
+
+        Args:
+            out: Writable text stream
+            fmt: Output format, 'ndjson' or 'csv'
+            after: Optional watermark from a previous export
+
+        Returns:
+            Tuple of (number of sessions exported, new watermark). The
+            watermark is the input watermark if nothing was exported.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}', expected one of {EXPORT_FORMATS}")
+
+        count = 0
+        watermark = after
+
+        writer = None
+        if fmt == 'csv':
+            writer = csv.DictWriter(out, fieldnames=SESSION_COLUMNS + self.columns,
+                                    extrasaction='ignore')
+            writer.writeheader()
+
+        for session in self.iter_completed(after):
+            if writer:
+                writer.writerow(self.flatten_session(session))
+            else:
+                out.write(json.dumps(self.session_record(session), ensure_ascii=False) + '\n')
+            count += 1
+            watermark = session_cursor(session)
+
+        return count, watermark
+
+    def session_record(self, session: WorkflowSession) -> Dict[str, Any]:
+        """Build the nested NDJSON record for a session.
+
+        Args:
+            session: Completed workflow session
+
+        Returns:
+            Dictionary with session attributes and per-step data
+        """
+        record = {
+            'session_id': session.session_id,
+            'workflow_token': session.workflow_token,
+            'workflow_name': session.workflow_name,
+            'status': session.status,
+            'created_at': session.created_at.isoformat(),
+            'updated_at': session.updated_at.isoformat(),
+            'completed_at': session.metadata.get('completed_at'),
+            'data': {}
+        }
+        for step_name, step_data in session.data.items():
+            record['data'][step_name] = {
+                key: value for key, value in step_data.items()
+                if key not in ROUTING_FIELDS
+            }
+        return record
+
+    def flatten_session(self, session: WorkflowSession) -> Dict[str, Any]:
+        """Build the flat CSV row for a session.
+
+        Args:
+            session: Completed workflow session
+
+        Returns:
+            Dictionary keyed by SESSION_COLUMNS and "<app>_<field>" columns
+        """
+        row = {
+            'session_id': session.session_id,
+            'workflow_token': session.workflow_token,
+            'workflow_name': session.workflow_name,
+            'status': session.status,
+            'created_at': session.created_at.isoformat(),
+            'updated_at': session.updated_at.isoformat()
+        }
+        for step_name, step_data in session.data.items():
+            for key, value in step_data.items():
+                if key in ROUTING_FIELDS:
+                    continue
+                if isinstance(value, list):
+                    value = ', '.join(str(v) for v in value)
+                row[f"{step_name}_{key}"] = value
+        return row
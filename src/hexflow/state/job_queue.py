@@ -0,0 +1,375 @@
+"""Durable job queue for processor steps, stored next to the sessions in SQLite."""
+
+import json
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .backend import SessionConflictError
+from .session import WorkflowSession
+from .sqlite_backend import SQLiteBackend
+
+# Job statuses
+JOB_QUEUED = 'queued'
+JOB_LEASED = 'leased'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# (app name, payload, priority, deadline or None) of a job to enqueue
+JobSpec = Tuple[str, Dict[str, Any], int, Optional[float]]
+
+# Session change applied when a job completes, as for StateBackend.update_session
+SessionUpdate = Callable[[WorkflowSession], None]
+
+# Chooses the jobs, if any, a completed session needs next
+FollowUp = Callable[[WorkflowSession], Sequence[JobSpec]]
+
+
+@dataclass
+class Job:
+    """A claimed job."""
+    job_id: int
+    workflow_token: str
+    app_name: str
+    payload: Dict[str, Any]
+    priority: int
+    attempts: int
+    lease_owner: str
+    lease_expires: float
+    # Unix time by which the job must finish, if it has a deadline
+    deadline: Optional[float] = None
+
+
+class SQLiteJobQueue:
+    """Job queue in the ``workflow_jobs`` table of a SQLiteBackend database.
+
+    Jobs survive restarts without an external broker. Workers claim jobs in
+    batches, highest priority first, and hold a lease on each claimed job
+    that they extend with heartbeat(); a job whose lease expires (its
+    worker died or hung) is handed to the next claim. A session has at most
+    one queued or leased job per app, so enqueueing the same step twice is
+    a no-op.
+
+    complete_many() settles jobs and saves their session changes in one
+    transaction, so a step's result is never recorded without its job
+    being marked done or the other way round. Session saves keep the
+    backend's compare-and-swap: a session changed by another writer
+    meanwhile is reloaded and the change applied again.
+    """
+
+    def __init__(self, state_backend: SQLiteBackend, lease_seconds: float = 30):
+        """Initialize the queue.
+
+        Args:
+            state_backend: Backend whose database holds the sessions and jobs
+            lease_seconds: Default lease length of claimed jobs
+        """
+        self.state_backend = state_backend
+        self.db_path = state_backend.db_path
+        self.lease_seconds = lease_seconds
+
+    @staticmethod
+    def new_worker_id() -> str:
+        """Return a unique ID for a worker claiming jobs."""
+        return uuid.uuid4().hex
+
+    def enqueue(self, workflow_token: str, app_name: str, payload: Dict[str, Any],
+                priority: int = 0, delay: float = 0, deadline: Optional[float] = None) -> Optional[int]:
+        """Add a job for a session's step.
+
+        Args:
+            workflow_token: Token of the session the job belongs to
+            app_name: Processor app that runs the job
+            payload: JSON-serialisable input of the job
+            priority: Higher priorities are claimed first
+            delay: Seconds before the job can be claimed
+            deadline: Optional Unix time by which the job must finish
+
+        Returns:
+            ID of the new job, or None if the step already has an active job
+        """
+        with self._connect() as conn:
+            job_id = self._insert_job(conn, workflow_token, (app_name, payload, priority, deadline), delay)
+            conn.commit()
+            return job_id
+
+    def enqueue_many(self, jobs: Sequence[Tuple[str, JobSpec]]) -> List[Optional[int]]:
+        """Add jobs in one transaction.
+
+        Args:
+            jobs: (workflow token, (app name, payload, priority, deadline)) per job
+
+        Returns:
+            For each job, its ID, or None if the step already has an active job
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            job_ids = [self._insert_job(conn, workflow_token, job) for workflow_token, job in jobs]
+            conn.commit()
+            return job_ids
+
+    def claim(self, app_name: str, worker_id: str, limit: int = 100,
+              lease_seconds: Optional[float] = None) -> List[Job]:
+        """Lease up to ``limit`` jobs for an app, highest priority first.
+
+        Expired leases are returned to the queue first, so their jobs are
+        claimed again.
+
+        Args:
+            app_name: Processor app the jobs are for
+            worker_id: ID of the claiming worker (see new_worker_id)
+            limit: Maximum number of jobs to claim
+            lease_seconds: Lease length. Defaults to the queue's lease_seconds
+
+        Returns:
+            Claimed jobs, with their attempts counting this claim
+        """
+        now = time.time()
+        lease_expires = now + (lease_seconds or self.lease_seconds)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._requeue_expired(conn, now)
+            rows = conn.execute(
+                "SELECT job_id, workflow_token, app_name, payload, priority, attempts, deadline FROM workflow_jobs "
+                "WHERE app_name = ? AND status = ? AND available_at <= ? "
+                "ORDER BY priority DESC, job_id LIMIT ?",
+                (app_name, JOB_QUEUED, now, limit)
+            ).fetchall()
+            if rows:
+                placeholders = ', '.join('?' for _ in rows)
+                conn.execute(
+                    f"UPDATE workflow_jobs SET status = ?, lease_owner = ?, lease_expires = ?, "
+                    f"attempts = attempts + 1, updated_at = ? WHERE job_id IN ({placeholders})",
+                    [JOB_LEASED, worker_id, lease_expires, now] + [row[0] for row in rows]
+                )
+            conn.commit()
+
+        return [Job(job_id=row[0], workflow_token=row[1], app_name=row[2], payload=json.loads(row[3]),
+                    priority=row[4], attempts=row[5] + 1, lease_owner=worker_id,
+                    lease_expires=lease_expires, deadline=row[6])
+                for row in rows]
+
+    def heartbeat(self, job_ids: Sequence[int], worker_id: str,
+                  lease_seconds: Optional[float] = None) -> int:
+        """Extend the leases a worker holds on running jobs.
+
+        Returns:
+            Number of leases extended; leases that already expired are lost
+            and not extended
+        """
+        if not job_ids:
+            return 0
+        now = time.time()
+        placeholders = ', '.join('?' for _ in job_ids)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE workflow_jobs SET lease_expires = ?, updated_at = ? "
+                f"WHERE status = ? AND lease_owner = ? AND lease_expires >= ? AND job_id IN ({placeholders})",
+                [now + (lease_seconds or self.lease_seconds), now, JOB_LEASED, worker_id, now] + list(job_ids)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def release(self, job: Job, delay: float = 0) -> bool:
+        """Return a leased job to the queue without completing it.
+
+        Args:
+            job: Job claimed by this worker
+            delay: Seconds before the job can be claimed again
+
+        Returns:
+            False if the worker no longer held the lease
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE workflow_jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, "
+                "available_at = ?, updated_at = ? WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                (JOB_QUEUED, now + delay, now, job.job_id, JOB_LEASED, job.lease_owner)
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def requeue_expired(self) -> int:
+        """Return jobs with expired leases to the queue.
+
+        claim() does this itself; call it to requeue without claiming.
+
+        Returns:
+            Number of jobs requeued
+        """
+        with self._connect() as conn:
+            requeued = self._requeue_expired(conn, time.time())
+            conn.commit()
+            return requeued
+
+    def complete(self, job: Job, update: SessionUpdate, error: Optional[str] = None,
+                 follow_up: Optional[FollowUp] = None) -> Optional[WorkflowSession]:
+        """Settle one job and save its session change (see complete_many)."""
+        return self.complete_many([(job, update, error)], follow_up)[0]
+
+    def complete_many(self, completions: Sequence[Tuple[Job, SessionUpdate, Optional[str]]],
+                      follow_up: Optional[FollowUp] = None) -> List[Optional[WorkflowSession]]:
+        """Settle jobs and save their sessions' changes in one transaction.
+
+        Each job is marked done, or failed if it has an error, and its
+        session change is saved with it; a job and its session change are
+        written together or not at all. The changes of jobs for the same
+        session, such as parallel branches, are applied in order to one
+        copy of it and saved together. Jobs whose lease was lost are
+        skipped, as the job now belongs to another worker. A session that
+        no longer exists, or whose update raises SessionConflictError,
+        settles the job without changing the session.
+
+        Args:
+            completions: (job, session update, error message or None)
+            follow_up: Called with each saved session; the jobs it returns
+                are enqueued in the same transaction, e.g. for the next
+                processor. Jobs for steps that already have one are skipped
+
+        Returns:
+            For each completion, the saved session, or None if the session
+            was not changed
+        """
+        results: List[Optional[WorkflowSession]] = [None] * len(completions)
+        # Completions by session, in order: jobs of one session, such as
+        # parallel branches, change the same loaded session and save it once
+        pending: Dict[str, List[int]] = {}
+        for index, (job, _, _) in enumerate(completions):
+            pending.setdefault(job.workflow_token, []).append(index)
+
+        for _ in range(self.state_backend.UPDATE_ATTEMPTS):
+            if not pending:
+                break
+            # Load and change the sessions, and encode them, before taking the
+            # write lock: binary codecs may write new terms on their own connection
+            sessions = self._load_sessions(pending)
+            prepared = []
+            for workflow_token, indices in pending.items():
+                session = sessions.get(workflow_token)
+                notes, changed = {}, []
+                for index in indices:
+                    _, update, error = completions[index]
+                    notes[index] = error
+                    if session is not None:
+                        try:
+                            update(session)
+                            changed.append(index)
+                        except SessionConflictError as e:
+                            notes[index] = error or f"Stale result: {e}"
+                params, next_jobs = None, ()
+                if changed:
+                    session.updated_at = datetime.now()
+                    params = self.state_backend._session_params(session)
+                    next_jobs = follow_up(session) if follow_up else ()
+                prepared.append((workflow_token, indices, notes, changed, session, params, next_jobs))
+
+            conflicted: Dict[str, List[int]] = {}
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for workflow_token, indices, notes, changed, session, params, next_jobs in prepared:
+                    conn.execute("SAVEPOINT session_jobs")
+                    lost = set()
+                    for index in indices:
+                        job, _, error = completions[index]
+                        if conn.execute(
+                            "UPDATE workflow_jobs SET status = ?, error = ?, lease_owner = NULL, "
+                            "lease_expires = NULL, updated_at = ? "
+                            "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                            (JOB_FAILED if error else JOB_DONE, notes[index], now,
+                             job.job_id, JOB_LEASED, job.lease_owner)
+                        ).rowcount != 1:
+                            lost.add(index)
+                    if lost.intersection(changed):
+                        # The session holds the change of a job another worker
+                        # now owns: redo the other jobs without it
+                        conn.execute("ROLLBACK TO session_jobs")
+                        conn.execute("RELEASE session_jobs")
+                        retry = [index for index in indices if index not in lost]
+                        if retry:
+                            conflicted[workflow_token] = retry
+                        continue
+                    if params is not None:
+                        if conn.execute(SQLiteBackend.UPSERT_SQL, params).rowcount == 0:
+                            # Saved by another writer since it was loaded: retry
+                            conn.execute("ROLLBACK TO session_jobs")
+                            conn.execute("RELEASE session_jobs")
+                            conflicted[workflow_token] = indices
+                            continue
+                        for next_job in next_jobs:
+                            self._insert_job(conn, workflow_token, next_job)
+                        session.version += 1
+                        for index in changed:
+                            results[index] = session
+                    conn.execute("RELEASE session_jobs")
+                conn.commit()
+            pending = conflicted
+
+        # Jobs still conflicting stay leased; their lease expires and they run again
+        return results
+
+    def counts(self, app_name: Optional[str] = None) -> Dict[str, int]:
+        """Count jobs by status, optionally for one app."""
+        query = "SELECT status, COUNT(*) FROM workflow_jobs"
+        params: List[Any] = []
+        if app_name is not None:
+            query += " WHERE app_name = ?"
+            params.append(app_name)
+        with self._connect() as conn:
+            return dict(conn.execute(query + " GROUP BY status", params).fetchall())
+
+    def purge(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """Delete done and failed jobs last changed before a cutoff.
+
+        Returns:
+            Number of jobs deleted
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM workflow_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (JOB_DONE, JOB_FAILED, time.time() - older_than_seconds)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection that leaves transactions to the caller."""
+        return sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+
+    def _insert_job(self, conn: sqlite3.Connection, workflow_token: str, job: JobSpec,
+                    delay: float = 0) -> Optional[int]:
+        """Insert a queued job unless the step already has an active one."""
+        app_name, payload, priority, deadline = job
+        now = time.time()
+        cursor = conn.execute(
+            "INSERT INTO workflow_jobs (workflow_token, app_name, payload, priority, status, "
+            "available_at, deadline, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT DO NOTHING",
+            (workflow_token, app_name, json.dumps(payload), priority, JOB_QUEUED, now + delay,
+             deadline, now, now)
+        )
+        return cursor.lastrowid if cursor.rowcount == 1 else None
+
+    @staticmethod
+    def _requeue_expired(conn: sqlite3.Connection, now: float) -> int:
+        """Return jobs with expired leases to the queue."""
+        return conn.execute(
+            "UPDATE workflow_jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = ? AND lease_expires < ?",
+            (JOB_QUEUED, now, JOB_LEASED, now)
+        ).rowcount
+
+    def _load_sessions(self, workflow_tokens) -> Dict[str, WorkflowSession]:
+        """Load sessions by workflow token in one query."""
+        tokens = list(workflow_tokens)
+        placeholders = ', '.join('?' for _ in tokens)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"SELECT * FROM workflow_sessions WHERE workflow_token IN ({placeholders})", tokens
+            ).fetchall()
+        return {row['workflow_token']: self.state_backend._row_to_session(row) for row in rows}
@@ -0,0 +1,60 @@
+"""Loading of the configured state backend for a workflow directory."""
+
+import logging
+import os
+import sys
+
+from .backend import StateBackend
+from .sqlite_backend import SQLiteBackend
+from ..logs import get_logger, log_event
+
+logger = get_logger('state')
+
+
+def load_state_backend(directory: str) -> StateBackend:
+    """Load state backend from workflow settings or use default.
+    
+    Reads STATE_BACKEND_CLASS and STATE_BACKEND_CONFIG from settings.py in
+    the workflow directory, and TOKEN_ALLOCATOR to customise the format of
+    workflow tokens. Falls back to a SQLiteBackend stored in
+    workflow_sessions.db alongside the DAG file.
+    
+    Args:
+        directory: Workflow directory containing the DAG and settings.py
+        
+    Returns:
+        Configured StateBackend instance
+    """
+    settings_path = os.path.join(directory, 'settings.py')
+    
+    if os.path.exists(settings_path):
+        try:
+            # Add directory to path temporarily
+            if directory not in sys.path:
+                sys.path.insert(0, directory)
+                
+            import settings
+            
+            # Get backend class and config from settings
+            backend_class = getattr(settings, 'STATE_BACKEND_CLASS', SQLiteBackend)
+            backend_config = getattr(settings, 'STATE_BACKEND_CONFIG', {})
+            
+            log_event(logger, logging.INFO, 'state_backend_loading', backend=backend_class.__name__)
+            backend = backend_class(**backend_config)
+            
+            token_allocator = getattr(settings, 'TOKEN_ALLOCATOR', None)
+            if token_allocator is not None:
+                backend.token_allocator = token_allocator
+            return backend
+            
+        except Exception as e:
+            log_event(logger, logging.WARNING, 'settings_load_failed', path=settings_path, error=str(e),
+                      fallback='SQLiteBackend')
+        finally:
+            # Clean up path
+            if directory in sys.path:
+                sys.path.remove(directory)
+    
+    # Default fallback
+    db_path = os.path.join(directory, 'workflow_sessions.db')
+    return SQLiteBackend(db_path)
@@ -0,0 +1,525 @@
+"""Append-only log-structured implementation of state backend."""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Any, Iterator, Set, Tuple
+from pathlib import Path
+
+from .backend import StateBackend, SessionCursor
+from .session import WorkflowSession
+from ..logs import get_logger, log_event
+
+logger = get_logger('state')
+
+
+class LogStructuredBackend(StateBackend):
+    """State backend keeping sessions in memory with an append-only log.
+
+    Every session is held in an in-memory hash index keyed by session ID,
+    with a second index from workflow token to session ID. Each change is
+    appended to a log segment as one JSON line and made durable by a group
+    commit: a background writer flushes and fsyncs everything queued since
+    its last flush in one go, and save_session returns once its record is
+    on disk. The writer applies each record to the index only once it is
+    durable, so readers never see a change that could still be lost. A
+    session being written is reserved until then; other writes to it wait.
+    A failed write is cut from the log, its writers get an error and the
+    writer carries on with the next records.
+
+    After snapshot_every records the writer rotates to a new segment and a
+    background thread writes a snapshot of the index, then deletes the
+    segments and snapshots it supersedes. On startup the latest complete
+    snapshot is loaded and only the segments written after it are replayed.
+    Log records carry the full session state, so replaying a record that is
+    already reflected in the snapshot is harmless.
+    """
+
+    SUMMARY_FIELDS = ('session_id', 'workflow_name', 'workflow_token', 'current_step',
+                      'status', 'created_at', 'updated_at', 'version')
+
+    def __init__(self, log_dir: str = None, snapshot_every: int = 10000, fsync: bool = True):
+        """Initialize the log-structured backend.
+
+        Args:
+            log_dir: Directory for log segments and snapshots. Defaults to
+                'workflow_sessions.log' in the current directory
+            snapshot_every: Number of log records after which a snapshot is taken
+            fsync: Whether to fsync each group commit
+        """
+        if log_dir is None:
+            log_dir = os.path.join(os.getcwd(), 'workflow_sessions.log')
+
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+
+        # Summary fields per session for filtering and ordering, plus the
+        # encoded session. Entries are replaced, never mutated in place, so a
+        # shallow copy of _blobs is a consistent snapshot.
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._blobs: Dict[str, str] = {}
+        self._tokens: Dict[str, str] = {}
+
+        self._cond = threading.Condition()
+        # Queued records: (line, index change once durable, reserved session ID and token)
+        self._pending: List[Tuple[str, Callable[[], None], str, Optional[str]]] = []
+        self._writing_ids: Set[str] = set()
+        self._writing_tokens: Set[str] = set()
+        self._queued_seq = 0
+        self._settled_seq = 0
+        self._failed: Dict[int, Exception] = {}
+        self._records_in_segment = 0
+        self._write_error: Optional[Exception] = None
+        self._closed = False
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_threads: List[threading.Thread] = []
+
+        self._segment = self._recover()
+        self._log = open(self._segment_path(self._segment), 'a', encoding='utf-8')
+
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    def create_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
+        """Create a new workflow session."""
+        return self._create_session(workflow_name, workflow_token)
+
+    def get_session(self, session_id: str) -> Optional[WorkflowSession]:
+        """Get a session by its session ID."""
+        with self._cond:
+            blob = self._blobs.get(session_id)
+        return WorkflowSession.from_dict(json.loads(blob)) if blob else None
+
+    def get_session_by_token(self, workflow_token: str) -> Optional[WorkflowSession]:
+        """Get a session by its workflow token."""
+        with self._cond:
+            session_id = self._tokens.get(workflow_token)
+        return self.get_session(session_id) if session_id else None
+
+    def save_session(self, session: WorkflowSession) -> bool:
+        """Save/update a session."""
+        try:
+            return self._put(session, insert=False)
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'session_save_failed', error=str(e))
+            return False
+
+    def insert_session(self, session: WorkflowSession) -> bool:
+        """Insert a new session, returning False if its ID or token is taken."""
+        return self._put(session, insert=True)
+
+    def insert_sessions(self, sessions: List[WorkflowSession]) -> List[bool]:
+        """Insert a batch of new sessions, waiting once for the whole batch to be durable."""
+        now = datetime.now()
+        prepared = []
+        for session in sessions:
+            session.updated_at = now
+            stored = session.to_dict()
+            stored['version'] = session.version + 1
+            prepared.append((stored, json.dumps(stored)))
+
+        seqs: List[Optional[int]] = []
+        errors = []
+        with self._cond:
+            for session, (stored, blob) in zip(sessions, prepared):
+                self._wait_unreserved(session.session_id, session.workflow_token)
+                if session.workflow_token in self._tokens or session.session_id in self._sessions:
+                    seqs.append(None)
+                    continue
+                seqs.append(self._queue('{"op": "put", "session": ' + blob + '}',
+                                        lambda stored=stored, blob=blob: self._apply_put(stored, blob),
+                                        session.session_id, session.workflow_token))
+            queued = [seq for seq in seqs if seq is not None]
+            if queued:
+                self._wait_settled(queued[-1])
+            for index, seq in enumerate(seqs):
+                error = self._failed.pop(seq, None) if seq is not None else None
+                if error is not None:
+                    errors.append(error)
+                    seqs[index] = None
+
+        results = [seq is not None for seq in seqs]
+        for session, inserted in zip(sessions, results):
+            if inserted:
+                session.version += 1
+        if errors:
+            raise RuntimeError(f"Log write failed: {errors[0]}")
+        return results
+
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a session."""
+        try:
+            with self._cond:
+                self._wait_unreserved(session_id)
+                if session_id not in self._sessions:
+                    return False
+                seq = self._queue(json.dumps({'op': 'delete', 'session_id': session_id}),
+                                  lambda: self._apply_delete(session_id), session_id)
+                self._wait_written(seq)
+            return True
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'session_delete_failed', error=str(e))
+            return False
+
+    def list_sessions(self, workflow_name: str = None, status: str = None) -> List[WorkflowSession]:
+        """List sessions with optional filters."""
+        return list(self.iter_sessions(workflow_name, status))
+
+    def iter_sessions(self, workflow_name: str = None, status: str = None,
+                      include_data: bool = True, page_size: int = 500,
+                      after: Optional[SessionCursor] = None,
+                      ascending: bool = False) -> Iterator[WorkflowSession]:
+        """Iterate over sessions ordered by (updated_at, session_id).
+
+        Matching entries are selected from the index under the lock; each
+        session is only decoded as it is yielded.
+        """
+        with self._cond:
+            matches = [
+                (stored, self._blobs[session_id]) for session_id, stored in self._sessions.items()
+                if (not workflow_name or stored['workflow_name'] == workflow_name)
+                and (not status or stored['status'] == status)
+            ]
+
+        def cursor(match):
+            return (match[0]['updated_at'], match[0]['session_id'])
+
+        matches.sort(key=cursor, reverse=not ascending)
+        for match in matches:
+            if after is not None and (cursor(match) <= after if ascending else cursor(match) >= after):
+                continue
+            stored, blob = match
+            if include_data:
+                yield WorkflowSession.from_dict(json.loads(blob))
+            else:
+                yield WorkflowSession.from_dict(dict(stored, data={}, metadata={}))
+
+    def count_sessions(self, workflow_name: str = None, status: str = None) -> int:
+        """Count sessions with optional filters."""
+        with self._cond:
+            return sum(
+                1 for stored in self._sessions.values()
+                if (not workflow_name or stored['workflow_name'] == workflow_name)
+                and (not status or stored['status'] == status)
+            )
+
+    def cleanup_expired_sessions(self, max_age_days: int = 30) -> int:
+        """Clean up old sessions."""
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+
+        try:
+            with self._cond:
+                # Sessions being written are left for the next cleanup
+                seqs = [
+                    self._queue(json.dumps({'op': 'delete', 'session_id': session_id}),
+                                lambda session_id=session_id: self._apply_delete(session_id), session_id)
+                    for session_id, stored in list(self._sessions.items())
+                    if stored['created_at'] < cutoff and session_id not in self._writing_ids
+                ]
+                if not seqs:
+                    return 0
+                self._wait_settled(seqs[-1])
+                errors = [error for error in (self._failed.pop(seq, None) for seq in seqs) if error]
+                if errors:
+                    log_event(logger, logging.ERROR, 'session_cleanup_failed', error=str(errors[0]))
+                return len(seqs) - len(errors)
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'session_cleanup_failed', error=str(e))
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics from the in-memory index."""
+        status_counts: Dict[str, int] = {}
+        workflow_counts: Dict[str, int] = {}
+        with self._cond:
+            for stored in self._sessions.values():
+                status_counts[stored['status']] = status_counts.get(stored['status'], 0) + 1
+                workflow_counts[stored['workflow_name']] = workflow_counts.get(stored['workflow_name'], 0) + 1
+            total = len(self._sessions)
+
+        return {
+            'total_sessions': total,
+            'status_counts': status_counts,
+            'workflow_counts': workflow_counts,
+            'log_directory': str(self.log_dir)
+        }
+
+    def close(self) -> None:
+        """Flush outstanding records and stop the background writer."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._log.close()
+
+        # Snapshot threads may still be deleting superseded segments
+        for thread in self._snapshot_threads:
+            thread.join()
+
+    def _put(self, session: WorkflowSession, insert: bool) -> bool:
+        """Log a put record and apply it once it is durable.
+
+        Returns False if inserting and the session ID or token is taken, or
+        if the stored version is not the one the session was loaded with.
+        Raises ValueError if the token belongs to another session.
+        """
+        # The session only takes the new timestamp once it is saved
+        updated_at = datetime.now()
+        stored = session.to_dict()
+        stored['updated_at'] = updated_at.isoformat()
+        stored['version'] = session.version + 1
+        blob = json.dumps(stored)
+        record = '{"op": "put", "session": ' + blob + '}'
+
+        with self._cond:
+            self._wait_unreserved(session.session_id, session.workflow_token)
+            owner = self._tokens.get(session.workflow_token)
+            current = self._sessions.get(session.session_id)
+            if insert and (owner is not None or current is not None):
+                return False
+            if current is not None and current['version'] != session.version:
+                # Another writer saved the session first
+                return False
+            if owner is not None and owner != session.session_id:
+                raise ValueError(f"Workflow token already in use: {session.workflow_token}")
+
+            seq = self._queue(record, lambda: self._apply_put(stored, blob),
+                              session.session_id, session.workflow_token)
+            self._wait_written(seq)
+        session.updated_at = updated_at
+        session.version += 1
+        return True
+
+    def _apply_put(self, stored: Dict[str, Any], blob: str) -> None:
+        """Apply a put record to the in-memory indexes."""
+        # Records written before versioning count as version 0
+        stored.setdefault('version', 0)
+        previous = self._sessions.get(stored['session_id'])
+        if previous and previous['workflow_token'] != stored['workflow_token']:
+            self._tokens.pop(previous['workflow_token'], None)
+        self._sessions[stored['session_id']] = {key: stored[key] for key in self.SUMMARY_FIELDS}
+        self._blobs[stored['session_id']] = blob
+        self._tokens[stored['workflow_token']] = stored['session_id']
+
+    def _apply_delete(self, session_id: str) -> None:
+        """Apply a delete record to the in-memory indexes."""
+        previous = self._sessions.pop(session_id, None)
+        self._blobs.pop(session_id, None)
+        if previous:
+            self._tokens.pop(previous['workflow_token'], None)
+
+    def _queue(self, record: str, apply: Callable[[], None], session_id: str,
+               workflow_token: Optional[str] = None) -> int:
+        """Queue a log record for the writer, reserving its session. Caller must hold the lock.
+
+        Args:
+            record: JSON log record
+            apply: Change to the index, made by the writer once the record is durable
+            session_id: ID of the session written
+            workflow_token: Token the record gives the session, if any
+        """
+        if self._closed:
+            raise RuntimeError("Backend is closed")
+        if self._write_error is not None:
+            raise RuntimeError(f"Log write failed: {self._write_error}")
+        self._pending.append((record + '\n', apply, session_id, workflow_token))
+        self._writing_ids.add(session_id)
+        if workflow_token is not None:
+            self._writing_tokens.add(workflow_token)
+        self._queued_seq += 1
+        self._cond.notify_all()
+        return self._queued_seq
+
+    def _wait_unreserved(self, session_id: str, workflow_token: Optional[str] = None) -> None:
+        """Block until no queued record writes the session or token. Caller must hold the lock."""
+        while session_id in self._writing_ids or workflow_token in self._writing_tokens:
+            self._cond.wait()
+
+    def _wait_settled(self, seq: int) -> None:
+        """Block until record seq is durable or has failed. Caller must hold the lock."""
+        while self._settled_seq < seq:
+            self._cond.wait()
+
+    def _wait_written(self, seq: int) -> None:
+        """Block until record seq is durable. Caller must hold the lock.
+
+        Raises:
+            RuntimeError: If the record could not be written
+        """
+        self._wait_settled(seq)
+        error = self._failed.pop(seq, None)
+        if error is not None:
+            raise RuntimeError(f"Log write failed: {error}")
+
+    def _writer_loop(self) -> None:
+        """Group-commit queued records and rotate segments for snapshots."""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                batch = self._pending
+                self._pending = []
+                seq = self._queued_seq
+
+            size = os.fstat(self._log.fileno()).st_size
+            try:
+                self._log.write(''.join(line for line, _, _, _ in batch))
+                self._log.flush()
+                if self.fsync:
+                    os.fsync(self._log.fileno())
+            except Exception as e:
+                log_event(logger, logging.ERROR, 'log_write_failed', records=len(batch), error=str(e))
+                recovered = self._truncate_log(size)
+                with self._cond:
+                    for offset, (_, _, session_id, workflow_token) in enumerate(batch):
+                        self._failed[seq - len(batch) + 1 + offset] = e
+                        self._release(session_id, workflow_token)
+                    self._settled_seq = seq
+                    if not recovered:
+                        # The log can no longer be trusted: fail everything from now on
+                        self._write_error = e
+                        for offset, (_, _, session_id, workflow_token) in enumerate(self._pending):
+                            self._failed[seq + 1 + offset] = e
+                            self._release(session_id, workflow_token)
+                        self._pending = []
+                        self._settled_seq = self._queued_seq
+                    self._cond.notify_all()
+                if recovered:
+                    continue
+                return
+
+            with self._cond:
+                for _, apply, session_id, workflow_token in batch:
+                    apply()
+                    self._release(session_id, workflow_token)
+                self._settled_seq = seq
+                self._records_in_segment += len(batch)
+                self._cond.notify_all()
+
+                if self._records_in_segment >= self.snapshot_every:
+                    # Everything in the closed segment is reflected in the
+                    # index copy; later records go to the new segment
+                    state = dict(self._blobs)
+                    self._log.close()
+                    self._segment += 1
+                    self._log = open(self._segment_path(self._segment), 'a', encoding='utf-8')
+                    self._records_in_segment = 0
+                    thread = threading.Thread(target=self._write_snapshot,
+                                              args=(self._segment, state), daemon=True)
+                    self._snapshot_threads = [t for t in self._snapshot_threads if t.is_alive()]
+                    self._snapshot_threads.append(thread)
+                    thread.start()
+
+    def _release(self, session_id: str, workflow_token: Optional[str]) -> None:
+        """Release the reservation of a settled record. Caller must hold the lock."""
+        self._writing_ids.discard(session_id)
+        if workflow_token is not None:
+            self._writing_tokens.discard(workflow_token)
+
+    def _truncate_log(self, size: int) -> bool:
+        """Cut a failed batch from the current segment and reopen it.
+
+        Returns:
+            False if the segment could not be restored to its size before the batch
+        """
+        try:
+            self._log.close()
+        except Exception:
+            pass
+        path = self._segment_path(self._segment)
+        try:
+            os.truncate(path, size)
+            self._log = open(path, 'a', encoding='utf-8')
+            return True
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'log_truncate_failed', path=str(path), error=str(e))
+            return False
+
+    def _write_snapshot(self, segment: int, state: Dict[str, str]) -> None:
+        """Write a snapshot covering all segments before segment, then compact."""
+        path = self._snapshot_path(segment)
+        tmp_path = path.with_suffix('.tmp')
+        with self._snapshot_lock:
+            # Snapshot threads can run out of order; never replace a newer one
+            if segment <= self._snapshot_segment:
+                return
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write('[' + ','.join(state.values()) + ']')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+                self._snapshot_segment = segment
+            except Exception as e:
+                log_event(logger, logging.ERROR, 'snapshot_failed', error=str(e))
+                return
+
+            # Older segments and snapshots are now redundant
+            for old_path in self.log_dir.iterdir():
+                number = self._file_number(old_path)
+                if number is not None and number < segment:
+                    old_path.unlink(missing_ok=True)
+
+    def _recover(self) -> int:
+        """Load the latest snapshot and replay later segments.
+
+        Returns:
+            Number of the segment to append to
+        """
+        snapshots = sorted(n for p in self.log_dir.glob('snapshot.*.json')
+                           if (n := self._file_number(p)) is not None)
+        base = snapshots[-1] if snapshots else 0
+        self._snapshot_segment = base
+
+        if snapshots:
+            with open(self._snapshot_path(base), 'r', encoding='utf-8') as f:
+                for stored in json.load(f):
+                    self._apply_put(stored, json.dumps(stored))
+
+        segments = sorted(n for p in self.log_dir.glob('segment.*.log')
+                          if (n := self._file_number(p)) is not None and n >= base)
+        for segment in segments:
+            self._replay_segment(self._segment_path(segment))
+
+        return segments[-1] if segments else base
+
+    def _replay_segment(self, path: Path) -> None:
+        """Replay one log segment, truncating a torn final record."""
+        with open(path, 'rb+') as f:
+            offset = 0
+            for line in iter(f.readline, b''):
+                try:
+                    record = json.loads(line) if line.endswith(b'\n') else None
+                except ValueError:
+                    record = None
+                if record is None:
+                    f.truncate(offset)
+                    return
+                offset += len(line)
+
+                if record['op'] == 'put':
+                    self._apply_put(record['session'], json.dumps(record['session']))
+                elif record['op'] == 'delete':
+                    self._apply_delete(record['session_id'])
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.log_dir / f"segment.{segment:08d}.log"
+
+    def _snapshot_path(self, segment: int) -> Path:
+        return self.log_dir / f"snapshot.{segment:08d}.json"
+
+    @staticmethod
+    def _file_number(path: Path) -> Optional[int]:
+        """Return the segment number of a segment or snapshot file name."""
+        parts = path.name.split('.')
+        if len(parts) == 3 and parts[0] in ('segment', 'snapshot') and parts[1].isdigit():
+            return int(parts[1])
+        return None
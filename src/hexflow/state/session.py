@@ -1,51 +1,119 @@
 """Workflow session data model."""
 
-import json
-import uuid
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, field, asdict
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Set
+
+from .tokens import DEFAULT_ALLOCATOR
 
 
-@dataclass
 class WorkflowSession:
-    """Represents a workflow session with all its data."""
-    
-    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    workflow_name: str = ""
-    workflow_token: str = field(default_factory=lambda: f"WF-{str(uuid.uuid4())[:8].upper()}")
-    current_step: Optional[str] = None
-    status: str = "in_progress"  # in_progress, completed, abandoned, processing
-    data: Dict[str, Dict[str, Any]] = field(default_factory=dict)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    created_at: datetime = field(default_factory=datetime.now)
-    updated_at: datetime = field(default_factory=datetime.now)
-    
-    def __post_init__(self):
-        """Initialize metadata if not provided."""
-        if not self.metadata:
-            self.metadata = {
-                'completed_steps': [],
-                'total_steps': None,
-                'progress_percentage': 0
-            }
+    """Represents a workflow session with all its data.
+    
+    Sessions are created on every hop, so the model keeps its footprint
+    small: attributes live in slots, completion checks on workflows with
+    more than COMPLETED_SCAN_LIMIT steps use a set kept alongside the
+    ``completed_steps`` list in metadata, and ``updated_at`` is only
+    stamped when it is next read after a change.
+    
+    ``version`` counts successful saves. Backends only save a session if
+    the stored version still matches the one it was loaded with, so a
+    concurrent update is detected instead of silently overwritten.
+    
+    Step data is copy-on-write: the dictionary passed to set_step_data is
+    stored as given and never modified in place by the session, so
+    to_dict and from_dict share step dictionaries instead of deep-copying
+    them. To change a step, pass a new dictionary to set_step_data.
+    """
+    
+    __slots__ = ('session_id', 'workflow_name', 'workflow_token', 'current_step', 'status',
+                 '_data', 'metadata', 'created_at', '_updated_at', '_touched', 'version',
+                 '_completed', '_completed_list', '_flattened')
+    
+    # Completed step lists up to this length are scanned rather than indexed
+    COMPLETED_SCAN_LIMIT = 8
+    
+    FIELDS = ('session_id', 'workflow_name', 'workflow_token', 'current_step', 'status',
+              'data', 'metadata', 'created_at', 'updated_at', 'version')
+    
+    def __init__(self, session_id: str = None, workflow_name: str = "",
+                 workflow_token: str = None, current_step: Optional[str] = None,
+                 status: str = "in_progress",  # in_progress, completed, abandoned, processing, failed
+                 data: Dict[str, Dict[str, Any]] = None, metadata: Dict[str, Any] = None,
+                 created_at: datetime = None, updated_at: datetime = None, version: int = 0):
+        self.session_id = session_id if session_id is not None else DEFAULT_ALLOCATOR.new_session_id()
+        self.workflow_name = workflow_name
+        self.workflow_token = workflow_token if workflow_token is not None else DEFAULT_ALLOCATOR.new_token()
+        self.current_step = current_step
+        self.status = status
+        self._data = data if data is not None else {}
+        self.metadata = metadata or {
+            'completed_steps': [],
+            'total_steps': None,
+            'progress_percentage': 0
+        }
+        self.created_at = created_at or datetime.now()
+        self._updated_at = updated_at or self.created_at
+        self._touched = False
+        self.version = version
+        self._completed: Optional[Set[str]] = None
+        self._completed_list: Optional[List[str]] = None
+        self._flattened: Optional[Dict[str, Any]] = None
+    
+    @property
+    def data(self) -> Dict[str, Dict[str, Any]]:
+        """Step data keyed by step name."""
+        return self._data
+    
+    @data.setter
+    def data(self, value: Dict[str, Dict[str, Any]]) -> None:
+        self._data = value
+        self._flattened = None
+    
+    @property
+    def updated_at(self) -> datetime:
+        """Time of the last change to the session."""
+        if self._touched:
+            self._updated_at = datetime.now()
+            self._touched = False
+        return self._updated_at
+    
+    @updated_at.setter
+    def updated_at(self, value: datetime) -> None:
+        self._updated_at = value
+        self._touched = False
+    
+    def touch(self) -> None:
+        """Mark the session as changed, deferring the clock read to the next updated_at access."""
+        self._touched = True
     
     def set_step_data(self, step_name: str, step_data: Dict[str, Any]) -> None:
         """Set data for a specific workflow step.
         
         Args:
             step_name: Name of the workflow step
-            step_data: Data dictionary for this step
+            step_data: Data dictionary for this step. It is stored without
+                copying and must not be modified afterwards
         """
-        self.data[step_name] = step_data
-        self.updated_at = datetime.now()
+        replaced = step_name in self._data
+        self._data[step_name] = step_data
+        self._touched = True
+        if self._flattened is not None:
+            if replaced:
+                # Later steps may depend on this one's keys; rebuild on next read
+                self._flattened = None
+            else:
+                self._flatten_step(self._flattened, step_name, step_data)
         
         # Mark step as completed if not already
-        completed_steps = self.metadata.get('completed_steps', [])
-        if step_name not in completed_steps:
+        completed_steps = self.metadata.get('completed_steps')
+        if completed_steps is None:
+            completed_steps = self.metadata['completed_steps'] = []
+        if not self.has_completed_step(step_name):
             completed_steps.append(step_name)
-            self.metadata['completed_steps'] = completed_steps
-            
+            if completed_steps is self._completed_list:
+                self._completed.add(step_name)
+        
         # Update progress percentage
         total_steps = self.metadata.get('total_steps')
         if total_steps:
@@ -57,51 +125,79 @@ class WorkflowSession:
         
         Args:
             step_name: Name of the workflow step
-            
+        
         Returns:
             Data dictionary if step exists, None otherwise
         """
-        return self.data.get(step_name)
+        return self._data.get(step_name)
     
     def has_completed_step(self, step_name: str) -> bool:
         """Check if a step has been completed.
         
         Args:
             step_name: Name of the workflow step
-            
+        
         Returns:
             True if step is completed, False otherwise
         """
-        completed_steps = self.metadata.get('completed_steps', [])
-        return step_name in completed_steps
+        completed_steps = self.metadata.get('completed_steps') or ()
+        if len(completed_steps) <= self.COMPLETED_SCAN_LIMIT:
+            return step_name in completed_steps
+        
+        if completed_steps is not self._completed_list or len(completed_steps) != len(self._completed):
+            self._completed = set(completed_steps)
+            self._completed_list = completed_steps
+        return step_name in self._completed
     
-    def get_all_data(self) -> Dict[str, Any]:
+    def get_all_data(self) -> Mapping[str, Any]:
         """Get all workflow data flattened into a single dictionary.
         
+        Steps are folded in the order they were first set. A key keeps the
+        value from the first step that set it; a later step with a different
+        value for the same key is stored as ``{step_name}_{key}``. This is
+        the view the router passes on for ``fields: "*"`` mappings.
+        
+        The view is built on first use and then kept up to date by
+        set_step_data, which folds in new steps without rescanning earlier
+        ones. Replacing an existing step or the whole data dictionary
+        rebuilds it on the next read.
+        
         Returns:
-            Dictionary with all step data combined
+            Read-only mapping with all step data combined
         """
-        all_data = {}
-        for step_name, step_data in self.data.items():
-            for key, value in step_data.items():
-                # Prefix with step name to avoid conflicts
-                all_data[f"{step_name}_{key}"] = value
-                # Also add unprefixed for convenience (last step wins)
-                all_data[key] = value
-        return all_data
+        if self._flattened is None:
+            flattened: Dict[str, Any] = {}
+            for step_name, step_data in self._data.items():
+                self._flatten_step(flattened, step_name, step_data)
+            self._flattened = flattened
+        return MappingProxyType(self._flattened)
+    
+    @staticmethod
+    def _flatten_step(flattened: Dict[str, Any], step_name: str, step_data: Any) -> None:
+        """Fold one step's data into a flattened view."""
+        if not isinstance(step_data, dict):
+            return
+        for key, value in step_data.items():
+            if key in flattened and flattened[key] != value:
+                flattened[f"{step_name}_{key}"] = value
+            else:
+                flattened[key] = value
     
     def set_status(self, status: str) -> None:
         """Update session status.
         
         Args:
-            status: New status (in_progress, completed, abandoned, processing)
+            status: New status (in_progress, completed, abandoned, processing, failed)
         """
         self.status = status
-        self.updated_at = datetime.now()
         
         if status == 'completed':
-            self.metadata['completed_at'] = datetime.now().isoformat()
+            now = datetime.now()
+            self.updated_at = now
+            self.metadata['completed_at'] = now.isoformat()
             self.metadata['progress_percentage'] = 100
+        else:
+            self._touched = True
     
     def add_metadata(self, key: str, value: Any) -> None:
         """Add custom metadata to the session.
@@ -111,37 +207,62 @@ class WorkflowSession:
             value: Metadata value
         """
         self.metadata[key] = value
-        self.updated_at = datetime.now()
+        self._touched = True
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert session to dictionary for serialization.
         
+        Step dictionaries are shared with the session rather than copied;
+        the data and metadata containers themselves are copied.
+        
         Returns:
             Dictionary representation of the session
         """
-        session_dict = asdict(self)
-        # Convert datetime objects to ISO strings
-        session_dict['created_at'] = self.created_at.isoformat()
-        session_dict['updated_at'] = self.updated_at.isoformat()
-        return session_dict
+        metadata = dict(self.metadata)
+        if isinstance(metadata.get('completed_steps'), list):
+            metadata['completed_steps'] = list(metadata['completed_steps'])
+        
+        return {
+            'session_id': self.session_id,
+            'workflow_name': self.workflow_name,
+            'workflow_token': self.workflow_token,
+            'current_step': self.current_step,
+            'status': self.status,
+            'data': dict(self._data),
+            'metadata': metadata,
+            # Convert datetime objects to ISO strings
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'version': self.version
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'WorkflowSession':
         """Create session from dictionary.
         
+        The input dictionary is not modified.
+        
         Args:
             data: Dictionary representation of session
-            
+        
         Returns:
             WorkflowSession instance
         """
+        values = dict(data)
         # Convert ISO strings back to datetime objects
-        if isinstance(data.get('created_at'), str):
-            data['created_at'] = datetime.fromisoformat(data['created_at'])
-        if isinstance(data.get('updated_at'), str):
-            data['updated_at'] = datetime.fromisoformat(data['updated_at'])
+        if isinstance(values.get('created_at'), str):
+            values['created_at'] = datetime.fromisoformat(values['created_at'])
+        if isinstance(values.get('updated_at'), str):
+            values['updated_at'] = datetime.fromisoformat(values['updated_at'])
         
-        return cls(**data)
+        return cls(**values)
+    
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+    
+    __hash__ = None
     
     def __repr__(self) -> str:
-        return f"WorkflowSession(id={self.session_id[:8]}, workflow={self.workflow_name}, token={self.workflow_token}, status={self.status})"
\ No newline at end of file
+        return f"WorkflowSession(id={self.session_id[:8]}, workflow={self.workflow_name}, token={self.workflow_token}, status={self.status})"
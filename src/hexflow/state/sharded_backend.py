@@ -0,0 +1,273 @@
+"""Sharded SQLite implementation of state backend."""
+
+import hashlib
+import heapq
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Iterator
+from pathlib import Path
+
+from .backend import StateBackend, SessionCursor, session_cursor
+from .session import WorkflowSession
+from .sqlite_backend import SQLiteBackend
+
+
+def shard_index(key: str, shards: int) -> int:
+    """Map a key to a shard using a hash that is stable across processes.
+
+    Args:
+        key: Workflow token or session ID
+        shards: Number of shards
+
+    Returns:
+        Shard index in range(shards)
+    """
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shards
+
+
+class ShardedSQLiteBackend(StateBackend):
+    """State backend spreading sessions across several SQLite databases.
+
+    Sessions are placed by a stable hash of their workflow token, so token
+    lookups and saves touch exactly one shard and concurrent hops on
+    different sessions mostly take different writer locks. create_session
+    picks a session ID that hashes to the same shard as the token, so ID
+    lookups also go straight to one shard; sessions saved with arbitrary
+    IDs are still found by falling back to a lookup on every shard.
+
+    Listing, counting, statistics and cleanup fan out across the shards on
+    a thread pool and merge the results.
+    """
+
+    MANIFEST = 'shards.json'
+
+    def __init__(self, db_dir: str = None, shards: int = 4, max_workers: int = None,
+                 codec: str = 'json'):
+        """Initialize sharded SQLite backend.
+
+        Args:
+            db_dir: Directory holding the shard databases. Defaults to
+                'workflow_sessions' in the current directory
+            shards: Number of shards. Must match the existing directory;
+                use reshard() to change it
+            max_workers: Threads used for fan-out queries. Defaults to shards
+            codec: Codec used to write data and metadata (see SQLiteBackend)
+        """
+        if db_dir is None:
+            db_dir = os.path.join(os.getcwd(), 'workflow_sessions')
+
+        self.db_dir = Path(db_dir)
+        self.db_dir.mkdir(parents=True, exist_ok=True)
+        self.shard_count = shards
+
+        manifest_path = self.db_dir / self.MANIFEST
+        if manifest_path.exists():
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                existing = json.load(f)['shards']
+            if existing != shards:
+                raise ValueError(f"{self.db_dir} holds {existing} shards, not {shards}. "
+                                 f"Use reshard() to change the shard count.")
+        else:
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump({'shards': shards}, f)
+
+        self.shards = [SQLiteBackend(str(self.db_dir / f"shard_{i:03d}.db"), codec=codec)
+                       for i in range(shards)]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or shards,
+                                            thread_name_prefix='hexflow-shard')
+
+    def shard_for_token(self, workflow_token: str) -> SQLiteBackend:
+        """Return the shard holding the session with a workflow token."""
+        return self.shards[shard_index(workflow_token, self.shard_count)]
+
+    def create_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
+        """Create a new workflow session."""
+        return self._create_session(workflow_name, workflow_token)
+
+    def new_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
+        """Build an unsaved session whose ID hashes to its token's shard."""
+        session = super().new_session(workflow_name, workflow_token)
+
+        # Align the session ID with the token's shard (about shard_count tries)
+        target = shard_index(session.workflow_token, self.shard_count)
+        while shard_index(session.session_id, self.shard_count) != target:
+            session.session_id = self.token_allocator.new_session_id()
+        return session
+
+    def get_session(self, session_id: str) -> Optional[WorkflowSession]:
+        """Get a session by its session ID."""
+        aligned = shard_index(session_id, self.shard_count)
+        session = self.shards[aligned].get_session(session_id)
+        if session:
+            return session
+
+        others = [shard for i, shard in enumerate(self.shards) if i != aligned]
+        for session in self._executor.map(lambda shard: shard.get_session(session_id), others):
+            if session:
+                return session
+        return None
+
+    def get_session_by_token(self, workflow_token: str) -> Optional[WorkflowSession]:
+        """Get a session by its workflow token."""
+        return self.shard_for_token(workflow_token).get_session_by_token(workflow_token)
+
+    def save_session(self, session: WorkflowSession) -> bool:
+        """Save/update a session."""
+        return self.shard_for_token(session.workflow_token).save_session(session)
+
+    def insert_session(self, session: WorkflowSession) -> bool:
+        """Insert a new session into its token's shard."""
+        return self.shard_for_token(session.workflow_token).insert_session(session)
+
+    def insert_sessions(self, sessions: List[WorkflowSession]) -> List[bool]:
+        """Insert a batch of new sessions, one transaction per shard, in parallel."""
+        by_shard: Dict[int, List[int]] = {}
+        for position, session in enumerate(sessions):
+            by_shard.setdefault(shard_index(session.workflow_token, self.shard_count), []).append(position)
+
+        def insert(index: int) -> List[bool]:
+            return self.shards[index].insert_sessions([sessions[position] for position in by_shard[index]])
+
+        results = [False] * len(sessions)
+        for index, inserted in zip(by_shard, self._executor.map(insert, by_shard)):
+            for position, flag in zip(by_shard[index], inserted):
+                results[position] = flag
+        return results
+
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a session."""
+        aligned = shard_index(session_id, self.shard_count)
+        if self.shards[aligned].delete_session(session_id):
+            return True
+
+        others = [shard for i, shard in enumerate(self.shards) if i != aligned]
+        return any(self._executor.map(lambda shard: shard.delete_session(session_id), others))
+
+    def list_sessions(self, workflow_name: str = None, status: str = None) -> List[WorkflowSession]:
+        """List sessions with optional filters, newest first."""
+        per_shard = self._fan_out(lambda shard: shard.list_sessions(workflow_name, status))
+        return list(heapq.merge(*per_shard, key=session_cursor, reverse=True))
+
+    def iter_sessions(self, workflow_name: str = None, status: str = None,
+                      include_data: bool = True, page_size: int = 500,
+                      after: Optional[SessionCursor] = None,
+                      ascending: bool = False) -> Iterator[WorkflowSession]:
+        """Iterate over sessions by merging each shard's keyset-paginated stream."""
+        streams = [
+            shard.iter_sessions(workflow_name, status, include_data, page_size, after, ascending)
+            for shard in self.shards
+        ]
+        return heapq.merge(*streams, key=session_cursor, reverse=not ascending)
+
+    def count_sessions(self, workflow_name: str = None, status: str = None) -> int:
+        """Count sessions with optional filters."""
+        return sum(self._fan_out(lambda shard: shard.count_sessions(workflow_name, status)))
+
+    def cleanup_expired_sessions(self, max_age_days: int = 30) -> int:
+        """Clean up old sessions."""
+        return sum(self._fan_out(lambda shard: shard.cleanup_expired_sessions(max_age_days)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics merged across all shards."""
+        status_counts: Dict[str, int] = {}
+        workflow_counts: Dict[str, int] = {}
+        total_sessions = 0
+
+        for stats in self._fan_out(lambda shard: shard.get_stats()):
+            total_sessions += stats['total_sessions']
+            for status, count in stats['status_counts'].items():
+                status_counts[status] = status_counts.get(status, 0) + count
+            for workflow_name, count in stats['workflow_counts'].items():
+                workflow_counts[workflow_name] = workflow_counts.get(workflow_name, 0) + count
+
+        return {
+            'total_sessions': total_sessions,
+            'status_counts': status_counts,
+            'workflow_counts': workflow_counts,
+            'database_path': str(self.db_dir),
+            'shards': self.shard_count
+        }
+
+    def reconcile_stats(self) -> Dict[str, Any]:
+        """Recompute the stats counters of every shard and report drift."""
+        drift: Dict[str, Dict[str, int]] = {}
+        for result in self._fan_out(lambda shard: shard.reconcile_stats()):
+            for key, values in result['drift'].items():
+                merged = drift.setdefault(key, {'counter': 0, 'actual': 0})
+                merged['counter'] += values['counter']
+                merged['actual'] += values['actual']
+        return {'drift': drift, 'stats': self.get_stats()}
+
+    def close(self) -> None:
+        """Shut down the fan-out thread pool."""
+        self._executor.shutdown(wait=True)
+
+    def _fan_out(self, operation) -> List[Any]:
+        """Run an operation on every shard in the thread pool."""
+        return list(self._executor.map(operation, self.shards))
+
+
+def reshard(source: str, target_dir: str, shards: int, batch_size: int = 1000) -> int:
+    """Copy sessions from a SQLite database or sharded directory into new shards.
+
+    Rows are copied as stored, without decoding them, in one transaction per
+    batch per shard. Rows written with the binary codecs are the exception:
+    their keys refer to the source database's term dictionary, so they are
+    decoded and re-encoded against the target shard's dictionary. The
+    target directory must not already contain shards.
+
+    Args:
+        source: Path to a workflow_sessions.db file or a ShardedSQLiteBackend directory
+        target_dir: Directory for the new shard databases
+        shards: Number of shards to create
+        batch_size: Rows read per batch
+
+    Returns:
+        Number of sessions copied
+    """
+    source_path = Path(source)
+    if source_path.is_dir():
+        source_dbs = sorted(source_path.glob('shard_*.db'))
+    else:
+        source_dbs = [source_path]
+
+    if (Path(target_dir) / ShardedSQLiteBackend.MANIFEST).exists():
+        raise ValueError(f"{target_dir} already contains shards")
+
+    target = ShardedSQLiteBackend(target_dir, shards=shards)
+    target.close()
+    copied = 0
+
+    for source_db in source_dbs:
+        # Opening through SQLiteBackend migrates older schemas first
+        source_backend = SQLiteBackend(str(source_db))
+        with sqlite3.connect(source_db) as source_conn:
+            cursor = source_conn.execute(
+                "SELECT session_id, workflow_name, workflow_token, current_step, status, "
+                "data, metadata, created_at, updated_at, codec, version FROM workflow_sessions"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+
+                by_shard: Dict[int, List[tuple]] = {}
+                for row in rows:
+                    index = shard_index(row[2], shards)
+                    codec_name = row[9]
+                    if codec_name.startswith('binary'):
+                        source_codec = source_backend.codecs[codec_name]
+                        target_codec = target.shards[index].codecs[codec_name]
+                        row = row[:5] + (target_codec.encode(source_codec.decode(row[5])),
+                                         target_codec.encode(source_codec.decode(row[6]))) + row[7:]
+                    by_shard.setdefault(index, []).append(row)
+
+                for index, shard_rows in by_shard.items():
+                    with sqlite3.connect(target.shards[index].db_path) as target_conn:
+                        target_conn.executemany(SQLiteBackend.UPSERT_SQL, shard_rows)
+                copied += len(rows)
+
+    return copied
@@ -1,24 +1,63 @@
 """SQLite implementation of state backend."""
 
+import logging
 import sqlite3
-import json
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator, Tuple
 from pathlib import Path
 
-from .backend import StateBackend
+from .backend import StateBackend, SessionCursor
+from .codecs import TermDictionary, build_codecs
 from .session import WorkflowSession
+from ..logs import get_logger, log_event
+
+logger = get_logger('state')
 
 
 class SQLiteBackend(StateBackend):
     """SQLite implementation of the state backend."""
     
-    def __init__(self, db_path: str = None):
+    # Columns loaded when data/metadata decoding is skipped
+    SUMMARY_COLUMNS = ("session_id, workflow_name, workflow_token, current_step, "
+                       "status, created_at, updated_at, version")
+    
+    INSERT_SQL = """
+        INSERT INTO workflow_sessions 
+        (session_id, workflow_name, workflow_token, current_step, 
+         status, data, metadata, created_at, updated_at, codec, version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    # Upsert rather than INSERT OR REPLACE so the stats triggers see an
+    # UPDATE instead of a silent delete and re-insert. The update only
+    # applies if the stored version is the one the session was loaded
+    # with (compare-and-swap); otherwise no row changes.
+    UPSERT_SQL = INSERT_SQL + """
+        ON CONFLICT(session_id) DO UPDATE SET
+            workflow_name = excluded.workflow_name,
+            workflow_token = excluded.workflow_token,
+            current_step = excluded.current_step,
+            status = excluded.status,
+            data = excluded.data,
+            metadata = excluded.metadata,
+            created_at = excluded.created_at,
+            updated_at = excluded.updated_at,
+            codec = excluded.codec,
+            version = excluded.version
+        WHERE workflow_sessions.version = excluded.version - 1
+    """
+    
+    def __init__(self, db_path: str = None, codec: str = 'json', compress_threshold: int = 512):
         """Initialize SQLite backend.
         
         Args:
             db_path: Path to SQLite database file. Defaults to 'workflow_sessions.db'
+            codec: Codec used to write data and metadata: 'json', 'binary',
+                'json+zlib' or 'binary+zlib'. Rows are always read with the
+                codec that wrote them.
+            compress_threshold: Encoded size in bytes above which the zlib
+                codecs compress
         """
         if db_path is None:
             db_path = os.path.join(os.getcwd(), 'workflow_sessions.db')
@@ -28,6 +67,12 @@ class SQLiteBackend(StateBackend):
         
         # Initialize database
         self._init_database()
+        
+        self.codecs = build_codecs(TermDictionary(self._load_terms, self._add_terms),
+                                   compress_threshold)
+        if codec not in self.codecs:
+            raise ValueError(f"Unknown codec '{codec}', expected one of {sorted(self.codecs)}")
+        self.codec = self.codecs[codec]
     
     def _init_database(self) -> None:
         """Initialize the database schema."""
@@ -42,7 +87,24 @@ class SQLiteBackend(StateBackend):
                     data TEXT NOT NULL,  -- JSON
                     metadata TEXT NOT NULL,  -- JSON
                     created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL
+                    updated_at TEXT NOT NULL,
+                    codec TEXT NOT NULL DEFAULT 'json',
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            
+            # Databases created before codecs existed hold JSON rows
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(workflow_sessions)")]
+            if 'codec' not in columns:
+                conn.execute("ALTER TABLE workflow_sessions ADD COLUMN codec TEXT NOT NULL DEFAULT 'json'")
+            if 'version' not in columns:
+                conn.execute("ALTER TABLE workflow_sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            
+            # Term dictionary for the binary codec's dictionary-encoded keys
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_codec_terms (
+                    term_id INTEGER PRIMARY KEY,
+                    term TEXT UNIQUE NOT NULL
                 )
             """)
             
@@ -62,19 +124,113 @@ class SQLiteBackend(StateBackend):
                 ON workflow_sessions(created_at)
             """)
             
+            # Keyset pagination index for iter_sessions
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_updated_at_session_id 
+                ON workflow_sessions(updated_at, session_id)
+            """)
+            
+            # Durable queue of processor jobs (see SQLiteJobQueue). Times are
+            # Unix timestamps so leases can be compared in SQL.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    workflow_token TEXT NOT NULL,
+                    app_name TEXT NOT NULL,
+                    payload TEXT NOT NULL,  -- JSON
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    error TEXT,
+                    deadline REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            
+            job_columns = [row[1] for row in conn.execute("PRAGMA table_info(workflow_jobs)")]
+            if 'deadline' not in job_columns:
+                conn.execute("ALTER TABLE workflow_jobs ADD COLUMN deadline REAL")
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_claim
+                ON workflow_jobs(app_name, status, priority DESC, job_id)
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_lease
+                ON workflow_jobs(status, lease_expires)
+            """)
+            
+            # At most one queued or leased job per session step
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active
+                ON workflow_jobs(workflow_token, app_name) WHERE status IN ('queued', 'leased')
+            """)
+            
+            stats_exist = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'workflow_stats'"
+            ).fetchone() is not None
+            
+            # Counters kept current by triggers so get_stats never scans sessions.
+            # dimension is 'total', 'status' or 'workflow'; key is the status or
+            # workflow name ('' for the total).
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_stats (
+                    dimension TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (dimension, key)
+                )
+            """)
+            
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_workflow_stats_insert
+                AFTER INSERT ON workflow_sessions
+                BEGIN
+                    INSERT INTO workflow_stats (dimension, key, count)
+                    VALUES ('total', '', 1), ('status', NEW.status, 1), ('workflow', NEW.workflow_name, 1)
+                    ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+                END
+            """)
+            
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_workflow_stats_delete
+                AFTER DELETE ON workflow_sessions
+                BEGIN
+                    UPDATE workflow_stats SET count = count - 1
+                    WHERE (dimension = 'total' AND key = '')
+                       OR (dimension = 'status' AND key = OLD.status)
+                       OR (dimension = 'workflow' AND key = OLD.workflow_name);
+                END
+            """)
+            
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_workflow_stats_update
+                AFTER UPDATE OF status, workflow_name ON workflow_sessions
+                WHEN OLD.status IS NOT NEW.status OR OLD.workflow_name IS NOT NEW.workflow_name
+                BEGIN
+                    UPDATE workflow_stats SET count = count - 1
+                    WHERE (dimension = 'status' AND key = OLD.status)
+                       OR (dimension = 'workflow' AND key = OLD.workflow_name);
+                    INSERT INTO workflow_stats (dimension, key, count)
+                    VALUES ('status', NEW.status, 1), ('workflow', NEW.workflow_name, 1)
+                    ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+                END
+            """)
+            
+            if not stats_exist:
+                # Existing database without counters: backfill them once
+                self._recompute_stats(conn)
+            
             conn.commit()
     
     def create_session(self, workflow_name: str, workflow_token: str = None) -> WorkflowSession:
         """Create a new workflow session."""
-        session = WorkflowSession(
-            workflow_name=workflow_name,
-            workflow_token=workflow_token or f"WF-{WorkflowSession().session_id[:8].upper()}"
-        )
-        
-        if self.save_session(session):
-            return session
-        else:
-            raise RuntimeError("Failed to create session")
+        return self._create_session(workflow_name, workflow_token)
     
     def get_session(self, session_id: str) -> Optional[WorkflowSession]:
         """Get a session by its session ID."""
@@ -105,34 +261,59 @@ class SQLiteBackend(StateBackend):
             return None
     
     def save_session(self, session: WorkflowSession) -> bool:
-        """Save/update a session."""
+        """Save/update a session if it has not changed since it was loaded."""
         try:
             with sqlite3.connect(self.db_path) as conn:
-                # Update the updated_at timestamp
-                session.updated_at = datetime.now()
-                
-                conn.execute("""
-                    INSERT OR REPLACE INTO workflow_sessions 
-                    (session_id, workflow_name, workflow_token, current_step, 
-                     status, data, metadata, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    session.session_id,
-                    session.workflow_name,
-                    session.workflow_token,
-                    session.current_step,
-                    session.status,
-                    json.dumps(session.data),
-                    json.dumps(session.metadata),
-                    session.created_at.isoformat(),
-                    session.updated_at.isoformat()
-                ))
+                # The session only takes the new timestamp once it is saved
+                updated_at = datetime.now()
+                cursor = conn.execute(self.UPSERT_SQL, self._session_params(session, updated_at))
                 conn.commit()
+                if cursor.rowcount == 0:
+                    # Another writer saved the session first
+                    return False
+                session.updated_at = updated_at
+                session.version += 1
                 return True
         except Exception as e:
-            print(f"Error saving session: {e}")
+            log_event(logger, logging.ERROR, 'session_save_failed', error=str(e))
+            return False
+    
+    def insert_session(self, session: WorkflowSession) -> bool:
+        """Insert a new session, returning False if its ID or token is taken."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                session.updated_at = datetime.now()
+                conn.execute(self.INSERT_SQL, self._session_params(session))
+                conn.commit()
+                session.version += 1
+                return True
+        except sqlite3.IntegrityError:
             return False
     
+    def insert_sessions(self, sessions: List[WorkflowSession]) -> List[bool]:
+        """Insert a batch of new sessions in one transaction.
+        
+        Sessions whose ID or token is taken are skipped rather than failing
+        the batch.
+        """
+        now = datetime.now()
+        for session in sessions:
+            session.updated_at = now
+        # Encode first: binary codecs may write new terms on their own connection
+        params = [self._session_params(session) for session in sessions]
+        
+        results = []
+        with sqlite3.connect(self.db_path) as conn:
+            for row in params:
+                cursor = conn.execute(self.INSERT_SQL + " ON CONFLICT DO NOTHING", row)
+                results.append(cursor.rowcount == 1)
+            conn.commit()
+        
+        for session, inserted in zip(sessions, results):
+            if inserted:
+                session.version += 1
+        return results
+    
     def delete_session(self, session_id: str) -> bool:
         """Delete a session."""
         try:
@@ -144,14 +325,79 @@ class SQLiteBackend(StateBackend):
                 conn.commit()
                 return cursor.rowcount > 0
         except Exception as e:
-            print(f"Error deleting session: {e}")
+            log_event(logger, logging.ERROR, 'session_delete_failed', error=str(e))
             return False
     
     def list_sessions(self, workflow_name: str = None, status: str = None) -> List[WorkflowSession]:
         """List sessions with optional filters."""
-        query = "SELECT * FROM workflow_sessions"
-        params = []
+        return list(self.iter_sessions(workflow_name, status))
+    
+    def iter_sessions(self, workflow_name: str = None, status: str = None,
+                      include_data: bool = True, page_size: int = 500,
+                      after: Optional[SessionCursor] = None,
+                      ascending: bool = False) -> Iterator[WorkflowSession]:
+        """Iterate over sessions one page at a time.
+        
+        Each page is a separate short query seeking past the last
+        (updated_at, session_id) seen, so no read transaction is held open
+        between pages and memory use is bounded by page_size.
+        """
+        while True:
+            query, params = self._page_query(workflow_name, status, include_data,
+                                             page_size, after, ascending)
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                rows = conn.execute(query, params).fetchall()
+            
+            for row in rows:
+                yield self._row_to_session(row)
+            
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]['updated_at'], rows[-1]['session_id'])
+    
+    def count_sessions(self, workflow_name: str = None, status: str = None) -> int:
+        """Count sessions with optional filters without loading rows."""
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(*self._count_query(workflow_name, status)).fetchone()[0]
+    
+    def _page_query(self, workflow_name: str = None, status: str = None,
+                    include_data: bool = True, page_size: int = 500,
+                    after: Optional[SessionCursor] = None,
+                    ascending: bool = False) -> Tuple[str, List[Any]]:
+        """Build the query and parameters for one page of iter_sessions.
+        
+        Shared with AsyncSQLiteBackend, which runs the same queries on its
+        own connections.
+        """
+        conditions, params = self._filter_conditions(workflow_name, status)
+        columns = "*" if include_data else self.SUMMARY_COLUMNS
+        order = "ASC" if ascending else "DESC"
+        
+        if after is not None:
+            comparison = ">" if ascending else "<"
+            conditions.append(f"(updated_at, session_id) {comparison} (?, ?)")
+            params.extend(after)
+        
+        query = f"SELECT {columns} FROM workflow_sessions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY updated_at {order}, session_id {order} LIMIT ?"
+        params.append(page_size)
+        return query, params
+    
+    def _count_query(self, workflow_name: str = None, status: str = None) -> Tuple[str, List[Any]]:
+        """Build the query and parameters for count_sessions."""
+        conditions, params = self._filter_conditions(workflow_name, status)
+        query = "SELECT COUNT(*) FROM workflow_sessions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query, params
+    
+    def _filter_conditions(self, workflow_name: str = None, status: str = None):
+        """Build WHERE conditions and parameters for the common session filters."""
         conditions = []
+        params = []
         
         if workflow_name:
             conditions.append("workflow_name = ?")
@@ -161,17 +407,7 @@ class SQLiteBackend(StateBackend):
             conditions.append("status = ?")
             params.append(status)
         
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " ORDER BY updated_at DESC"
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
-            
-            return [self._row_to_session(row) for row in rows]
+        return conditions, params
     
     def cleanup_expired_sessions(self, max_age_days: int = 30) -> int:
         """Clean up old sessions."""
@@ -186,49 +422,124 @@ class SQLiteBackend(StateBackend):
                 conn.commit()
                 return cursor.rowcount
         except Exception as e:
-            print(f"Error cleaning up sessions: {e}")
+            log_event(logger, logging.ERROR, 'session_cleanup_failed', error=str(e))
             return 0
     
     def _row_to_session(self, row: sqlite3.Row) -> WorkflowSession:
-        """Convert a database row to a WorkflowSession object."""
+        """Convert a database row to a WorkflowSession object.
+        
+        Rows selected with SUMMARY_COLUMNS have no data/metadata columns;
+        those sessions are returned with empty data.
+        """
+        has_data = 'data' in row.keys()
+        codec = self.codecs[row['codec']] if has_data else None
         return WorkflowSession(
             session_id=row['session_id'],
             workflow_name=row['workflow_name'],
             workflow_token=row['workflow_token'],
             current_step=row['current_step'],
             status=row['status'],
-            data=json.loads(row['data']),
-            metadata=json.loads(row['metadata']),
+            data=codec.decode(row['data']) if has_data else {},
+            metadata=codec.decode(row['metadata']) if has_data else {},
             created_at=datetime.fromisoformat(row['created_at']),
-            updated_at=datetime.fromisoformat(row['updated_at'])
+            updated_at=datetime.fromisoformat(row['updated_at']),
+            version=row['version']
+        )
+    
+    def _session_params(self, session: WorkflowSession, updated_at: Optional[datetime] = None) -> tuple:
+        """Build UPSERT_SQL parameters for a session using the configured codec.
+        
+        The version parameter is the one the session will have once saved,
+        and updated_at, if given, replaces the session's own timestamp.
+        """
+        return (
+            session.session_id,
+            session.workflow_name,
+            session.workflow_token,
+            session.current_step,
+            session.status,
+            self.codec.encode(session.data),
+            self.codec.encode(session.metadata),
+            session.created_at.isoformat(),
+            (updated_at or session.updated_at).isoformat(),
+            self.codec.name,
+            session.version + 1
         )
     
+    def _load_terms(self) -> Dict[str, int]:
+        """Load the codec term dictionary."""
+        with sqlite3.connect(self.db_path) as conn:
+            return dict(conn.execute("SELECT term, term_id FROM session_codec_terms").fetchall())
+    
+    def _add_terms(self, terms: List[str]) -> Dict[str, int]:
+        """Persist new codec terms and return their IDs."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany("INSERT OR IGNORE INTO session_codec_terms (term) VALUES (?)",
+                             [(term,) for term in terms])
+            placeholders = ', '.join('?' for _ in terms)
+            cursor = conn.execute(
+                f"SELECT term, term_id FROM session_codec_terms WHERE term IN ({placeholders})", terms)
+            return dict(cursor.fetchall())
+    
     def get_stats(self) -> Dict[str, Any]:
-        """Get database statistics."""
+        """Get database statistics from the maintained counters."""
         with sqlite3.connect(self.db_path) as conn:
-            # Total sessions
-            cursor = conn.execute("SELECT COUNT(*) FROM workflow_sessions")
-            total_sessions = cursor.fetchone()[0]
-            
-            # Sessions by status
-            cursor = conn.execute("""
-                SELECT status, COUNT(*) 
-                FROM workflow_sessions 
-                GROUP BY status
-            """)
-            status_counts = dict(cursor.fetchall())
-            
-            # Sessions by workflow
-            cursor = conn.execute("""
-                SELECT workflow_name, COUNT(*) 
-                FROM workflow_sessions 
-                GROUP BY workflow_name
-            """)
-            workflow_counts = dict(cursor.fetchall())
+            counters = self._read_stats(conn)
             
             return {
-                'total_sessions': total_sessions,
-                'status_counts': status_counts,
-                'workflow_counts': workflow_counts,
+                'total_sessions': counters.get(('total', ''), 0),
+                'status_counts': {key: count for (dimension, key), count in counters.items()
+                                  if dimension == 'status' and count > 0},
+                'workflow_counts': {key: count for (dimension, key), count in counters.items()
+                                    if dimension == 'workflow' and count > 0},
                 'database_path': str(self.db_path)
-            }
\ No newline at end of file
+            }
+    
+    def reconcile_stats(self) -> Dict[str, Any]:
+        """Recompute the stats counters from the sessions table.
+        
+        Runs a full scan inside one write transaction, replaces the counters
+        with the recomputed values and reports any drift found.
+        
+        Returns:
+            Dictionary with 'drift', mapping "dimension:key" to a
+            {'counter': ..., 'actual': ...} pair for every counter that was
+            wrong, and 'stats' with the corrected statistics
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = self._read_stats(conn)
+            self._recompute_stats(conn)
+            after = self._read_stats(conn)
+            conn.commit()
+        
+        drift = {}
+        for counter_key in set(before) | set(after):
+            counter = before.get(counter_key, 0)
+            actual = after.get(counter_key, 0)
+            if counter != actual:
+                dimension, key = counter_key
+                drift[f"{dimension}:{key}"] = {'counter': counter, 'actual': actual}
+        
+        return {'drift': drift, 'stats': self.get_stats()}
+    
+    def _read_stats(self, conn: sqlite3.Connection) -> Dict[tuple, int]:
+        """Read all stats counters keyed by (dimension, key)."""
+        cursor = conn.execute("SELECT dimension, key, count FROM workflow_stats")
+        return {(dimension, key): count for dimension, key, count in cursor.fetchall()}
+    
+    def _recompute_stats(self, conn: sqlite3.Connection) -> None:
+        """Rebuild the stats counters from a full scan of the sessions table."""
+        conn.execute("DELETE FROM workflow_stats")
+        conn.execute("""
+            INSERT INTO workflow_stats (dimension, key, count)
+            SELECT 'total', '', COUNT(*) FROM workflow_sessions
+        """)
+        conn.execute("""
+            INSERT INTO workflow_stats (dimension, key, count)
+            SELECT 'status', status, COUNT(*) FROM workflow_sessions GROUP BY status
+        """)
+        conn.execute("""
+            INSERT INTO workflow_stats (dimension, key, count)
+            SELECT 'workflow', workflow_name, COUNT(*) FROM workflow_sessions GROUP BY workflow_name
+        """)
@@ -0,0 +1,162 @@
+"""Allocation of session IDs and workflow tokens.
+
+Both are time-ordered, so new rows land at the end of the session_id and
+workflow_token indexes instead of at random positions, and both are
+monotonic within a process even when many are minted in one millisecond.
+
+Workflow tokens are meant to be read and typed by people. They use
+Crockford's base32 alphabet (no I, L, O or U), are grouped with hyphens and
+end in a Luhn mod 32 check character, which catches every single mistyped
+character and most swapped pairs.
+"""
+
+import secrets
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Tuple
+
+# Crockford base32 alphabet
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+# Characters commonly typed in place of alphabet characters
+CONFUSABLES = str.maketrans({'I': '1', 'L': '1', 'O': '0', 'U': 'V'})
+
+
+class InvalidTokenError(ValueError):
+    """Raised when a workflow token fails its checksum."""
+    pass
+
+
+class TokenAllocator:
+    """Mints time-ordered session IDs and checksummed workflow tokens.
+
+    A token is the prefix followed by the millisecond timestamp (9 base32
+    characters), ``random_chars`` random characters and, if enabled, a
+    check character, split into groups of ``group`` characters. With the
+    defaults a token looks like ``WF-01JB-4ZK8-QX3M-7TRC``.
+
+    Session IDs are version 7 UUIDs: a millisecond timestamp followed by
+    random bits.
+
+    Random parts are incremented rather than redrawn within the same
+    millisecond, so IDs from one allocator are strictly increasing.
+    Different processes can still collide; backends retry with a fresh
+    token when an insert hits an existing one.
+    """
+
+    TIME_CHARS = 9
+
+    def __init__(self, prefix: str = 'WF-', random_chars: int = 6, group: int = 4,
+                 checksum: bool = True, clock: Callable[[], float] = time.time):
+        """Initialize the allocator.
+
+        Args:
+            prefix: Text placed before every token
+            random_chars: Number of random base32 characters per token
+            group: Characters per hyphen-separated group, or 0 for no hyphens
+            checksum: Whether tokens end in a check character
+            clock: Returns the current time in seconds
+        """
+        self.prefix = prefix
+        self.random_chars = random_chars
+        self.group = group
+        self.checksum = checksum
+        self.clock = clock
+        self.length = self.TIME_CHARS + random_chars + (1 if checksum else 0)
+
+        self._lock = threading.Lock()
+        self._last: Dict[str, Tuple[int, int]] = {}
+
+    def new_token(self) -> str:
+        """Mint a new workflow token."""
+        millis, random_part = self._next('token', self.random_chars * 5)
+        body = (self._encode(millis, self.TIME_CHARS) +
+                self._encode(random_part, self.random_chars))
+        if self.checksum:
+            body += self.check_character(body)
+        return self._format(body)
+
+    def new_session_id(self) -> str:
+        """Mint a new session ID as a version 7 UUID string."""
+        millis, random_part = self._next('session_id', 74)
+        value = ((millis & (2 ** 48 - 1)) << 80 | 0x7 << 76 |
+                 (random_part >> 62) << 64 | 0b10 << 62 | random_part & (2 ** 62 - 1))
+        return str(uuid.UUID(int=value))
+
+    def normalize(self, token: str) -> str:
+        """Return the canonical form of a token typed by a person.
+
+        Case, spacing, hyphens and confusable characters (I, L, O and U)
+        are corrected and the check character is verified. Tokens that are
+        not in this allocator's format, such as tokens minted before it
+        existed or passed explicitly to create_session, are returned
+        unchanged.
+
+        Args:
+            token: Workflow token as entered
+
+        Returns:
+            Canonical workflow token
+
+        Raises:
+            InvalidTokenError: If the token is in this format but its
+                check character does not match
+        """
+        text = token.strip()
+        if not text.upper().startswith(self.prefix.upper()):
+            return token
+
+        body = text[len(self.prefix):].upper().replace('-', '').replace(' ', '')
+        body = body.translate(CONFUSABLES)
+        if len(body) != self.length or any(char not in ALPHABET for char in body):
+            return token
+
+        if self.checksum and self.check_character(body[:-1]) != body[-1]:
+            raise InvalidTokenError(f"Workflow token {token} is not valid; check it for typos")
+        return self._format(body)
+
+    @staticmethod
+    def check_character(body: str) -> str:
+        """Compute the Luhn mod 32 check character for a base32 string."""
+        factor = 2
+        total = 0
+        for char in reversed(body):
+            addend = ALPHABET.index(char) * factor
+            total += addend // 32 + addend % 32
+            factor = 1 if factor == 2 else 2
+        return ALPHABET[-total % 32]
+
+    def _next(self, kind: str, bits: int) -> Tuple[int, int]:
+        """Return the next (milliseconds, random part) pair for a kind of ID."""
+        millis = int(self.clock() * 1000)
+        with self._lock:
+            last_millis, last_random = self._last.get(kind, (-1, 0))
+            if millis <= last_millis:
+                millis, random_part = last_millis, last_random + 1
+                if random_part >= 2 ** bits:
+                    millis, random_part = last_millis + 1, secrets.randbits(bits - 1)
+            else:
+                # Leave headroom for incrementing within the millisecond
+                random_part = secrets.randbits(bits - 1)
+            self._last[kind] = (millis, random_part)
+        return millis, random_part
+
+    @staticmethod
+    def _encode(value: int, chars: int) -> str:
+        """Encode an integer as a fixed number of base32 characters."""
+        encoded = []
+        for _ in range(chars):
+            encoded.append(ALPHABET[value & 31])
+            value >>= 5
+        return ''.join(reversed(encoded))
+
+    def _format(self, body: str) -> str:
+        """Add the prefix and group separators to a token body."""
+        if self.group:
+            body = '-'.join(body[i:i + self.group] for i in range(0, len(body), self.group))
+        return self.prefix + body
+
+
+# Allocator used by WorkflowSession defaults and backends unless configured
+DEFAULT_ALLOCATOR = TokenAllocator()
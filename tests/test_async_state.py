@@ -0,0 +1,117 @@
+"""Tests for the asyncio state backends."""
+
+import asyncio
+import threading
+import pytest
+
+from hexflow.state import SQLiteBackend, SyncBackendAdapter, AsyncSQLiteBackend, WorkflowSession
+
+
+@pytest.fixture(params=["adapter", "native"])
+def make_backend(request, tmp_path):
+    """Return a factory creating each async backend; call it inside the event loop."""
+    def factory():
+        if request.param == "adapter":
+            return SyncBackendAdapter(SQLiteBackend(str(tmp_path / "sessions.db")), max_workers=4)
+        return AsyncSQLiteBackend(str(tmp_path / "sessions.db"))
+    return factory
+
+
+class TestAsyncStateBackend:
+    """Behaviour tests shared by the async backends."""
+    
+    def test_create_get_save_delete(self, make_backend):
+        """Test the basic session lifecycle through the async interface."""
+        async def scenario():
+            backend = make_backend()
+            session = await backend.create_session("test-flow")
+            session.set_step_data("step-one", {"name": "Alice"})
+            assert await backend.save_session(session) is True
+            
+            loaded = await backend.get_session_by_token(session.workflow_token)
+            assert loaded.get_step_data("step-one") == {"name": "Alice"}
+            assert await backend.delete_session(session.session_id) is True
+            assert await backend.get_session(session.session_id) is None
+            await backend.close()
+        
+        asyncio.run(scenario())
+    
+    def test_concurrent_saves_and_batched_access(self, make_backend):
+        """Test many concurrent writes, get_many, save_many and iteration."""
+        async def scenario():
+            backend = make_backend()
+            sessions = await asyncio.gather(*(backend.create_session("test-flow") for _ in range(50)))
+            
+            for session in sessions:
+                session.set_status("completed")
+            assert await backend.save_many(sessions) is True
+            
+            found = await backend.get_many([s.session_id for s in sessions[:10]] + ["missing"])
+            assert set(found) == {s.session_id for s in sessions[:10]}
+            assert await backend.count_sessions(status="completed") == 50
+            assert len([s async for s in backend.iter_sessions(page_size=7)]) == 50
+            assert (await backend.get_stats())['total_sessions'] == 50
+            await backend.close()
+        
+        asyncio.run(scenario())
+    
+    def test_create_with_token_in_use_fails(self, make_backend):
+        """Test create_session raises when an explicit token is taken."""
+        async def scenario():
+            backend = make_backend()
+            await backend.create_session("test-flow", workflow_token="WF-TAKEN")
+            with pytest.raises(RuntimeError, match="WF-TAKEN"):
+                await backend.create_session("test-flow", workflow_token="WF-TAKEN")
+            assert await backend.count_sessions() == 1
+            await backend.close()
+        
+        asyncio.run(scenario())
+    
+    def test_failed_write_does_not_affect_batch(self, make_backend):
+        """Test a failing save is reported without losing other writes."""
+        async def scenario():
+            backend = make_backend()
+            await backend.create_session("test-flow", workflow_token="WF-TAKEN")
+            clash = WorkflowSession(workflow_name="test-flow", workflow_token="WF-TAKEN")
+            others = [WorkflowSession(workflow_name="test-flow") for _ in range(5)]
+            
+            results = await asyncio.gather(backend.save_session(clash),
+                                           *(backend.save_session(s) for s in others))
+            assert results == [False] + [True] * 5
+            assert await backend.count_sessions() == 6
+            await backend.close()
+        
+        asyncio.run(scenario())
+
+
+class TestAsyncSQLiteBackend:
+    """Tests specific to the native asyncio SQLite backend."""
+    
+    def test_binary_codec_encodes_off_the_event_loop(self, tmp_path, monkeypatch):
+        """Test sessions are encoded, and new codec terms stored, on the writer thread."""
+        encoding_threads = []
+        
+        async def scenario():
+            backend = AsyncSQLiteBackend(str(tmp_path / "sessions.db"), codec="binary")
+            session_params = backend._schema._session_params
+            
+            def recording(session):
+                encoding_threads.append(threading.current_thread())
+                return session_params(session)
+            
+            monkeypatch.setattr(backend._schema, "_session_params", recording)
+            session = await backend.create_session("test-flow")
+            session.set_step_data("step-one", {"new_field": "Alice"})
+            assert await backend.save_session(session) is True
+            others = [await backend.create_session("test-flow") for _ in range(3)]
+            for other in others:
+                other.set_step_data("step-two", {"another_field": "Bob"})
+            assert await backend.save_many(others) is True
+            
+            loaded = await backend.get_session(session.session_id)
+            assert loaded.get_step_data("step-one") == {"new_field": "Alice"}
+            await backend.close()
+        
+        asyncio.run(scenario())
+        assert encoding_threads and all(thread is not threading.main_thread() for thread in encoding_threads)
+        assert {thread.name for thread in encoding_threads} == {"hexflow-sqlite-write"}
@@ -0,0 +1,101 @@
+"""Tests for bulk workflow ingestion."""
+
+import io
+import json
+import pytest
+
+from hexflow.runner import Router
+from hexflow.runner.ingest import BulkIngester, flow_order
+from hexflow.skeletons.casa.app import CasaApp
+from hexflow.state import SQLiteBackend
+
+from .test_router import DAG_YAML
+
+
+class NameForm(CasaApp):
+    """Form app validating the first step."""
+    
+    def setup_form(self):
+        return {
+            'title': 'Your name',
+            'fields': [{'name': 'full_name', 'type': 'text', 'required': True}],
+            'validation': {'full_name': {'min_length': 2}},
+            'submit_text': 'Continue'
+        }
+
+
+@pytest.fixture
+def router(tmp_path):
+    """Create a router with an in-process form app for the first step."""
+    (tmp_path / "test-flow.dag").write_text(DAG_YAML)
+    router = Router(dag_directory=str(tmp_path), state_backend=SQLiteBackend(str(tmp_path / "sessions.db")))
+    router.register_app(NameForm("step-one", "localhost", 8001))
+    return router
+
+
+def ndjson(*records):
+    """Encode records as NDJSON lines."""
+    return [json.dumps(record) + '\n' for record in records]
+
+
+class TestBulkIngester:
+    """Test suite for BulkIngester."""
+    
+    def test_flow_order(self, router):
+        """Test apps are ordered by following the flow from the entry point."""
+        assert flow_order(router.dag) == ['step-one', 'step-two', 'confirmation']
+    
+    def test_ingest_valid_and_invalid_records(self, router):
+        """Test valid records become sessions and invalid ones are reported."""
+        ingester = BulkIngester(router.dag, router.state_backend, router.apps, batch_size=2, workers=2)
+        lines = ndjson(
+            {'steps': {'step-one': {'full_name': 'Alice'}, 'step-two': {'age': 30}}},
+            {'steps': {'step-one': {'full_name': 'B'}}},
+            {'steps': {'step-one': {'full_name': 'Carol'}}, 'status': 'in_progress'},
+            {'steps': {'unknown': {}}},
+        ) + ['\n', 'not json\n', json.dumps({'steps': {'step-one': {'full_name': 'Dan'}},
+                                              'workflow_token': 'WF-DAN'}) + '\n']
+        report = io.StringIO()
+        
+        result = ingester.ingest(lines, report)
+        
+        assert (result.ingested, result.failed) == (3, 3)
+        assert [error['line'] for error in result.errors] == [2, 4, 6]
+        assert 'full_name' in result.errors[0]['errors']['step-one']
+        
+        outcomes = [json.loads(line) for line in report.getvalue().splitlines()]
+        assert [outcome['status'] for outcome in outcomes] == [
+            'ingested', 'failed', 'ingested', 'failed', 'failed', 'ingested']
+        
+        backend = router.state_backend
+        alice = backend.get_session_by_token(outcomes[0]['workflow_token'])
+        assert alice.status == 'completed' and alice.current_step == 'confirmation'
+        assert alice.get_step_data('step-two') == {'age': '30'}
+        carol = backend.get_session_by_token(outcomes[2]['workflow_token'])
+        assert carol.status == 'in_progress' and carol.current_step == 'step-two'
+        assert backend.get_session_by_token('WF-DAN').get_step_data('step-one') == {'full_name': 'Dan'}
+    
+    def test_taken_token_reported(self, router):
+        """Test a record reusing an existing workflow token fails alone."""
+        router.state_backend.create_session('test-flow', workflow_token='WF-TAKEN')
+        ingester = BulkIngester(router.dag, router.state_backend, router.apps)
+        
+        result = ingester.ingest(ndjson(
+            {'steps': {'step-one': {'full_name': 'Alice'}}, 'workflow_token': 'WF-TAKEN'},
+            {'steps': {'step-one': {'full_name': 'Bob'}}},
+        ))
+        
+        assert (result.ingested, result.failed) == (1, 1)
+        assert 'already in use' in result.errors[0]['errors']['workflow_token']
+    
+    def test_ingest_endpoint(self, router):
+        """Test the router's /api/ingest endpoint accepts an NDJSON body."""
+        body = ''.join(ndjson({'steps': {'step-one': {'full_name': 'Alice'}}},
+                              {'steps': {'step-one': {}}}))
+        
+        response = router.app.test_client().post('/api/ingest', data=body,
+                                                  content_type='application/x-ndjson')
+        
+        assert response.get_json()['ingested'] == 1
+        assert response.get_json()['errors'][0]['line'] == 2
+        assert router.state_backend.count_sessions('test-flow', 'completed') == 1
@@ -1,5 +1,8 @@
 """Tests for the hexflow launcher functionality."""
 
+import os
+import subprocess
+import sys
 import pytest
 from pathlib import Path
 from unittest.mock import Mock, patch
@@ -60,4 +63,51 @@ class TestAppLauncher:
         
         launcher = AppLauncher(str(tmp_path))
         apps = launcher.discover_apps()
-        assert "apps/sub-app" in apps
\ No newline at end of file
+        assert "apps/sub-app" in apps
+
+
+def import_times(*args):
+    """Run python -X importtime and return {module: cumulative microseconds}."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                            capture_output=True, text=True, env=env, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+class TestLazyImports:
+    """Import-time regression tests: commands that don't serve traffic stay light."""
+    
+    HEAVY_MODULES = ['flask', 'werkzeug', 'jinja2', 'yaml', 'asyncio', 'hexflow.runner.router',
+                     'hexflow.state.sqlite_backend']
+    
+    @pytest.mark.parametrize('command', [['--help'], ['init', '{tmp_path}']])
+    def test_cli_does_not_import_server_stack(self, command, tmp_path):
+        """Test hexflow --help and init load neither Flask, YAML nor the state backends."""
+        command = [arg.format(tmp_path=tmp_path) for arg in command]
+        times = import_times('-m', 'hexflow.launcher.cli', *command)
+        
+        assert 'hexflow.launcher' in times
+        assert [module for module in self.HEAVY_MODULES if module in times] == []
+        # Generous bound; the eager imports took about 300ms
+        assert times['hexflow.launcher'] < 100_000
+    
+    def test_package_exports_load_on_first_use(self):
+        """Test the package __init__ modules resolve their exports lazily."""
+        times = import_times('-c', 'import hexflow, hexflow.runner, hexflow.state, hexflow.skeletons')
+        assert [module for module in self.HEAVY_MODULES if module in times] == []
+        
+        import hexflow
+        from hexflow.runner import Router
+        from hexflow.state import SQLiteBackend
+        assert hexflow.runner.Router is Router
+        assert SQLiteBackend.__module__ == 'hexflow.state.sqlite_backend'
+        assert hexflow.skeletons.casa.app.CasaApp.__name__ == 'CasaApp'
+        assert 'SQLiteBackend' in dir(hexflow.state)
+        with pytest.raises(AttributeError):
+            hexflow.state.NoSuchBackend
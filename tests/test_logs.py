@@ -0,0 +1,113 @@
+"""Tests for hexflow's structured, queue-based logging."""
+
+import io
+import json
+import logging
+
+import pytest
+
+from hexflow.logs import (configure_from_settings, configure_logging, get_logger, log_event, logging_configured,
+                          stop_logging)
+
+
+@pytest.fixture
+def stream():
+    """Log into a buffer, restoring the default logging afterwards."""
+    buffer = io.StringIO()
+    yield buffer
+    stop_logging()
+
+
+def lines(stream):
+    """Stop the background writer so every queued record is written, and return the lines."""
+    stop_logging()
+    return stream.getvalue().splitlines()
+
+
+class TestLogging:
+    """Test suite for configure_logging and log_event."""
+
+    def test_logfmt_records(self, stream):
+        """Test events are written as logfmt lines with their fields."""
+        configure_logging(stream=stream)
+        assert logging_configured()
+        log_event(get_logger('router'), logging.INFO, 'workflow_started', workflow_token='ABCD-EFGH',
+                  workflow='Apply now', attempts=2)
+
+        [line] = lines(stream)
+        assert line.startswith('time=')
+        assert ('level=info logger=hexflow.router event=workflow_started workflow_token=ABCD-EFGH '
+                'workflow="Apply now" attempts=2') in line
+        assert not logging_configured()
+
+    def test_json_records_with_exception(self, stream):
+        """Test JSON lines carry the fields and the traceback."""
+        configure_logging(fmt='json', stream=stream)
+        try:
+            raise ValueError('bad input')
+        except ValueError as e:
+            log_event(get_logger('jobs'), logging.ERROR, 'job_worker_error', error=str(e), exc_info=e)
+
+        [record] = [json.loads(line) for line in lines(stream)]
+        assert record['logger'] == 'hexflow.jobs' and record['event'] == 'job_worker_error'
+        assert record['error'] == 'bad input'
+        assert 'ValueError: bad input' in record['exception']
+
+    def test_levels_per_app(self, stream):
+        """Test levels are set per component and app, and skipped events are never formatted."""
+        configure_logging(level='INFO', levels={'router': 'WARNING', 'details-form': 'DEBUG'}, stream=stream)
+
+        class Unprintable:
+            def __str__(self):
+                raise AssertionError('formatted a skipped event')
+
+        log_event(get_logger('router'), logging.INFO, 'workflow_started', value=Unprintable())
+        log_event(get_logger('router'), logging.WARNING, 'job_queue_disabled')
+        log_event(get_logger('details-form'), logging.DEBUG, 'validation_errors', fields=['age', 'name'])
+        log_event(get_logger('confirmation'), logging.DEBUG, 'validation_errors')
+
+        output = lines(stream)
+        assert [line.split(' event=')[1].split()[0] for line in output] == ['job_queue_disabled',
+                                                                            'validation_errors']
+        assert 'logger=hexflow.app.details-form' in output[1] and 'fields=age,name' in output[1]
+        assert get_logger('router').level == logging.NOTSET
+
+    def test_sampling(self, stream):
+        """Test high-volume events are sampled, with settings overriding the default rate."""
+        configure_logging(sampling={'asset_served': 3}, stream=stream)
+        logger = get_logger('gds-form')
+        for _ in range(9):
+            log_event(logger, logging.INFO, 'asset_served')
+        for _ in range(4):
+            log_event(logger, logging.INFO, 'workflow_started', sample=2)
+
+        output = lines(stream)
+        assert sum('event=asset_served sample_rate=3' in line for line in output) == 3
+        assert sum('event=workflow_started sample_rate=2' in line for line in output) == 2
+
+    def test_configure_from_settings(self, tmp_path, capsys):
+        """Test LOG_LEVEL, LOG_LEVELS and LOG_FORMAT are read from settings.py."""
+        (tmp_path / 'settings.py').write_text("LOG_LEVEL = 'WARNING'\n"
+                                              "LOG_LEVELS = {'launcher': 'info'}\n"
+                                              "LOG_FORMAT = 'json'\n")
+        configure_from_settings(str(tmp_path))
+        log_event(get_logger('launcher'), logging.INFO, 'apps_launched', count=3)
+        log_event(get_logger('router'), logging.INFO, 'workflow_started')
+        stop_logging()
+
+        records = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+        assert [(record['event'], record['count']) for record in records] == [('apps_launched', 3)]
+
+    def test_fields_in_message_until_configured(self, caplog):
+        """Test events logged before configure_logging keep their fields in the message."""
+        log_event(get_logger('router'), logging.WARNING, 'job_queue_disabled', reason='no sqlite', attempts=2)
+        log_event(get_logger('router'), logging.INFO, 'workflow_started')
+
+        [record] = caplog.records
+        assert record.getMessage() == 'job_queue_disabled reason="no sqlite" attempts=2'
+
+    def test_unknown_format(self):
+        """Test an unknown log format is rejected."""
+        with pytest.raises(ValueError):
+            configure_logging(fmt='xml')
+        assert not logging_configured()
@@ -0,0 +1,978 @@
+"""Tests for the hexflow router."""
+
+import datetime
+import json
+import threading
+import time
+import pytest
+
+from hexflow.runner import Router, WorkflowDataReader, DAGParser
+from hexflow.runner.api import WorkflowAPI
+from hexflow.runner.idempotency import IdempotencyCache
+from hexflow.skeletons.casa.app import CasaApp
+from hexflow.skeletons.processor.app import ProcessorApp
+from hexflow.state import SQLiteBackend, SessionConflictError
+
+
+DAG_YAML = """
+name: "test-flow"
+description: "Three step test workflow"
+
+apps:
+  - name: "step-one"
+    port: 8001
+    entry_point: true
+  - name: "step-two"
+    port: 8002
+  - name: "confirmation"
+    port: 8003
+
+flow:
+  - from: "step-one"
+    to: "step-two"
+    trigger: "completion"
+  - from: "step-two"
+    to: "confirmation"
+    trigger: "completion"
+
+data_mapping:
+  - from: "step-one"
+    to: "step-two"
+    fields: ["full_name"]
+  - from: "step-two"
+    to: "confirmation"
+    fields: "*"
+
+config:
+  timeout: 300
+  retry_attempts: 3
+  parallel_execution: false
+"""
+
+
+@pytest.fixture
+def router(tmp_path):
+    """Create a router for a three step workflow."""
+    (tmp_path / "test-flow.dag").write_text(DAG_YAML)
+    backend = SQLiteBackend(str(tmp_path / "sessions.db"))
+    return Router(dag_directory=str(tmp_path), state_backend=backend)
+
+
+@pytest.fixture
+def client(router):
+    """Create a Flask test client for the router."""
+    return router.app.test_client()
+
+
+def start_workflow(router, client):
+    """Start a workflow and return its session."""
+    response = client.get('/start')
+    assert response.status_code == 200
+    return router.state_backend.list_sessions()[0]
+
+
+class TestRouter:
+    """Test suite for Router workflow transitions."""
+    
+    def test_start_creates_session_at_entry_point(self, router, client):
+        """Test /start creates a session positioned at the entry point."""
+        session = start_workflow(router, client)
+        
+        assert session.current_step == "step-one"
+        assert session.workflow_name == "test-flow"
+    
+    def test_next_saves_data_and_passes_mapped_fields(self, router, client):
+        """Test /next stores step data and forwards only mapped fields."""
+        session = start_workflow(router, client)
+        
+        response = client.post('/next', data={
+            'from': 'step-one', 'workflow_token': session.workflow_token,
+            'full_name': 'Alice', 'secret': 'hidden'
+        })
+        
+        body = response.get_data(as_text=True)
+        assert 'name="full_name" value="Alice"' in body
+        assert 'secret' not in body
+        stored = router.state_backend.get_session_by_token(session.workflow_token)
+        assert stored.current_step == "step-two"
+        assert stored.get_step_data("step-one")['full_name'] == 'Alice'
+    
+    def test_star_mapping_passes_flattened_session_data(self, router, client):
+        """Test "*" mappings forward the session's flattened view."""
+        session = start_workflow(router, client)
+        token = session.workflow_token
+        
+        client.post('/next', data={'from': 'step-one', 'workflow_token': token,
+                                   'full_name': 'Alice', 'plan': 'basic'})
+        response = client.post('/next', data={'from': 'step-two', 'workflow_token': token,
+                                               'plan': 'premium'})
+        
+        body = response.get_data(as_text=True)
+        assert 'name="full_name" value="Alice"' in body
+        assert 'name="plan" value="basic"' in body
+        assert 'name="step-two_plan" value="premium"' in body
+        stored = router.state_backend.get_session_by_token(token)
+        assert dict(router._get_data_for_app(stored, 'step-two', 'confirmation')) == dict(stored.get_all_data())
+    
+    def test_last_step_completes_workflow(self, router, client):
+        """Test leaving the final app marks the session completed."""
+        session = start_workflow(router, client)
+        
+        client.post('/next', data={'from': 'step-one', 'workflow_token': session.workflow_token})
+        client.post('/next', data={'from': 'step-two', 'workflow_token': session.workflow_token})
+        response = client.post('/next', data={'from': 'confirmation',
+                                              'workflow_token': session.workflow_token})
+        
+        assert response.status_code == 200
+        assert router.state_backend.get_session_by_token(session.workflow_token).status == 'completed'
+    
+    def test_next_accepts_typed_token_and_rejects_typos(self, router, client):
+        """Test hand-typed tokens are normalised and checksum failures rejected."""
+        session = start_workflow(router, client)
+        typed = session.workflow_token.lower().replace('-', '').replace('wf', 'wf-', 1)
+        
+        response = client.post('/next', data={'from': 'step-one', 'workflow_token': typed})
+        assert response.status_code == 200
+        assert router.state_backend.get_session_by_token(session.workflow_token).current_step == "step-two"
+        
+        last = session.workflow_token[-2]
+        mistyped = session.workflow_token[:-2] + ('0' if last != '0' else '1') + session.workflow_token[-1]
+        response = client.post('/next', data={'from': 'step-two', 'workflow_token': mistyped})
+        assert response.status_code == 400
+        assert 'typos' in response.get_data(as_text=True)
+    
+    def test_concurrent_hops_on_one_token(self, router, client):
+        """Stress test: concurrent hops on one session never lose an update."""
+        session = start_workflow(router, client)
+        token = session.workflow_token
+        threads_per_step = 8
+        barrier = threading.Barrier(threads_per_step * 2)
+        results = []
+        
+        def hop(from_app, data):
+            own_client = router.app.test_client()
+            barrier.wait()
+            response = own_client.post('/next', data=dict(data, **{'from': from_app, 'workflow_token': token}))
+            results.append((from_app, response.status_code))
+        
+        # Double submits of step-one race hops submitting step-two
+        threads = [threading.Thread(target=hop, args=('step-one', {'full_name': 'Alice'}))
+                   for _ in range(threads_per_step)]
+        threads += [threading.Thread(target=hop, args=('step-two', {'age': '42'}))
+                    for _ in range(threads_per_step)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert {status for _, status in results} <= {200, 409}
+        stored = router.state_backend.get_session_by_token(token)
+        saved = sum(1 for _, status in results if status == 200)
+        # Every successful hop is exactly one compare-and-swap save
+        assert stored.version == session.version + saved
+        for from_app, data in (('step-one', {'full_name': 'Alice'}), ('step-two', {'age': '42'})):
+            if (from_app, 200) in results:
+                assert data.items() <= stored.get_step_data(from_app).items()
+    
+    def test_conflicting_step_data_returns_409(self, router, client):
+        """Test different data submitted concurrently for one step is a conflict."""
+        session = start_workflow(router, client)
+        backend = router.state_backend
+        update = router._hop_update('step-one', {'full_name': 'Bob'})
+        
+        stale = backend.get_session_by_token(session.workflow_token)
+        update(stale)
+        client.post('/next', data={'from': 'step-one', 'workflow_token': session.workflow_token,
+                                   'full_name': 'Alice'})
+        
+        fresh = backend.get_session_by_token(session.workflow_token)
+        with pytest.raises(SessionConflictError):
+            update(fresh)
+    
+    def test_failed_saves_return_503(self, router, client, monkeypatch):
+        """Test a save failing for a reason other than a conflict is reported, not raised."""
+        session = start_workflow(router, client)
+        monkeypatch.setattr(router.state_backend, 'save_session', lambda workflow_session: False)
+        
+        response = client.post('/next', data={'from': 'step-one', 'workflow_token': session.workflow_token,
+                                              'full_name': 'Alice'})
+        assert response.status_code == 503
+        assert client.get('/start').status_code == 503
+        assert client.post('/api/workflows').status_code == 503
+    
+    def test_repeat_submission_replays_response(self, router, client, monkeypatch):
+        """Test a resubmitted form replays the first response without the backend."""
+        session = start_workflow(router, client)
+        form = {'from': 'step-one', 'workflow_token': session.workflow_token,
+                'full_name': 'Alice', 'idempotency_key': 'key-1'}
+        
+        first = client.post('/next', data=form)
+        saved = router.state_backend.get_session_by_token(session.workflow_token)
+        assert 'idempotency_key' not in saved.get_step_data('step-one')
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("backend touched by a repeat submission")
+        monkeypatch.setattr(router.state_backend, 'update_session', fail)
+        monkeypatch.setattr(router.state_backend, 'get_session_by_token', fail)
+        
+        repeat = client.post('/next', data=form)
+        assert repeat.status_code == 200
+        assert repeat.get_data() == first.get_data()
+    
+    def test_concurrent_duplicates_advance_once(self, router, client):
+        """Test simultaneous submissions with one key save the hop once."""
+        session = start_workflow(router, client)
+        barrier = threading.Barrier(8)
+        bodies = []
+        
+        def submit():
+            own_client = router.app.test_client()
+            barrier.wait()
+            response = own_client.post('/next', data={
+                'from': 'step-one', 'workflow_token': session.workflow_token,
+                'full_name': 'Alice', 'idempotency_key': 'key-1'})
+            bodies.append((response.status_code, response.get_data()))
+        
+        threads = [threading.Thread(target=submit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(set(bodies)) == 1 and bodies[0][0] == 200
+        stored = router.state_backend.get_session_by_token(session.workflow_token)
+        assert stored.version == session.version + 1
+    
+    def test_failed_submission_is_not_replayed(self, router, client):
+        """Test a key whose request failed can be retried."""
+        form = {'from': 'step-one', 'workflow_token': 'WF-MISSING', 'idempotency_key': 'key-1'}
+        assert client.post('/next', data=form).status_code == 404
+        
+        session = start_workflow(router, client)
+        form['workflow_token'] = session.workflow_token
+        assert client.post('/next', data=form).status_code == 200
+    
+    def test_reference_handoff_posts_only_token(self, router, client):
+        """Test reference handoff keeps mapped data out of the handoff page."""
+        router.dag.config['data_handoff'] = 'reference'
+        session = start_workflow(router, client)
+        
+        response = client.post('/next', data={
+            'from': 'step-one', 'workflow_token': session.workflow_token,
+            'full_name': 'Alice', 'notes': 'x' * 5000
+        })
+        
+        body = response.get_data(as_text=True)
+        assert 'name="data_handoff" value="reference"' in body
+        assert 'Alice' not in body and 'notes' not in body
+    
+    def test_data_endpoint_enforces_mapping(self, router, client):
+        """Test /data only returns fields the DAG maps into the app."""
+        session = start_workflow(router, client)
+        token = session.workflow_token
+        client.post('/next', data={'from': 'step-one', 'workflow_token': token,
+                                   'full_name': 'Alice', 'secret': 'hidden'})
+        
+        assert client.get(f'/data/step-two?workflow_token={token}').get_json() == {'full_name': 'Alice'}
+        reader = WorkflowDataReader(router.dag, router.state_backend)
+        assert reader.read(token, 'step-two') == {'full_name': 'Alice'}
+        assert client.get(f'/data/step-one?workflow_token={token}').get_json() == {}
+        confirmation = client.get('/data/confirmation', headers={'X-Workflow-Token': token}).get_json()
+        assert confirmation['secret'] == 'hidden'
+        
+        assert client.get(f'/data/unknown?workflow_token={token}').status_code == 404
+        assert client.get('/data/step-two?workflow_token=WF-MISSING').status_code == 404
+        assert client.get('/data/step-two').status_code == 400
+    
+    def test_stats_endpoint(self, router, client):
+        """Test /stats reports backend statistics."""
+        start_workflow(router, client)
+        
+        stats = client.get('/stats').get_json()
+        assert stats['total_sessions'] == 1
+        assert stats['status_counts'] == {'in_progress': 1}
+
+
+class TestWorkflowAPI:
+    """Test suite for the router's JSON API."""
+    
+    @pytest.fixture
+    def api_router(self, router):
+        """Register an in-process form app for the first step."""
+        class StepOne(CasaApp):
+            def setup_form(self):
+                return {
+                    'title': 'Your name',
+                    'fields': [{'name': 'full_name', 'type': 'text', 'required': True}],
+                    'validation': {'full_name': {'min_length': 2}},
+                    'submit_text': 'Continue'
+                }
+        
+        router.register_app(StepOne("step-one", "localhost", 8001))
+        return router
+    
+    def test_complete_workflow_with_json(self, api_router, client):
+        """Test a machine client completes a workflow in one request per step."""
+        started = client.post('/api/workflows')
+        assert started.status_code == 201
+        workflow = started.get_json()
+        token = workflow['workflow_token']
+        assert workflow['step']['app'] == 'step-one'
+        assert workflow['step']['form']['fields'][0]['name'] == 'full_name'
+        
+        response = client.post(f'/api/workflows/{token}/steps/step-one', json={'full_name': 'Alice'})
+        assert response.status_code == 200
+        workflow = response.get_json()
+        assert workflow['current_step'] == 'step-two'
+        assert workflow['step'] == {'app': 'step-two', 'form': None, 'inputs': {'full_name': 'Alice'}}
+        
+        client.post(f'/api/workflows/{token}/steps/step-two', json={'age': 30})
+        response = client.post(f'/api/workflows/{token}/steps/confirmation', json={})
+        assert response.get_json()['status'] == 'completed'
+        assert response.get_json()['step'] is None
+        
+        stored = api_router.state_backend.get_session_by_token(token)
+        assert stored.get_step_data('step-two') == {'age': '30'}
+        assert client.get(f'/api/workflows/{token}').get_json()['status'] == 'completed'
+    
+    def test_step_validated_with_app_rules(self, api_router, client):
+        """Test submissions are validated in-process by the registered app."""
+        token = client.post('/api/workflows').get_json()['workflow_token']
+        
+        response = client.post(f'/api/workflows/{token}/steps/step-one', json={'full_name': 'A'})
+        assert response.status_code == 422
+        assert 'full_name' in response.get_json()['errors']
+        assert api_router.state_backend.get_session_by_token(token).current_step == 'step-one'
+    
+    def test_only_current_step_accepted(self, api_router, client):
+        """Test out-of-order submissions conflict and retries replay."""
+        token = client.post('/api/workflows').get_json()['workflow_token']
+        
+        assert client.post(f'/api/workflows/{token}/steps/step-two', json={}).status_code == 409
+        
+        headers = {'Idempotency-Key': 'key-1'}
+        first = client.post(f'/api/workflows/{token}/steps/step-one',
+                            json={'full_name': 'Alice'}, headers=headers)
+        retry = client.post(f'/api/workflows/{token}/steps/step-one',
+                            json={'full_name': 'Alice'}, headers=headers)
+        assert first.status_code == retry.status_code == 200
+        assert first.get_json() == retry.get_json()
+        assert client.post(f'/api/workflows/{token}/steps/step-one',
+                           json={'full_name': 'Alice'}).status_code == 409
+    
+    def test_unknown_workflow_and_app(self, api_router, client):
+        """Test missing sessions and apps return 404."""
+        token = client.post('/api/workflows').get_json()['workflow_token']
+        
+        assert client.get('/api/workflows/WF-MISSING').status_code == 404
+        assert client.post(f'/api/workflows/{token}/steps/unknown', json={}).status_code == 404
+        assert client.post(f'/api/workflows/{token}/steps/step-one', json=[1]).status_code == 400
+
+
+PROCESSOR_DAG_YAML = """
+name: "processing-flow"
+description: "Form, background check and confirmation"
+
+apps:
+  - name: "details"
+    port: 8001
+    entry_point: true
+  - name: "eligibility"
+    port: 8002
+    type: "processor"
+  - name: "confirmation"
+    port: 8003
+
+flow:
+  - from: "details"
+    to: "eligibility"
+    trigger: "completion"
+  - from: "eligibility"
+    to: "confirmation"
+    trigger: "completion"
+
+data_mapping:
+  - from: "details"
+    to: "eligibility"
+    fields: ["age"]
+  - from: "eligibility"
+    to: "confirmation"
+    fields: "*"
+"""
+
+
+class EligibilityCheck(ProcessorApp):
+    """Processor approving applicants aged 18 or over."""
+    
+    def process(self, session_data):
+        if session_data.get('age') == 'boom':
+            raise ValueError("age is not a number")
+        return {'eligible': 'yes' if int(session_data['age']) >= 18 else 'no'}
+
+
+def wait_for_status(backend, token, status, timeout=5):
+    """Poll a session until it reaches a status."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        workflow_session = backend.get_session_by_token(token)
+        if workflow_session.status == status:
+            return workflow_session
+        time.sleep(0.01)
+    raise AssertionError(f"Session did not reach {status}")
+
+
+class TestProcessorSteps:
+    """Test suite for routing through background processor apps."""
+    
+    @pytest.fixture
+    def router(self, tmp_path):
+        """Create a router with an in-process eligibility processor."""
+        (tmp_path / "processing-flow.dag").write_text(PROCESSOR_DAG_YAML)
+        router = Router(dag_directory=str(tmp_path), state_backend=SQLiteBackend(str(tmp_path / "sessions.db")))
+        processor = EligibilityCheck("eligibility", "localhost", 8002)
+        router.register_app(processor)
+        yield router
+        processor.stop()
+    
+    def test_session_parked_and_advanced(self, router, client):
+        """Test the session waits in processing and moves on when the job ends."""
+        token = start_workflow(router, client).workflow_token
+        
+        response = client.post('/next', data={'from': 'details', 'workflow_token': token, 'age': '30'})
+        assert 'Processing' in response.get_data(as_text=True)
+        
+        workflow_session = wait_for_status(router.state_backend, token, 'in_progress')
+        assert workflow_session.current_step == 'confirmation'
+        assert workflow_session.get_step_data('eligibility') == {'eligible': 'yes'}
+        
+        body = client.get(f'/wait?workflow_token={token}').get_data(as_text=True)
+        assert 'action="http://localhost:8003"' in body
+        assert 'name="eligible" value="yes"' in body
+    
+    def test_failed_job_fails_session(self, router, client):
+        """Test an exception in process() fails the session with its message."""
+        token = start_workflow(router, client).workflow_token
+        client.post('/next', data={'from': 'details', 'workflow_token': token, 'age': 'boom'})
+        
+        workflow_session = wait_for_status(router.state_backend, token, 'failed')
+        assert 'not a number' in workflow_session.metadata['processing_error']
+        assert client.get(f'/wait?workflow_token={token}').status_code == 500
+    
+    def test_completion_callback_over_http(self, router, client):
+        """Test processors in other processes report back to /jobs/<app>/complete."""
+        router.apps.clear()
+        workflow_session = router.state_backend.create_session('processing-flow')
+        workflow_session.current_step = 'eligibility'
+        workflow_session.set_status('processing')
+        router.state_backend.save_session(workflow_session)
+        token = workflow_session.workflow_token
+        
+        response = client.post('/jobs/eligibility/complete',
+                               json={'workflow_token': token, 'data': {'eligible': 'no'}})
+        assert response.get_json() == {'status': 'in_progress', 'current_step': 'confirmation'}
+        
+        # A late duplicate is rejected rather than applied twice
+        repeat = client.post('/jobs/eligibility/complete', json={'workflow_token': token, 'data': {}})
+        assert repeat.status_code == 409
+        assert client.post('/jobs/details/complete', json={'workflow_token': token}).status_code == 404
+    
+    def test_api_reports_processing(self, router, client):
+        """Test the JSON API returns 202 while a processor runs."""
+        token = client.post('/api/workflows').get_json()['workflow_token']
+        
+        response = client.post(f'/api/workflows/{token}/steps/details', json={'age': 12})
+        assert response.status_code == 202
+        assert response.get_json()['step']['app'] == 'eligibility'
+        
+        wait_for_status(router.state_backend, token, 'in_progress')
+        workflow = client.get(f'/api/workflows/{token}').get_json()
+        assert workflow['step']['inputs']['eligible'] == 'no'
+    
+    def test_api_polls_do_not_rerun_processor(self, router, client, monkeypatch):
+        """Test polling a processing workflow without a job queue leaves the running job alone."""
+        workflow_session = router.state_backend.create_session('processing-flow')
+        workflow_session.current_step = 'eligibility'
+        workflow_session.set_status('processing')
+        router.state_backend.save_session(workflow_session)
+        dispatched = []
+        monkeypatch.setattr(router, 'dispatch_job', dispatched.append)
+        
+        for _ in range(3):
+            assert client.get(f'/api/workflows/{workflow_session.workflow_token}').status_code == 202
+        assert dispatched == []
+
+    
+    def test_jobs_run_from_durable_queue(self, tmp_path):
+        """Test job_queue: true routes processor jobs through the job table."""
+        (tmp_path / "processing-flow.dag").write_text(PROCESSOR_DAG_YAML + "config:\n  job_queue: true\n")
+        backend = SQLiteBackend(str(tmp_path / "sessions.db"))
+        router = Router(dag_directory=str(tmp_path), state_backend=backend)
+        api = router.app.test_client()
+        token = api.post('/api/workflows').get_json()['workflow_token']
+        
+        # No processor registered yet: the job waits in the queue, once
+        assert api.post(f'/api/workflows/{token}/steps/details', json={'age': 40}).status_code == 202
+        assert api.get(f'/api/workflows/{token}').status_code == 202
+        assert router.job_queue.counts() == {'queued': 1}
+        
+        # A router started later with the processor picks the job up
+        restarted = Router(dag_directory=str(tmp_path), state_backend=SQLiteBackend(str(tmp_path / "sessions.db")))
+        processor = EligibilityCheck("eligibility", "localhost", 8002)
+        restarted.register_app(processor)
+        try:
+            workflow_session = wait_for_status(backend, token, 'in_progress')
+            assert workflow_session.get_step_data('eligibility') == {'eligible': 'yes'}
+            assert restarted.job_queue.counts() == {'done': 1}
+        finally:
+            restarted.stop()
+            processor.stop()
+
+
+PARALLEL_DAG_YAML = """
+name: "parallel-flow"
+description: "Form, concurrent background checks and review"
+
+apps:
+  - name: "details"
+    port: 8001
+    entry_point: true
+  - name: "identity-check"
+    port: 8002
+    type: "processor"
+  - name: "document-check"
+    port: 8003
+    type: "processor"
+  - name: "document-score"
+    port: 8004
+    type: "processor"
+  - name: "review"
+    port: 8005
+
+flow:
+  - from: "details"
+    to: "identity-check"
+    trigger: "completion"
+  - from: "details"
+    to: "document-check"
+    trigger: "completion"
+  - from: "identity-check"
+    to: "review"
+    trigger: "completion"
+  - from: "document-check"
+    to: "document-score"
+    trigger: "completion"
+  - from: "document-score"
+    to: "review"
+    trigger: "completion"
+
+data_mapping:
+  - from: "details"
+    to: "identity-check"
+    fields: ["full_name"]
+  - from: "details"
+    to: "document-check"
+    fields: ["full_name"]
+  - from: "document-check"
+    to: "document-score"
+    fields: ["pages"]
+  - from: "document-score"
+    to: "review"
+    fields: "*"
+
+config:
+  parallel_execution: true
+"""
+
+
+class BranchCheck(ProcessorApp):
+    """Processor that only finishes once the other branch is running too."""
+    
+    barrier = None
+    
+    def process(self, session_data):
+        if session_data.get('full_name') == 'boom':
+            raise ValueError("check failed")
+        if 'pages' in session_data:
+            return {'score': str(int(session_data['pages']) * 10)}
+        # Both branches must be running at once to pass the barrier
+        self.barrier.wait()
+        return {f'{self.name}_ok': 'yes', 'pages': '3'}
+
+
+class TestParallelBranches:
+    """Test suite for parallel_execution fan-out and join."""
+    
+    def make_router(self, tmp_path, dag_yaml=PARALLEL_DAG_YAML):
+        """Create a router with every branch processor registered."""
+        (tmp_path / "parallel-flow.dag").write_text(dag_yaml)
+        router = Router(dag_directory=str(tmp_path), state_backend=SQLiteBackend(str(tmp_path / "sessions.db")))
+        BranchCheck.barrier = threading.Barrier(2, timeout=5)
+        processors = [BranchCheck(name, "localhost", port) for name, port in
+                      (("identity-check", 8002), ("document-check", 8003), ("document-score", 8004))]
+        for processor in processors:
+            router.register_app(processor)
+        return router, processors
+    
+    @pytest.fixture
+    def router(self, tmp_path):
+        """Create a parallel-flow router."""
+        router, processors = self.make_router(tmp_path)
+        yield router
+        router.stop()
+        for processor in processors:
+            processor.stop()
+    
+    def test_branches_run_concurrently_and_join(self, router, client):
+        """Test a fan-out runs every branch at once and joins when all have finished."""
+        token = start_workflow(router, client).workflow_token
+        
+        response = client.post('/next', data={'from': 'details', 'workflow_token': token, 'full_name': 'Ann'})
+        assert 'Processing' in response.get_data(as_text=True)
+        
+        workflow_session = wait_for_status(router.state_backend, token, 'in_progress')
+        assert workflow_session.current_step == 'review'
+        assert workflow_session.get_step_data('identity-check') == {'identity-check_ok': 'yes', 'pages': '3'}
+        assert workflow_session.get_step_data('document-check') == {'document-check_ok': 'yes', 'pages': '3'}
+        assert workflow_session.get_step_data('document-score') == {'score': '30'}
+        assert 'pending_branches' not in workflow_session.metadata
+    
+    def test_failed_branch_fails_session(self, router, client):
+        """Test one failing branch fails the session and later results are ignored."""
+        token = start_workflow(router, client).workflow_token
+        client.post('/next', data={'from': 'details', 'workflow_token': token, 'full_name': 'boom'})
+        
+        workflow_session = wait_for_status(router.state_backend, token, 'failed')
+        assert 'check failed' in workflow_session.metadata['processing_error']
+    
+    def test_api_lists_pending_branches(self, router):
+        """Test the JSON API reports the branches a session is waiting for."""
+        workflow_session = router.state_backend.create_session('parallel-flow')
+        workflow_session.current_step = 'review'
+        workflow_session.add_metadata('pending_branches', ['identity-check', 'document-score'])
+        workflow_session.set_status('processing')
+        
+        description = WorkflowAPI(router).describe(workflow_session)
+        assert description['pending_branches'] == ['identity-check', 'document-score']
+        assert description['step']['app'] == 'review'
+    
+    def test_branches_through_job_queue(self, tmp_path):
+        """Test fan-out and join with jobs in the durable job queue."""
+        router, processors = self.make_router(
+            tmp_path, PARALLEL_DAG_YAML + "  job_queue: true\n  job_lease_seconds: 5\n")
+        try:
+            api = router.app.test_client()
+            token = api.post('/api/workflows').get_json()['workflow_token']
+            response = api.post(f'/api/workflows/{token}/steps/details', json={'full_name': 'Ann'})
+            assert response.status_code == 202
+            assert sorted(response.get_json()['pending_branches']) == ['document-check', 'identity-check']
+            
+            workflow_session = wait_for_status(router.state_backend, token, 'in_progress')
+            assert workflow_session.get_step_data('document-score') == {'score': '30'}
+            assert router.job_queue.counts() == {'done': 3}
+        finally:
+            router.stop()
+            for processor in processors:
+                processor.stop()
+    
+    def test_branch_validation(self, tmp_path):
+        """Test fan-outs must branch through processors only."""
+        dag_file = tmp_path / "parallel-flow.dag"
+        web_branch = PARALLEL_DAG_YAML.replace('port: 8002\n    type: "processor"', 'port: 8002')
+        dag_file.write_text(web_branch)
+        with pytest.raises(ValueError, match="identity-check must be a processor"):
+            DAGParser.parse_file(str(dag_file))
+        
+        # Without parallel_execution only the first successor runs
+        dag_file.write_text(web_branch.replace("parallel_execution: true", "parallel_execution: false"))
+        dag = DAGParser.parse_file(str(dag_file))
+        assert dag.get_branches('details') == ['identity-check']
+        assert dag.get_join('details') == 'review'
+
+
+class FlakyCheck(ProcessorApp):
+    """Processor that fails a set number of times before succeeding, or hangs."""
+    
+    failures = 0
+    hang = None
+    
+    def process(self, session_data):
+        self.calls.append(time.monotonic())
+        if self.hang is not None:
+            self.hang.wait(5)
+        if len(self.calls) <= self.failures:
+            raise RuntimeError(f"flaky failure {len(self.calls)}")
+        return {'eligible': 'yes'}
+
+
+class TestDeadlines:
+    """Test suite for config.timeout, per-app timeouts and retry_attempts."""
+    
+    def make_router(self, tmp_path, config, app_timeout=None, failures=0, hang=False):
+        """Create a processing-flow router with a flaky eligibility processor."""
+        dag_yaml = PROCESSOR_DAG_YAML
+        if app_timeout is not None:
+            dag_yaml = dag_yaml.replace('port: 8002\n    type: "processor"',
+                                        f'port: 8002\n    type: "processor"\n    timeout: {app_timeout}')
+        (tmp_path / "processing-flow.dag").write_text(dag_yaml + "config:\n" + config)
+        router = Router(dag_directory=str(tmp_path), state_backend=SQLiteBackend(str(tmp_path / "sessions.db")))
+        processor = FlakyCheck("eligibility", "localhost", 8002)
+        processor.calls = []
+        processor.failures = failures
+        processor.hang = threading.Event() if hang else None
+        router.register_app(processor)
+        return router, processor
+    
+    def stop(self, router, processor):
+        """Stop a router and its processor, releasing a hung job."""
+        if processor.hang is not None:
+            processor.hang.set()
+        router.stop()
+        processor.stop()
+    
+    def test_workflow_timeout(self, tmp_path):
+        """Test a hop after config.timeout times the session out instead of advancing."""
+        router, processor = self.make_router(tmp_path, "  timeout: 0.2\n")
+        try:
+            api = router.app.test_client()
+            started = api.get('/start')
+            assert 'name="workflow_deadline"' in started.get_data(as_text=True)
+            token = api.post('/api/workflows').get_json()['workflow_token']
+            assert api.get(f'/api/workflows/{token}').get_json()['deadline'] > time.time()
+            
+            time.sleep(0.25)
+            response = api.post(f'/api/workflows/{token}/steps/details', json={'age': 30})
+            assert response.status_code == 408
+            assert response.get_json()['status'] == 'timed_out'
+            assert response.get_json()['timed_out_step'] == 'details'
+            assert processor.calls == []
+            assert api.post(f'/api/workflows/{token}/steps/details', json={'age': 30}).status_code == 408
+            
+            # The browser's next hop is refused too, and the timeout is counted
+            assert api.post('/next', data={'from': 'details', 'workflow_token': token}).status_code == 408
+            assert api.get('/stats').get_json()['status_counts']['timed_out'] == 1
+        finally:
+            self.stop(router, processor)
+    
+    def test_hung_processor_times_out(self, tmp_path):
+        """Test a processor job still running at its app's timeout times the session out."""
+        router, processor = self.make_router(tmp_path, "  retry_attempts: 3\n", app_timeout=0.2, hang=True)
+        try:
+            api = router.app.test_client()
+            token = api.post('/api/workflows').get_json()['workflow_token']
+            assert api.post(f'/api/workflows/{token}/steps/details', json={'age': 30}).status_code == 202
+            
+            workflow_session = wait_for_status(router.state_backend, token, 'timed_out')
+            assert workflow_session.metadata['timed_out_step'] == 'eligibility'
+            # A deadline is not retried, and a late result is ignored
+            processor.hang.set()
+            time.sleep(0.1)
+            assert len(processor.calls) == 1
+            assert router.state_backend.get_session_by_token(token).status == 'timed_out'
+            assert api.get(f'/wait?workflow_token={token}').status_code == 408
+        finally:
+            self.stop(router, processor)
+    
+    def test_failed_job_retried_with_backoff(self, tmp_path):
+        """Test failed jobs run again with doubling delays up to retry_attempts."""
+        router, processor = self.make_router(tmp_path, "  retry_attempts: 2\n  retry_backoff: 0.05\n",
+                                             failures=2)
+        try:
+            api = router.app.test_client()
+            token = api.post('/api/workflows').get_json()['workflow_token']
+            api.post(f'/api/workflows/{token}/steps/details', json={'age': 30})
+            
+            workflow_session = wait_for_status(router.state_backend, token, 'in_progress')
+            assert workflow_session.get_step_data('eligibility') == {'eligible': 'yes'}
+            assert 'eligibility' not in workflow_session.metadata['processing_retries']
+            assert len(processor.calls) == 3
+            assert processor.calls[1] - processor.calls[0] >= 0.05
+            assert processor.calls[2] - processor.calls[1] >= 0.1
+        finally:
+            self.stop(router, processor)
+    
+    def test_retries_exhausted(self, tmp_path):
+        """Test a job failing more often than retry_attempts fails the session."""
+        router, processor = self.make_router(tmp_path, "  retry_attempts: 1\n  retry_backoff: 0.01\n",
+                                             failures=5)
+        try:
+            api = router.app.test_client()
+            token = api.post('/api/workflows').get_json()['workflow_token']
+            api.post(f'/api/workflows/{token}/steps/details', json={'age': 30})
+            
+            workflow_session = wait_for_status(router.state_backend, token, 'failed')
+            assert workflow_session.metadata['processing_error'] == 'eligibility: flaky failure 2'
+            assert len(processor.calls) == 2
+        finally:
+            self.stop(router, processor)
+    
+    def test_queue_jobs_retried_and_timed_out(self, tmp_path):
+        """Test the job queue retries failed jobs and times out jobs past their deadline."""
+        router, processor = self.make_router(
+            tmp_path, "  job_queue: true\n  retry_attempts: 2\n  retry_backoff: 0.01\n", failures=2)
+        try:
+            api = router.app.test_client()
+            token = api.post('/api/workflows').get_json()['workflow_token']
+            api.post(f'/api/workflows/{token}/steps/details', json={'age': 30})
+            
+            wait_for_status(router.state_backend, token, 'in_progress')
+            assert len(processor.calls) == 3
+            assert router.job_queue.counts() == {'done': 1}
+            
+            # A job whose deadline passed while queued never runs
+            late = router.state_backend.create_session('processing-flow')
+            late.current_step = 'eligibility'
+            late.set_status('processing')
+            router.state_backend.save_session(late)
+            router.job_queue.enqueue(late.workflow_token, 'eligibility', {'age': '30'}, deadline=time.time())
+            wait_for_status(router.state_backend, late.workflow_token, 'timed_out')
+            assert len(processor.calls) == 3
+        finally:
+            self.stop(router, processor)
+    
+    def test_dag_timeout_settings(self, tmp_path):
+        """Test timeout and retry_attempts are read from the config and per app."""
+        dag_file = tmp_path / "processing-flow.dag"
+        dag_file.write_text(PROCESSOR_DAG_YAML.replace(
+            'type: "processor"', 'type: "processor"\n    timeout: 5\n    retry_attempts: 4')
+            + "config:\n  timeout: 60\n  retry_attempts: 1\n")
+        dag = DAGParser.parse_file(str(dag_file))
+        assert dag.timeout == 60
+        assert dag.get_app_by_name('eligibility').timeout == 5
+        assert dag.get_retry_attempts('eligibility') == 4
+        assert dag.get_retry_attempts('details') == 1
+
+
+class TestDAGCache:
+    """Test suite for the compiled DAG cache."""
+    
+    @pytest.fixture
+    def yaml_parses(self, monkeypatch):
+        """Count YAML parses, starting with an empty in-memory cache."""
+        from hexflow.runner import dag_parser
+        monkeypatch.setattr(dag_parser, '_compiled', {})
+        parses = []
+        parse_yaml = dag_parser._parse_yaml
+        
+        def counting(raw):
+            parses.append(raw)
+            return parse_yaml(raw)
+        
+        monkeypatch.setattr(dag_parser, '_parse_yaml', counting)
+        return parses
+    
+    def test_dag_parsed_once_per_content(self, tmp_path, yaml_parses, monkeypatch):
+        """Test each file's YAML is parsed once and later loads use the compiled copy."""
+        from hexflow.runner import dag_parser
+        (tmp_path / "notes.dag").write_text("just: notes\n")
+        (tmp_path / "processing-flow.dag").write_text(PROCESSOR_DAG_YAML)
+        
+        dag_file = DAGParser.find_dag_file(str(tmp_path))
+        dag = DAGParser.parse_file(dag_file)
+        assert dag.name == 'processing-flow'
+        assert len(yaml_parses) == 2
+        
+        # A new process finds the compiled copy on disk
+        monkeypatch.setattr(dag_parser, '_compiled', {})
+        assert DAGParser.parse_file(dag_file) == dag
+        assert len(yaml_parses) == 2
+        assert len(list((tmp_path / "__pycache__").glob("processing-flow.*.dag.json"))) == 1
+        
+        # Cached definitions are not shared between callers
+        dag.config['timeout'] = 1
+        assert DAGParser.parse_file(dag_file).config == {}
+    
+    def test_edited_dag_replaces_cache(self, tmp_path, yaml_parses):
+        """Test a changed file is parsed again and its old compiled copy removed."""
+        dag_file = tmp_path / "processing-flow.dag"
+        dag_file.write_text(PROCESSOR_DAG_YAML)
+        DAGParser.parse_file(str(dag_file))
+        
+        dag_file.write_text(PROCESSOR_DAG_YAML.replace('name: "processing-flow"', 'name: "renamed-flow"'))
+        assert DAGParser.parse_file(str(dag_file)).name == 'renamed-flow'
+        assert len(yaml_parses) == 2
+        assert len(list((tmp_path / "__pycache__").glob("processing-flow.*.dag.json"))) == 1
+        
+        assert DAGParser.parse_file(str(dag_file), cache=False).name == 'renamed-flow'
+        assert len(yaml_parses) == 3
+
+    
+    def test_corrupt_cache_file_rebuilt(self, tmp_path, yaml_parses, monkeypatch):
+        """Test a truncated compiled copy is treated as a miss and written again."""
+        from hexflow.runner import dag_parser
+        dag_file = tmp_path / "processing-flow.dag"
+        dag_file.write_text(PROCESSOR_DAG_YAML)
+        dag = DAGParser.parse_file(str(dag_file))
+        cache_file, = (tmp_path / "__pycache__").glob("processing-flow.*.dag.json")
+        cache_file.write_text('{"name": "processing-')
+        
+        monkeypatch.setattr(dag_parser, '_compiled', {})
+        assert DAGParser.parse_file(str(dag_file)) == dag
+        assert len(yaml_parses) == 2
+        assert json.loads(cache_file.read_text())['name'] == 'processing-flow'
+    
+    def test_dag_with_dates_not_cached(self, tmp_path, yaml_parses):
+        """Test a DAG holding values JSON cannot store, such as dates, is loaded but not cached."""
+        from hexflow.runner.dag_parser import load_dag_data
+        dag_file = tmp_path / "processing-flow.dag"
+        dag_file.write_text("created: 2025-01-12\n" + PROCESSOR_DAG_YAML)
+        
+        assert load_dag_data(str(dag_file))['created'] == datetime.date(2025, 1, 12)
+        assert DAGParser.parse_file(str(dag_file)).name == 'processing-flow'
+        assert len(yaml_parses) == 2
+        assert not (tmp_path / "__pycache__").exists()
+
+
+class TestIdempotencyCache:
+    """Test suite for the router's idempotency cache."""
+    
+    def test_expired_entries_run_again(self):
+        """Test responses are only replayed within the TTL."""
+        cache = IdempotencyCache(ttl=0.05)
+        calls = []
+        handler = lambda: calls.append(1) or 'done'
+        
+        assert cache.run('key', handler) == 'done'
+        assert cache.run('key', handler) == 'done'
+        assert len(calls) == 1
+        
+        time.sleep(0.1)
+        cache.run('key', handler)
+        assert len(calls) == 2
+    
+    def test_bounded_size(self):
+        """Test the oldest responses are evicted beyond max_entries."""
+        cache = IdempotencyCache(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.run(key, lambda: key)
+        
+        assert cache.run('a', lambda: 'rerun') == 'rerun'
+        assert cache.run('c', lambda: 'rerun') == 'c'
+    
+    def test_repeat_outlasting_wait_not_run_again(self):
+        """Test a repeat still waiting at wait_timeout gets a 409 rather than running the handler."""
+        cache = IdempotencyCache(wait_timeout=0.05)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'done'
+        
+        original = threading.Thread(target=cache.run, args=('key', slow))
+        original.start()
+        started.wait(5)
+        body, status, headers = cache.run('key', slow)
+        assert status == 409 and 'Retry-After' in headers
+        
+        release.set()
+        original.join()
+        assert cache.run('key', slow) == 'done'
+        assert len(calls) == 1
+    
+    def test_only_successes_cached(self):
+        """Test error responses are not replayed."""
+        cache = IdempotencyCache()
+        cache.run('key', lambda: ('conflict', 409))
+        assert cache.run('key', lambda: 'ok') == 'ok'
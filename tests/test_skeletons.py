@@ -1,10 +1,15 @@
 """Tests for hexflow skeleton applications."""
 
+import re
 import pytest
 from unittest.mock import Mock, patch
+from flask import request
 
 from hexflow.skeletons.http_base.app import HTTPBaseApp
+from hexflow.skeletons.http_base.streaming import flush_chunks
 from hexflow.skeletons.casa.app import CasaApp
+from hexflow.skeletons.display.app import DisplayApp
+from hexflow.skeletons.processor.app import ProcessorApp
 
 
 class TestHTTPBaseApp:
@@ -23,6 +28,77 @@ class TestHTTPBaseApp:
         with patch.object(HTTPBaseApp, 'setup_routes') as mock_setup:
             app = HTTPBaseApp("test-app", "localhost", 8000)
             mock_setup.assert_called_once()
+    
+    class Receipt(HTTPBaseApp):
+        """App serving a page rendered only from the posted data."""
+        
+        def setup_routes(self):
+            self.renders = 0
+            
+            @self.app.route('/', methods=['GET', 'POST'])
+            def receipt():
+                page_data = dict(request.values)
+                return self.cached_response(page_data, lambda: self.render(page_data))
+        
+        def render(self, page_data):
+            self.renders += 1
+            return f"<p>{page_data.get('name', '')}</p>"
+    
+    def test_cached_response_answers_if_none_match(self):
+        """Test a GET with a matching If-None-Match gets a 304 without rendering."""
+        app = self.Receipt("receipt", "localhost", 8000)
+        client = app.app.test_client()
+        
+        response = client.get('/?name=Alice')
+        etag = response.headers['ETag']
+        assert response.status_code == 200 and response.get_data(as_text=True) == '<p>Alice</p>'
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+        
+        app.response_cache.clear()
+        response = client.get('/?name=Alice', headers={'If-None-Match': etag})
+        assert response.status_code == 304 and response.get_data() == b''
+        assert response.headers['ETag'] == etag
+        assert app.renders == 1
+        
+        # Other data has another ETag
+        response = client.get('/?name=Bob', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and response.headers['ETag'] != etag
+        assert app.renders == 2
+    
+    def test_cached_response_reuses_rendered_bodies(self):
+        """Test repeated views are served from the bounded LRU of rendered pages."""
+        app = self.Receipt("receipt", "localhost", 8000)
+        app.response_cache.max_entries = 2
+        client = app.app.test_client()
+        
+        for name in ('Alice', 'Alice', 'Bob', 'Alice'):
+            assert client.post('/', data={'name': name}).get_data(as_text=True) == f'<p>{name}</p>'
+        assert app.renders == 2
+        
+        # Carol evicts Bob, the least recently used page
+        client.post('/', data={'name': 'Carol'})
+        client.post('/', data={'name': 'Alice'})
+        client.post('/', data={'name': 'Bob'})
+        assert app.renders == 4
+        assert len(app.response_cache) == 2
+        
+        # A new page version changes every ETag
+        etag = client.get('/?name=Bob').headers['ETag']
+        app.page_version = '2'
+        assert client.get('/?name=Bob').headers['ETag'] != etag
+    
+    def test_flush_chunks_sends_head_first(self):
+        """Test streamed pages flush the head at once and buffer the rest."""
+        chunks = ['<html><head>', '<title>T</title>', '</head>', 'a' * 30, 'b' * 30, 'c']
+        assert list(flush_chunks(chunks, buffer_size=40)) == [
+            '<html><head><title>T</title></head>', 'a' * 30 + 'b' * 30, 'c']
+        assert list(flush_chunks(['a', 'b'])) == ['ab']
+    
+    def test_flush_chunks_finds_head_end_split_across_chunks(self):
+        """Test the head is flushed when </head> spans several chunks."""
+        chunks = ['<head><title>T</title></he', 'a', 'd>', '<body>', '</body>']
+        assert list(flush_chunks(chunks)) == ['<head><title>T</title></head>', '<body></body>']
+        assert list(flush_chunks(['<p>', '</', 'h', 'e', 'a', 'd', '>'])) == ['<p></head>']
 
 
 class TestCasaApp:
@@ -61,4 +137,231 @@ class TestCasaApp:
         app = TestCasaApp("test-form", "localhost", 8001)
         assert app.form_config['title'] == 'Test Form'
         assert len(app.form_config['fields']) == 1
-        assert app.form_config['fields'][0]['name'] == 'test'
\ No newline at end of file
+        assert app.form_config['fields'][0]['name'] == 'test'
+    
+    def test_form_carries_fresh_idempotency_key(self):
+        """Test each rendered form gets a new idempotency key for the router."""
+        class TestCasaApp(CasaApp):
+            def setup_form(self):
+                return {
+                    'title': 'Test Form',
+                    'fields': [{'name': 'full_name', 'type': 'text', 'required': True}],
+                    'validation': {},
+                    'submit_text': 'Submit'
+                }
+        
+        client = TestCasaApp("test-form", "localhost", 8001).app.test_client()
+        first = re.search(r'name="idempotency_key" value="([^"]+)"', client.get('/').get_data(as_text=True))
+        second = re.search(r'name="idempotency_key" value="([^"]+)"', client.get('/').get_data(as_text=True))
+        assert first and second and first.group(1) != second.group(1)
+        
+        # Re-rendering with validation errors keeps the submission's key
+        response = client.post('/', data={'action': 'submit', 'full_name': '',
+                                          'idempotency_key': first.group(1)})
+        assert f'name="idempotency_key" value="{first.group(1)}"' in response.get_data(as_text=True)
+        
+        # A valid submission forwards the key to the router
+        response = client.post('/', data={'action': 'submit', 'full_name': 'Alice',
+                                          'idempotency_key': first.group(1)})
+        assert f'name="idempotency_key" value="{first.group(1)}"' in response.get_data(as_text=True)
+    
+    def test_reference_handoff_prefills_from_data_reader(self):
+        """Test inputs passed by reference are read once, on first use."""
+        class TestCasaApp(CasaApp):
+            def setup_form(self):
+                return {
+                    'title': 'Test Form',
+                    'fields': [{'name': 'full_name', 'type': 'text'},
+                               {'name': 'email', 'type': 'email'}],
+                    'validation': {},
+                    'submit_text': 'Submit'
+                }
+        
+        app = TestCasaApp("test-form", "localhost", 8001)
+        app.data_reader = Mock()
+        app.data_reader.read.return_value = {'full_name': 'Alice'}
+        
+        response = app.app.test_client().post('/', data={'workflow_token': 'WF-TOKEN',
+                                                         'data_handoff': 'reference'})
+        
+        assert 'value="Alice"' in response.get_data(as_text=True)
+        app.data_reader.read.assert_called_once_with('WF-TOKEN', 'test-form')
+
+
+class TestDisplayApp:
+    """Test suite for DisplayApp skeleton."""
+    
+    def test_inline_handoff_shows_posted_data(self):
+        """Test data posted by the router is displayed."""
+        app = DisplayApp("confirmation", "localhost", 8003)
+        app.data_reader = Mock()
+        
+        response = app.app.test_client().post('/', data={'workflow_token': 'WF-TOKEN',
+                                                         'full_name': 'Alice'})
+        
+        assert 'Alice' in response.get_data(as_text=True)
+        assert 'WF-TOKEN' not in response.get_data(as_text=True)
+        app.data_reader.read.assert_not_called()
+    
+    def test_reference_handoff_reads_inputs(self):
+        """Test data passed by reference is read from the data reader."""
+        app = DisplayApp("confirmation", "localhost", 8003)
+        app.data_reader = Mock()
+        app.data_reader.read.return_value = {'full_name': 'Alice'}
+        
+        response = app.app.test_client().post('/', data={'workflow_token': 'WF-TOKEN',
+                                                         'data_handoff': 'reference'})
+        
+        assert 'Alice' in response.get_data(as_text=True)
+        app.data_reader.read.assert_called_once_with('WF-TOKEN', 'confirmation')
+    
+    class Greeting(DisplayApp):
+        """Display with one static and one data-bound section."""
+        
+        cache_static = True
+        
+        def setup_display(self, workflow_data=None):
+            workflow_data = workflow_data or {}
+            return {
+                'title': 'Done',
+                'sections': [
+                    {'title': 'Next steps', 'items': ['We will email you']},
+                    {'title': 'You', 'items': [{'label': 'Name', 'value': workflow_data.get('full_name', '')}]}
+                ],
+                'show_workflow_data': True,
+                'completion_message': 'Thank you!'
+            }
+        
+        def render_section(self, section):
+            self.rendered.append(section['title'])
+            return super().render_section(section)
+    
+    def test_static_sections_rendered_once(self):
+        """Test sections not depending on workflow data are rendered once per app."""
+        app = self.Greeting("confirmation", "localhost", 8003)
+        app.rendered = []
+        client = app.app.test_client()
+        
+        for name in ('Alice', 'Bob'):
+            body = client.post('/', data={'workflow_token': 'WF-TOKEN', 'full_name': name}).get_data(as_text=True)
+            assert f'<span class="data-value">{name}</span>' in body
+            assert 'We will email you' in body
+        # Pre-rendering renders both sections once; requests only the data-bound one
+        assert app.rendered == ['Next steps', 'You', 'You', 'You']
+        
+        # Without workflow data the whole page around the data is reused
+        body = client.post('/', data={'workflow_token': 'WF-TOKEN'}).get_data(as_text=True)
+        assert 'No workflow data available' in body and 'Thank you!' in body
+        assert app.rendered == ['Next steps', 'You', 'You', 'You']
+        
+        app.cache_static = False
+        client.post('/', data={'workflow_token': 'WF-TOKEN'})
+        assert app.rendered[4:] == ['Next steps', 'You']
+    
+    def test_repeat_views_revalidate(self):
+        """Test pages carry an ETag and a repeat view is not rendered again."""
+        app = self.Greeting("confirmation", "localhost", 8003)
+        app.rendered = []
+        client = app.app.test_client()
+        
+        first = client.post('/', data={'workflow_token': 'WF-TOKEN', 'full_name': 'Alice'})
+        again = client.post('/', data={'workflow_token': 'WF-TOKEN', 'full_name': 'Alice'})
+        assert again.get_data() == first.get_data()
+        assert app.rendered == ['Next steps', 'You', 'You']
+        
+        response = client.get('/?full_name=Alice', headers={'If-None-Match': first.headers['ETag']})
+        assert response.status_code == 304
+        assert app.rendered == ['Next steps', 'You', 'You']
+    
+    def test_streamed_page(self):
+        """Test a streamed page sends its head before rendering any data-bound section."""
+        app = self.Greeting("confirmation", "localhost", 8003)
+        app.rendered = []
+        client = app.app.test_client()
+        form = {'workflow_token': 'WF-TOKEN', 'full_name': 'Alice'}
+        expected = client.post('/', data=form).get_data(as_text=True)
+        
+        app.stream_responses = True
+        app.response_cache.clear()
+        app.rendered = []
+        response = client.post('/', data=form, buffered=False)
+        assert response.is_streamed and 'ETag' in response.headers
+        chunks = response.iter_encoded()
+        head = next(chunks).decode('utf-8')
+        assert '</head>' in head and 'Alice' not in head
+        assert app.rendered == []
+        body = b''.join(chunks).decode('utf-8')
+        assert app.rendered == ['You']
+        assert expected.endswith(body)
+        
+        # The page around the workflow data streams when it is all static
+        response = client.post('/', data={'workflow_token': 'WF-TOKEN'}, buffered=False)
+        assert 'No workflow data available' in response.get_data(as_text=True)
+    
+    def test_pages_not_cached_by_default(self):
+        """Test a display that has not opted in to caching is rendered for every request."""
+        class Numbered(DisplayApp):
+            def setup_display(self, workflow_data=None):
+                self.views = getattr(self, 'views', 0) + 1
+                return {'title': f'Reference {self.views}', 'sections': [], 'show_workflow_data': False,
+                        'completion_message': ''}
+        
+        client = Numbered("confirmation", "localhost", 8003).app.test_client()
+        first = client.post('/', data={'workflow_token': 'WF-ONE', 'full_name': 'Alice'})
+        second = client.post('/', data={'workflow_token': 'WF-TWO', 'full_name': 'Alice'})
+        assert 'Reference 1' in first.get_data(as_text=True)
+        assert 'Reference 2' in second.get_data(as_text=True)
+        assert 'ETag' not in second.headers
+    
+    def test_inline_template_without_display_html(self, tmp_path):
+        """Test the inline page template is used when display.html is missing."""
+        app = self.Greeting("confirmation", "localhost", 8003)
+        app.rendered = []
+        app.app.template_folder = str(tmp_path)
+        
+        body = app.app.test_client().post('/', data={'full_name': 'Alice'}).get_data(as_text=True)
+        assert '<h1>Done</h1>' in body
+        assert 'We will email you' in body and 'Alice' in body
+
+
+class TestProcessorApp:
+    """Test suite for ProcessorApp skeleton."""
+    
+    class Doubler(ProcessorApp):
+        def process(self, session_data):
+            return {'doubled': str(int(session_data['value']) * 2)}
+    
+    def test_submit_job_reports_result(self):
+        """Test process() runs on the pool and its result reaches the callback."""
+        app = self.Doubler("doubler", "localhost", 8004)
+        outcomes = []
+        
+        app.submit_job('WF-TOKEN', {'value': '21'}, lambda *outcome: outcomes.append(outcome)).result()
+        app.stop()
+        
+        assert outcomes == [('WF-TOKEN', {'doubled': '42'}, None)]
+    
+    def test_submit_job_reports_errors(self):
+        """Test an exception in process() is reported as an error message."""
+        app = self.Doubler("doubler", "localhost", 8004)
+        outcomes = []
+        
+        app.submit_job('WF-TOKEN', {'value': 'x'}, lambda *outcome: outcomes.append(outcome)).exception()
+        app.stop()
+        
+        assert outcomes[0][1] is None and 'invalid literal' in outcomes[0][2]
+    
+    def test_jobs_route_accepts_and_calls_back(self):
+        """Test jobs posted over HTTP are accepted and reported to the callback URL."""
+        app = self.Doubler("doubler", "localhost", 8004)
+        
+        with patch.object(ProcessorApp, 'post_result') as post_result:
+            response = app.app.test_client().post('/jobs', json={
+                'workflow_token': 'WF-TOKEN', 'session_data': {'value': '2'},
+                'callback_url': 'http://localhost:8000/jobs/doubler/complete'})
+            app.stop()
+        
+        assert response.status_code == 202
+        post_result.assert_called_once_with('http://localhost:8000/jobs/doubler/complete',
+                                            'WF-TOKEN', {'doubled': '4'}, None)
+        assert app.app.test_client().post('/jobs', json={}).status_code == 400
@@ -0,0 +1,854 @@
+"""Tests for hexflow state backends."""
+
+import csv
+import io
+import json
+import sqlite3
+import time
+import pytest
+from datetime import datetime, timedelta
+
+from hexflow.runner.dag_parser import DAGDefinition, App
+from hexflow.state import (StateBackend, SQLiteBackend, LogStructuredBackend, ShardedSQLiteBackend,
+                           SQLiteJobQueue, WorkflowSession, SessionConflictError, DeadlineExceededError,
+                           session_cursor, reshard)
+from hexflow.state.export import SessionExporter, dag_columns, read_watermark, write_watermark
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    """Create a SQLite backend in a temporary directory."""
+    return SQLiteBackend(str(tmp_path / "sessions.db"))
+
+
+@pytest.fixture(params=["sqlite", "sqlite-binary", "log", "sharded"])
+def backend(request, tmp_path):
+    """Create each general-purpose backend in a temporary directory."""
+    if request.param == "sqlite":
+        yield SQLiteBackend(str(tmp_path / "sessions.db"))
+    elif request.param == "sqlite-binary":
+        yield SQLiteBackend(str(tmp_path / "sessions.db"), codec="binary+zlib", compress_threshold=64)
+    elif request.param == "sharded":
+        sharded_backend = ShardedSQLiteBackend(str(tmp_path / "shards"), shards=3)
+        yield sharded_backend
+        sharded_backend.close()
+    else:
+        log_backend = LogStructuredBackend(str(tmp_path / "sessions.log"), fsync=False)
+        yield log_backend
+        log_backend.close()
+
+
+def make_sessions(backend, count, workflow_name="test-flow", status="in_progress"):
+    """Create sessions saved one after another, oldest first."""
+    sessions = []
+    for i in range(count):
+        session = backend.create_session(workflow_name)
+        session.status = status
+        session.set_step_data("step-one", {"index": str(i)})
+        backend.save_session(session)
+        sessions.append(session)
+    return sessions
+
+
+class TestStateBackend:
+    """Behaviour tests shared by all state backends."""
+    
+    def test_create_and_get_session(self, backend):
+        """Test a created session can be fetched by id and token."""
+        session = backend.create_session("test-flow")
+        
+        assert backend.get_session(session.session_id).workflow_token == session.workflow_token
+        assert backend.get_session_by_token(session.workflow_token).session_id == session.session_id
+    
+    def test_save_session_persists_step_data(self, backend):
+        """Test step data round-trips through the database."""
+        session = backend.create_session("test-flow")
+        session.set_step_data("step-one", {"name": "Alice"})
+        backend.save_session(session)
+        
+        loaded = backend.get_session(session.session_id)
+        assert loaded.get_step_data("step-one") == {"name": "Alice"}
+        assert loaded.has_completed_step("step-one")
+    
+    def test_insert_sessions_batch(self, backend):
+        """Test a batch insert saves new sessions and skips taken tokens."""
+        existing = backend.create_session("test-flow", workflow_token="WF-TAKEN")
+        batch = [backend.new_session("test-flow") for _ in range(5)]
+        batch.append(backend.new_session("test-flow", workflow_token="WF-TAKEN"))
+        batch[0].set_step_data("step-one", {"name": "Alice"})
+        
+        assert backend.insert_sessions(batch) == [True] * 5 + [False]
+        assert backend.count_sessions("test-flow") == 6
+        assert backend.get_session(batch[0].session_id).get_step_data("step-one") == {"name": "Alice"}
+        assert batch[0].version == 1 and batch[-1].version == 0
+        assert backend.get_session_by_token("WF-TAKEN").session_id == existing.session_id
+    
+    def test_delete_session(self, backend):
+        """Test deleting a session removes it."""
+        session = backend.create_session("test-flow")
+        
+        assert backend.delete_session(session.session_id) is True
+        assert backend.get_session(session.session_id) is None
+        assert backend.delete_session(session.session_id) is False
+    
+    def test_duplicate_token_rejected(self, backend):
+        """Test a second session cannot take an existing workflow token."""
+        backend.create_session("test-flow", workflow_token="WF-TAKEN")
+        
+        with pytest.raises(RuntimeError):
+            backend.create_session("test-flow", workflow_token="WF-TAKEN")
+    
+    def test_stale_save_rejected(self, backend):
+        """Test saving a copy loaded before another save fails (compare-and-swap)."""
+        session = backend.create_session("test-flow")
+        first = backend.get_session(session.session_id)
+        second = backend.get_session(session.session_id)
+        
+        first.set_step_data("step-one", {"name": "Alice"})
+        assert backend.save_session(first) is True
+        second.set_step_data("step-two", {"name": "Bob"})
+        assert backend.save_session(second) is False
+        
+        loaded = backend.get_session(session.session_id)
+        assert loaded.version == first.version == session.version + 1
+        assert loaded.get_step_data("step-two") is None
+    
+    def test_rejected_save_leaves_session_unchanged(self, backend):
+        """Test a stale save changes neither the caller's version nor its timestamp."""
+        session = backend.create_session("test-flow")
+        stale = backend.get_session(session.session_id)
+        assert backend.save_session(session) is True
+        
+        updated_at, version = stale.updated_at, stale.version
+        assert backend.save_session(stale) is False
+        assert (stale.updated_at, stale.version) == (updated_at, version)
+        assert session.updated_at > updated_at
+    
+    def test_update_session_merges_concurrent_changes(self, backend):
+        """Test update_session reapplies its change on top of a concurrent save."""
+        session = backend.create_session("test-flow")
+        calls = []
+        
+        def update(loaded):
+            if not calls:
+                # Another writer saves between our load and our save
+                concurrent = backend.get_session(session.session_id)
+                concurrent.set_step_data("step-one", {"name": "Alice"})
+                assert backend.save_session(concurrent)
+            calls.append(loaded.version)
+            loaded.set_step_data("step-two", {"age": "42"})
+        
+        updated = backend.update_session(session.workflow_token, update)
+        
+        assert len(calls) == 2
+        loaded = backend.get_session(session.session_id)
+        assert loaded.get_step_data("step-one") == {"name": "Alice"}
+        assert loaded.get_step_data("step-two") == {"age": "42"}
+        assert loaded.version == updated.version == session.version + 2
+    
+    def test_update_session_gives_up(self, backend):
+        """Test update_session raises after losing every race."""
+        session = backend.create_session("test-flow")
+        
+        def update(loaded):
+            concurrent = backend.get_session(session.session_id)
+            assert backend.save_session(concurrent)
+        
+        with pytest.raises(SessionConflictError):
+            backend.update_session(session.workflow_token, update, max_attempts=2)
+        assert backend.update_session("WF-MISSING", update) is None
+    
+    def test_update_session_stops_at_deadline(self, backend):
+        """Test update_session does not retry a lost race past its deadline."""
+        session = backend.create_session("test-flow")
+        calls = []
+        
+        def update(loaded):
+            calls.append(loaded.version)
+            concurrent = backend.get_session(session.session_id)
+            assert backend.save_session(concurrent)
+        
+        with pytest.raises(DeadlineExceededError):
+            backend.update_session(session.workflow_token, update, max_attempts=5, deadline=time.time())
+        assert len(calls) == 1
+    
+    def test_cleanup_expired_sessions(self, backend):
+        """Test sessions created before the cutoff are removed."""
+        old = backend.create_session("test-flow")
+        old.created_at = datetime.now() - timedelta(days=40)
+        backend.save_session(old)
+        recent = backend.create_session("test-flow")
+        
+        assert backend.cleanup_expired_sessions(max_age_days=30) == 1
+        assert backend.get_session(old.session_id) is None
+        assert backend.get_session(recent.session_id) is not None
+
+
+class TestIterSessions:
+    """Test suite for keyset-paginated session iteration."""
+    
+    def test_list_sessions_newest_first(self, backend):
+        """Test list_sessions still returns newest sessions first."""
+        sessions = make_sessions(backend, 5)
+        
+        listed = backend.list_sessions()
+        assert [s.session_id for s in listed] == [s.session_id for s in reversed(sessions)]
+    
+    def test_iter_sessions_pages_through_all_rows(self, backend):
+        """Test iteration across page boundaries returns every session once."""
+        sessions = make_sessions(backend, 7)
+        
+        iterated = list(backend.iter_sessions(page_size=3))
+        assert len(iterated) == 7
+        assert {s.session_id for s in iterated} == {s.session_id for s in sessions}
+    
+    def test_iter_sessions_ascending_with_cursor(self, backend):
+        """Test resuming ascending iteration after a cursor."""
+        sessions = make_sessions(backend, 6)
+        
+        first_page = list(backend.iter_sessions(ascending=True, page_size=2))[:3]
+        rest = list(backend.iter_sessions(ascending=True, page_size=2,
+                                          after=session_cursor(first_page[-1])))
+        assert [s.session_id for s in first_page + rest] == [s.session_id for s in sessions]
+    
+    def test_iter_sessions_without_data(self, backend):
+        """Test the projection skips decoding step data and metadata."""
+        for session in make_sessions(backend, 2):
+            session.metadata["source"] = "test"
+            backend.save_session(session)
+        
+        for session in backend.iter_sessions(include_data=False):
+            assert session.data == {} and "source" not in session.metadata
+            assert session.workflow_token.startswith("WF-")
+        
+        # The fallback for backends that only implement list_sessions
+        for session in StateBackend.iter_sessions(backend, include_data=False):
+            assert session.data == {} and "source" not in session.metadata
+    
+    def test_iter_sessions_filters(self, backend):
+        """Test workflow and status filters apply to iteration."""
+        make_sessions(backend, 3, workflow_name="flow-a")
+        make_sessions(backend, 2, workflow_name="flow-b", status="completed")
+        
+        assert len(list(backend.iter_sessions(workflow_name="flow-a", page_size=1))) == 3
+        assert len(list(backend.iter_sessions(status="completed"))) == 2
+    
+    def test_count_sessions(self, backend):
+        """Test count_sessions counts without loading rows."""
+        make_sessions(backend, 3, workflow_name="flow-a")
+        make_sessions(backend, 2, workflow_name="flow-b", status="completed")
+        
+        assert backend.count_sessions() == 5
+        assert backend.count_sessions(workflow_name="flow-a") == 3
+        assert backend.count_sessions(status="completed") == 2
+        assert backend.count_sessions(workflow_name="flow-a", status="completed") == 0
+
+
+class TestStatsCounters:
+    """Test suite for trigger-maintained session statistics."""
+    
+    def test_counters_follow_create_status_change_and_delete(self, backend):
+        """Test counters are updated on create, status change and delete."""
+        sessions = make_sessions(backend, 3, workflow_name="flow-a")
+        make_sessions(backend, 1, workflow_name="flow-b")
+        
+        sessions[0].set_status("completed")
+        backend.save_session(sessions[0])
+        backend.delete_session(sessions[1].session_id)
+        
+        stats = backend.get_stats()
+        assert stats['total_sessions'] == 3
+        assert stats['status_counts'] == {'in_progress': 2, 'completed': 1}
+        assert stats['workflow_counts'] == {'flow-a': 2, 'flow-b': 1}
+    
+    def test_reconcile_reports_and_fixes_drift(self, sqlite_backend):
+        """Test reconciliation recomputes counters and reports drift."""
+        make_sessions(sqlite_backend, 2)
+        with sqlite3.connect(sqlite_backend.db_path) as conn:
+            conn.execute("UPDATE workflow_stats SET count = 7 WHERE dimension = 'total'")
+        
+        result = sqlite_backend.reconcile_stats()
+        assert result['drift'] == {'total:': {'counter': 7, 'actual': 2}}
+        assert sqlite_backend.get_stats()['total_sessions'] == 2
+        assert sqlite_backend.reconcile_stats()['drift'] == {}
+    
+    def test_counters_backfilled_for_existing_database(self, tmp_path):
+        """Test counters are built when opening a database created without them."""
+        db_path = tmp_path / "old.db"
+        backend = SQLiteBackend(str(db_path))
+        make_sessions(backend, 2)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DROP TABLE workflow_stats")
+        
+        assert SQLiteBackend(str(db_path)).get_stats()['total_sessions'] == 2
+
+
+class TestLogStructuredBackend:
+    """Test suite for LogStructuredBackend recovery and compaction."""
+    
+    def test_recovers_sessions_after_restart(self, tmp_path):
+        """Test sessions and deletes are replayed from the log on startup."""
+        log_dir = str(tmp_path / "sessions.log")
+        backend = LogStructuredBackend(log_dir)
+        kept, deleted = make_sessions(backend, 2)
+        backend.delete_session(deleted.session_id)
+        backend.close()
+        
+        reopened = LogStructuredBackend(log_dir)
+        assert reopened.get_session_by_token(kept.workflow_token).get_step_data("step-one") == {"index": "0"}
+        assert reopened.get_session(deleted.session_id) is None
+        reopened.close()
+    
+    def test_snapshot_compacts_old_segments(self, tmp_path):
+        """Test snapshots replace old segments and still recover all sessions."""
+        log_dir = tmp_path / "sessions.log"
+        backend = LogStructuredBackend(str(log_dir), snapshot_every=4, fsync=False)
+        sessions = make_sessions(backend, 10)
+        backend.close()
+        
+        # Snapshots are written in the background
+        for _ in range(50):
+            if len(list(log_dir.glob("snapshot.*.json"))) == 1:
+                break
+            time.sleep(0.05)
+        assert len(list(log_dir.glob("snapshot.*.json"))) == 1
+        
+        reopened = LogStructuredBackend(str(log_dir))
+        assert reopened.count_sessions() == 10
+        assert reopened.get_session(sessions[-1].session_id).get_step_data("step-one") == {"index": "9"}
+        reopened.close()
+    
+    def test_torn_final_record_is_discarded(self, tmp_path):
+        """Test a partially written last record is ignored and truncated."""
+        log_dir = tmp_path / "sessions.log"
+        backend = LogStructuredBackend(str(log_dir))
+        session = backend.create_session("test-flow")
+        backend.close()
+        
+        segment = next(log_dir.glob("segment.*.log"))
+        with open(segment, "a") as f:
+            f.write('{"op": "delete", "sess')
+        
+        reopened = LogStructuredBackend(str(log_dir))
+        assert reopened.get_session(session.session_id) is not None
+        reopened.create_session("test-flow")
+        reopened.close()
+        assert LogStructuredBackend(str(log_dir)).count_sessions() == 2
+
+    
+    def test_failed_write_not_applied_and_writer_recovers(self, tmp_path):
+        """Test a record that fails to write is neither visible nor logged, and later writes succeed."""
+        log_dir = tmp_path / "sessions.log"
+        backend = LogStructuredBackend(str(log_dir))
+        session = backend.create_session("test-flow")
+        
+        class FailingLog:
+            """Log file whose next write fails part way, as on a full disk."""
+            def __init__(self, log):
+                self.log = log
+            
+            def write(self, text):
+                self.log.write(text[:10])
+                self.log.flush()
+                raise OSError("No space left on device")
+            
+            def __getattr__(self, name):
+                return getattr(self.log, name)
+        
+        with backend._cond:
+            backend._log = FailingLog(backend._log)
+        session.set_step_data("step-one", {"lost": "yes"})
+        assert backend.save_session(session) is False
+        assert backend.get_session(session.session_id).get_step_data("step-one") is None
+        
+        stored = backend.get_session(session.session_id)
+        stored.set_step_data("step-one", {"kept": "yes"})
+        assert backend.save_session(stored) is True
+        assert backend.cleanup_expired_sessions(max_age_days=-1) == 1
+        backend.close()
+        
+        reopened = LogStructuredBackend(str(log_dir))
+        assert reopened.count_sessions() == 0
+        reopened.close()
+        
+        segment = next(log_dir.glob("segment.*.log"))
+        records = [json.loads(line) for line in segment.read_text().splitlines()]
+        assert [record["op"] for record in records] == ["put", "put", "delete"]
+        assert records[1]["session"]["data"]["step-one"] == {"kept": "yes"}
+
+class TestShardedSQLiteBackend:
+    """Test suite for ShardedSQLiteBackend placement and resharding."""
+    
+    def test_sessions_spread_across_shards(self, tmp_path):
+        """Test sessions land on several shards and lookups find them."""
+        backend = ShardedSQLiteBackend(str(tmp_path / "shards"), shards=4)
+        sessions = make_sessions(backend, 20)
+        
+        assert sum(1 for shard in backend.shards if shard.count_sessions() > 0) > 1
+        for session in sessions:
+            assert backend.get_session(session.session_id).workflow_token == session.workflow_token
+        backend.close()
+    
+    def test_unaligned_session_id_found_by_fan_out(self, tmp_path):
+        """Test sessions saved with arbitrary IDs are still found by ID."""
+        backend = ShardedSQLiteBackend(str(tmp_path / "shards"), shards=4)
+        sessions = [WorkflowSession(workflow_name="test-flow") for _ in range(8)]
+        for session in sessions:
+            backend.save_session(session)
+        
+        for session in sessions:
+            assert backend.get_session(session.session_id) is not None
+        assert backend.delete_session(sessions[0].session_id) is True
+        backend.close()
+    
+    def test_shard_count_mismatch_rejected(self, tmp_path):
+        """Test reopening a shard directory with a different count fails."""
+        ShardedSQLiteBackend(str(tmp_path / "shards"), shards=4).close()
+        
+        with pytest.raises(ValueError):
+            ShardedSQLiteBackend(str(tmp_path / "shards"), shards=2)
+    
+    def test_reshard_single_database(self, tmp_path):
+        """Test resharding copies every session from a single database."""
+        source = SQLiteBackend(str(tmp_path / "workflow_sessions.db"))
+        sessions = make_sessions(source, 12)
+        sessions[0].set_status("completed")
+        source.save_session(sessions[0])
+        
+        copied = reshard(str(source.db_path), str(tmp_path / "shards"), shards=3, batch_size=5)
+        
+        backend = ShardedSQLiteBackend(str(tmp_path / "shards"), shards=3)
+        assert copied == 12
+        assert backend.count_sessions() == 12
+        assert backend.get_stats()['status_counts'] == {'in_progress': 11, 'completed': 1}
+        assert backend.get_session_by_token(sessions[5].workflow_token).get_step_data("step-one") == {"index": "5"}
+        backend.close()
+
+
+class TestSQLiteJobQueue:
+    """Test suite for the durable processor job queue."""
+    
+    def processing_session(self, backend, step="check"):
+        """Create a session waiting for a processor step."""
+        session = backend.create_session("test-flow")
+        session.current_step = step
+        session.set_status("processing")
+        backend.save_session(session)
+        return session
+    
+    def test_claims_by_priority_in_batches(self, sqlite_backend):
+        """Test claims take the highest priority jobs first, oldest first within a priority."""
+        queue = SQLiteJobQueue(sqlite_backend)
+        low = queue.enqueue("token-a", "check", {"n": 1})
+        high = queue.enqueue("token-b", "check", {"n": 2}, priority=5)
+        later_low = queue.enqueue("token-c", "check", {"n": 3})
+        queue.enqueue("token-d", "other", {})
+        
+        jobs = queue.claim("check", "worker-1", limit=2)
+        assert [job.job_id for job in jobs] == [high, low]
+        assert jobs[0].payload == {"n": 2} and jobs[0].attempts == 1
+        assert [job.job_id for job in queue.claim("check", "worker-2")] == [later_low]
+        assert queue.claim("check", "worker-3") == []
+        assert queue.counts() == {"leased": 3, "queued": 1}
+    
+    def test_one_active_job_per_step(self, sqlite_backend):
+        """Test enqueueing a step that already has a queued job is a no-op."""
+        queue = SQLiteJobQueue(sqlite_backend)
+        assert queue.enqueue("token-a", "check", {}) is not None
+        assert queue.enqueue("token-a", "check", {}) is None
+        assert queue.enqueue("token-a", "other", {}) is not None
+        assert queue.enqueue_many([("token-a", ("check", {}, 0, None)), ("token-b", ("check", {}, 0, None))])[0] is None
+        assert queue.counts() == {"queued": 3}
+    
+    def test_expired_lease_requeued(self, sqlite_backend):
+        """Test a job whose worker stopped heartbeating goes to the next claim."""
+        queue = SQLiteJobQueue(sqlite_backend)
+        queue.enqueue("token-a", "check", {})
+        queue.enqueue("token-b", "check", {})
+        crashed = queue.claim("check", "worker-1", lease_seconds=0.05)
+        
+        time.sleep(0.1)
+        assert queue.heartbeat([job.job_id for job in crashed], "worker-1") == 0
+        reclaimed = queue.claim("check", "worker-2", lease_seconds=30)
+        assert sorted(job.job_id for job in reclaimed) == sorted(job.job_id for job in crashed)
+        assert all(job.attempts == 2 for job in reclaimed)
+        assert queue.heartbeat([job.job_id for job in reclaimed], "worker-2") == 2
+        
+        # The first worker's late completion is ignored
+        assert queue.complete(crashed[0], lambda session: None) is None
+        assert queue.counts() == {"leased": 2}
+    
+    def test_completion_saves_session_and_follow_up(self, sqlite_backend):
+        """Test a completion settles the job, saves the session and enqueues the next job together."""
+        queue = SQLiteJobQueue(sqlite_backend)
+        session = self.processing_session(sqlite_backend)
+        queue.enqueue(session.workflow_token, "check", {"age": "30"})
+        job = queue.claim("check", "worker-1")[0]
+        
+        def update(workflow_session):
+            workflow_session.set_step_data("check", {"ok": "yes"})
+            workflow_session.current_step = "notify"
+        
+        saved = queue.complete(job, update, follow_up=lambda workflow_session: [("notify", {"ok": "yes"}, 1, None)])
+        assert saved.version == session.version + 1
+        
+        stored = sqlite_backend.get_session_by_token(session.workflow_token)
+        assert stored.current_step == "notify" and stored.get_step_data("check") == {"ok": "yes"}
+        assert queue.counts() == {"done": 1, "queued": 1}
+        follow_up = queue.claim("notify", "worker-1")[0]
+        assert (follow_up.workflow_token, follow_up.payload, follow_up.priority) == \
+            (session.workflow_token, {"ok": "yes"}, 1)
+    
+    def test_completion_retries_session_conflicts(self, sqlite_backend):
+        """Test a session saved by another writer meanwhile is reloaded and the change reapplied."""
+        queue = SQLiteJobQueue(sqlite_backend)
+        session = self.processing_session(sqlite_backend)
+        queue.enqueue(session.workflow_token, "check", {})
+        job = queue.claim("check", "worker-1")[0]
+        calls = []
+        
+        def update(workflow_session):
+            if not calls:
+                # Another writer saves the session after this completion loaded it
+                other = sqlite_backend.get_session_by_token(session.workflow_token)
+                other.add_metadata("note", "kept")
+                sqlite_backend.save_session(other)
+            calls.append(1)
+            workflow_session.set_step_data("check", {"ok": "yes"})
+        
+        assert queue.complete(job, update) is not None
+        stored = sqlite_backend.get_session_by_token(session.workflow_token)
+        assert len(calls) == 2
+        assert stored.metadata["note"] == "kept" and stored.get_step_data("check") == {"ok": "yes"}
+    
+    def test_branch_completions_saved_together(self, sqlite_backend):
+        """Test jobs for one session in a batch, such as parallel branches, all change it in one save."""
+        queue = SQLiteJobQueue(sqlite_backend)
+        session = self.processing_session(sqlite_backend)
+        branches = ["branch-a", "branch-b", "branch-c", "branch-d"]
+        jobs = []
+        for branch in branches:
+            queue.enqueue(session.workflow_token, branch, {})
+            jobs.extend(queue.claim(branch, "worker-1"))
+        
+        def finish(branch):
+            def update(workflow_session):
+                workflow_session.set_step_data(branch, {"done": "yes"})
+            return update
+        
+        saved = queue.complete_many([(job, finish(job.app_name), None) for job in jobs])
+        assert all(result is saved[0] for result in saved)
+        assert saved[0].version == session.version + 1
+        stored = sqlite_backend.get_session_by_token(session.workflow_token)
+        assert all(stored.get_step_data(branch) == {"done": "yes"} for branch in branches)
+        assert queue.counts() == {"done": 4}
+    
+    def test_lost_lease_dropped_from_shared_save(self, sqlite_backend):
+        """Test a job whose lease was lost does not take its change into its session's save."""
+        queue = SQLiteJobQueue(sqlite_backend)
+        session = self.processing_session(sqlite_backend)
+        queue.enqueue(session.workflow_token, "branch-a", {})
+        queue.enqueue(session.workflow_token, "branch-b", {})
+        kept = queue.claim("branch-a", "worker-1")[0]
+        lost = queue.claim("branch-b", "worker-1", lease_seconds=0.05)[0]
+        time.sleep(0.1)
+        assert queue.claim("branch-b", "worker-2")
+        
+        def update(workflow_session):
+            workflow_session.add_metadata("ran", workflow_session.metadata.get("ran", []) + ["update"])
+        
+        def lost_update(workflow_session):
+            workflow_session.set_step_data("branch-b", {"done": "yes"})
+        
+        saved, ignored = queue.complete_many([(kept, update, None), (lost, lost_update, None)])
+        assert ignored is None and saved.version == session.version + 1
+        stored = sqlite_backend.get_session_by_token(session.workflow_token)
+        assert stored.metadata["ran"] == ["update"] and stored.get_step_data("branch-b") is None
+        assert queue.counts() == {"done": 1, "leased": 1}
+    
+    def test_failed_and_stale_jobs_settled(self, sqlite_backend):
+        """Test errors mark jobs failed and stale results leave the session alone."""
+        queue = SQLiteJobQueue(sqlite_backend)
+        session = self.processing_session(sqlite_backend)
+        queue.enqueue(session.workflow_token, "check", {})
+        queue.enqueue("missing-token", "check", {})
+        failed, missing = queue.claim("check", "worker-1")
+        
+        def stale(workflow_session):
+            raise SessionConflictError("not waiting")
+        
+        assert queue.complete_many([(failed, stale, "boom"), (missing, stale, None)]) == [None, None]
+        assert queue.counts() == {"done": 1, "failed": 1}
+        assert sqlite_backend.get_session_by_token(session.workflow_token).version == session.version
+    
+    def test_jobs_survive_reopening(self, tmp_path):
+        """Test queued jobs and leases are kept in the database file."""
+        queue = SQLiteJobQueue(SQLiteBackend(str(tmp_path / "sessions.db")))
+        queue.enqueue("token-a", "check", {"n": 1})
+        
+        reopened = SQLiteJobQueue(SQLiteBackend(str(tmp_path / "sessions.db")))
+        assert [job.payload for job in reopened.claim("check", "worker-1")] == [{"n": 1}]
+
+
+class TestSessionCodecs:
+    """Test suite for pluggable session codecs."""
+    
+    SAMPLE = {
+        "step-one": {"full_name": "Alice", "age": 42, "score": -1.5, "ok": True,
+                     "none": None, "extras": ["a", "b"], "big": 2 ** 70, "neg": -2 ** 70},
+        "step-two": {"notes": "x" * 2000, "unicode": "caf\u00e9 \u2713"},
+    }
+    
+    @pytest.mark.parametrize("codec", ["json", "binary", "json+zlib", "binary+zlib"])
+    def test_round_trip(self, tmp_path, codec):
+        """Test every codec round-trips session data through the database."""
+        backend = SQLiteBackend(str(tmp_path / "sessions.db"), codec=codec)
+        session = backend.create_session("test-flow")
+        for step_name, step_data in self.SAMPLE.items():
+            session.set_step_data(step_name, step_data)
+        backend.save_session(session)
+        
+        loaded = backend.get_session(session.session_id)
+        assert loaded.data == self.SAMPLE
+        assert loaded.metadata['completed_steps'] == ["step-one", "step-two"]
+    
+    def test_rows_tagged_and_mixed_formats_readable(self, tmp_path):
+        """Test a database can hold rows written by different codecs."""
+        db_path = str(tmp_path / "sessions.db")
+        json_session = SQLiteBackend(db_path).create_session("test-flow")
+        binary_backend = SQLiteBackend(db_path, codec="binary")
+        binary_session = binary_backend.create_session("test-flow")
+        
+        with sqlite3.connect(db_path) as conn:
+            codecs = dict(conn.execute("SELECT session_id, codec FROM workflow_sessions"))
+        assert codecs == {json_session.session_id: "json", binary_session.session_id: "binary"}
+        
+        reader = SQLiteBackend(db_path)
+        assert reader.get_session(binary_session.session_id).metadata == binary_session.metadata
+        assert binary_backend.get_session(json_session.session_id).metadata == json_session.metadata
+    
+    def test_compression_threshold(self, tmp_path):
+        """Test zlib codecs only compress values above the threshold."""
+        backend = SQLiteBackend(str(tmp_path / "sessions.db"), codec="json+zlib", compress_threshold=100)
+        
+        assert backend.codec.encode({"a": 1})[:1] == b"\x00"
+        large = backend.codec.encode({"a": "x" * 1000})
+        assert large[:1] == b"\x01"
+        assert len(large) < 100
+    
+    def test_binary_keys_are_dictionary_encoded(self, tmp_path):
+        """Test binary rows store field names once in the term dictionary."""
+        backend = SQLiteBackend(str(tmp_path / "sessions.db"), codec="binary")
+        encoded = backend.codec.encode({"a_very_long_field_name": "v"})
+        
+        assert b"a_very_long_field_name" not in encoded
+        other = SQLiteBackend(str(tmp_path / "sessions.db"), codec="binary")
+        assert other.codec.decode(encoded) == {"a_very_long_field_name": "v"}
+    
+    def test_codec_must_implement_encode_and_decode(self):
+        """Test a codec missing encode or decode cannot be instantiated."""
+        from hexflow.state.codecs import SessionCodec
+        
+        class EncodeOnly(SessionCodec):
+            def encode(self, value):
+                return ''
+        
+        with pytest.raises(TypeError):
+            EncodeOnly()
+    
+    def test_existing_database_gains_codec_column(self, tmp_path):
+        """Test databases created before codecs are migrated as JSON rows."""
+        db_path = tmp_path / "old.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("""
+                CREATE TABLE workflow_sessions (
+                    session_id TEXT PRIMARY KEY, workflow_name TEXT NOT NULL,
+                    workflow_token TEXT UNIQUE NOT NULL, current_step TEXT,
+                    status TEXT DEFAULT 'in_progress', data TEXT NOT NULL,
+                    metadata TEXT NOT NULL, created_at TEXT NOT NULL, updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("INSERT INTO workflow_sessions VALUES ('s1', 'test-flow', 'WF-OLD', NULL, "
+                         "'in_progress', '{\"a\": {\"b\": 1}}', '{}', "
+                         "'2025-01-01T00:00:00', '2025-01-01T00:00:00')")
+        
+        backend = SQLiteBackend(str(db_path), codec="binary")
+        assert backend.get_session_by_token("WF-OLD").data == {"a": {"b": 1}}
+        assert backend.get_stats()['total_sessions'] == 1
+    
+    def test_reshard_reencodes_binary_rows(self, tmp_path):
+        """Test binary rows stay readable after resharding."""
+        source = SQLiteBackend(str(tmp_path / "workflow_sessions.db"), codec="binary")
+        sessions = make_sessions(source, 6)
+        
+        reshard(str(source.db_path), str(tmp_path / "shards"), shards=2)
+        
+        backend = ShardedSQLiteBackend(str(tmp_path / "shards"), shards=2)
+        for session in sessions:
+            assert backend.get_session_by_token(session.workflow_token).data == session.data
+        backend.close()
+
+
+class TestWorkflowSession:
+    """Test suite for the WorkflowSession model."""
+    
+    def test_slotted(self):
+        """Test sessions carry no per-instance __dict__."""
+        session = WorkflowSession(workflow_name="test-flow")
+        assert not hasattr(session, "__dict__")
+        with pytest.raises(AttributeError):
+            session.unknown_attribute = 1
+    
+    def test_to_dict_shares_steps_but_not_containers(self):
+        """Test to_dict avoids deep copies without aliasing mutable containers."""
+        session = WorkflowSession(workflow_name="test-flow")
+        step_data = {"name": "Alice"}
+        session.set_step_data("step-one", step_data)
+        
+        stored = session.to_dict()
+        assert stored["data"]["step-one"] is step_data
+        
+        session.set_step_data("step-two", {"age": "42"})
+        assert "step-two" not in stored["data"]
+        assert stored["metadata"]["completed_steps"] == ["step-one"]
+    
+    def test_from_dict_does_not_mutate_input(self):
+        """Test from_dict leaves its input untouched."""
+        stored = WorkflowSession(workflow_name="test-flow").to_dict()
+        original = dict(stored)
+        
+        session = WorkflowSession.from_dict(stored)
+        assert stored == original
+        assert isinstance(session.created_at, datetime)
+        assert WorkflowSession.from_dict(session.to_dict()) == session
+    
+    def test_completion_tracking_beyond_scan_limit(self):
+        """Test completion checks stay correct for long workflows."""
+        session = WorkflowSession(workflow_name="test-flow")
+        session.metadata["total_steps"] = 20
+        steps = [f"step-{i}" for i in range(20)]
+        for step in steps + steps[:5]:
+            session.set_step_data(step, {})
+        
+        assert session.metadata["completed_steps"] == steps
+        assert session.metadata["progress_percentage"] == 100
+        assert session.has_completed_step("step-15")
+        assert not session.has_completed_step("step-20")
+        
+        # Replacing metadata wholesale is picked up
+        session.metadata = {"completed_steps": steps[10:]}
+        assert not session.has_completed_step("step-0")
+    
+    def test_get_all_data_cached_until_step_changes(self):
+        """Test the flattened view is reused and refreshed on change."""
+        session = WorkflowSession(workflow_name="test-flow")
+        session.set_step_data("step-one", {"name": "Alice"})
+        
+        view = session.get_all_data()
+        assert view == {"name": "Alice"}
+        with pytest.raises(TypeError):
+            view["name"] = "Bob"
+        
+        session.set_step_data("step-two", {"name": "Bob", "age": 30})
+        assert session.get_all_data() == {"name": "Alice", "step-two_name": "Bob", "age": 30}
+        
+        session.data = {}
+        assert dict(session.get_all_data()) == {}
+    
+    def test_get_all_data_incremental_matches_rebuild(self):
+        """Test folding steps in one at a time gives the same view as a rebuild."""
+        session = WorkflowSession(workflow_name="test-flow")
+        session.get_all_data()
+        steps = {
+            "details": {"name": "Alice", "city": "Leeds"},
+            "options": {"city": "York", "plan": "basic"},
+            "review": {"name": "Alice", "plan": "premium"},
+        }
+        for step_name, step_data in steps.items():
+            session.set_step_data(step_name, step_data)
+        
+        expected = {"name": "Alice", "city": "Leeds", "options_city": "York",
+                    "plan": "basic", "review_plan": "premium"}
+        assert session.get_all_data() == expected
+        assert WorkflowSession.from_dict(session.to_dict()).get_all_data() == expected
+        
+        # Resubmitting an earlier step rebuilds the view in step order
+        session.set_step_data("details", {"name": "Bob"})
+        assert session.get_all_data() == {"name": "Bob", "city": "York", "plan": "basic",
+                                          "review_name": "Alice", "review_plan": "premium"}
+    
+    def test_updated_at_stamped_on_read_after_change(self):
+        """Test updated_at moves on after a change and is stable otherwise."""
+        past = datetime(2025, 1, 1)
+        session = WorkflowSession(workflow_name="test-flow", created_at=past, updated_at=past)
+        assert session.updated_at == past
+        
+        session.set_step_data("step-one", {})
+        stamped = session.updated_at
+        assert stamped > past
+        assert session.updated_at == stamped
+
+
+class TestSessionExporter:
+    """Test suite for streaming export of completed sessions."""
+    
+    def make_completed(self, backend, name):
+        """Create a completed two-step session."""
+        session = backend.create_session("test-flow")
+        session.set_step_data("details", {"full_name": name, "from": "details",
+                                          "workflow_token": session.workflow_token})
+        session.set_step_data("options", {"extras": ["a", "b"]})
+        session.set_status("completed")
+        backend.save_session(session)
+        return session
+    
+    def test_dag_columns_prefers_form_fields(self):
+        """Test columns come from form fields, falling back to data_mapping."""
+        dag = DAGDefinition(
+            name="test-flow", description="", flow=[], config={},
+            apps=[App("details", 8001, True), App("options", 8002)],
+            data_mapping=[{"from": "options", "to": "done", "fields": ["extras"]},
+                          {"from": "details", "to": "options", "fields": "*"}]
+        )
+        
+        columns = dag_columns(dag, {"details": ["full_name", "email"]})
+        assert columns == ["details_full_name", "details_email", "options_extras"]
+    
+    def test_export_ndjson_skips_incomplete_and_routing_fields(self, backend):
+        """Test NDJSON export contains only completed sessions' step data."""
+        make_sessions(backend, 2)
+        completed = self.make_completed(backend, "Alice")
+        
+        out = io.StringIO()
+        count, watermark = SessionExporter(backend).export(out, "ndjson")
+        
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert count == 1
+        assert watermark == session_cursor(completed)
+        assert records[0]["data"]["details"] == {"full_name": "Alice"}
+    
+    def test_export_csv_flattens_columns(self, backend):
+        """Test CSV export flattens step data into DAG columns."""
+        self.make_completed(backend, "Alice")
+        
+        out = io.StringIO()
+        SessionExporter(backend, columns=["details_full_name", "options_extras"]).export(out, "csv")
+        
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        assert rows[0]["details_full_name"] == "Alice"
+        assert rows[0]["options_extras"] == "a, b"
+    
+    def test_export_resumes_from_watermark(self, backend, tmp_path):
+        """Test an incremental export only reads sessions after the watermark."""
+        self.make_completed(backend, "Alice")
+        exporter = SessionExporter(backend)
+        watermark_path = str(tmp_path / "watermark.json")
+        
+        _, watermark = exporter.export(io.StringIO())
+        write_watermark(watermark_path, watermark)
+        self.make_completed(backend, "Bob")
+        
+        out = io.StringIO()
+        count, _ = exporter.export(out, after=read_watermark(watermark_path))
+        assert count == 1
+        assert json.loads(out.getvalue())["data"]["details"]["full_name"] == "Bob"
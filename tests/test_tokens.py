@@ -0,0 +1,146 @@
+"""Tests for session ID and workflow token allocation."""
+
+import uuid
+import pytest
+
+from hexflow.state import SQLiteBackend, LogStructuredBackend, ShardedSQLiteBackend
+from hexflow.state.tokens import TokenAllocator, InvalidTokenError, ALPHABET
+
+
+class RepeatingAllocator(TokenAllocator):
+    """Allocator that hands out a fixed sequence of tokens, then real ones."""
+    
+    def __init__(self, tokens):
+        super().__init__()
+        self.tokens = list(tokens)
+    
+    def new_token(self):
+        return self.tokens.pop(0) if self.tokens else super().new_token()
+
+
+@pytest.fixture(params=["sqlite", "log", "sharded"])
+def backend(request, tmp_path):
+    """Create each general-purpose backend in a temporary directory."""
+    if request.param == "sqlite":
+        yield SQLiteBackend(str(tmp_path / "sessions.db"))
+    elif request.param == "log":
+        backend = LogStructuredBackend(str(tmp_path / "sessions.log"), fsync=False)
+        yield backend
+        backend.close()
+    else:
+        backend = ShardedSQLiteBackend(str(tmp_path / "shards"), shards=3)
+        yield backend
+        backend.close()
+
+
+class TestTokenAllocator:
+    """Test suite for TokenAllocator."""
+    
+    def test_token_format(self):
+        """Test tokens have the prefix, grouping and a valid check character."""
+        token = TokenAllocator().new_token()
+        
+        assert token.startswith("WF-")
+        groups = token[3:].split("-")
+        assert [len(group) for group in groups] == [4, 4, 4, 4]
+        assert all(char in ALPHABET for char in "".join(groups))
+        assert TokenAllocator().normalize(token) == token
+    
+    def test_configurable_encoding(self):
+        """Test prefix, length, grouping and checksum can be configured."""
+        allocator = TokenAllocator(prefix="FL-", random_chars=4, group=0, checksum=False)
+        token = allocator.new_token()
+        
+        assert token.startswith("FL-")
+        assert len(token) == 3 + TokenAllocator.TIME_CHARS + 4
+        assert "-" not in token[3:]
+    
+    def test_monotonic_within_one_millisecond(self):
+        """Test tokens and IDs keep increasing when the clock stands still."""
+        allocator = TokenAllocator(clock=lambda: 1_700_000_000.0)
+        tokens = [allocator.new_token() for _ in range(1000)]
+        session_ids = [allocator.new_session_id() for _ in range(1000)]
+        
+        assert tokens == sorted(tokens)
+        assert len(set(tokens)) == 1000
+        assert session_ids == sorted(session_ids)
+        assert len(set(session_ids)) == 1000
+    
+    def test_time_ordered(self):
+        """Test later tokens sort after earlier ones."""
+        now = [1_700_000_000.0]
+        allocator = TokenAllocator(clock=lambda: now[0])
+        first = allocator.new_token()
+        now[0] += 1
+        assert allocator.new_token() > first
+    
+    def test_session_ids_are_uuid7(self):
+        """Test session IDs are version 7 UUIDs."""
+        session_id = TokenAllocator().new_session_id()
+        parsed = uuid.UUID(session_id)
+        
+        assert parsed.version == 7
+        assert str(parsed) == session_id
+    
+    def test_normalize_fixes_case_spacing_and_confusables(self):
+        """Test typed variations of a token map back to it."""
+        allocator = TokenAllocator()
+        token = allocator.new_token()
+        typed = " " + token.lower().replace("-", " ").replace("wf ", "wf-", 1) + " "
+        
+        assert allocator.normalize(typed) == token
+        if "1" in token[3:] or "0" in token[3:]:
+            confused = "WF-" + token[3:].replace("1", "l").replace("0", "O")
+            assert allocator.normalize(confused) == token
+    
+    def test_checksum_detects_single_character_errors(self):
+        """Test every single-character substitution is rejected."""
+        allocator = TokenAllocator(group=0)
+        token = allocator.new_token()
+        body = token[3:]
+        
+        for position in range(len(body)):
+            for char in ALPHABET:
+                if char == body[position]:
+                    continue
+                mistyped = "WF-" + body[:position] + char + body[position + 1:]
+                with pytest.raises(InvalidTokenError):
+                    allocator.normalize(mistyped)
+    
+    def test_legacy_and_custom_tokens_pass_through(self):
+        """Test tokens not in the allocator's format are left alone."""
+        allocator = TokenAllocator()
+        
+        assert allocator.normalize("WF-1A2B3C4D") == "WF-1A2B3C4D"
+        assert allocator.normalize("custom-token") == "custom-token"
+
+
+class TestCreateSessionRetry:
+    """Test suite for collision handling in create_session."""
+    
+    def test_collision_retries_with_fresh_token(self, backend):
+        """Test a token collision is retried instead of failing."""
+        existing = backend.create_session("test-flow")
+        backend.token_allocator = RepeatingAllocator([existing.workflow_token] * 2)
+        
+        session = backend.create_session("test-flow")
+        
+        assert session.workflow_token != existing.workflow_token
+        assert backend.get_session_by_token(session.workflow_token).session_id == session.session_id
+        assert backend.get_session_by_token(existing.workflow_token).session_id == existing.session_id
+    
+    def test_gives_up_after_repeated_collisions(self, backend):
+        """Test create_session fails after CREATE_ATTEMPTS collisions."""
+        existing = backend.create_session("test-flow")
+        backend.token_allocator = RepeatingAllocator([existing.workflow_token] * backend.CREATE_ATTEMPTS)
+        
+        with pytest.raises(RuntimeError):
+            backend.create_session("test-flow")
+        assert backend.count_sessions() == 1
+    
+    def test_custom_token_in_use_is_not_retried(self, backend):
+        """Test an explicit token that is taken raises immediately."""
+        backend.create_session("test-flow", workflow_token="WF-TAKEN")
+        
+        with pytest.raises(RuntimeError, match="WF-TAKEN"):
+            backend.create_session("test-flow", workflow_token="WF-TAKEN")